@@ -2,30 +2,37 @@
 ACTUALLY extracts article content - not just headlines
 Uses multiple methods to get real article text fast
 """
-import requests
-from bs4 import BeautifulSoup
-import concurrent.futures
 import hashlib
+import itertools
 import json
 from pathlib import Path
 import time
 from datetime import datetime, timedelta
+from http_client import BROWSER_USER_AGENT
+from google_news_resolver import get_google_news_resolver, canonicalize_url
+from extraction_engine import get_extraction_engine
+from extraction_pipeline import get_extraction_pipeline
+
+# Structured fields kept alongside the article text
+DETAIL_FIELDS = ('title', 'byline', 'published', 'canonical_url')
 
 class ArticleExtractor:
     def __init__(self, cache_dir="article_cache"):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.headers = {'User-Agent': BROWSER_USER_AGENT}
 
     def _get_cache_key(self, url):
         """Create cache key from URL"""
         return hashlib.md5(url.encode()).hexdigest()
 
     def _get_from_cache(self, url):
-        """Get article from cache if fresh (24 hours)"""
+        """Get article text from cache if fresh (24 hours)"""
+        entry = self._get_cache_entry(url)
+        return entry['content'] if entry else None
+
+    def _get_cache_entry(self, url):
+        """Cached text and structured fields if fresh (24 hours)"""
         cache_file = self.cache_dir / f"{self._get_cache_key(url)}.json"
 
         if cache_file.exists():
@@ -35,14 +42,14 @@ class ArticleExtractor:
 
                 # Check if cache is fresh (24 hours)
                 cached_time = datetime.fromisoformat(data['cached_at'])
-                if datetime.now() - cached_time < timedelta(hours=24):
-                    return data['content']
+                if datetime.now() - cached_time < timedelta(hours=24) and data.get('content'):
+                    return data
             except:
                 pass
 
         return None
 
-    def _save_to_cache(self, url, content):
+    def _save_to_cache(self, url, content, fields=None):
         """Save article to cache"""
         cache_file = self.cache_dir / f"{self._get_cache_key(url)}.json"
 
@@ -51,6 +58,7 @@ class ArticleExtractor:
                 json.dump({
                     'url': url,
                     'content': content,
+                    'fields': fields or {},
                     'cached_at': datetime.now().isoformat()
                 }, f)
         except:
@@ -58,67 +66,51 @@ class ArticleExtractor:
 
     def extract_article(self, url, timeout=3):
         """Extract actual article content from URL"""
+        details = self.extract_article_details(url, timeout=timeout)
+        return details['content'] if details else None
 
+    def extract_article_details(self, url, timeout=3):
+        """
+        Article text plus structured fields (title, byline, published,
+        canonical_url), or None if no text could be extracted
+        """
         # Check cache first
-        cached = self._get_from_cache(url)
+        cached = self._get_cache_entry(url)
         if cached:
-            return cached
+            return {'content': cached['content'], **cached.get('fields', {})}
 
         try:
-            response = self.session.get(url, timeout=timeout)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-
-            # Try different methods to find article content
-            content = ""
-
-            # Method 1: Look for article tags
-            article = soup.find('article')
-            if article:
-                content = article.get_text()
-
-            # Method 2: Look for common content divs
-            if not content:
-                for selector in ['div.article-content', 'div.entry-content', 'div.post-content',
-                                'main', 'div.content', 'div.story-body']:
-                    element = soup.select_one(selector)
-                    if element:
-                        content = element.get_text()
-                        break
-
-            # Method 3: Get all paragraphs
-            if not content:
-                paragraphs = soup.find_all('p')
-                if len(paragraphs) > 3:
-                    content = ' '.join([p.get_text() for p in paragraphs[:20]])
-
-            # Clean up the text
-            if content:
-                content = ' '.join(content.split())
-                content = content[:5000]  # Limit to 5000 chars
-
-                # Save to cache
-                self._save_to_cache(url, content)
-
-                return content
+            # Streams the byte-capped page into the lxml-based engine
+            result = get_extraction_engine().extract_url(url, max_chars=5000,
+                                                         timeout=(min(timeout, 3.05), timeout),
+                                                         headers=self.headers)
+            return self._details_from_result(url, result)
 
+        except Exception as e:
             return None
 
-        except Exception as e:
+    def _details_from_result(self, url, result):
+        """Cache an engine result and turn it into article details"""
+        content = result['body']
+        if not content:
             return None
+        fields = {key: result[key] for key in DETAIL_FIELDS if result.get(key)}
+        self._save_to_cache(url, content, fields)
+        return {'content': content, **fields}
 
-    def extract_articles_parallel(self, articles, max_workers=10):
+    def extract_articles_parallel(self, articles, max_workers=50):
         """
         Extract content from multiple articles in parallel
-        Super fast - processes 10 articles simultaneously
+        Up to max_workers downloads run at once on the asyncio ingest
+        engine, within per-domain limits so no single domain gets hammered;
+        parsing happens in worker processes so it scales with cores
         """
         enhanced_articles = []
 
+        # Swap Google News redirects for publisher URLs so the first request
+        # hits the actual story, and drop copies of the same URL
+        articles = get_google_news_resolver().resolve_articles(articles)
+
         # Create a list of URLs to process
         urls_to_fetch = []
         url_to_article = {}
@@ -132,38 +124,43 @@ class ArticleExtractor:
         print(f"Extracting content from {len(urls_to_fetch)} articles...")
         start_time = time.time()
 
-        # Process URLs in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            future_to_url = {
-                executor.submit(self.extract_article, url, timeout=3): url
-                for url in urls_to_fetch
-            }
-
-            # Collect results as they complete
-            completed = 0
-            for future in concurrent.futures.as_completed(future_to_url):
-                url = future_to_url[future]
-                article = url_to_article[url].copy()
-
-                try:
-                    content = future.result()
-                    if content:
-                        article['full_content'] = content
-                        article['has_content'] = True
-                    else:
-                        article['full_content'] = article.get('summary', article.get('title', ''))
-                        article['has_content'] = False
-                except:
-                    article['full_content'] = article.get('summary', article.get('title', ''))
-                    article['has_content'] = False
-
-                enhanced_articles.append(article)
-                completed += 1
-
-                # Progress update
-                if completed % 10 == 0:
-                    print(f"  Processed {completed}/{len(urls_to_fetch)} articles...")
+        # Cached articles need no request, so only schedule the rest
+        cached = {url: self._get_cache_entry(url) for url in urls_to_fetch}
+        results = [(url, {'content': entry['content'], **entry.get('fields', {})}, None)
+                   for url, entry in cached.items() if entry]
+        to_fetch = [url for url, entry in cached.items() if not entry]
+
+        # The async downloader (per-domain caps and rate limits) hands raw
+        # pages to a process pool for parsing
+        fetched = (
+            (url, self._details_from_result(url, result) if result else None, error)
+            for url, result, error in get_extraction_pipeline().run(to_fetch, download_workers=max_workers)
+        )
+
+        completed = 0
+        for url, details, error in itertools.chain(results, fetched):
+            article = url_to_article[url].copy()
+
+            if details and not error:
+                article['full_content'] = details['content']
+                article['has_content'] = True
+                if details.get('byline'):
+                    article['byline'] = details['byline']
+                if details.get('published'):
+                    article['published_time'] = details['published']
+                if details.get('canonical_url'):
+                    # The page's own canonical link beats the one derived from the feed
+                    article['canonical_url'] = canonicalize_url(details['canonical_url'])
+            else:
+                article['full_content'] = article.get('summary', article.get('title', ''))
+                article['has_content'] = False
+
+            enhanced_articles.append(article)
+            completed += 1
+
+            # Progress update
+            if completed % 10 == 0:
+                print(f"  Processed {completed}/{len(urls_to_fetch)} articles...")
 
         elapsed = time.time() - start_time
         print(f"Extracted content from {len(enhanced_articles)} articles in {elapsed:.1f} seconds")
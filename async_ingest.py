@@ -0,0 +1,345 @@
+"""
+Asyncio ingestion engine - every feed, search and page of a cycle in flight at once
+
+Ingestion used to be serial (dashboard feeds, dynamic country feeds) or a
+fixed 10-thread pool, so a cycle over hundreds of sources took the sum of
+their latencies. This engine runs one event loop on a background thread
+with an httpx AsyncClient (up to MAX_CONNECTIONS sockets), so a cycle
+takes roughly as long as its slowest request.
+
+Per-domain politeness still applies: every request reserves a slot from
+the shared fetch scheduler (domain concurrency cap + token bucket), so
+threaded and async callers stay polite together. That caps each host at
+4 concurrent requests and 4/s for news.google.com, 2 and 1/s elsewhere:
+the wide concurrency only comes from spreading a cycle over many hosts.
+Requests over a cap wait for a release or a token, without polling.
+
+Flask routes and scheduled jobs call the sync facade (fetch_feeds,
+iter_html), which submits coroutines to the loop and waits. Without httpx
+installed, requests run through the pooled requests client in the loop's
+thread pool instead.
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import feedparser
+
+from fetch_scheduler import FetchScheduler, get_fetch_scheduler
+from http_client import (
+    get_http_client, ACCEPT_ENCODING, USER_AGENT, FEED_TIMEOUT, DEFAULT_TIMEOUT,
+    MAX_HTML_BYTES, HTML_CONTENT_TYPES, ContentTypeError
+)
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+MAX_CONNECTIONS = 1000
+MAX_KEEPALIVE = 200
+
+
+class AsyncResponse:
+    """The parts of a response the ingest callers need"""
+    __slots__ = ('url', 'status', 'headers', 'content')
+
+    def __init__(self, url: str, status: int, headers: Dict[str, str], content: bytes):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.content = content
+
+    def charset(self) -> Optional[str]:
+        content_type = self.headers.get('content-type', '')
+        if 'charset=' in content_type.lower():
+            return content_type.lower().split('charset=', 1)[1].split(';')[0].strip('"\' ') or None
+        return None
+
+
+def _as_httpx_timeout(timeout) -> 'httpx.Timeout':
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+def _failed_feed(url: str, error: BaseException) -> feedparser.FeedParserDict:
+    return feedparser.FeedParserDict(entries=[], feed=feedparser.FeedParserDict(),
+                                     bozo=1, bozo_exception=error, href=url)
+
+
+class AsyncIngestEngine:
+    def __init__(self, max_connections: int = MAX_CONNECTIONS, scheduler: FetchScheduler = None):
+        self.max_connections = max_connections
+        self.scheduler = scheduler or get_fetch_scheduler()
+        self._loop = None
+        self._client = None
+        self._thread = None
+        self._waiters = {}  # domain -> futures of requests waiting for a slot (loop thread only)
+        self._watched = None  # scheduler whose releases wake the waiters
+        self._lock = threading.Lock()
+
+    # -- event loop ------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, daemon=True, name="async-ingest")
+                self._thread.start()
+                self._loop = loop
+                if HTTPX_AVAILABLE:
+                    self._client = asyncio.run_coroutine_threadsafe(self._make_client(), loop).result()
+            return self._loop
+
+    async def _make_client(self):
+        return httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT, 'Accept-Encoding': ACCEPT_ENCODING},
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=MAX_KEEPALIVE),
+            transport=httpx.AsyncHTTPTransport(retries=1),
+            follow_redirects=True
+        )
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the engine's loop from synchronous code"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result(timeout)
+
+    def close(self):
+        with self._lock:
+            loop, client = self._loop, self._client
+            self._loop = self._client = None
+        if loop is None:
+            return
+        if client is not None:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(5)
+        # Body iterators left early by max_bytes still need finalizing
+        asyncio.run_coroutine_threadsafe(loop.shutdown_asyncgens(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+
+    # -- requests ----------------------------------------------------------
+
+    async def _reserve(self, url: str):
+        """Wait for the shared scheduler to grant a slot on url's domain"""
+        scheduler = self.scheduler
+        if self._watched is not scheduler:
+            scheduler.add_release_listener(self._on_release)
+            self._watched = scheduler
+        domain = scheduler.domain(url)
+        while True:
+            reserved, wait = scheduler.try_reserve(url)
+            if reserved:
+                return
+            if wait:
+                # Rate limited: sleep until the bucket has a token
+                await asyncio.sleep(wait)
+                continue
+            # At the domain's concurrency cap: sleep until a slot is released.
+            # Releases reach the loop after this runs, so none are missed.
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(domain, []).append(waiter)
+            try:
+                await waiter
+            finally:
+                waiters = self._waiters.get(domain)
+                if waiters and waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._waiters.pop(domain, None)
+
+    def _on_release(self, domain: str):
+        """Scheduler listener; may run on any thread"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._wake, domain)
+            except RuntimeError:
+                pass  # loop shut down in between
+
+    def _wake(self, domain: str):
+        for waiter in self._waiters.pop(domain, []):
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def fetch(self, url: str, timeout=DEFAULT_TIMEOUT, headers: Optional[Dict[str, str]] = None,
+                    max_bytes: Optional[int] = None, html_only: bool = False) -> AsyncResponse:
+        """
+        GET a URL politely; raises for network errors
+
+        max_bytes stops reading the body at the cap; html_only rejects
+        non-HTML content types before the body is read.
+        """
+        await self._reserve(url)
+        try:
+            if self._client is None:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, self._fetch_sync, url, timeout, headers,
+                                                  max_bytes, html_only)
+            async with self._client.stream('GET', url, timeout=_as_httpx_timeout(timeout),
+                                           headers=headers) as response:
+                if html_only:
+                    response.raise_for_status()
+                    self._check_html(url, response.headers.get('content-type', ''))
+                chunks, received = [], 0
+                async for chunk in response.aiter_bytes():
+                    chunks.append(chunk)
+                    received += len(chunk)
+                    if max_bytes and received >= max_bytes:
+                        break
+                content = b''.join(chunks)
+                return AsyncResponse(str(response.url), response.status_code,
+                                     {k.lower(): v for k, v in response.headers.items()},
+                                     content[:max_bytes] if max_bytes else content)
+        finally:
+            self.scheduler.release(url)
+
+    @staticmethod
+    def _check_html(url: str, content_type: str):
+        content_type = content_type.split(';')[0].strip().lower()
+        if content_type and content_type not in HTML_CONTENT_TYPES:
+            raise ContentTypeError(f"Not HTML ({content_type}): {url}")
+
+    def _fetch_sync(self, url, timeout, headers, max_bytes, html_only) -> AsyncResponse:
+        """Fallback without httpx: the pooled requests client in a worker thread"""
+        client = get_http_client()
+        if html_only:
+            data, charset = client.fetch_html_bytes(url, max_bytes=max_bytes or MAX_HTML_BYTES,
+                                                    timeout=timeout, headers=headers)
+            content_type = f"text/html; charset={charset}" if charset else 'text/html'
+            return AsyncResponse(url, 200, {'content-type': content_type}, data)
+        response = client.get(url, timeout=timeout, headers=headers)
+        content = response.content[:max_bytes] if max_bytes else response.content
+        return AsyncResponse(response.url, response.status_code,
+                             {k.lower(): v for k, v in response.headers.items()}, content)
+
+    async def fetch_feed(self, url: str, timeout=FEED_TIMEOUT,
+                         headers: Optional[Dict[str, str]] = None) -> feedparser.FeedParserDict:
+        """
+        Download and parse a feed; like http_client.fetch_feed it never
+        raises. The result also carries 'elapsed' (seconds, download only).
+        """
+        started = time.monotonic()
+        try:
+            response = await self.fetch(url, timeout=timeout, headers=headers)
+        except Exception as e:
+            result = _failed_feed(url, e)
+            result['elapsed'] = time.monotonic() - started
+            return result
+        elapsed = time.monotonic() - started
+
+        # feedparser is CPU work: keep it off the event loop
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            None, lambda: feedparser.parse(response.content, response_headers=response.headers))
+        result['status'] = response.status
+        result['href'] = response.url
+        result['elapsed'] = elapsed
+        return result
+
+    # -- sync facade ------------------------------------------------------
+
+    def fetch_feeds(self, urls: Iterable[str], timeout=FEED_TIMEOUT,
+                    headers: Optional[Dict[str, str]] = None) -> Dict[str, feedparser.FeedParserDict]:
+        """Fetch every feed concurrently; returns {url: parsed feed}"""
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+
+        async def gather():
+            feeds = await asyncio.gather(*(self.fetch_feed(u, timeout, headers) for u in urls))
+            return dict(zip(urls, feeds))
+
+        return self.run(gather())
+
+    def iter_html(self, urls: Iterable[str], max_bytes: int = MAX_HTML_BYTES, timeout=(3.05, 5),
+                  headers: Optional[Dict[str, str]] = None,
+                  limit: int = 50) -> Iterator[Tuple[str, Optional[Tuple[bytes, Optional[str]]], Optional[BaseException]]]:
+        """
+        Download pages concurrently, yielding (url, (bytes, charset), error)
+        as each finishes
+
+        At most `limit` pages are downloading or waiting to be consumed, so
+        a slow consumer (the parse pool) holds back new downloads.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return
+        loop = self._ensure_loop()
+        results = asyncio.run_coroutine_threadsafe(self._make_queue(), loop).result()
+        slots = asyncio.run_coroutine_threadsafe(self._make_semaphore(limit), loop).result()
+        cancelled = threading.Event()
+
+        async def one(url):
+            async with slots:
+                if cancelled.is_set():
+                    return
+                try:
+                    response = await self.fetch(url, timeout=timeout, headers=headers,
+                                                max_bytes=max_bytes, html_only=True)
+                    if response.status >= 400:
+                        raise IOError(f"HTTP {response.status}: {url}")
+                    item = (url, (response.content, response.charset()), None)
+                except Exception as e:
+                    item = (url, None, e)
+                # The slot is held until the consumer takes the page
+                held = asyncio.Event()
+                results.put_nowait((item, held))
+                await held.wait()
+
+        async def start():
+            return [asyncio.ensure_future(one(u)) for u in urls]
+
+        tasks = self.run(start())
+        try:
+            for _ in urls:
+                item, held = asyncio.run_coroutine_threadsafe(results.get(), loop).result()
+                loop.call_soon_threadsafe(held.set)
+                yield item
+        finally:
+            cancelled.set()
+            for task in tasks:
+                loop.call_soon_threadsafe(task.cancel)
+
+    @staticmethod
+    async def _make_queue() -> asyncio.Queue:
+        return asyncio.Queue()
+
+    @staticmethod
+    async def _make_semaphore(limit: int) -> asyncio.Semaphore:
+        return asyncio.Semaphore(limit)
+
+
+# Singleton instance
+_ingest_instance = None
+_ingest_lock = threading.Lock()
+
+
+def get_ingest_engine() -> AsyncIngestEngine:
+    """Get or create the shared ingest engine"""
+    global _ingest_instance
+    with _ingest_lock:
+        if _ingest_instance is None:
+            _ingest_instance = AsyncIngestEngine()
+    return _ingest_instance
+
+
+def fetch_feeds(urls: Iterable[str], timeout=FEED_TIMEOUT) -> Dict[str, feedparser.FeedParserDict]:
+    """Fetch and parse feeds concurrently through the shared engine"""
+    return get_ingest_engine().fetch_feeds(urls, timeout=timeout)
+
+
+if __name__ == "__main__":
+    import json
+
+    with open("sources.json", "r") as f:
+        sources = [s for s in json.load(f).get('sources', []) if s.get('active', True)]
+
+    start = time.time()
+    feeds = fetch_feeds([s['url'] for s in sources], timeout=(3.05, 8))
+    total = time.time() - start
+    slowest = max((feed.get('elapsed', 0) for feed in feeds.values()), default=0)
+    ok = sum(1 for feed in feeds.values() if feed.entries)
+    print(f"{ok}/{len(feeds)} feeds with entries in {total:.2f}s (slowest request {slowest:.2f}s)")
@@ -0,0 +1,176 @@
+"""
+Offline synthesis benchmark against the mock LLM server
+
+Runs the synthesis path for a set of synthetic countries under load, with
+mock_llm_server.py standing in for Ollama or Gemini, and reports wall time,
+throughput, per-country latency and what the gateway and server saw. No
+network or API key is needed, and a given seed gives the same run.
+
+Article extraction is skipped (the synthetic articles carry their content,
+and LLMSynthesizer runs without deep analysis, which downloads pages), so
+the numbers cover prompt building, the LLM round trips and parsing.
+
+    python benchmark_synthesis.py --provider ollama --countries 20 --concurrency 8 \\
+        --latency lognormal:0.8,0.5 --tps 40 --error-rate 0.05 --synthesizer all
+"""
+import argparse
+import concurrent.futures
+import os
+import random
+import time
+from typing import Dict, List
+
+from fast_llm_synthesizer import FastLLMSynthesizer, BATCH_MAX_COUNTRIES
+from llm_gateway import LLMGateway
+from llm_providers import ProviderRegistry
+from llm_synthesizer import LLMSynthesizer
+from mock_llm_server import MockLLMServer
+from ollama_synthesizer import OllamaSynthesizer
+
+SYNTHESIZERS = ['fast', 'map-reduce', 'batch', 'legacy', 'ollama']
+
+_PLACES = ['the capital', 'the northern province', 'the border region', 'the main port', 'the highway']
+_EVENTS = ['armed attack', 'protest', 'kidnapping', 'curfew', 'police operation', 'fuel blockade']
+
+
+def synthetic_articles(country: str, count: int, seed: int = 0) -> List[Dict]:
+    """Articles with content already extracted, distinct per country"""
+    rng = random.Random(f"{seed}:{country}")
+    articles = []
+    for i in range(count):
+        event = rng.choice(_EVENTS)
+        place = rng.choice(_PLACES)
+        articles.append({
+            'title': f"{country}: {event} in {place} leaves {rng.randint(2, 60)} affected (report {i})",
+            'link': f"https://news.example/{country.lower().replace(' ', '-')}/{i}",
+            'source': rng.choice(['Wire', 'Daily', 'Tribune']),
+            'published': f"2025-09-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00",
+            'summary': f"Officials reported a {event} in {place} of {country}.",
+            'full_content': (f"Officials in {country} said a {event} took place in {place}. "
+                             f"Security forces responded and {rng.randint(2, 60)} people were affected. ") * 6,
+            'has_content': True,
+        })
+    return articles
+
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+
+def run_benchmark(provider: str = 'ollama', synthesizer: str = 'fast', countries: int = 20,
+                  articles: int = 30, concurrency: int = 8, latency='fixed:0.2', tokens_per_second: float = 50,
+                  error_rate: float = 0.0, seed: int = 0) -> Dict:
+    """One benchmark run; returns timings plus gateway and server stats"""
+    names = [f"Country {i + 1}" for i in range(countries)]
+    data = {name: synthetic_articles(name, articles, seed) for name in names}
+
+    saved = {k: os.environ.get(k) for k in ('OLLAMA_URL', 'LLM_PROVIDER', 'GEMINI_API_KEY', 'GEMINI_API_ENDPOINT')}
+    with MockLLMServer(latency=latency, tokens_per_second=tokens_per_second, error_rate=error_rate,
+                       seed=seed) as server:
+        try:
+            os.environ['LLM_PROVIDER'] = provider
+            if provider == 'gemini':
+                os.environ['GEMINI_API_KEY'] = os.environ.get('GEMINI_API_KEY') or 'mock-key'
+                os.environ['GEMINI_API_ENDPOINT'] = server.url
+            else:
+                os.environ['OLLAMA_URL'] = server.url
+
+            registry = ProviderRegistry(preferred=provider)
+            gateway = LLMGateway(registry, providers=[registry.get(provider)],
+                                 limits={provider: (concurrency, 0)}, backoff=0.1)
+            jobs = _jobs(synthesizer, gateway, data, server.url)
+
+            latencies = []
+            failures = 0
+            started = time.monotonic()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+                for elapsed, ok in pool.map(_timed, jobs):
+                    latencies.append(elapsed)
+                    failures += 0 if ok else 1
+            wall = time.monotonic() - started
+            stats = dict(server.stats)
+        finally:
+            for key, value in saved.items():
+                os.environ.pop(key, None)
+                if value is not None:
+                    os.environ[key] = value
+
+    return {
+        'provider': provider,
+        'synthesizer': synthesizer,
+        'countries': countries,
+        'jobs': len(latencies),
+        'failures': failures,
+        'wall_seconds': round(wall, 3),
+        'countries_per_second': round(countries / wall, 2) if wall else None,
+        'p50_seconds': round(_percentile(latencies, 0.5), 3),
+        'p95_seconds': round(_percentile(latencies, 0.95), 3),
+        'gateway': gateway.summary().get(provider, {}),
+        'server': stats,
+    }
+
+
+def _jobs(synthesizer: str, gateway: LLMGateway, data: Dict[str, List[Dict]], url: str) -> List:
+    """Callables returning True when they produced an LLM narrative"""
+    if synthesizer in ('fast', 'map-reduce'):
+        synth = FastLLMSynthesizer(gateway)
+        map_reduce = synthesizer == 'map-reduce'
+        return [lambda c=c, a=a: bool(synth._write_narrative(c, a, map_reduce=map_reduce)) for c, a in data.items()]
+    if synthesizer == 'batch':
+        synth = FastLLMSynthesizer(gateway)
+        names = list(data)
+        batches = [{c: data[c] for c in names[i:i + BATCH_MAX_COUNTRIES]}
+                   for i in range(0, len(names), BATCH_MAX_COUNTRIES)]
+        return [lambda b=b: not any(r['fallback'] for r in synth._synthesize_batch(b).values()) for b in batches]
+    if synthesizer == 'legacy':
+        # Deep analysis downloads every article itself, so it is left out
+        synth = LLMSynthesizer(gateway)
+        return [lambda c=c, a=a: 'Analysis of' not in synth.synthesize_country_report(c, a, use_deep_analysis=False)
+                for c, a in data.items()]
+    if synthesizer == 'ollama':
+        synth = OllamaSynthesizer(base_url=url)
+        return [lambda c=c, a=a: synth.synthesize_report(c, a, 'HIGH')['llm_provider'] != 'Fallback'
+                for c, a in data.items()]
+    raise ValueError(f"Unknown synthesizer: {synthesizer}")
+
+
+def _timed(job):
+    started = time.monotonic()
+    try:
+        ok = job()
+    except Exception as e:
+        print(f"[Benchmark] Job failed: {e}")
+        ok = False
+    return time.monotonic() - started, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark synthesis against the mock LLM server')
+    parser.add_argument('--provider', choices=['ollama', 'gemini'], default='ollama')
+    parser.add_argument('--synthesizer', choices=SYNTHESIZERS + ['all'], default='fast')
+    parser.add_argument('--countries', type=int, default=20)
+    parser.add_argument('--articles', type=int, default=30, help='Articles per country')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', default='lognormal:0.5,0.4')
+    parser.add_argument('--tps', type=float, default=50, help='Mock generation speed, tokens per second')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    synthesizers = SYNTHESIZERS if args.synthesizer == 'all' else [args.synthesizer]
+    for name in synthesizers:
+        if name == 'ollama' and args.provider != 'ollama':
+            continue
+        result = run_benchmark(args.provider, name, args.countries, args.articles, args.concurrency,
+                               args.latency, args.tps, args.error_rate, args.seed)
+        gateway = result['gateway']
+        print(f"[Benchmark] {name:10} {result['wall_seconds']:7.2f}s  "
+              f"{result['countries_per_second']:6.2f} countries/s  "
+              f"p50 {result['p50_seconds']:.2f}s  p95 {result['p95_seconds']:.2f}s  "
+              f"requests {result['server'].get('ok', 0)}  failed jobs {result['failures']}  "
+              f"tokens in/out {gateway.get('prompt_tokens', 0)}/{gateway.get('completion_tokens', 0)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,62 @@
-"""Breaking news monitor for critical security events"""
-import feedparser
-import requests
+"""Breaking news monitor for critical security events
+
+BreakingNewsMonitor runs the critical Google News queries in parallel on
+demand. BreakingNewsWatcher keeps polling them on a short interval in the
+background, remembers what it has already seen (across restarts) and pushes
+only new high-priority items to a webhook and/or an email queue.
+
+Only one process polls: start() takes a file lock, and watchers in other
+processes (the other gunicorn workers) serve the alerts the polling one
+writes to its alerts file instead of sending their own.
+"""
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
 from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from dotenv import load_dotenv
+
+from atomic_file import atomic_write_json, try_file_lock
+from date_normalizer import filter_recent
+from google_news_engine import GoogleNewsEngine
+from http_client import get_http_client
+from incident_clusterer import group_into_events, get_incident_clusterer
+
+load_dotenv()
+
+# Title keywords and their priority weights
+PRIORITY_KEYWORDS = {
+    'nato': 2, 'article 4': 3, 'article 5': 4, 'airspace': 2, 'violation': 1,
+    'shot down': 3, 'scrambled': 2, 'missile': 2, 'drone': 1, 'explosion': 2,
+    'killed': 2, 'attack': 1, 'invasion': 3, 'coup': 3, 'breaking': 1
+}
+
+
+def score_priority(article: Dict) -> int:
+    """Priority score from title keywords plus breadth of coverage"""
+    title = article.get('title', '').lower()
+    score = sum(weight for keyword, weight in PRIORITY_KEYWORDS.items() if keyword in title)
+    # Incidents carried by several outlets are more likely to be real and significant
+    score += min(3, article.get('event_article_count', 1) - 1)
+    return score
+
+
+def _when_for_hours(hours_back: float) -> str:
+    """Map a look-back window to Google News' when= parameter"""
+    if hours_back <= 1:
+        return "1h"
+    elif hours_back <= 24:
+        return "1d"
+    elif hours_back <= 168:
+        return "7d"
+    return "30d"
+
 
 class BreakingNewsMonitor:
     def __init__(self):
@@ -13,12 +68,9 @@ class BreakingNewsMonitor:
             "Estonia airspace Russia",
             "Poland Russia border"
         ]
+        self.engine = GoogleNewsEngine()
 
-    def get_breaking_news(self, country=None, hours_back=72):
-        """Get breaking news for critical events"""
-        all_breaking = []
-
-        # Add country-specific searches if provided
+    def _searches_for(self, country: Optional[str] = None) -> List[str]:
         searches = self.critical_searches.copy()
         if country:
             searches.extend([
@@ -27,64 +79,320 @@ class BreakingNewsMonitor:
                 f"{country} military alert",
                 f"{country} airspace violation"
             ])
+        return searches
 
-        for query in searches:
-            try:
-                # Use Google News with time restriction
-                # when=1d limits to past day, when=7d for past week
-                url = f"https://news.google.com/rss/search?q={query.replace(' ', '+')}&when=7d&hl=en-US&gl=US&ceid=US:en"
-
-                feed = feedparser.parse(url)
+    def fetch_queries(self, searches: List[str], when: str = "7d",
+                      errors: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """
+        Run searches concurrently and merge results, deduplicated by title
 
-                for entry in feed.entries[:10]:
-                    # Check if truly recent (Google sometimes includes old articles)
-                    published = entry.get('published', '')
+        Failed searches (e.g. Google throttling) add {query: reason} to errors.
+        """
+        all_breaking = []
+        seen_titles = set()
 
-                    article = {
-                        'title': entry.get('title', ''),
-                        'link': entry.get('link', ''),
-                        'published': published,
-                        'source': f"Breaking: {query}",
-                        'is_breaking': True
-                    }
+        results = self.engine.search_many(searches, when=when, max_results=10, errors=errors)
+        for query in searches:
+            for article in results.get(query, []):
+                title = article.get('title', '')
+                if title and title not in seen_titles:
+                    seen_titles.add(title)
+                    article['source_query'] = query
+                    article['is_breaking'] = True
+                    all_breaking.append(article)
 
-                    # Avoid duplicates
-                    if article['title'] and article['title'] not in [a['title'] for a in all_breaking]:
-                        all_breaking.append(article)
+        return all_breaking
 
-            except:
-                pass
+    def get_breaking_news(self, country=None, hours_back=72):
+        """Get breaking news for critical events"""
+        all_breaking = self.fetch_queries(self._searches_for(country), when=_when_for_hours(hours_back))
 
-        # Sort by relevance (NATO mentions, airspace violations get priority)
-        priority_keywords = ['NATO', 'Article 4', 'Article 5', 'airspace', 'violation', 'shot down', 'scrambled']
+        # Google's when= is coarse (72h asks for 7d); drop older items before clustering
+        all_breaking = filter_recent(all_breaking, hours_back * 3600)
 
-        for article in all_breaking:
-            score = sum(1 for keyword in priority_keywords if keyword.lower() in article['title'].lower())
-            article['priority_score'] = score
+        # Group into incidents so one story covered by every query doesn't
+        # crowd out the rest; the shared clusterer links to earlier polls
+        leads = []
+        for event in group_into_events(all_breaking, get_incident_clusterer()):
+            for article in event['articles']:
+                article['event_article_count'] = event['article_count']
+                article['priority_score'] = score_priority(article)
+            lead = max(event['articles'], key=lambda x: x['priority_score'])
+            lead['event_id'] = event['event_id']
+            lead['event_sources'] = event['sources']
+            leads.append(lead)
 
-        all_breaking.sort(key=lambda x: x['priority_score'], reverse=True)
+        leads.sort(key=lambda x: (x['priority_score'], x['event_article_count']), reverse=True)
 
-        return all_breaking[:20]  # Return top 20 most relevant
+        return leads[:20]  # Return top 20 most relevant incidents
 
     def check_specific_incident(self, description):
         """Check for a specific incident"""
         # Direct search for the incident
-        query = description.replace(' ', '+')
-        url = f"https://news.google.com/rss/search?q={query}&when=30d&hl=en-US&gl=US&ceid=US:en"
+        articles = self.engine.search(description, when="30d", max_results=5)
+        for article in articles:
+            article['found'] = True
+        return articles
+
+
+class AlertDispatcher:
+    """Background queue that pushes alerts to a webhook and batches emails"""
+
+    def __init__(self, webhook_url: str = None, email_recipients: List[str] = None,
+                 email_batch_seconds: float = 30):
+        self.webhook_url = webhook_url or os.getenv('ALERT_WEBHOOK_URL')
+        recipients = os.getenv('ALERT_EMAIL_RECIPIENTS', '')
+        self.email_recipients = email_recipients or [r.strip() for r in recipients.split(',') if r.strip()]
+        self.email_batch_seconds = email_batch_seconds
+
+        self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
+        self.smtp_port = int(os.getenv('SMTP_PORT', 587))
+        self.smtp_username = os.getenv('SMTP_USERNAME')
+        self.smtp_password = os.getenv('SMTP_PASSWORD')
+
+        self.queue = queue.Queue()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def enqueue(self, alerts: List[Dict]):
+        for alert in alerts:
+            self.queue.put(alert)
+
+    def _run(self):
+        pending_email = []
+        batch_started = None
+
+        while True:
+            try:
+                alert = self.queue.get(timeout=1)
+            except queue.Empty:
+                alert = None
 
-        feed = feedparser.parse(url)
+            if alert is not None:
+                if self.webhook_url:
+                    self._post_webhook(alert)
+                if self.email_recipients:
+                    pending_email.append(alert)
+                    batch_started = batch_started or time.time()
 
-        if feed.entries:
-            return [
-                {
-                    'title': entry.get('title', ''),
-                    'link': entry.get('link', ''),
-                    'published': entry.get('published', ''),
-                    'found': True
-                }
-                for entry in feed.entries[:5]
-            ]
-        return []
+            # Send one email per batch window instead of one per alert
+            if pending_email and time.time() - batch_started >= self.email_batch_seconds:
+                self._send_email(pending_email)
+                pending_email = []
+                batch_started = None
+
+    def _post_webhook(self, alert: Dict):
+        try:
+            response = get_http_client().post(self.webhook_url, json={
+                'type': 'breaking_news',
+                'title': alert['title'],
+                'link': alert.get('link', ''),
+                'source': alert.get('source', ''),
+                'published': alert.get('published', ''),
+                'priority_score': alert.get('priority_score', 0),
+                'detected_at': alert.get('detected_at')
+            }, timeout=5)
+            if response.status_code >= 400:
+                print(f"[Alerts] Webhook returned {response.status_code}")
+        except Exception as e:
+            print(f"[Alerts] Webhook delivery failed: {e}")
+
+    def _send_email(self, alerts: List[Dict]):
+        if not self.smtp_username or not self.smtp_password:
+            print("[Alerts] Email credentials not configured")
+            return
+
+        from email_sender import EmailSender
+        sender = EmailSender(self.smtp_server, self.smtp_port, self.smtp_username, self.smtp_password)
+
+        lines = [f"{len(alerts)} breaking security alert(s):", ""]
+        for alert in sorted(alerts, key=lambda a: a.get('priority_score', 0), reverse=True):
+            lines.append(f"[PRIORITY {alert.get('priority_score', 0)}] {alert['title']}")
+            lines.append(f"  {alert.get('link', '')}")
+            lines.append("")
+
+        subject = f"BREAKING: {alerts[0]['title'][:80]}"
+        if len(alerts) > 1:
+            subject += f" (+{len(alerts) - 1} more)"
+        sender.send_alert(self.email_recipients, subject, "\n".join(lines))
+
+
+class BreakingNewsWatcher:
+    """Polls critical queries continuously and pushes new priority items"""
+
+    def __init__(self, monitor: BreakingNewsMonitor = None, poll_interval: float = None,
+                 alert_threshold: int = None, seen_file: str = "data/breaking_seen.json",
+                 dispatcher: AlertDispatcher = None, seen_retention_days: int = 7,
+                 alerts_file: str = None):
+        self.monitor = monitor or BreakingNewsMonitor()
+        self.poll_interval = poll_interval or float(os.getenv('BREAKING_POLL_SECONDS', 45))
+        self.alert_threshold = alert_threshold if alert_threshold is not None else \
+            int(os.getenv('BREAKING_ALERT_THRESHOLD', 3))
+        self.seen_file = Path(seen_file)
+        self.alerts_file = Path(alerts_file) if alerts_file else self.seen_file.with_name('breaking_alerts.json')
+        self.seen_retention = seen_retention_days * 86400
+        self.dispatcher = dispatcher or AlertDispatcher()
+
+        self.seen = self._load_seen()
+        self.recent_alerts = deque(maxlen=200)
+        self.last_poll = None
+        self.search_errors: Dict[str, str] = {}  # failed searches in the last poll
+        self.failed_searches = 0
+        self.running = False
+        self.following = False  # another process holds the poll lock
+        self.thread = None
+        self._poll_lock = None
+        self._lock = threading.Lock()
+
+    def _load_seen(self) -> Dict[str, float]:
+        if self.seen_file.exists():
+            try:
+                with open(self.seen_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"[Breaking] Could not read seen-set {self.seen_file}: {e}")
+        return {}
+
+    def _save_seen(self):
+        cutoff = time.time() - self.seen_retention
+        self.seen = {key: ts for key, ts in self.seen.items() if ts >= cutoff}
+        atomic_write_json(self.seen_file, self.seen, indent=None)
+
+    @staticmethod
+    def _item_key(article: Dict) -> str:
+        # Titles are more stable than Google redirect links across polls
+        title = article.get('title', '').strip().lower()
+        return hashlib.md5((title or article.get('link', '')).encode()).hexdigest()
+
+    def _save_alerts(self):
+        with self._lock:
+            state = {'last_poll': self.last_poll, 'alerts': list(self.recent_alerts),
+                     'search_errors': self.search_errors, 'failed_searches': self.failed_searches}
+        atomic_write_json(self.alerts_file, state, indent=None, default=str)
+
+    def _load_alerts(self):
+        """Alerts written by the process that polls"""
+        try:
+            with open(self.alerts_file, 'r') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"[Breaking] Could not read alerts {self.alerts_file}: {e}")
+            return
+        with self._lock:
+            self.recent_alerts = deque(state.get('alerts', []), maxlen=self.recent_alerts.maxlen)
+            self.last_poll = state.get('last_poll')
+            self.search_errors = state.get('search_errors', {})
+            self.failed_searches = state.get('failed_searches', 0)
+
+    def poll_once(self) -> List[Dict]:
+        """Run one polling cycle and return only items not seen before"""
+        errors = {}
+        articles = self.monitor.fetch_queries(self.monitor.critical_searches, when="1h", errors=errors)
+        now = time.time()
+        if errors:
+            # An empty poll is only "no news" if the searches went through
+            print(f"[Breaking] {len(errors)}/{len(self.monitor.critical_searches)} searches failed: "
+                  f"{'; '.join(sorted(set(errors.values())))}")
+
+        with self._lock:
+            self.search_errors = errors
+            self.failed_searches += len(errors)
+            new_items = []
+            for article in articles:
+                key = self._item_key(article)
+                if key not in self.seen:
+                    self.seen[key] = now
+                    new_items.append(article)
+            self._save_seen()
+            self.last_poll = datetime.now().isoformat()
+
+        if not new_items:
+            self._save_alerts()
+            return []
+
+        # Attach incident coverage so multi-outlet stories rank higher
+        for event in group_into_events(new_items, get_incident_clusterer()):
+            for article in event['articles']:
+                article['event_id'] = event['event_id']
+                article['event_article_count'] = event['article_count']
+
+        alerts = []
+        for article in new_items:
+            article['priority_score'] = score_priority(article)
+            article['detected_at'] = datetime.now().isoformat()
+            if article['priority_score'] >= self.alert_threshold:
+                alerts.append(article)
+
+        alerts.sort(key=lambda a: a['priority_score'], reverse=True)
+        if alerts:
+            print(f"[Breaking] {len(alerts)} new alert(s): {alerts[0]['title'][:80]}")
+            with self._lock:
+                self.recent_alerts.extendleft(reversed(alerts))
+            self.dispatcher.enqueue(alerts)
+        self._save_alerts()
+
+        return new_items
+
+    def get_recent_alerts(self, since: str = None, limit: int = 50) -> List[Dict]:
+        """Alerts detected since an ISO timestamp (newest first)"""
+        if self.following:
+            self._load_alerts()
+        with self._lock:
+            alerts = list(self.recent_alerts)
+        if since:
+            alerts = [a for a in alerts if a.get('detected_at', '') > since]
+        return alerts[:limit]
+
+    def start(self):
+        """Start polling in a background thread, unless another process already polls"""
+        if not self.running and not self.following:
+            self._poll_lock = try_file_lock(self.seen_file)
+            if self._poll_lock is None:
+                self.following = True
+                print("[Breaking] Watcher runs in another process; serving its alerts")
+                return
+            self.running = True
+            self.dispatcher.start()
+            self.thread = threading.Thread(target=self._run_watcher, daemon=True)
+            self.thread.start()
+            print(f"Breaking news watcher started (every {self.poll_interval:.0f}s)")
+
+    def stop(self):
+        """Stop the watcher"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=5)
+        if self._poll_lock is not None:
+            self._poll_lock.close()
+            self._poll_lock = None
+        print("Breaking news watcher stopped")
+
+    def _run_watcher(self):
+        while self.running:
+            started = time.time()
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"[Breaking] Poll error: {e}")
+            # Keep a steady cadence regardless of how long the poll took
+            time.sleep(max(1.0, self.poll_interval - (time.time() - started)))
+
+
+# Singleton instance
+watcher_instance = None
+
+def get_breaking_watcher():
+    """Get or create the breaking news watcher instance"""
+    global watcher_instance
+    if watcher_instance is None:
+        watcher_instance = BreakingNewsWatcher()
+    return watcher_instance
 
 
 if __name__ == "__main__":
@@ -117,4 +425,11 @@ if __name__ == "__main__":
         for article in specific:
             print(f"  - {article['title']}")
     else:
-        print("Specific incident not found in news feeds")
\ No newline at end of file
+        print("Specific incident not found in news feeds")
+
+    # Run one watcher cycle to show incremental output
+    print("\n" + "="*50)
+    watcher = BreakingNewsWatcher(seen_file="data/breaking_seen_demo.json")
+    first = watcher.poll_once()
+    second = watcher.poll_once()
+    print(f"Watcher: first poll {len(first)} new items, second poll {len(second)} new items")
@@ -0,0 +1,214 @@
+"""
+Server-side chat sessions, one per (user, country)
+
+/api/chat used to get its context posted back by the browser (cut to 1000
+characters) and rebuilt everything on every question. A session keeps the
+warm state between questions instead:
+- the chat_context produced by synthesis
+- the country's basic facts, looked up once
+- the conversation: the last few turns verbatim, older ones folded into a
+  rolling summary so the prompt stays small however long the chat runs
+Follow-ups only send the question. Sessions are rows in a SQLite table
+(WAL mode), so every gunicorn worker sees the same session; each change is
+one read-modify-write transaction. Sessions expire after SESSION_TTL
+seconds idle; the least recently used are dropped beyond MAX_SESSIONS.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+SESSION_TTL = 6 * 3600
+MAX_SESSIONS = 500
+RECENT_TURNS = 4
+MAX_CONTEXT_CHARS = 6000
+MAX_SUMMARY_CHARS = 1500
+
+_FIRST_SENTENCE = re.compile(r'^(.{20,200}?[.!?])(?:\s|$)', re.S)
+
+
+def _gist(text: str, limit: int) -> str:
+    """First sentence of text (or its first `limit` characters), on one line"""
+    text = ' '.join(text.split())
+    match = _FIRST_SENTENCE.match(text)
+    if match:
+        return match.group(1)
+    return text if len(text) <= limit else text[:limit].rstrip() + '...'
+
+
+class ChatSession:
+    def __init__(self, user: str, country: str):
+        self.user = user
+        self.country = country
+        self.chat_context = ''
+        self.facts: Optional[str] = None
+        self.turns: List[Dict[str, str]] = []
+        self.summary_lines: List[str] = []
+        self.total_turns = 0
+        self.updated = time.time()
+
+    _FIELDS = ('chat_context', 'facts', 'turns', 'summary_lines', 'total_turns')
+
+    def to_json(self) -> str:
+        return json.dumps({field: getattr(self, field) for field in self._FIELDS})
+
+    @classmethod
+    def from_json(cls, user: str, country: str, data: str, updated: float) -> 'ChatSession':
+        chat = cls(user, country)
+        for field, value in json.loads(data).items():
+            if field in cls._FIELDS:
+                setattr(chat, field, value)
+        chat.updated = updated
+        return chat
+
+    def set_context(self, chat_context: str):
+        """New synthesis results; the conversation so far is kept"""
+        self.chat_context = chat_context or ''
+
+    def add_turn(self, question: str, answer: str):
+        self.turns.append({'question': question, 'answer': answer})
+        self.total_turns += 1
+        # Fold turns beyond the recent window into the rolling summary
+        while len(self.turns) > RECENT_TURNS:
+            old = self.turns.pop(0)
+            self.summary_lines.append(f"- Q: {_gist(old['question'], 120)} A: {_gist(old['answer'], 200)}")
+        while self.summary_lines and sum(len(line) + 1 for line in self.summary_lines) > MAX_SUMMARY_CHARS:
+            self.summary_lines.pop(0)
+
+    def news_context(self, max_chars: int = MAX_CONTEXT_CHARS) -> str:
+        text = self.chat_context
+        if len(text) <= max_chars:
+            return text
+        # chat_context is a list of articles; cut at an article boundary
+        cut = text.rfind('\n---', 0, max_chars)
+        return text[:cut + 4] if cut > 0 else text[:max_chars]
+
+    def conversation(self) -> str:
+        """Summary of earlier turns plus the recent turns, for the prompt"""
+        parts = []
+        if self.summary_lines:
+            parts.append("Earlier in this conversation:\n" + '\n'.join(self.summary_lines))
+        if self.turns:
+            parts.append("Recent exchange:\n" + '\n'.join(
+                f"Q: {turn['question']}\nA: {turn['answer']}" for turn in self.turns))
+        return '\n\n'.join(parts)
+
+    def to_dict(self) -> Dict:
+        return {
+            'country': self.country,
+            'turns': self.total_turns,
+            'has_context': bool(self.chat_context),
+            'updated': self.updated,
+        }
+
+
+class ChatSessionStore:
+    def __init__(self, db_path: str = "data/chat_sessions.db", ttl: float = SESSION_TTL,
+                 max_sessions: int = MAX_SESSIONS):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        try:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.DatabaseError:
+            pass  # e.g. network filesystems; the default journal still works
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                user TEXT NOT NULL,
+                country TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (user, country)
+            )
+        ''')
+
+    @staticmethod
+    def _key(user, country: str) -> Tuple[str, str]:
+        return str(user), country.strip().lower()
+
+    def _load(self, key: Tuple[str, str], now: float) -> Optional[ChatSession]:
+        row = self._conn.execute('SELECT data, updated FROM chat_sessions WHERE user = ? AND country = ?',
+                                 key).fetchone()
+        if row is None or now - row[1] > self.ttl:
+            return None
+        return ChatSession.from_json(key[0], key[1], row[0], row[1])
+
+    def _save(self, key: Tuple[str, str], chat: ChatSession, now: float):
+        chat.updated = now
+        self._conn.execute('INSERT OR REPLACE INTO chat_sessions (user, country, data, updated) '
+                           'VALUES (?, ?, ?, ?)', key + (chat.to_json(), now))
+        self._conn.execute('DELETE FROM chat_sessions WHERE updated < ?', (now - self.ttl,))
+        self._conn.execute('DELETE FROM chat_sessions WHERE rowid NOT IN '
+                           '(SELECT rowid FROM chat_sessions ORDER BY updated DESC LIMIT ?)',
+                           (self.max_sessions,))
+
+    def get(self, user, country: str) -> Optional[ChatSession]:
+        """A snapshot of the session, or None; change it through update()"""
+        with self._lock:
+            return self._load(self._key(user, country), time.time())
+
+    def update(self, user, country: str, change: Callable[[ChatSession], None]) -> ChatSession:
+        """
+        Apply change() to the session (created if missing) and store it
+
+        Runs in one write transaction, so workers changing the same session
+        at once don't lose each other's turns. Keep change() quick.
+        """
+        key = self._key(user, country)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                chat = self._load(key, now) or ChatSession(*key)
+                change(chat)
+                self._save(key, chat, now)
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            return chat
+
+    def get_or_create(self, user, country: str) -> ChatSession:
+        return self.update(user, country, lambda chat: None)
+
+    def update_context(self, user, country: str, chat_context: str) -> ChatSession:
+        """Store fresh synthesis results for a user's chat about country"""
+        return self.update(user, country, lambda chat: chat.set_context(chat_context))
+
+    def add_turn(self, user, country: str, question: str, answer: str) -> ChatSession:
+        return self.update(user, country, lambda chat: chat.add_turn(question, answer))
+
+    def reset(self, user, country: str):
+        with self._lock:
+            self._conn.execute('DELETE FROM chat_sessions WHERE user = ? AND country = ?',
+                               self._key(user, country))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM chat_sessions WHERE updated >= ?',
+                                      (time.time() - self.ttl,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Singleton instance
+_store_instance = None
+_store_lock = threading.Lock()
+
+
+def get_chat_session_store() -> ChatSessionStore:
+    """Get or create the shared chat session store"""
+    global _store_instance
+    with _store_lock:
+        if _store_instance is None:
+            _store_instance = ChatSessionStore()
+    return _store_instance
@@ -0,0 +1,259 @@
+"""
+Offline country facts - the whole REST Countries dataset in memory
+
+Capitals, populations, borders and the like change over years, yet every
+historical context used to cost a live /name/{country} lookup. This module
+keeps a snapshot of the full dataset:
+- built from bulk /all requests (the API allows 10 fields per request, so
+  the fields are fetched in groups and merged on cca3), normalized to the
+  basics dict CountryIntelligence has always returned
+- saved to data/country_facts.json and loaded from there at startup
+- indexed by common/official name, ISO codes, alternative spellings and a
+  few local aliases, accent- and case-insensitively
+- refreshed in the background once it is older than REFRESH_SECONDS
+
+Lookups never touch the network; until a snapshot exists, `loaded` is
+False and callers fall back to their own live lookup.
+"""
+import json
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from atomic_file import atomic_write_json
+from http_client import get_http_client
+
+REST_COUNTRIES_ALL = "https://restcountries.com/v3.1/all"
+FIELD_GROUPS = [
+    'name,cca2,cca3,altSpellings,capital,region,subregion,population,area,languages',
+    'cca3,currencies,borders,timezones,flags,coatOfArms,latlng,landlocked,unMember,independent',
+    'cca3,idd',
+]
+REFRESH_SECONDS = 7 * 86400
+RETRY_SECONDS = 3600
+
+# Names used in the dashboard's country list (and common shorthand) that
+# the dataset spells differently or shares between countries
+ALIASES = {
+    'usa': 'USA', 'us': 'USA', 'america': 'USA',
+    'uk': 'GBR', 'britain': 'GBR', 'great britain': 'GBR',
+    'uae': 'ARE',
+    'drc': 'COD', 'dr congo': 'COD', 'congo': 'COG', 'republic of congo': 'COG',
+    'democratic republic of congo': 'COD',
+    'east timor': 'TLS',
+    'czech republic': 'CZE',
+    'ivory coast': 'CIV',
+    'vatican city': 'VAT',
+    'turkey': 'TUR',
+    'micronesia': 'FSM',
+    'burma': 'MMR',
+}
+
+
+def normalize_name(name: str) -> str:
+    """Index key for a country name: accents dropped, case and spacing folded"""
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return ' '.join(name.replace('-', ' ').split()).lower()
+
+
+def government_type(record: Dict) -> str:
+    """Government type inferred from the official name (the API has no such field)"""
+    official_name = record.get('name', {}).get('official', '').lower()
+
+    if 'republic' in official_name:
+        if 'democratic' in official_name:
+            return 'Democratic Republic'
+        elif 'federal' in official_name:
+            return 'Federal Republic'
+        elif 'islamic' in official_name:
+            return 'Islamic Republic'
+        else:
+            return 'Republic'
+    elif 'kingdom' in official_name:
+        return 'Monarchy'
+    elif 'state' in official_name:
+        return 'State'
+    else:
+        return 'Unknown'
+
+
+def basics_from_record(record: Dict, fallback_name: str = '') -> Dict:
+    """A REST Countries record as CountryIntelligence's basics dict"""
+    name = record.get('name', {})
+    idd = record.get('idd', {})
+    return {
+        'official_name': name.get('official', fallback_name),
+        'common_name': name.get('common', fallback_name),
+        'cca2': record.get('cca2', ''),
+        'cca3': record.get('cca3', ''),
+        'capital': record.get('capital', ['Unknown'])[0] if record.get('capital') else 'Unknown',
+        'region': record.get('region', 'Unknown'),
+        'subregion': record.get('subregion', 'Unknown'),
+        'population': record.get('population', 0),
+        'area': record.get('area', 0),
+        'languages': list(record.get('languages', {}).values()),
+        'currencies': list(record.get('currencies', {}).keys()),
+        'borders': record.get('borders', []),
+        'timezones': record.get('timezones', []),
+        'flag': record.get('flags', {}).get('png', ''),
+        'coat_of_arms': record.get('coatOfArms', {}).get('png', ''),
+        'lat_lng': record.get('latlng', []),
+        'landlocked': record.get('landlocked', False),
+        'un_member': record.get('unMember', False),
+        'independence_day': record.get('independent', None),
+        'government_type': government_type(record),
+        'gdp_info': 'See World Bank or IMF for current GDP data',
+        'calling_code': idd.get('root', '') + (idd.get('suffixes', [''])[0] if idd.get('suffixes') else ''),
+        'aliases': record.get('altSpellings', []),
+    }
+
+
+def fetch_snapshot(timeout: float = 30) -> List[Dict]:
+    """Download the full dataset (one request per field group) as basics dicts"""
+    http = get_http_client()
+    merged = {}
+    for fields in FIELD_GROUPS:
+        response = http.get(REST_COUNTRIES_ALL, params={'fields': fields}, timeout=timeout)
+        response.raise_for_status()
+        for record in response.json():
+            code = record.get('cca3')
+            if code:
+                merged.setdefault(code, {}).update(record)
+    if not merged:
+        raise ValueError("REST Countries returned no countries")
+    return [basics_from_record(record, record.get('cca3', '')) for record in merged.values()]
+
+
+class CountryFacts:
+    def __init__(self, snapshot_file: str = "data/country_facts.json", fetch=fetch_snapshot,
+                 refresh_seconds: float = REFRESH_SECONDS):
+        self.snapshot_file = Path(snapshot_file)
+        self.fetch = fetch
+        self.refresh_seconds = refresh_seconds
+        self.built_at = 0.0
+        self._by_code = {}
+        self._index = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.load()
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._by_code)
+
+    def __len__(self):
+        return len(self._by_code)
+
+    def _install(self, countries: List[Dict], built_at: float):
+        by_code = {c['cca3']: c for c in countries if c.get('cca3')}
+        index = {}
+        # Weakest names first so that exact names and aliases win collisions
+        for country in by_code.values():
+            for alias in country.get('aliases', []):
+                index.setdefault(normalize_name(alias), country['cca3'])
+        for country in by_code.values():
+            for name in (country['cca2'], country['cca3'], country['common_name'], country['official_name']):
+                if name:
+                    index[normalize_name(name)] = country['cca3']
+        for alias, code in ALIASES.items():
+            if code in by_code:
+                index[alias] = code
+        with self._lock:
+            self._by_code, self._index, self.built_at = by_code, index, built_at
+
+    def load(self) -> bool:
+        """Load the snapshot file, if there is one"""
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                data = json.load(f)
+            self._install(data['countries'], data.get('built_at', 0))
+            return True
+        except FileNotFoundError:
+            return False
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"[Country Facts] Ignoring unreadable snapshot {self.snapshot_file}: {e}")
+            return False
+
+    def refresh(self) -> bool:
+        """Rebuild the snapshot from the API and save it; keeps the old one on failure"""
+        with self._refresh_lock:
+            try:
+                countries = self.fetch()
+            except Exception as e:
+                print(f"[Country Facts] Snapshot refresh failed: {e}")
+                return False
+            built_at = time.time()
+            atomic_write_json(self.snapshot_file, {'built_at': built_at, 'countries': countries})
+            self._install(countries, built_at)
+            print(f"[Country Facts] Snapshot refreshed: {len(countries)} countries")
+            return True
+
+    def is_stale(self) -> bool:
+        return time.time() - self.built_at >= self.refresh_seconds
+
+    def lookup(self, name: str) -> Optional[Dict]:
+        """Basics for a country name, code or alias, or None (never fetches)"""
+        if not name:
+            return None
+        with self._lock:
+            code = self._index.get(normalize_name(name))
+            return self._by_code.get(code) if code else None
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted(c['common_name'] for c in self._by_code.values())
+
+    def start(self):
+        """Refresh in the background now (if stale) and whenever it goes stale"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="country-facts")
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.is_stale() and not self.refresh():
+                wait = RETRY_SECONDS
+            else:
+                wait = max(self.built_at + self.refresh_seconds - time.time(), 1)
+            self._stop.wait(wait)
+
+
+# Singleton instance
+_facts_instance = None
+_facts_lock = threading.Lock()
+
+
+def get_country_facts() -> CountryFacts:
+    """Get or create the shared country facts table (starts its refresher)"""
+    global _facts_instance
+    with _facts_lock:
+        if _facts_instance is None:
+            _facts_instance = CountryFacts()
+            _facts_instance.start()
+    return _facts_instance
+
+
+if __name__ == "__main__":
+    facts = CountryFacts()
+    if not facts.loaded or facts.is_stale():
+        start = time.time()
+        facts.refresh()
+        print(f"Built snapshot in {time.time() - start:.2f}s")
+
+    for name in ['Haiti', 'east timor', 'Sao Tome and Principe', 'DRC', 'Congo', 'Czech Republic', 'UK']:
+        basics = facts.lookup(name)
+        print(f"{name:25} -> {basics['common_name'] + ', capital ' + basics['capital'] if basics else None}")
+
+    start = time.perf_counter()
+    for _ in range(100000):
+        facts.lookup('Haiti')
+    print(f"\n{len(facts)} countries; lookup {(time.perf_counter() - start) * 10:.2f} us")
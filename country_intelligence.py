@@ -1,132 +1,158 @@
 """Enhanced country intelligence with historical context from real APIs"""
-import requests
 import json
 import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime
+from http_client import get_http_client
+from persistent_cache import get_persistent_cache, COUNTRY_FACTS_TTL, WIKI_TTL
+from country_facts import get_country_facts, basics_from_record, government_type
+
+WIKIPEDIA_API = "https://en.wikipedia.org/api/rest_v1"
+# Shared deadline for all lookups of one get_historical_context(s) call
+LOOKUP_TIMEOUT = 12
+
+_lookup_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='country-intel')
+
+
+def _completed(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def _cache_key(name):
+    return ' '.join(name.split()).lower()
+
+
+def _wiki_title(name):
+    return ' '.join(name.split()).replace(' ', '_')
+
+
+def wikipedia_summary(title, cache=None):
+    """
+    Wikipedia page summary (title, extract, description, page_url), cached
+    for days; None if there is no such page or the request failed (only
+    missing pages are cached, briefly)
+    """
+    cache = cache or get_persistent_cache()
+
+    def fetch():
+        response = get_http_client().get(f"{WIKIPEDIA_API}/page/summary/{_wiki_title(title)}", timeout=10)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        data = response.json()
+        return {
+            'title': data.get('title', title),
+            'extract': data.get('extract', ''),
+            'description': data.get('description', ''),
+            'page_url': data.get('content_urls', {}).get('desktop', {}).get('page', '')
+        }
+
+    try:
+        return cache.get_or_fetch('wiki_summary', _cache_key(title), fetch, WIKI_TTL)
+    except Exception as e:
+        print(f"[Wikipedia] Error fetching summary for {title}: {e}")
+        return None
+
+
+def wikipedia_sections(title, cache=None):
+    """A page's section list as [{'line', 'toclevel', 'anchor'}], cached for days"""
+    cache = cache or get_persistent_cache()
+
+    def fetch():
+        response = get_http_client().get(f"{WIKIPEDIA_API}/page/sections/{_wiki_title(title)}", timeout=10)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return [{'line': s.get('line', ''), 'toclevel': s.get('toclevel', 0), 'anchor': s.get('anchor', '')}
+                for s in response.json().get('sections', [])]
+
+    try:
+        return cache.get_or_fetch('wiki_sections', _cache_key(title), fetch, WIKI_TTL)
+    except Exception as e:
+        print(f"[Wikipedia] Error fetching sections for {title}: {e}")
+        return None
+
 
 class CountryIntelligence:
-    def __init__(self):
+    def __init__(self, cache=None, facts=None):
         # Free APIs that don't require keys
         self.rest_countries_api = "https://restcountries.com/v3.1"
-        self.wikipedia_api = "https://en.wikipedia.org/api/rest_v1"
+        self.wikipedia_api = WIKIPEDIA_API
         self.geonames_api = "http://api.geonames.org"
-        self.cache = {}
+        # Shared across instances and restarts; routes create a new instance per call
+        self.cache = cache or get_persistent_cache()
+        self.facts = facts if facts is not None else get_country_facts()
+        self.http = get_http_client()
 
     def get_country_basics(self, country_name):
-        """Get basic country information from REST Countries API"""
-        try:
-            # Try exact name first
-            response = requests.get(
-                f"{self.rest_countries_api}/name/{country_name}",
-                params={'fullText': 'false'},
-                timeout=10
-            )
-
-            if response.status_code == 200:
-                data = response.json()[0]  # Get first match
-
-                basics = {
-                    'official_name': data.get('name', {}).get('official', country_name),
-                    'common_name': data.get('name', {}).get('common', country_name),
-                    'capital': data.get('capital', ['Unknown'])[0] if data.get('capital') else 'Unknown',
-                    'region': data.get('region', 'Unknown'),
-                    'subregion': data.get('subregion', 'Unknown'),
-                    'population': data.get('population', 0),
-                    'area': data.get('area', 0),
-                    'languages': list(data.get('languages', {}).values()),
-                    'currencies': list(data.get('currencies', {}).keys()),
-                    'borders': data.get('borders', []),
-                    'timezones': data.get('timezones', []),
-                    'flag': data.get('flags', {}).get('png', ''),
-                    'coat_of_arms': data.get('coatOfArms', {}).get('png', ''),
-                    'lat_lng': data.get('latlng', []),
-                    'landlocked': data.get('landlocked', False),
-                    'un_member': data.get('unMember', False),
-                    'independence_day': data.get('independent', None),
-                    'government_type': self._extract_government_type(data),
-                    'gdp_info': 'See World Bank or IMF for current GDP data',
-                    'calling_code': data.get('idd', {}).get('root', '') +
-                                   (data.get('idd', {}).get('suffixes', [''])[0] if data.get('idd', {}).get('suffixes') else '')
-                }
-
-                print(f"[REST Countries] Retrieved basic data for {country_name}")
-                return basics
-            else:
-                print(f"[REST Countries] No data found for {country_name}")
-                return None
+        """
+        Get basic country information from the offline snapshot; only
+        before the first snapshot exists is REST Countries queried (and
+        the answer cached for days)
+        """
+        if self.facts.loaded:
+            basics = self.facts.lookup(country_name)
+            if basics is None:
+                print(f"[Country Facts] No data found for {country_name}")
+            return basics
 
+        try:
+            return self.cache.get_or_fetch('country_basics', _cache_key(country_name),
+                                           lambda: self._fetch_country_basics(country_name),
+                                           COUNTRY_FACTS_TTL)
         except Exception as e:
             print(f"[REST Countries] Error: {e}")
             return None
 
+    def _fetch_country_basics(self, country_name):
+        # Try exact name first
+        response = self.http.get(
+            f"{self.rest_countries_api}/name/{country_name}",
+            params={'fullText': 'false'},
+            timeout=10
+        )
+
+        if response.status_code == 200:
+            basics = basics_from_record(response.json()[0], country_name)  # Get first match
+            print(f"[REST Countries] Retrieved basic data for {country_name}")
+            return basics
+
+        if response.status_code == 404:
+            print(f"[REST Countries] No data found for {country_name}")
+            return None
+        # Anything else (rate limits, outages) must not be cached as "unknown"
+        response.raise_for_status()
+        raise IOError(f"REST Countries returned HTTP {response.status_code}")
+
     def _extract_government_type(self, data):
         """Extract government type from country data"""
-        # REST Countries doesn't directly provide government type
-        # We can infer from other fields
-        name_data = data.get('name', {})
-        official_name = name_data.get('official', '').lower()
-
-        if 'republic' in official_name:
-            if 'democratic' in official_name:
-                return 'Democratic Republic'
-            elif 'federal' in official_name:
-                return 'Federal Republic'
-            elif 'islamic' in official_name:
-                return 'Islamic Republic'
-            else:
-                return 'Republic'
-        elif 'kingdom' in official_name:
-            return 'Monarchy'
-        elif 'state' in official_name:
-            return 'State'
-        else:
-            return 'Unknown'
+        return government_type(data)
 
     def get_wikipedia_extract(self, country_name):
         """Get Wikipedia extract and historical summary"""
-        try:
-            # Get page summary
-            url = f"{self.wikipedia_api}/page/summary/{country_name.replace(' ', '_')}"
-            response = requests.get(url, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-
-                wiki_info = {
-                    'title': data.get('title', country_name),
-                    'extract': data.get('extract', ''),
-                    'description': data.get('description', ''),
-                    'page_url': data.get('content_urls', {}).get('desktop', {}).get('page', '')
-                }
-
-                # Try to get sections for more detailed history
-                sections_url = f"{self.wikipedia_api}/page/sections/{country_name.replace(' ', '_')}"
-                sections_response = requests.get(sections_url, timeout=10)
-
-                if sections_response.status_code == 200:
-                    sections = sections_response.json()
-                    history_sections = []
+        return self._wiki_info(country_name, wikipedia_summary(country_name, self.cache),
+                               wikipedia_sections(country_name, self.cache))
 
-                    for section in sections.get('sections', []):
-                        title_lower = section.get('line', '').lower()
-                        if any(keyword in title_lower for keyword in ['history', 'colonial', 'independence', 'war', 'conflict']):
-                            history_sections.append({
-                                'title': section.get('line', ''),
-                                'level': section.get('toclevel', 0),
-                                'anchor': section.get('anchor', '')
-                            })
-
-                    wiki_info['history_sections'] = history_sections
-
-                print(f"[Wikipedia] Retrieved data for {country_name}")
-                return wiki_info
-            else:
-                print(f"[Wikipedia] No data found for {country_name}")
-                return None
-
-        except Exception as e:
-            print(f"[Wikipedia] Error: {e}")
+    @staticmethod
+    def _wiki_info(country_name, summary, sections):
+        if not summary:
+            print(f"[Wikipedia] No data found for {country_name}")
             return None
+        wiki_info = dict(summary)
+
+        # Sections give more detailed history
+        if sections is not None:
+            wiki_info['history_sections'] = [
+                {'title': section['line'], 'level': section['toclevel'], 'anchor': section['anchor']}
+                for section in sections
+                if any(keyword in section['line'].lower()
+                       for keyword in ['history', 'colonial', 'independence', 'war', 'conflict'])
+            ]
+
+        return wiki_info
 
     def get_cia_factbook_url(self, country_name):
         """Generate CIA World Factbook URL"""
@@ -149,16 +175,53 @@ class CountryIntelligence:
 
         return f"https://www.cia.gov/the-world-factbook/countries/{country_slug}/"
 
-    def get_historical_context(self, country_name, focus_areas=None):
+    def get_historical_context(self, country_name, focus_areas=None, timeout=LOOKUP_TIMEOUT):
         """Generate comprehensive historical context for a country"""
-
-        # Check cache
-        cache_key = f"{country_name}_{str(focus_areas)}"
-        if cache_key in self.cache:
-            print(f"Returning cached data for {country_name}")
-            return self.cache[cache_key]
-
+        return self.get_historical_contexts([country_name], focus_areas, timeout)[country_name]
+
+    def get_historical_contexts(self, country_names, focus_areas=None, timeout=LOOKUP_TIMEOUT):
+        """
+        Historical context for several countries, looked up concurrently
+
+        Every lookup (basics, Wikipedia summary, sections) for every country
+        runs at once against one shared deadline. Lookups still running at
+        the deadline are left out - the context lists them under 'missing'
+        - and finish in the background, landing in the cache for next time.
+        """
+        country_names = list(dict.fromkeys(country_names))
+        deadline = time.monotonic() + timeout
+        pending = {country: self._submit_lookups(country) for country in country_names}
+        return {country: self._build_context(country, focus_areas, *self._collect(futures, deadline))
+                for country, futures in pending.items()}
+
+    def _submit_lookups(self, country_name):
+        futures = {
+            'wiki_summary': _lookup_pool.submit(wikipedia_summary, country_name, self.cache),
+            'wiki_sections': _lookup_pool.submit(wikipedia_sections, country_name, self.cache),
+        }
+        if self.facts.loaded:
+            futures['basics'] = _completed(self.get_country_basics(country_name))
+        else:
+            futures['basics'] = _lookup_pool.submit(self.get_country_basics, country_name)
+        return futures
+
+    @staticmethod
+    def _collect(futures, deadline):
+        results, missing = {}, []
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeout:
+                missing.append(name)
+            except Exception as e:
+                print(f"[Country Intelligence] {name} lookup failed: {e}")
+                results[name] = None
+        return results, missing
+
+    def _build_context(self, country_name, focus_areas, results, missing):
         print(f"\n=== Gathering Intelligence on {country_name} ===")
+        if missing:
+            print(f"[Country Intelligence] Deadline passed for {country_name}, missing: {', '.join(missing)}")
 
         intelligence = {
             'country': country_name,
@@ -169,12 +232,11 @@ class CountryIntelligence:
             'reference_urls': {},
             'key_facts': [],
             'historical_timeline': [],
-            'current_context': ''
+            'current_context': '',
+            'missing': missing
         }
 
-        # Get basic country info
-        print("Fetching basic country information...")
-        basics = self.get_country_basics(country_name)
+        basics = results.get('basics')
         if basics:
             intelligence['basic_info'] = basics
 
@@ -190,9 +252,9 @@ class CountryIntelligence:
                 f"Landlocked: {'Yes' if basics['landlocked'] else 'No'}"
             ]
 
-        # Get Wikipedia data
-        print("Fetching Wikipedia information...")
-        wiki_data = self.get_wikipedia_extract(country_name)
+        wiki_data = None
+        if 'wiki_summary' not in missing:
+            wiki_data = self._wiki_info(country_name, results['wiki_summary'], results.get('wiki_sections'))
         if wiki_data:
             intelligence['wikipedia_data'] = wiki_data
             intelligence['historical_summary'] = wiki_data.get('extract', '')
@@ -213,9 +275,6 @@ class CountryIntelligence:
         if focus_areas:
             intelligence['focus_analysis'] = self._analyze_focus_areas(country_name, focus_areas, intelligence)
 
-        # Cache the results
-        self.cache[cache_key] = intelligence
-
         print(f"Intelligence gathering complete for {country_name}")
         return intelligence
 
@@ -231,9 +290,10 @@ class CountryIntelligence:
         return region_map.get(region, 'africa')
 
     def _get_country_code(self, country_name):
-        """Get ISO country code (simplified)"""
-        # This would ideally use a proper mapping
-        # For now, return a default
+        """Get ISO 3166 alpha-2 country code"""
+        basics = self.facts.lookup(country_name)
+        if basics and basics.get('cca2'):
+            return basics['cca2'].lower()
         return country_name[:2].upper()
 
     def _generate_timeline_structure(self, country_name):
@@ -1,20 +1,24 @@
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, send_from_directory
-import feedparser
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
 import re
 import json
 from pathlib import Path
-import socket
 import os
-
-# Set timeout for all network operations
-socket.setdefaulttimeout(5)
+import time
 from report_synthesizer import IntelligenceSynthesizer
 from narrative_generator import NarrativeGenerator
 from dynamic_feed_generator import DynamicFeedGenerator
 from country_intelligence import CountryIntelligence
 from google_news_engine import GoogleNewsEngine
+from near_duplicates import collapse_near_duplicates
+from source_health import get_source_health
+from source_registry import get_source_registry, UNCHANGED
+from async_ingest import fetch_feeds
+from text_normalizer import clean_summary
+from date_normalizer import entry_ts
+from chat_sessions import get_chat_session_store
+from llm_providers import get_provider_registry
+from llm_gateway import get_llm_gateway
 try:
     from fast_llm_synthesizer import FastLLMSynthesizer, generate_chat_context
     llm_available = True
@@ -59,61 +63,46 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Load sources from file
+# Sources live in an in-memory registry that reloads only when the file changes
 SOURCES_FILE = Path('sources_config.json')
+source_registry = get_source_registry(str(SOURCES_FILE))
 
-def load_sources():
-    if SOURCES_FILE.exists():
-        with open(SOURCES_FILE, 'r') as f:
-            data = json.load(f)
-            # If sources list is small, offer to add more
-            if len(data.get('sources', [])) < 10:
-                try:
-                    from default_sources import DEFAULT_SOURCES
-                    existing_urls = [s['url'] for s in data['sources']]
-                    max_id = max([s.get('id', 0) for s in data['sources']], default=0)
-
-                    for source in DEFAULT_SOURCES:
-                        if source['url'] not in existing_urls:
-                            max_id += 1
-                            source['id'] = max_id
-                            data['sources'].append(source)
-
-                    save_sources(data)
-                except:
-                    pass
-            return data
-    else:
-        # Use comprehensive default sources
-        try:
-            from default_sources import DEFAULT_SOURCES
-            sources_with_ids = []
-            for i, source in enumerate(DEFAULT_SOURCES, 1):
-                source['id'] = i
-                sources_with_ids.append(source)
-
-            default = {
-                'sources': sources_with_ids,
-                'blacklist': []
-            }
-        except:
-            # Fallback to basic sources
-            default = {
-                'sources': [
-                    {'id': 1, 'name': 'BBC World', 'url': 'http://feeds.bbci.co.uk/news/world/rss.xml', 'type': 'news', 'active': True},
-                    {'id': 2, 'name': 'Reuters World', 'url': 'https://feeds.reuters.com/Reuters/worldNews', 'type': 'news', 'active': True},
-                    {'id': 3, 'name': 'Al Jazeera', 'url': 'https://www.aljazeera.com/xml/rss/all.xml', 'type': 'news', 'active': True},
-                    {'id': 4, 'name': 'Krebs on Security', 'url': 'https://krebsonsecurity.com/feed/', 'type': 'cyber', 'active': True},
-                    {'id': 5, 'name': 'Bellingcat', 'url': 'https://www.bellingcat.com/feed/', 'type': 'geopolitical', 'active': True},
-                ],
-                'blacklist': []
-            }
-        save_sources(default)
-        return default
+def seed_default_sources():
+    """Create the sources file from DEFAULT_SOURCES, or top up a short list (runs once at startup)"""
+    try:
+        from default_sources import DEFAULT_SOURCES
+    except ImportError:
+        # Fallback to basic sources
+        DEFAULT_SOURCES = [
+            {'name': 'BBC World', 'url': 'http://feeds.bbci.co.uk/news/world/rss.xml', 'type': 'news', 'active': True},
+            {'name': 'Reuters World', 'url': 'https://feeds.reuters.com/Reuters/worldNews', 'type': 'news', 'active': True},
+            {'name': 'Al Jazeera', 'url': 'https://www.aljazeera.com/xml/rss/all.xml', 'type': 'news', 'active': True},
+            {'name': 'Krebs on Security', 'url': 'https://krebsonsecurity.com/feed/', 'type': 'cyber', 'active': True},
+            {'name': 'Bellingcat', 'url': 'https://www.bellingcat.com/feed/', 'type': 'geopolitical', 'active': True},
+        ]
+
+    if source_registry.exists() and len(source_registry.all_sources()) >= 10:
+        return
+
+    def _seed(data):
+        existing_urls = {s['url'] for s in data['sources']}
+        max_id = max([s.get('id', 0) for s in data['sources']], default=0)
+        added = 0
+        for source in DEFAULT_SOURCES:
+            if source['url'] not in existing_urls:
+                max_id += 1
+                data['sources'].append(dict(source, id=max_id))
+                added += 1
+        if not added and source_registry.exists():
+            return UNCHANGED
+
+    source_registry.update(_seed)
+
+seed_default_sources()
 
-def save_sources(data):
-    with open(SOURCES_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+def load_sources():
+    """Current sources document (shared and read-only; use source_registry.update to change it)"""
+    return source_registry.data()
 
 # All countries list (195 countries)
 COUNTRIES = [
@@ -212,33 +201,54 @@ def filter_by_location(articles, countries=None):
     print(f"Filtered down to {len(filtered)} articles")
     return filtered
 
-def fetch_articles(limit=30):  # Increased limit to 30 articles per source
-    import socket
-    socket.setdefaulttimeout(5)  # Set 5 second timeout for feeds
+# Last articles parsed from each feed, reused while a source is not due
+_feed_cache = {}
 
-    sources_data = load_sources()
+def fetch_articles(limit=30):  # Increased limit to 30 articles per source
     all_articles = []
 
-    print(f"Fetching from {len(sources_data['sources'])} sources...")  # Debug
-    active_sources = [s for s in sources_data['sources'] if s.get('active', True) and s['url'] not in sources_data.get('blacklist', [])]
+    print(f"Fetching from {len(source_registry.all_sources())} sources...")  # Debug
+    active_sources = source_registry.active_sources()
     print(f"Active sources: {len(active_sources)}")
 
+    health = get_source_health(str(SOURCES_FILE))
+
+    # Sources that are backing off, quiet or circuit-broken reuse their last articles.
+    # The poll schedule is shared on disk but the articles are per process, so a
+    # source with nothing cached here (fresh start, another worker) is polled anyway.
+    due_urls = [s['url'] for s in active_sources
+                if s['url'] not in _feed_cache or health.should_poll(s['url'])]
+
+    # All due feeds download concurrently; the cycle takes about as long as the slowest one
+    feeds = fetch_feeds(due_urls, timeout=(3.05, 5))
+
     # Process all active sources (removed temporary limit)
     for source in active_sources:
+        if source['url'] not in feeds:
+            cached = _feed_cache.get(source['url'], [])
+            all_articles.extend(cached)
+            print(f"[CACHED] {len(cached)} articles from {source['name']} (not due)")
+            continue
+
+        feed = feeds[source['url']]
+        latency = feed.get('elapsed', 0.0)
+        # A failed poll still counts as polled here, so backoff applies from now on
+        _feed_cache.setdefault(source['url'], [])
         try:
-            print(f"Fetching {source['name']}...")  # Debug
-
-            # Add timeout to prevent hanging
-            feed = feedparser.parse(source['url'])
-
             if hasattr(feed, 'status') and feed.status >= 400:
                 print(f"HTTP error {feed.status} for {source['name']}")
+                health.record_failure(source['url'], latency, f"HTTP {feed.status}", name=source['name'])
                 continue
 
             if hasattr(feed, 'bozo_exception'):
                 print(f"Feed parse warning for {source['name']}: {feed.bozo_exception}")
+                if not feed.entries:
+                    health.record_failure(source['url'], latency, str(feed.bozo_exception),
+                                          name=source['name'])
+                    continue
 
             article_count = 0
+            source_articles = []
             for entry in feed.entries[:limit]:
                 # Get summary or description
                 summary = ''
@@ -247,16 +257,9 @@ def fetch_articles(limit=30):  # Increased limit to 30 articles per source
                 elif hasattr(entry, 'description'):
                     summary = entry.description
 
-                # Clean HTML and preserve full content
-                if summary:
-                    summary = BeautifulSoup(summary, 'html.parser').get_text()
-                    # Keep full summary but truncate at sentence boundary
-                    if len(summary) > 1000:
-                        # Find last complete sentence within 1000 chars
-                        summary = summary[:1000]
-                        last_period = summary.rfind('. ')
-                        if last_period > 0:
-                            summary = summary[:last_period + 1]
+                # Clean HTML; keep full summary but truncate at a sentence
+                # boundary within 1000 chars
+                summary = clean_summary(summary, max_chars=1000)
 
                 article = {
                     'title': entry.get('title', 'No title'),
@@ -265,17 +268,25 @@ def fetch_articles(limit=30):  # Increased limit to 30 articles per source
                     'source': source['name'],
                     'type': source.get('type', 'general'),
                     'published': entry.get('published', entry.get('updated', '')),
+                    'published_ts': entry_ts(entry, source['name']),
                 }
-                all_articles.append(article)
+                source_articles.append(article)
                 article_count += 1
 
+            all_articles.extend(source_articles)
+            _feed_cache[source['url']] = source_articles
+            new_items = health.record_success(source['url'], latency,
+                                              [a['link'] for a in source_articles], name=source['name'])
+
             if article_count > 0:
-                print(f"[OK] Got {article_count} articles from {source['name']}")
+                print(f"[OK] Got {article_count} articles ({new_items} new) from {source['name']}")
             else:
                 print(f"[SKIP] No articles from {source['name']}")
         except Exception as e:
             print(f"[ERROR] Error fetching {source['name']}: {str(e)[:100]}")
+            health.record_failure(source['url'], latency, str(e), name=source['name'])
 
+    health.save()
     print(f"Total articles collected: {len(all_articles)}")
     return all_articles
 
@@ -373,6 +384,9 @@ def fetch_news():
         # Filter for the country (removes duplicates)
         articles = filter_by_location(articles, countries)
 
+        # Collapse the same story carried by RSS feeds and Google News
+        articles = collapse_near_duplicates(articles)
+
     else:
         # No specific countries - get breaking security news
         print("\nGetting global breaking security news...")
@@ -390,25 +404,25 @@ def fetch_news():
                 'published': article['published']
             })
 
+        articles = collapse_near_duplicates(articles)
+
     # Generate synthesized report if requested
     if report_type == 'synthesized' and countries:
         synthesizer = IntelligenceSynthesizer()
         country_reports = synthesizer.synthesize_by_country(articles, countries)
 
-        # Add historical intelligence for each country
-        intel = CountryIntelligence()
-        for country in countries:
-            if country in country_reports:
-                print(f"Fetching historical context for {country}...")
-                historical_data = intel.get_historical_context(country)
-                country_reports[country]['historical_context'] = {
-                    'basic_facts': historical_data.get('key_facts', []),
-                    'summary': historical_data.get('historical_summary', '')[:500],
-                    'references': historical_data.get('reference_urls', {}),
-                    'capital': historical_data.get('basic_info', {}).get('capital', 'Unknown'),
-                    'population': historical_data.get('basic_info', {}).get('population', 0),
-                    'government': historical_data.get('basic_info', {}).get('government_type', 'Unknown')
-                }
+        # Add historical intelligence for each country (looked up concurrently, one shared deadline)
+        print("Fetching historical context...")
+        contexts = CountryIntelligence().get_historical_contexts([c for c in countries if c in country_reports])
+        for country, historical_data in contexts.items():
+            country_reports[country]['historical_context'] = {
+                'basic_facts': historical_data.get('key_facts', []),
+                'summary': historical_data.get('historical_summary', '')[:500],
+                'references': historical_data.get('reference_urls', {}),
+                'capital': historical_data.get('basic_info', {}).get('capital', 'Unknown'),
+                'population': historical_data.get('basic_info', {}).get('population', 0),
+                'government': historical_data.get('basic_info', {}).get('government_type', 'Unknown')
+            }
 
         # Try Fast LLM synthesis with real content
         if llm_available:
@@ -423,6 +437,9 @@ def fetch_news():
                     data['articles_with_content'] = result['articles_with_content']
                     # Generate chat context with real content
                     data['chat_context'] = generate_chat_context(country, result['articles_with_content'])
+                    # Follow-up chat questions read it from the server-side session
+                    if 'user_id' in session:
+                        get_chat_session_store().update_context(session['user_id'], country, data['chat_context'])
             except NameError:
                 # Fall back to old LLM synthesizer if fast one not available
                 try:
@@ -472,58 +489,71 @@ def fetch_news():
 
 @app.route('/api/sources', methods=['GET'])
 def get_sources():
-    return jsonify(load_sources())
+    sources_data = load_sources()
+    health = get_source_health(str(SOURCES_FILE))
+    # Health stats are attached to the response only, not saved with the sources
+    response = dict(sources_data)
+    response['sources'] = [
+        dict(source, health=health.get_health(source['url']))
+        for source in sources_data['sources']
+    ]
+    response['health_summary'] = health.summary([s['url'] for s in sources_data['sources']])
+    return jsonify(response)
 
 @app.route('/api/sources', methods=['POST'])
 def add_source():
     data = request.json
-    sources_data = load_sources()
-
-    # Generate new ID
-    new_id = max([s['id'] for s in sources_data['sources']], default=0) + 1
-
-    new_source = {
-        'id': new_id,
-        'name': data['name'],
-        'url': data['url'],
-        'type': data.get('type', 'general'),
-        'active': True
-    }
-
-    sources_data['sources'].append(new_source)
-    save_sources(sources_data)
 
+    def _add(sources_data):
+        # Generate new ID
+        new_id = max([s['id'] for s in sources_data['sources']], default=0) + 1
+        new_source = {
+            'id': new_id,
+            'name': data['name'],
+            'url': data['url'],
+            'type': data.get('type', 'general'),
+            'active': True
+        }
+        sources_data['sources'].append(new_source)
+        return new_source
+
+    new_source = source_registry.update(_add)
     return jsonify({'success': True, 'source': new_source})
 
 @app.route('/api/sources/<int:source_id>', methods=['DELETE'])
 def delete_source(source_id):
-    sources_data = load_sources()
-    sources_data['sources'] = [s for s in sources_data['sources'] if s['id'] != source_id]
-    save_sources(sources_data)
+    def _delete(sources_data):
+        sources_data['sources'] = [s for s in sources_data['sources'] if s['id'] != source_id]
+
+    source_registry.update(_delete)
     return jsonify({'success': True})
 
 @app.route('/api/sources/<int:source_id>/toggle', methods=['POST'])
 def toggle_source(source_id):
-    sources_data = load_sources()
-    for source in sources_data['sources']:
-        if source['id'] == source_id:
-            source['active'] = not source.get('active', True)
-            save_sources(sources_data)
-            return jsonify({'success': True, 'active': source['active']})
-    return jsonify({'success': False})
+    if source_registry.get(source_id) is None:
+        return jsonify({'success': False})
+
+    def _toggle(sources_data):
+        for source in sources_data['sources']:
+            if source['id'] == source_id:
+                source['active'] = not source.get('active', True)
+                return source['active']
+        return UNCHANGED
+
+    active = source_registry.update(_toggle)
+    return jsonify({'success': True, 'active': active})
 
 @app.route('/api/sources/<int:source_id>/blacklist', methods=['POST'])
 def blacklist_source(source_id):
-    sources_data = load_sources()
-    for source in sources_data['sources']:
-        if source['id'] == source_id:
-            if source['url'] not in sources_data.get('blacklist', []):
-                if 'blacklist' not in sources_data:
-                    sources_data['blacklist'] = []
-                sources_data['blacklist'].append(source['url'])
-                save_sources(sources_data)
-                return jsonify({'success': True})
-    return jsonify({'success': False})
+    source = source_registry.get(source_id)
+    if source is None or source_registry.is_blacklisted(source['url']):
+        return jsonify({'success': False})
+
+    def _blacklist(sources_data):
+        sources_data['blacklist'].append(source['url'])
+
+    source_registry.update(_blacklist)
+    return jsonify({'success': True})
 
 @app.route('/api/countries', methods=['GET'])
 def get_countries():
@@ -551,49 +581,71 @@ def get_historical_context():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _chat_facts(country):
+    """Country facts block for chat prompts (offline snapshot, no network)"""
+    intel = CountryIntelligence()
+    info = intel.get_country_basics(country)
+    if not info:
+        return ''
+    facts = f"\nCountry Facts:\n"
+    facts += f"- Capital: {info.get('capital', 'Unknown')}\n"
+    facts += f"- Population: {info.get('population', 0):,}\n"
+    facts += f"- Area: {info.get('area', 0):,} km²\n"
+    facts += f"- Government: {info.get('government_type', 'Unknown')}\n"
+    facts += f"- Languages: {', '.join(info.get('languages', [])[:3])}\n"
+    facts += f"\nCIA Factbook: {intel.get_cia_factbook_url(country)}\n"
+    return facts
+
 @app.route('/api/chat', methods=['POST'])
+@login_required
 def chat_with_analyst():
     """Chat with AI analyst about a specific country's situation"""
     data = request.json
     country = data.get('country')
     question = data.get('question')
-    context = data.get('context', '')  # Previous reports/articles
+    context = data.get('context', '')  # Only needed when no synthesis has seeded the session
 
     if not country or not question:
         return jsonify({'error': 'Country and question required'}), 400
 
     try:
-        # Get historical/CIA Factbook data if asking about facts
-        historical_context = ""
-        if any(keyword in question.lower() for keyword in ['gdp', 'economy', 'population', 'capital', 'government', 'history', 'cia', 'factbook', 'facts']):
+        store = get_chat_session_store()
+        user = session['user_id']
+        chat = store.get(user, country)
+        if chat is None and not context:
+            # Expired or reset since the browser last posted context; ask for it again
+            return jsonify({'session': None, 'resend_context': True}), 409
+
+        facts = None
+        if chat is None or chat.facts is None:
             try:
-                intel = CountryIntelligence()
-                historical_data = intel.get_historical_context(country)
-
-                # Add relevant facts to context
-                if historical_data.get('basic_info'):
-                    info = historical_data['basic_info']
-                    historical_context = f"\nCountry Facts:\n"
-                    historical_context += f"- Capital: {info.get('capital', 'Unknown')}\n"
-                    historical_context += f"- Population: {info.get('population', 0):,}\n"
-                    historical_context += f"- Area: {info.get('area', 0):,} km²\n"
-                    historical_context += f"- Government: {info.get('government_type', 'Unknown')}\n"
-                    historical_context += f"- Languages: {', '.join(info.get('languages', [])[:3])}\n"
-
-                    # Add CIA Factbook reference
-                    if historical_data.get('reference_urls'):
-                        cia_url = historical_data['reference_urls'].get('CIA World Factbook', '')
-                        historical_context += f"\nCIA Factbook: {cia_url}\n"
-            except:
-                pass  # If historical fetch fails, continue without it
+                facts = _chat_facts(country)
+            except Exception as e:
+                print(f"Chat facts lookup failed for {country}: {e}")
+                facts = ''
+
+        def seed(chat):
+            if not chat.chat_context and context:
+                chat.set_context(context)
+            if chat.facts is None and facts is not None:
+                chat.facts = facts
+
+        chat = store.update(user, country, seed)
+        historical_context = chat.facts or ''
+        news_context = chat.news_context()
+        conversation = chat.conversation()
 
         # Initialize LLM
         if llm_available:
-            from llm_synthesizer import LLMSynthesizer
-            llm = LLMSynthesizer()
+            # Shared gateway: warm providers, rate limits, retries and fallback
+            llm = get_llm_gateway()
+            primary = llm.primary()
 
             # Create chat prompt
-            if llm.use_gemini:
+            if primary is None:
+                return jsonify({'answer': "**Analysis:** Configure Gemini API in .env file for chat features."})
+
+            elif primary.name == 'gemini':
                 from datetime import datetime
                 current_date = datetime.now().strftime('%Y-%m-%d')
                 prompt = f"""You are a concise intelligence analyst specializing in {country}.
@@ -604,7 +656,9 @@ IMPORTANT: Only call events "recent" if they happened within the last 7 days. Al
 {historical_context}
 
 Recent News:
-{context[:1000]}
+{news_context}
+
+{conversation}
 
 Question: {question}
 
@@ -617,26 +671,18 @@ Instructions:
 - Keep total response under 100 words
 - Write in plain text only"""
 
-                response = llm.model.generate_content(prompt)
-                answer = response.text
+                answer = llm.generate(prompt)
 
-            elif llm.use_openai:
-                # OpenAI version
+            else:
+                # OpenAI / Ollama version
                 messages = [
                     {"role": "system", "content": f"You are a concise intelligence analyst specializing in {country}. Answer in plain text only. NO markdown. Use dash (-) for bullets, not asterisks. Keep under 100 words."},
-                    {"role": "user", "content": f"{historical_context}\n\nRecent News:\n{context[:1000]}\n\nQuestion: {question}\n\nAnswer in 2-3 sentences with facts. Use plain text only."}
+                    {"role": "user", "content": f"{historical_context}\n\nRecent News:\n{news_context}\n\n{conversation}\n\nQuestion: {question}\n\nAnswer in 2-3 sentences with facts. Use plain text only."}
                 ]
-                response = llm.openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=messages,
-                    temperature=0.7,
-                    max_tokens=200  # Reduced from 500
-                )
-                answer = response.choices[0].message.content
-            else:
-                answer = "**Analysis:** Configure Gemini API in .env file for chat features."
+                answer = llm.complete(messages, temperature=0.7, max_tokens=200)  # Reduced from 500
 
-            return jsonify({'answer': answer})
+            chat = store.add_turn(user, country, question, answer)
+            return jsonify({'answer': answer, 'session': chat.to_dict()})
 
         else:
             return jsonify({'answer': '**Note:** Add GEMINI_API_KEY to .env file to enable chat.'})
@@ -645,6 +691,42 @@ Instructions:
         print(f"Chat error: {e}")
         return jsonify({'error': 'Failed to process question'}), 500
 
+@app.route('/api/chat/session', methods=['GET', 'DELETE'])
+@login_required
+def chat_session_state():
+    """Whether the server holds a chat session for a country (DELETE starts over)"""
+    country = request.args.get('country', '')
+    if not country:
+        return jsonify({'error': 'Country required'}), 400
+    store = get_chat_session_store()
+    user = session['user_id']
+    if request.method == 'DELETE':
+        store.reset(user, country)
+        return jsonify({'success': True})
+    chat = store.get(user, country)
+    return jsonify({'session': chat.to_dict() if chat else None})
+
+@app.route('/api/llm/health', methods=['GET'])
+def llm_health():
+    """LLM provider states plus per-provider call, token and latency stats"""
+    health = get_provider_registry().health()
+    health['gateway'] = get_llm_gateway().summary()
+    return jsonify(health)
+
+@app.route('/api/breaking', methods=['GET'])
+def get_breaking_alerts():
+    """Get alerts from the breaking news watcher (optionally since a timestamp)"""
+    from breaking_news_monitor import get_breaking_watcher
+    watcher = get_breaking_watcher()
+    since = request.args.get('since')
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({
+        'alerts': watcher.get_recent_alerts(since=since, limit=limit),
+        'last_poll': watcher.last_poll,
+        'search_errors': watcher.search_errors,
+        'running': watcher.running or watcher.following
+    })
+
 # Scheduled Reports API Endpoints
 @app.route('/api/scheduled-reports', methods=['GET'])
 def get_scheduled_reports():
@@ -921,6 +1003,17 @@ if __name__ == '__main__':
     scheduler = get_scheduler()
     scheduler.start()
 
+    # Start the breaking news watcher
+    from breaking_news_monitor import get_breaking_watcher
+    get_breaking_watcher().start()
+
+    # Set up LLM providers now so the first request doesn't pay for it
+    get_provider_registry().warm()
+
+    # Load the offline country facts snapshot (refreshes in the background)
+    from country_facts import get_country_facts
+    get_country_facts()
+
     import os
     debug_mode = os.getenv('FLASK_ENV', 'development') == 'development'
     app.run(debug=debug_mode, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""
+Date normalization - every article gets an integer UTC timestamp
+
+Publish dates arrive as strings in mixed formats (RFC 822 from feeds, ISO
+8601 from FeedCollector and page metadata, the odd locale-specific one).
+Sorting or filtering on those strings is wrong, and re-parsing them at
+every use is slow. This module turns them into `published_ts` (epoch
+seconds, UTC) once, at ingest:
+- feedparser's *_parsed structs (already UTC) are used directly
+- otherwise the parser that last worked for the same source is tried
+  first, falling back through the others, so each source's format is
+  detected once
+- naive datetimes are taken as UTC; absurd dates (far future, pre-1990)
+  count as unknown
+Filtering, sorting and bucketing then compare integers.
+"""
+import calendar
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional
+
+try:
+    from feedparser.datetimes import _parse_date as feedparser_parse_date
+except ImportError:  # feedparser 5 kept it at the top level
+    from feedparser import _parse_date as feedparser_parse_date
+
+try:
+    from dateutil import parser as dateutil_parser
+    DATEUTIL_AVAILABLE = True
+except ImportError:
+    DATEUTIL_AVAILABLE = False
+
+MIN_TS = 631152000  # 1990-01-01
+MAX_FUTURE_SECONDS = 2 * 86400
+
+_STRUCT_KEYS = ('published_parsed', 'updated_parsed', 'created_parsed')
+_STRING_KEYS = ('published', 'updated', 'created')
+
+
+def _to_ts(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _parse_rfc822(text: str) -> int:
+    dt = parsedate_to_datetime(text)
+    if dt is None:
+        raise ValueError(text)
+    return _to_ts(dt)
+
+
+def _parse_iso(text: str) -> int:
+    text = text.strip()
+    if text.endswith('Z'):
+        text = text[:-1] + '+00:00'
+    return _to_ts(datetime.fromisoformat(text))
+
+
+def _parse_feedparser(text: str) -> int:
+    # feedparser knows a dozen feed date dialects and returns a UTC struct
+    struct = feedparser_parse_date(text)
+    if struct is None:
+        raise ValueError(text)
+    return calendar.timegm(struct)
+
+
+def _parse_dateutil(text: str) -> int:
+    if not DATEUTIL_AVAILABLE:
+        raise ValueError(text)
+    return _to_ts(dateutil_parser.parse(text))
+
+
+PARSERS: Dict[str, Callable[[str], int]] = {
+    'rfc822': _parse_rfc822,
+    'iso': _parse_iso,
+    'feedparser': _parse_feedparser,
+    'dateutil': _parse_dateutil,
+}
+
+
+class DateNormalizer:
+    def __init__(self):
+        self._formats = {}  # source -> name of the parser that last worked
+        self.stats = Counter()
+
+    @staticmethod
+    def _plausible(ts: int, now: float) -> bool:
+        return MIN_TS <= ts <= now + MAX_FUTURE_SECONDS
+
+    def parse(self, text: Optional[str], source: Optional[str] = None) -> Optional[int]:
+        """Epoch seconds for a date string, or None if it can't be read"""
+        if not text or not isinstance(text, str):
+            return None
+        now = time.time()
+
+        cached = self._formats.get(source)
+        order = [cached] + [name for name in PARSERS if name != cached] if cached else list(PARSERS)
+        for name in order:
+            try:
+                ts = PARSERS[name](text)
+            except (TypeError, ValueError, OverflowError, IndexError):
+                continue
+            if not self._plausible(ts, now):
+                continue
+            self.stats['cache_hit' if name == cached else 'detected'] += 1
+            if source is not None and name != cached:
+                self._formats[source] = name
+            return ts
+
+        self.stats['unparseable'] += 1
+        return None
+
+    def entry_ts(self, entry, source: Optional[str] = None) -> Optional[int]:
+        """Timestamp for a feedparser entry, preferring its parsed structs"""
+        now = time.time()
+        for key in _STRUCT_KEYS:
+            struct = entry.get(key)
+            if struct:
+                ts = calendar.timegm(struct)
+                if self._plausible(ts, now):
+                    self.stats['struct'] += 1
+                    return ts
+        for key in _STRING_KEYS:
+            ts = self.parse(entry.get(key), source)
+            if ts is not None:
+                return ts
+        return None
+
+    def article_ts(self, article: Dict) -> Optional[int]:
+        """An article's published_ts, parsing its 'published' string if needed"""
+        ts = article.get('published_ts')
+        if isinstance(ts, int):
+            return ts
+        return self.parse(article.get('published') or article.get('published_time'), article.get('source'))
+
+    def detected_formats(self) -> Dict[str, str]:
+        return dict(self._formats)
+
+
+# Singleton instance
+_normalizer_instance = None
+_normalizer_lock = threading.Lock()
+
+
+def get_date_normalizer() -> DateNormalizer:
+    """Get or create the shared date normalizer"""
+    global _normalizer_instance
+    with _normalizer_lock:
+        if _normalizer_instance is None:
+            _normalizer_instance = DateNormalizer()
+    return _normalizer_instance
+
+
+def entry_ts(entry, source: Optional[str] = None) -> Optional[int]:
+    return get_date_normalizer().entry_ts(entry, source)
+
+
+def published_ts(article: Dict) -> Optional[int]:
+    return get_date_normalizer().article_ts(article)
+
+
+def annotate(articles: List[Dict]) -> List[Dict]:
+    """Fill in published_ts on articles that lack it (None when unknown)"""
+    normalizer = get_date_normalizer()
+    for article in articles:
+        if not isinstance(article.get('published_ts'), int):
+            article['published_ts'] = normalizer.article_ts(article)
+    return articles
+
+
+def filter_recent(articles: List[Dict], max_age_seconds: float, now: Optional[float] = None,
+                  keep_undated: bool = True) -> List[Dict]:
+    """Drop articles published more than max_age_seconds ago"""
+    cutoff = (now if now is not None else time.time()) - max_age_seconds
+    kept = []
+    for article in annotate(articles):
+        ts = article['published_ts']
+        if ts is None:
+            if keep_undated:
+                kept.append(article)
+        elif ts >= cutoff:
+            kept.append(article)
+    return kept
+
+
+def sort_newest_first(articles: List[Dict]) -> List[Dict]:
+    """Newest first by published_ts; undated articles go last"""
+    return sorted(annotate(articles), key=lambda a: a['published_ts'] or 0, reverse=True)
+
+
+def format_ts(ts: Optional[int], fmt: str = '%B %d, %Y at %I:%M %p', default: str = '') -> str:
+    """Format a UTC timestamp for display"""
+    if ts is None:
+        return default
+    return datetime.fromtimestamp(ts, timezone.utc).strftime(fmt)
+
+
+def iso_from_ts(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+if __name__ == "__main__":
+    samples = [
+        ('Reuters', 'Fri, 19 Sep 2025 10:00:00 GMT'),
+        ('Reuters', 'Sat, 20 Sep 2025 08:30:00 +0200'),
+        ('Collector', '2025-09-19T10:00:00Z'),
+        ('Collector', '2025-09-19T12:00:00.123456+02:00'),
+        ('Blog', 'September 19, 2025 10:00 AM'),
+        ('Broken', 'yesterday-ish'),
+    ]
+    normalizer = get_date_normalizer()
+    for source, text in samples:
+        ts = normalizer.parse(text, source)
+        print(f"{source:10} {text:35} -> {ts} {format_ts(ts, default='(unknown)')}")
+
+    start = time.time()
+    for _ in range(10000):
+        normalizer.parse('Fri, 19 Sep 2025 10:00:00 GMT', 'Reuters')
+    print(f"\n{10000 / (time.time() - start):.0f} cached-format parses/s; formats: {normalizer.detected_formats()}")
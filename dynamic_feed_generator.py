@@ -1,12 +1,12 @@
 """Dynamic Google News RSS feed generator for any country/topic"""
 import urllib.parse
-import feedparser
-import socket
+from async_ingest import fetch_feeds
+from text_normalizer import strip_html
+from date_normalizer import entry_ts
 
 class DynamicFeedGenerator:
     def __init__(self):
         self.base_url = "https://news.google.com/rss/search"
-        socket.setdefaulttimeout(10)  # Set timeout for feed fetching
 
     def build_google_news_url(self, query, language='en-US', country='US'):
         """Build Google News RSS URL for a specific query"""
@@ -63,17 +63,21 @@ class DynamicFeedGenerator:
         all_articles = []
         sources_used = set()
 
+        # Fetch every generated feed at once
+        fetched = fetch_feeds([f['url'] for f in feeds])
+
         for feed_info in feeds:
             try:
-                feed = feedparser.parse(feed_info['url'])
+                feed = fetched[feed_info['url']]
 
                 if feed.entries:
                     for entry in feed.entries[:max_per_feed]:
                         article = {
                             'title': entry.get('title', 'No title'),
-                            'summary': entry.get('summary', ''),
+                            'summary': strip_html(entry.get('summary', '')),
                             'link': entry.get('link', ''),
                             'published': entry.get('published', ''),
+                            'published_ts': entry_ts(entry, 'news.google.com'),
                             'source': feed_info['name'],
                             'category': feed_info['category']
                         }
@@ -74,6 +74,25 @@ class EmailSender:
         except Exception as e:
             logger.error(f"Failed to attach file {filepath}: {e}")
     
+    def send_alert(self, recipients: List[str], subject: str, text_content: str) -> bool:
+        try:
+            msg = MIMEText(text_content)
+            msg['Subject'] = subject
+            msg['From'] = self.username
+            msg['To'] = ', '.join(recipients)
+            
+            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
+                server.starttls()
+                server.login(self.username, self.password)
+                server.send_message(msg)
+            
+            logger.info(f"Alert sent to {len(recipients)} recipients")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to send alert: {e}")
+            return False
+    
     def send_test_email(self, recipient: str) -> bool:
         test_message = f"""
 Test Email from Security Monitor System
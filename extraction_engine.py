@@ -0,0 +1,468 @@
+"""
+Article extraction engine - lxml parsing, learned per-site selectors,
+readability-style scoring as the fallback
+
+For each page:
+1. Streamed HTML (byte-capped) is fed straight into lxml's C parser,
+   stopping once a known selector's content node is closed
+2. Metadata comes from meta tags / JSON-LD: title, byline, published
+   time, canonical URL
+3. The body comes from the domain's selector if we know one, otherwise
+   from a text-density scorer (paragraph text and commas, minus link
+   density, plus class/id hints)
+4. When the scorer keeps picking the same container on a domain, its
+   selector is learned and cached, so later pages skip scoring
+Without lxml installed, the body falls back to the streaming HTMLParser
+extractor and structured fields are left empty.
+"""
+import codecs
+import json
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+from atomic_file import atomic_write_json
+from http_client import get_http_client, host_of, BROWSER_USER_AGENT, MAX_HTML_BYTES
+from streaming_html import extract_text
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+_WHITESPACE = re.compile(r'\s+')
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([A-Za-z0-9_\-]+)', re.I)
+_POSITIVE = re.compile(r'article|body|content|entry|main|post|story|text|blog', re.I)
+_NEGATIVE = re.compile(r'comment|footer|nav|sidebar|promo|related|share|social|sponsor|'
+                       r'advert|\bads?\b|cookie|newsletter|subscribe|menu|widget|breadcrumb', re.I)
+# Build-generated names (css-1x2y3z, Styles__body___a8Fk2) change between deploys
+_AUTO_GENERATED = re.compile(r'\d{3,}|^(?:css|sc|jsx)-|__|\d[A-Za-z]+\d')
+
+_STRIP_TAGS = ('script', 'style', 'noscript', 'template', 'svg', 'form', 'button', 'iframe')
+_BLOCK_TAGS = ('div', 'section', 'article', 'main', 'td')
+
+# Selectors known to work for common outlets; learned ones are added per domain
+SEED_SELECTORS = {
+    'bbc.com': '//article',
+    'bbc.co.uk': '//article',
+    'apnews.com': '//div[contains(@class, "RichTextStoryBody")]',
+    'aljazeera.com': '//div[contains(@class, "wysiwyg")]',
+    'theguardian.com': '//div[@id="maincontent"]',
+}
+
+GENERIC_SELECTORS = [
+    '//*[@itemprop="articleBody"]',
+    '//article',
+]
+
+# Scorer wins needed before a selector is learned, and misses before it's dropped
+LEARN_AFTER = 2
+DROP_AFTER = 3
+MIN_BODY_CHARS = 250
+
+
+def _clean(text: str) -> str:
+    return _WHITESPACE.sub(' ', text or '').strip()
+
+
+def _sniff_charset(data: bytes) -> Optional[str]:
+    match = _META_CHARSET.search(data[:4096])
+    return match.group(1).decode('ascii') if match else None
+
+
+def _domain(url: str) -> str:
+    host = host_of(url).lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class SelectorRegistry:
+    """Per-domain body selectors learned from successful extractions"""
+
+    def __init__(self, cache_file: str = "data/extraction_selectors.json"):
+        self.cache_file = Path(cache_file)
+        self.selectors = dict(SEED_SELECTORS)
+        self.misses = Counter()
+        self.candidates = {}  # domain -> Counter of scorer-picked selectors
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r') as f:
+                    self.selectors.update(json.load(f))
+            except Exception as e:
+                print(f"[Extraction] Could not read {self.cache_file}: {e}")
+
+    def save(self):
+        with self._lock:
+            learned = {d: s for d, s in self.selectors.items() if SEED_SELECTORS.get(d) != s}
+        atomic_write_json(self.cache_file, learned)
+
+    def get(self, domain: str) -> Optional[str]:
+        return self.selectors.get(domain)
+
+    def record_hit(self, domain: str):
+        with self._lock:
+            self.misses.pop(domain, None)
+
+    def record_miss(self, domain: str) -> bool:
+        """Count a failed selector; returns True when it was dropped"""
+        with self._lock:
+            self.misses[domain] += 1
+            if self.misses[domain] < DROP_AFTER:
+                return False
+            self.selectors.pop(domain, None)
+            self.misses.pop(domain, None)
+        self.save()
+        return True
+
+    def record_candidate(self, domain: str, selector: str) -> bool:
+        """Note the scorer's choice; returns True when it gets learned"""
+        with self._lock:
+            counts = self.candidates.setdefault(domain, Counter())
+            counts[selector] += 1
+            if counts[selector] < LEARN_AFTER or self.selectors.get(domain) == selector:
+                return False
+            self.selectors[domain] = selector
+            self.misses.pop(domain, None)
+            del self.candidates[domain]
+        self.save()
+        print(f"[Extraction] Learned selector for {domain}: {selector}")
+        return True
+
+
+class ExtractionEngine:
+    def __init__(self, registry: SelectorRegistry = None):
+        self.registry = registry or SelectorRegistry()
+
+    # -- metadata -------------------------------------------------------
+
+    @staticmethod
+    def _meta(doc, *names) -> str:
+        for name in names:
+            values = doc.xpath(f'//meta[@property="{name}" or @name="{name}" or @itemprop="{name}"]/@content')
+            for value in values:
+                if value and value.strip():
+                    return value.strip()
+        return ''
+
+    @staticmethod
+    def _json_ld(doc) -> Dict:
+        """First NewsArticle-like object in the page's JSON-LD"""
+        for block in doc.xpath('//script[@type="application/ld+json"]/text()'):
+            try:
+                data = json.loads(block)
+            except ValueError:
+                continue
+            items = data if isinstance(data, list) else data.get('@graph', [data]) if isinstance(data, dict) else []
+            for item in items:
+                if isinstance(item, dict) and ('datePublished' in item or 'author' in item):
+                    return item
+        return {}
+
+    def _metadata(self, doc, url: str) -> Dict:
+        ld = self._json_ld(doc)
+
+        author = ld.get('author')
+        if isinstance(author, list):
+            author = ', '.join(a.get('name', '') if isinstance(a, dict) else str(a) for a in author)
+        elif isinstance(author, dict):
+            author = author.get('name', '')
+        byline = author or self._meta(doc, 'author', 'article:author', 'byl', 'sailthru.author')
+        if not byline:
+            nodes = doc.xpath('//*[@rel="author" or @itemprop="author" or contains(@class, "byline")]')
+            byline = _clean(nodes[0].text_content()) if nodes else ''
+        if byline.lower().startswith('by '):
+            byline = byline[3:]
+
+        published = ld.get('datePublished') or self._meta(
+            doc, 'article:published_time', 'datePublished', 'pubdate', 'publish-date', 'date', 'dc.date')
+        if not published:
+            times = doc.xpath('//time/@datetime')
+            published = times[0] if times else ''
+
+        canonical = doc.xpath('//link[@rel="canonical"]/@href')
+        canonical = canonical[0] if canonical else self._meta(doc, 'og:url') or url
+
+        title = self._meta(doc, 'og:title', 'twitter:title')
+        if not title:
+            nodes = doc.xpath('//h1') or doc.xpath('//title')
+            title = _clean(nodes[0].text_content()) if nodes else ''
+
+        return {
+            'title': _clean(title),
+            'byline': _clean(byline)[:200],
+            'published': str(published).strip(),
+            'canonical_url': canonical.strip()
+        }
+
+    # -- body -----------------------------------------------------------
+
+    @staticmethod
+    def _node_text(node, max_chars: int) -> str:
+        parts = []
+        total = 0
+        for element in node.iter('p', 'blockquote', 'h2', 'li'):
+            if element.tag == 'li' and element.getparent() is not None and \
+                    _NEGATIVE.search(element.getparent().get('class') or ''):
+                continue
+            text = _clean(element.text_content())
+            # Short list items and headings are usually navigation
+            if element.tag != 'p' and len(text) < 40:
+                continue
+            if text:
+                parts.append(text)
+                total += len(text) + 1
+                if total >= max_chars:
+                    break
+        if not parts:
+            parts = [_clean(node.text_content())]
+        return ' '.join(parts)[:max_chars]
+
+    @staticmethod
+    def _class_weight(node) -> float:
+        hints = f"{node.get('class') or ''} {node.get('id') or ''}"
+        weight = 0.0
+        if _NEGATIVE.search(hints):
+            weight -= 25
+        if _POSITIVE.search(hints):
+            weight += 25
+        if node.get('itemprop') == 'articleBody':
+            weight += 50
+        return weight
+
+    def _score_candidates(self, doc):
+        """Readability-style scoring: paragraphs vote for their ancestors"""
+        scores = {}
+        for paragraph in doc.iter('p', 'pre', 'td'):
+            text = _clean(paragraph.text_content())
+            if len(text) < 25:
+                continue
+            score = 1 + text.count(',') + min(len(text) / 100, 3)
+            parent = paragraph.getparent()
+            grandparent = parent.getparent() if parent is not None else None
+            for node, share in ((parent, 1.0), (grandparent, 0.5)):
+                if node is None or not isinstance(node.tag, str) or node.tag not in _BLOCK_TAGS:
+                    continue
+                if node not in scores:
+                    scores[node] = self._class_weight(node)
+                scores[node] += score * share
+
+        best, best_score = None, 0.0
+        for node, score in scores.items():
+            text_length = len(node.text_content()) or 1
+            link_length = sum(len(a.text_content()) for a in node.iter('a'))
+            score *= 1 - min(link_length / text_length, 1)
+            if score > best_score:
+                best, best_score = node, score
+        return best
+
+    @staticmethod
+    def _selector_for(node) -> Optional[str]:
+        """A stable XPath for a container, or None if it has no good hook"""
+        if node.get('itemprop') == 'articleBody':
+            return '//*[@itemprop="articleBody"]'
+        # Values with a double quote can't go inside an XPath string literal
+        node_id = node.get('id')
+        if node_id and '"' not in node_id and not _AUTO_GENERATED.search(node_id):
+            return f'//{node.tag}[@id="{node_id}"]'
+        for token in (node.get('class') or '').split():
+            if '"' not in token and _POSITIVE.search(token) and not _AUTO_GENERATED.search(token):
+                return f'//{node.tag}[contains(concat(" ", normalize-space(@class), " "), " {token} ")]'
+        if node.tag in ('article', 'main'):
+            return f'//{node.tag}'
+        return None
+
+    def _body(self, doc, url: str, max_chars: int) -> Dict:
+        domain = _domain(url)
+
+        # Fast path: a selector we already trust for this domain
+        selector = self.registry.get(domain)
+        if selector:
+            try:
+                nodes = doc.xpath(selector)
+            except etree.XPathError:
+                nodes = []
+            text = ' '.join(self._node_text(n, max_chars) for n in nodes)[:max_chars] if nodes else ''
+            if len(text) >= MIN_BODY_CHARS:
+                self.registry.record_hit(domain)
+                return {'body': text, 'method': 'selector', 'selector': selector}
+            self.registry.record_miss(domain)
+
+        best = self._score_candidates(doc)
+        if best is not None:
+            text = self._node_text(best, max_chars)
+            if len(text) >= MIN_BODY_CHARS:
+                learned = self._selector_for(best)
+                if learned:
+                    self.registry.record_candidate(domain, learned)
+                return {'body': text, 'method': 'density', 'selector': learned}
+
+        for selector in GENERIC_SELECTORS:
+            nodes = doc.xpath(selector)
+            if nodes:
+                text = self._node_text(nodes[0], max_chars)
+                if text:
+                    return {'body': text, 'method': 'generic', 'selector': selector}
+
+        paragraphs = [_clean(p.text_content()) for p in doc.iter('p')]
+        text = ' '.join(p for p in paragraphs if p)[:max_chars] if len(paragraphs) > 3 else ''
+        return {'body': text, 'method': 'paragraphs', 'selector': None}
+
+    # -- entry points ---------------------------------------------------
+
+    def extract_html(self, html, url: str = '', max_chars: int = 5000) -> Dict:
+        """
+        Extract body and metadata from an HTML string (or iterable of chunks)
+
+        When the domain has a selector, feeding stops as soon as the node it
+        matches is closed with enough text, so the rest of the download is
+        skipped. Pages from domains without one are read up to the byte cap,
+        since the density scorer needs the whole document.
+        """
+        chunks = [html] if isinstance(html, (str, bytes)) else html
+        if not LXML_AVAILABLE:
+            return self._empty(url, extract_text(iter(chunks), max_chars=max_chars), 'htmlparser')
+
+        # Feed chunks into the C parser as they arrive
+        selector = self.registry.get(_domain(url)) if url else None
+        if selector:
+            parser = etree.HTMLPullParser(events=('end',), remove_comments=True, remove_pis=True)
+            parser.set_element_class_lookup(lxml_html.HtmlElementClassLookup())
+        else:
+            parser = lxml_html.HTMLParser(remove_comments=True, remove_pis=True)
+        closed = set()
+        fed = False
+        for chunk in chunks:
+            if not chunk:
+                continue
+            parser.feed(chunk)
+            fed = True
+            if selector and self._content_closed(parser, selector, closed):
+                break
+        if not fed:
+            return self._empty(url, '', 'empty')
+        try:
+            doc = parser.close()
+        except etree.XMLSyntaxError:
+            return self._empty(url, '', 'unparseable')
+
+        return self._extract_doc(doc, url, max_chars)
+
+    @staticmethod
+    def _content_closed(parser, selector: str, closed: set) -> bool:
+        """Whether the node the selector matches has been parsed in full"""
+        ended = [element for _, element in parser.read_events()]
+        if not ended:
+            return False
+        closed.update(ended)
+        try:
+            nodes = ended[-1].getroottree().xpath(selector)
+        except etree.XPathError:
+            return False
+        return any(node in closed and len(node.text_content()) >= MIN_BODY_CHARS for node in nodes)
+
+    def extract_bytes(self, data: bytes, encoding: Optional[str] = None, url: str = '',
+                      max_chars: int = 5000) -> Dict:
+        """
+        Extract from raw page bytes, decoding once inside the parser
+
+        encoding is the HTTP header charset if there was one; otherwise the
+        page's <meta charset> is used, then UTF-8.
+        """
+        encoding = encoding or _sniff_charset(data) or 'utf-8'
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            encoding = 'utf-8'
+        if not LXML_AVAILABLE:
+            return self._empty(url, extract_text(iter([data.decode(encoding, errors='replace')]),
+                                                 max_chars=max_chars), 'htmlparser')
+        if not data.strip():
+            return self._empty(url, '', 'empty')
+
+        parser = lxml_html.HTMLParser(encoding=encoding, remove_comments=True, remove_pis=True)
+        try:
+            doc = lxml_html.document_fromstring(data, parser=parser)
+        except (etree.ParserError, etree.XMLSyntaxError):
+            return self._empty(url, '', 'unparseable')
+        return self._extract_doc(doc, url, max_chars)
+
+    def _extract_doc(self, doc, url: str, max_chars: int) -> Dict:
+        result = self._metadata(doc, url)
+        etree.strip_elements(doc, *_STRIP_TAGS, with_tail=False)
+        result.update(self._body(doc, url, max_chars))
+        return result
+
+    def extract_url(self, url: str, max_chars: int = 5000, max_bytes: int = MAX_HTML_BYTES,
+                    timeout=(3.05, 5), headers: Optional[dict] = None) -> Dict:
+        """Stream a page (byte-capped) and extract it"""
+        headers = headers or {'User-Agent': BROWSER_USER_AGENT}
+        chunks = get_http_client().stream_html(url, max_bytes=max_bytes, timeout=timeout, headers=headers)
+        if not LXML_AVAILABLE:
+            # The streaming parser can stop the download early on its own
+            return self._empty(url, extract_text(chunks, max_chars=max_chars), 'htmlparser')
+        try:
+            return self.extract_html(chunks, url, max_chars)
+        finally:
+            chunks.close()
+
+    @staticmethod
+    def _empty(url: str, body: str, method: str) -> Dict:
+        return {'title': '', 'byline': '', 'published': '', 'canonical_url': url,
+                'body': body, 'method': method, 'selector': None}
+
+
+# Singleton instance
+_engine_instance = None
+_engine_lock = threading.Lock()
+
+
+def get_extraction_engine() -> ExtractionEngine:
+    """Get or create the shared extraction engine"""
+    global _engine_instance
+    with _engine_lock:
+        if _engine_instance is None:
+            _engine_instance = ExtractionEngine()
+    return _engine_instance
+
+
+def _benchmark_page(index: int) -> str:
+    nav = ''.join(f'<li><a href="/s{i}">Section {i}</a></li>' for i in range(60))
+    body = ''.join(f'<p>Paragraph {i} of story {index}, with officials saying the incident, which '
+                   f'involved several aircraft, lasted twelve minutes.</p>' for i in range(40))
+    script = '<script>' + 'var x = 1;' * 20000 + '</script>'
+    return (f'<html><head><title>Story {index}</title>{script}'
+            f'<meta property="article:published_time" content="2025-09-19T10:00:00Z"></head>'
+            f'<body><nav><ul>{nav}</ul></nav><div class="story-body">{body}</div>'
+            f'<aside class="related">{nav}</aside></body></html>')
+
+
+if __name__ == "__main__":
+    from bs4 import BeautifulSoup
+
+    pages = [_benchmark_page(i) for i in range(50)]
+    engine = ExtractionEngine(SelectorRegistry("/tmp/extraction_selectors_bench.json"))
+
+    start = time.time()
+    for page in pages:
+        soup = BeautifulSoup(page, 'html.parser')
+        for tag in soup(['script', 'style']):
+            tag.decompose()
+        ' '.join(p.get_text() for p in soup.find_all('p'))[:5000]
+    bs4_time = time.time() - start
+
+    start = time.time()
+    methods = Counter()
+    for page in pages:
+        methods[engine.extract_html(page, 'https://example.com/story')['method']] += 1
+    engine_time = time.time() - start
+
+    print(f"BeautifulSoup html.parser: {len(pages) / bs4_time:6.1f} pages/s")
+    print(f"ExtractionEngine (lxml={LXML_AVAILABLE}): {len(pages) / engine_time:6.1f} pages/s  {dict(methods)}")
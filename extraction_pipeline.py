@@ -0,0 +1,219 @@
+"""
+Two-stage article extraction: an event loop downloads, processes parse
+
+Downloading is I/O-bound and parsing is CPU-bound; doing both in the same
+threads means sockets sit idle while the GIL is held by a parse. Here the
+asyncio ingest engine only downloads raw (byte-capped) pages, politely per
+domain, and a pool of worker processes parses them with the extraction
+engine:
+
+    ingest event loop --bytes--> bounded queue --> process pool --> results
+
+Pages cross the process boundary as the raw bytes off the wire plus the
+header charset, so they are decoded exactly once, by lxml in the worker.
+When the parse queue is full, the feeder stops taking downloads and the
+ingest engine stops starting new ones, so memory stays bounded.
+
+Selector learning stays in the parent: each task carries its domain's
+known selector, and the worker sends back the hits/misses/candidates it
+would have recorded, which are replayed into the shared registry.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from extraction_engine import ExtractionEngine, SelectorRegistry, get_extraction_engine, _domain
+from async_ingest import get_ingest_engine
+from http_client import BROWSER_USER_AGENT, MAX_HTML_BYTES
+
+# Parsed pages allowed to wait for (or sit in) the process pool, per worker
+QUEUE_PER_WORKER = 4
+
+
+class _TaskRegistry:
+    """Selector registry stand-in used inside a worker for one page"""
+
+    def __init__(self, domain: str, selector: Optional[str]):
+        self.selectors = {domain: selector} if selector else {}
+        self.events = []
+
+    def get(self, domain: str) -> Optional[str]:
+        return self.selectors.get(domain)
+
+    def record_hit(self, domain: str):
+        self.events.append(('record_hit', (domain,)))
+
+    def record_miss(self, domain: str) -> bool:
+        self.events.append(('record_miss', (domain,)))
+        return False
+
+    def record_candidate(self, domain: str, selector: str) -> bool:
+        self.events.append(('record_candidate', (domain, selector)))
+        return False
+
+
+def _parse_page(url: str, data: bytes, encoding: Optional[str], selector: Optional[str],
+                max_chars: int) -> Tuple[Dict, List]:
+    """Worker entry point: parse one page, return (result, registry events)"""
+    registry = _TaskRegistry(_domain(url), selector)
+    result = ExtractionEngine(registry).extract_bytes(data, encoding, url, max_chars)
+    return result, registry.events
+
+
+class ExtractionPipeline:
+    def __init__(self, parse_workers: int = None, queue_size: int = None,
+                 registry: SelectorRegistry = None, max_bytes: int = MAX_HTML_BYTES):
+        self.parse_workers = parse_workers if parse_workers is not None else max(1, (os.cpu_count() or 2) - 1)
+        self.queue_size = queue_size or max(1, self.parse_workers) * QUEUE_PER_WORKER
+        self.registry = registry or get_extraction_engine().registry
+        self.max_bytes = max_bytes
+        self.headers = {'User-Agent': BROWSER_USER_AGENT}
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """The worker pool, or None to parse in-thread (no workers / no multiprocessing)"""
+        with self._pool_lock:
+            if self._pool is None and self.parse_workers > 0:
+                try:
+                    # Forking a process that is running HTTP and scheduler
+                    # threads can copy their held locks; spawn starts clean
+                    self._pool = ProcessPoolExecutor(max_workers=self.parse_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                except (OSError, NotImplementedError, ImportError) as e:
+                    print(f"[Pipeline] Process pool unavailable, parsing in-thread: {e}")
+                    self.parse_workers = 0
+            return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+    def _replay(self, events: List):
+        for name, args in events:
+            getattr(self.registry, name)(*args)
+
+    def run(self, urls: Iterable[str], download_workers: int = 50, timeout: float = 3,
+            max_chars: int = 5000) -> Iterator[Tuple[str, Optional[Dict], Optional[BaseException]]]:
+        """
+        Download and extract every URL
+
+        Yields (url, engine result, error) as pages finish. At most
+        download_workers pages are downloading or waiting for a parser;
+        per-domain limits come from the shared fetch scheduler.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return
+        pool = self._get_pool()
+        results = queue.Queue()
+        slots = threading.BoundedSemaphore(self.queue_size)
+        stop = threading.Event()
+
+        def on_parsed(url, future):
+            slots.release()
+            error = future.exception()
+            results.put((url, None if error else future.result(), error))
+
+        def feed():
+            handed_off = set()
+            failure = None
+            try:
+                downloads = get_ingest_engine().iter_html(urls, max_bytes=self.max_bytes,
+                                                          timeout=(min(timeout, 3.05), timeout),
+                                                          headers=self.headers, limit=download_workers)
+                try:
+                    for url, payload, error in downloads:
+                        handed_off.add(url)
+                        if error:
+                            results.put((url, None, error))
+                            continue
+                        data, encoding = payload
+                        selector = self.registry.get(_domain(url))
+                        if pool is None:
+                            try:
+                                results.put((url, _parse_page(url, data, encoding, selector, max_chars), None))
+                            except Exception as e:
+                                results.put((url, None, e))
+                            continue
+
+                        # Bounded hand-off: wait for a free parse slot
+                        while not slots.acquire(timeout=0.5):
+                            if stop.is_set():
+                                return
+                        try:
+                            future = pool.submit(_parse_page, url, data, encoding, selector, max_chars)
+                        except Exception as e:
+                            slots.release()
+                            results.put((url, None, e))
+                            continue
+                        future.add_done_callback(lambda f, u=url: on_parsed(u, f))
+                        if stop.is_set():
+                            return
+                finally:
+                    downloads.close()
+            except Exception as e:
+                failure = e
+            # run() waits for one result per URL, so none may go missing
+            for url in urls:
+                if url not in handed_off:
+                    results.put((url, None, failure or RuntimeError(f"No download result for {url}")))
+
+        feeder = threading.Thread(target=feed, daemon=True, name="extraction-feeder")
+        feeder.start()
+        try:
+            for _ in range(len(urls)):
+                url, parsed, error = results.get()
+                if error:
+                    yield url, None, error
+                    continue
+                result, events = parsed
+                self._replay(events)
+                yield url, result, None
+        finally:
+            stop.set()
+
+
+# Singleton instance
+_pipeline_instance = None
+_pipeline_lock = threading.Lock()
+
+
+def get_extraction_pipeline() -> ExtractionPipeline:
+    """Get or create the shared extraction pipeline"""
+    global _pipeline_instance
+    with _pipeline_lock:
+        if _pipeline_instance is None:
+            _pipeline_instance = ExtractionPipeline()
+    return _pipeline_instance
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+    from extraction_engine import _benchmark_page
+
+    # CPU side only: 10 threads parsing (the old layout) vs the process pool
+    pages = [(f"https://example{i % 8}.com/story/{i}", _benchmark_page(i).encode()) for i in range(200)]
+    engine = ExtractionEngine(SelectorRegistry("/tmp/extraction_selectors_bench.json"))
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=10) as threads:
+        list(threads.map(lambda page: engine.extract_bytes(page[1], None, page[0]), pages))
+    thread_time = time.time() - start
+
+    pipeline = ExtractionPipeline(registry=engine.registry)
+    pool = pipeline._get_pool()
+    if pool:
+        list(pool.map(_parse_page, *zip(*[(u, d, None, None, 5000) for u, d in pages[:pipeline.parse_workers]])))
+        start = time.time()
+        list(pool.map(_parse_page, *zip(*[(u, d, None, None, 5000) for u, d in pages]), chunksize=4))
+        pool_time = time.time() - start
+        print(f"10 threads:             {len(pages) / thread_time:7.1f} pages/s")
+        print(f"{pipeline.parse_workers} worker processes: {len(pages) / pool_time:7.1f} pages/s")
+    pipeline.shutdown()
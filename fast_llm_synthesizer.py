@@ -1,45 +1,48 @@
 """
 Fast, accurate LLM synthesis with REAL article content
 """
+import math
 import os
-from typing import List, Dict
+import re
+from typing import List, Dict, Optional
 from article_extractor import ArticleExtractor
+from token_optimizer import TokenOptimizer
+from token_counter import count_tokens, truncate_to_tokens
+from incident_clusterer import group_into_events
+from date_normalizer import published_ts, sort_newest_first, format_ts
+from llm_gateway import LLMGateway, get_llm_gateway
 import concurrent.futures
 
-# Dynamic LLM provider loading
-llm_provider = os.getenv('LLM_PROVIDER', 'gemini').lower()
-
-if llm_provider == 'ollama':
-    from ollama_synthesizer import OllamaSynthesizer
-else:
-    try:
-        import google.generativeai as genai
-    except ImportError:
-        genai = None
+# Hard token ceiling for the article section of synthesis prompts
+CONTEXT_TOKEN_BUDGET = int(os.getenv('LLM_CONTEXT_TOKENS', '3000'))
+
+# Incidents briefed directly; beyond this the synthesis runs map-reduce
+DIRECT_EVENTS = 20
+MAP_REDUCE_MAX_EVENTS = int(os.getenv('LLM_MAP_REDUCE_EVENTS', '150'))
+MAP_CHUNK_ARTICLES = 10
+MAP_CHUNK_TOKENS = 2000
+MAP_NOTE_TOKENS = 250
+MAP_TIMEOUT = 60
+# Rounds of the map provider's concurrency one country may use
+MAP_ROUNDS = 2
+# Providers for the chunk summaries, e.g. "ollama,gemini" (default: the normal chain)
+MAP_PROVIDERS = [n.strip() for n in os.getenv('LLM_MAP_PROVIDERS', '').split(',') if n.strip()] or None
+
+# Countries with at most this many incidents can share one batched prompt
+BATCH_MAX_EVENTS = 8
+BATCH_MAX_COUNTRIES = 4
+BATCH_MIN_SECTION_CHARS = 150
+_SECTION_HEADER = re.compile(r'^[\s#*]*COUNTRY:\s*(.+?)[\s#*]*$', re.M | re.I)
+
+_map_pool = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix='llm-map')
 
 class FastLLMSynthesizer:
-    def __init__(self):
-        self.provider = llm_provider
-        self.enabled = False
-
-        if self.provider == 'ollama':
-            # Use Ollama (free, local)
-            try:
-                self.model = OllamaSynthesizer()
-                self.enabled = True
-                print("Using Ollama for LLM synthesis (local, free)")
-            except Exception as e:
-                print(f"Ollama initialization failed: {e}")
-                print(OllamaSynthesizer.install_instructions())
-
-        elif genai:
-            # Use Google Gemini
-            self.gemini_key = os.getenv('GEMINI_API_KEY')
-            if self.gemini_key:
-                genai.configure(api_key=self.gemini_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-                self.enabled = True
-                print("Using Google Gemini for LLM synthesis")
+    def __init__(self, gateway: LLMGateway = None):
+        # Calls go through the shared gateway (limits, retries, fallback); this is cheap
+        self.llm = gateway or get_llm_gateway()
+        primary = self.llm.primary()
+        self.provider = primary.name if primary else os.getenv('LLM_PROVIDER', 'gemini').lower()
+        self.enabled = primary is not None
 
         if not self.enabled:
             print("No LLM provider configured. Set LLM_PROVIDER=ollama for free local LLM.")
@@ -52,31 +55,239 @@ class FastLLMSynthesizer:
         if not self.enabled or not articles:
             return {
                 'narrative': f"No LLM available. {len(articles)} articles found for {country}.",
-                'articles_with_content': articles
+                'articles_with_content': articles,
+                'fallback': True
             }
 
-        # Step 1: Extract actual article content in parallel (FAST)
-        print(f"Extracting article content for {country}...")
+        # Step 1: Group into incidents and extract content for each lead article
+        events = group_into_events(articles)
+        map_reduce = len(events) > DIRECT_EVENTS
+        leads = self._leads(events, MAP_REDUCE_MAX_EVENTS if map_reduce else DIRECT_EVENTS)
+
+        print(f"Extracting article content for {country} ({len(leads)} incidents from {len(articles)} articles)...")
         extractor = ArticleExtractor()
-        articles_with_content = extractor.extract_articles_parallel(articles[:20], max_workers=10)
+        articles_with_content = extractor.extract_articles_parallel(leads)
 
-        # Step 2: Prepare content for LLM
-        article_data = self._prepare_for_llm(articles_with_content)
+        # Step 2: Generate narrative with custom focus if provided
+        fallback = False
+        try:
+            narrative = self._write_narrative(country, articles_with_content, custom_prompt, map_reduce)
+        except Exception as e:
+            print(f"LLM generation failed: {e}")
+            narrative = self._fallback_narrative(country, articles_with_content)
+            fallback = True
+
+        return {
+            'narrative': narrative,
+            'articles_with_content': articles_with_content,  # Pass full content for chat
+            'fallback': fallback
+        }
+
+    def synthesize_country_reports(self, country_articles: Dict[str, List[Dict]],
+                                   custom_prompt: str = None) -> Dict[str, Dict]:
+        """
+        Reports for several countries, batching the small ones
+
+        Countries with at most BATCH_MAX_EVENTS incidents share one prompt
+        (up to BATCH_MAX_COUNTRIES per request) so the instructions are sent
+        once; larger ones get their own call as in synthesize_country_report.
+        """
+        results = {}
+        small = {}
+        for country, articles in country_articles.items():
+            events = group_into_events(articles)
+            if not self.enabled or not articles or len(events) > BATCH_MAX_EVENTS:
+                results[country] = self.synthesize_country_report(country, articles, custom_prompt)
+            else:
+                small[country] = self._leads(events, BATCH_MAX_EVENTS)
+
+        if len(small) == 1:
+            country = next(iter(small))
+            results[country] = self.synthesize_country_report(country, country_articles[country], custom_prompt)
+        elif small:
+            # One extraction pass for every batched country
+            leads = [dict(lead, _batch_country=country) for country, ls in small.items() for lead in ls]
+            print(f"Extracting article content for {len(small)} batched countries ({len(leads)} incidents)...")
+            extracted = {country: [] for country in small}
+            for article in ArticleExtractor().extract_articles_parallel(leads):
+                extracted[article.pop('_batch_country')].append(article)
+
+            names = list(small)
+            for i in range(0, len(names), BATCH_MAX_COUNTRIES):
+                batch = {country: extracted[country] for country in names[i:i + BATCH_MAX_COUNTRIES]}
+                results.update(self._synthesize_batch(batch, custom_prompt))
+
+        return {country: results[country] for country in country_articles}
+
+    def _synthesize_batch(self, batch: Dict[str, List[Dict]], custom_prompt: str = None) -> Dict[str, Dict]:
+        """One request for a batch of countries; individual calls for any section it gets wrong"""
+        narratives = {}
+        if len(batch) > 1:
+            try:
+                narratives = self._parse_batch(self.llm.generate(self._batch_prompt(batch, custom_prompt)), batch)
+            except Exception as e:
+                print(f"Batched LLM generation failed: {e}")
+
+        results = {}
+        for country, articles_with_content in batch.items():
+            fallback = False
+            narrative = narratives.get(country)
+            if narrative is None:
+                if len(batch) > 1:
+                    print(f"No usable batch section for {country}; synthesizing it alone")
+                try:
+                    narrative = self._write_narrative(country, articles_with_content, custom_prompt)
+                except Exception as e:
+                    print(f"LLM generation failed: {e}")
+                    narrative = self._fallback_narrative(country, articles_with_content)
+                    fallback = True
+            results[country] = {
+                'narrative': narrative,
+                'articles_with_content': articles_with_content,
+                'fallback': fallback
+            }
+        return results
+
+    def _batch_prompt(self, batch: Dict[str, List[Dict]], custom_prompt: str = None) -> str:
+        from datetime import datetime
+        current_date = datetime.now().strftime('%B %d, %Y')
+        # The countries share the usual article budget
+        budget = max(CONTEXT_TOKEN_BUDGET // len(batch), 400)
+        sections = "\n\n".join(
+            f"=== ARTICLES FOR {country} ===\n{self._prepare_for_llm(articles, budget)}"
+            for country, articles in batch.items()
+        )
+        focus = f"\nUSER FOCUS AREAS: {custom_prompt}\nFocus each assessment on these areas.\n" if custom_prompt else ""
+        headers = "\n".join(f"## COUNTRY: {country}" for country in batch)
+
+        return f"""
+You are a security intelligence analyst. Today's date is {current_date}.
+Below are RECENT articles about {len(batch)} countries. Write a separate 3-paragraph briefing for EACH country,
+using only that country's articles.
+Remember: These are current events happening in 2025, NOT historical events from 2024.
+{focus}
+{sections}
+
+For each country write a professional intelligence assessment:
+
+PARAGRAPH 1: The most significant security development. Include specific dates, numbers, and actors from the articles.
+
+PARAGRAPH 2: Patterns and connections. What are the underlying causes? How do events relate?
+
+PARAGRAPH 3: Implications for stability and what to watch next.
+
+Be specific. Use facts from the articles. Include dates and numbers.
+
+FORMAT: Start each country's briefing with its header line exactly as below, in this order, and write nothing else:
+{headers}"""
+
+    @staticmethod
+    def _parse_batch(response: str, batch: Dict[str, List[Dict]]) -> Dict[str, str]:
+        """Per-country narratives from a batched response; countries with a missing, repeated or short section are left out"""
+        wanted = {country.strip().lower(): country for country in batch}
+        headers = list(_SECTION_HEADER.finditer(response or ''))
+        sections = {}
+        repeated = set()
+        for i, match in enumerate(headers):
+            country = wanted.get(match.group(1).lower())
+            if country is None:
+                continue
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(response)
+            text = response[match.end():end].strip()
+            if country in sections:
+                repeated.add(country)
+            sections[country] = text
+        return {country: text for country, text in sections.items()
+                if country not in repeated and len(text) >= BATCH_MIN_SECTION_CHARS}
+
+    def update_country_report(self, country: str, prior_narrative: str, new_articles: List[Dict],
+                              custom_prompt: str = None) -> Dict:
+        """
+        Update an earlier narrative with articles published since it was written
+
+        Only the new articles (their incidents' lead articles) are extracted and
+        sent, with the prior brief, so the cost follows the amount of new news.
+        """
+        if not self.enabled or not new_articles:
+            return {'narrative': prior_narrative, 'articles_with_content': []}
+
+        leads = self._leads(group_into_events(new_articles), DIRECT_EVENTS)
+
+        print(f"Updating {country} narrative with {len(leads)} new incidents from {len(new_articles)} articles...")
+        articles_with_content = ArticleExtractor().extract_articles_parallel(leads)
 
-        # Step 3: Generate narrative with custom focus if provided
+        fallback = False
         try:
-            from datetime import datetime
-            current_date = datetime.now().strftime('%B %d, %Y')
+            narrative = self._write_update(country, prior_narrative, articles_with_content, custom_prompt)
+        except Exception as e:
+            print(f"LLM update failed: {e}")
+            narrative = prior_narrative
+            fallback = True
+
+        return {
+            'narrative': narrative,
+            'articles_with_content': articles_with_content,
+            'fallback': fallback
+        }
+
+    def _write_update(self, country: str, prior_narrative: str, articles_with_content: List[Dict],
+                      custom_prompt: str = None) -> str:
+        from datetime import datetime
+        current_date = datetime.now().strftime('%B %d, %Y')
+        article_data = self._prepare_for_llm(articles_with_content)
+        focus = f"\nUSER FOCUS AREAS: {custom_prompt}\n" if custom_prompt else ""
 
-            base_prompt = f"""
+        prompt = f"""
 You are a security intelligence analyst. Today's date is {current_date}.
-Analyze these RECENT articles about {country} and write a 3-paragraph briefing.
+Below is your previous 3-paragraph briefing on {country}, followed by NEW articles published since it was written.
+{focus}
+PREVIOUS BRIEFING:
+{prior_narrative}
+
+NEW ARTICLES:
+{article_data}
+
+Write the updated 3-paragraph briefing:
+- Lead with the most significant new development if it matters more than what the briefing led with
+- Keep earlier points that still hold; revise or drop any the new articles overtake
+- Include specific dates, numbers, and actors
+
+Same structure as before: PARAGRAPH 1 key developments, PARAGRAPH 2 patterns and causes, PARAGRAPH 3 implications and what to watch next."""
+
+        return self.llm.generate(prompt)
+
+    @staticmethod
+    def _leads(events: List[Dict], limit: int) -> List[Dict]:
+        """Lead article of each of the first `limit` events, tagged with its coverage"""
+        leads = []
+        for event in events[:limit]:
+            lead = dict(event['lead_article'])
+            lead['event_article_count'] = event['article_count']
+            leads.append(lead)
+        return leads
+
+    def _write_narrative(self, country: str, articles_with_content: List[Dict],
+                         custom_prompt: str = None, map_reduce: bool = False) -> str:
+        """The three-paragraph brief, from the articles or (map-reduce) from chunk notes"""
+        from datetime import datetime
+        current_date = datetime.now().strftime('%B %d, %Y')
+
+        if map_reduce:
+            material = "notes, each summarizing a batch of RECENT articles,"
+            article_data = self._map_notes(country, articles_with_content)
+        else:
+            material = "RECENT articles"
+            article_data = self._prepare_for_llm(articles_with_content)
+
+        base_prompt = f"""
+You are a security intelligence analyst. Today's date is {current_date}.
+Analyze these {material} about {country} and write a 3-paragraph briefing.
 Remember: These are current events happening in 2025, NOT historical events from 2024.
 
 {article_data}"""
 
-            if custom_prompt:
-                prompt = base_prompt + f"""
+        if custom_prompt:
+            prompt = base_prompt + f"""
 
 USER FOCUS AREAS: {custom_prompt}
 
@@ -89,8 +300,8 @@ PARAGRAPH 2: Analyze patterns and connections within the focus areas. What are t
 PARAGRAPH 3: Assess implications specific to the focus areas and what to watch next.
 
 Be specific. Use facts from the articles. Include dates and numbers."""
-            else:
-                prompt = base_prompt + """
+        else:
+            prompt = base_prompt + """
 
 Write a professional intelligence assessment:
 
@@ -102,39 +313,108 @@ PARAGRAPH 3: Assess implications for stability and what to watch next.
 
 Be specific. Use facts from the articles. Include dates and numbers."""
 
-            response = self.model.generate_content(prompt)
-            narrative = response.text
+        return self.llm.generate(prompt)
 
-        except Exception as e:
-            print(f"LLM generation failed: {e}")
-            narrative = self._fallback_narrative(country, articles_with_content)
-
-        return {
-            'narrative': narrative,
-            'articles_with_content': articles_with_content  # Pass full content for chat
-        }
+    def _map_notes(self, country: str, articles: List[Dict], timeout: float = MAP_TIMEOUT) -> str:
+        """
+        Map step: summarize chunks of articles in parallel into short notes
+
+        All chunks run at once, so latency grows with chunk count / parallelism
+        rather than with article count. The chunk count is sized from the map
+        provider's limits (see _map_chunk_size) so one country neither queues
+        past the deadline nor spends the process's request quota. A chunk that
+        fails or misses the deadline is represented by its headlines instead.
+        The notes are fitted to CONTEXT_TOKEN_BUDGET for the reduce prompt.
+        """
+        providers = MAP_PROVIDERS if MAP_PROVIDERS and self.llm.chain(MAP_PROVIDERS) else None
+        size = self._map_chunk_size(len(articles), providers)
+        chunks = [articles[i:i + size] for i in range(0, len(articles), size)]
+        futures = [_map_pool.submit(self._summarize_chunk, country, chunk, providers, timeout)
+                   for chunk in chunks]
+        done, _ = concurrent.futures.wait(futures, timeout=timeout)
+
+        per_chunk = max(CONTEXT_TOKEN_BUDGET // max(len(chunks), 1), 50)
+        notes = []
+        failed = 0
+        for i, (chunk, future) in enumerate(zip(chunks, futures)):
+            note = future.result() if future in done and future.exception() is None else None
+            if not note:
+                failed += 1
+                note = self._headlines(chunk)
+            first = i * size + 1
+            notes.append(f"Batch {i + 1} (articles {first}-{first + len(chunk) - 1}):\n"
+                         f"{truncate_to_tokens(note.strip(), per_chunk)}")
+
+        print(f"Map-reduce: {len(articles)} articles in {len(chunks)} chunks for {country}"
+              + (f" ({failed} summarized by headlines only)" if failed else ""))
+        return "\n\n".join(notes)
+
+    def _map_chunk_size(self, article_count: int, providers: Optional[List[str]]) -> int:
+        """
+        Articles per map chunk
 
-    def _prepare_for_llm(self, articles: List[Dict]) -> str:
-        """Prepare actual article content for LLM"""
-        prepared = []
+        MAP_CHUNK_ARTICLES when the provider allows it; otherwise fewer, larger
+        chunks: at most MAP_ROUNDS rounds of its concurrency, and with an RPM
+        limit no more calls than its bucket's burst (a quarter of a minute's
+        quota), so gemini at 15 RPM gets 3 chunks rather than 15.
+        """
+        chunks = math.ceil(article_count / MAP_CHUNK_ARTICLES)
+        chain = self.llm.chain(providers)
+        if chain:
+            limits = self.llm.limits(chain[0].name)
+            chunks = min(chunks, limits.concurrency * MAP_ROUNDS)
+            if limits.burst:
+                chunks = min(chunks, int(limits.burst))
+        return max(math.ceil(article_count / max(chunks, 1)), MAP_CHUNK_ARTICLES)
+
+    def _summarize_chunk(self, country: str, chunk: List[Dict], providers: Optional[List[str]],
+                         timeout: float) -> str:
+        article_data = self._prepare_for_llm(chunk, MAP_CHUNK_TOKENS)
+        prompt = f"""Summarize the security-relevant facts in these articles about {country} as 3-6 short bullet points.
+Keep specific dates, numbers, places and actors. Skip anything not about {country}. Plain text, dash bullets.
 
-        for i, article in enumerate(articles[:10], 1):  # Top 10 articles
-            # Use real content
-            content = article.get('full_content', article.get('summary', article['title']))
+{article_data}"""
+        return self.llm.generate(prompt, temperature=0.2, max_tokens=MAP_NOTE_TOKENS,
+                                 providers=providers, timeout=timeout)
+
+    @staticmethod
+    def _headlines(chunk: List[Dict]) -> str:
+        return "\n".join(
+            f"- {format_ts(published_ts(a), '%Y-%m-%d', default='Unknown date')}: {a['title'][:120]}"
+            for a in chunk
+        )
+
+    def _prepare_for_llm(self, articles: List[Dict], token_budget: int = None) -> str:
+        """Pack the most relevant real article content into the token budget"""
+        token_budget = token_budget or CONTEXT_TOKEN_BUDGET
+
+        def render(article, content):
+            date = format_ts(published_ts(article), '%Y-%m-%d', default='Unknown date')
+            block = f"Article ({date}):\nTitle: {article['title'][:100]}"
+            if article.get('event_article_count', 1) > 1:
+                block += f"\nCoverage: {article['event_article_count']} reports on this incident"
+            if content:
+                block += f"\nContent: {content}"
+            return block
+
+        packed = TokenOptimizer().pack_for_llm(
+            articles, token_budget, render,
+            snippet_tokens=(0, 60, 150, 400)
+        )
 
-            # Extract key info
-            if len(content) > 500:
-                content = content[:500] + "..."
+        prepared = []
+        for i, (article, block) in enumerate(packed, 1):
+            prepared.append("\n" + block.replace("Article (", f"Article {i} (", 1) + "\n")
 
-            date = article.get('published', 'Unknown date')[:10] if article.get('published') else 'Unknown date'
+        article_data = "\n".join(prepared)
 
-            prepared.append(f"""
-Article {i} ({date}):
-Title: {article['title'][:100]}
-Content: {content}
-""")
+        # Packing is per-block; guard the joined text against rounding drift
+        if count_tokens(article_data) > token_budget:
+            article_data = truncate_to_tokens(article_data, token_budget)
 
-        return "\n".join(prepared)
+        print(f"Packed {len(packed)}/{len(articles)} articles into "
+              f"{count_tokens(article_data)}/{token_budget} tokens")
+        return article_data
 
     def _fallback_narrative(self, country: str, articles: List[Dict]) -> str:
         """Basic narrative without LLM"""
@@ -177,29 +457,23 @@ def generate_chat_context(country: str, articles_with_content: List[Dict]) -> st
     context_parts = [f"Today's date: {current_date}\nCurrent intelligence on {country}:\n"]
 
     # Sort articles by date (most recent first)
-    sorted_articles = sorted(articles_with_content[:15],
-                           key=lambda x: x.get('published', ''),
-                           reverse=True)
+    sorted_articles = sort_newest_first(articles_with_content[:15])
+    now = datetime.now().timestamp()
 
     for i, article in enumerate(sorted_articles, 1):
-        date = article.get('published', 'Unknown date')
+        ts = article['published_ts']
+        date = format_ts(ts, '%Y-%m-%d %H:%M UTC', default='Unknown date')
 
         # Calculate days ago for temporal awareness
         days_ago = "Unknown"
-        if date != 'Unknown date':
-            try:
-                from datetime import datetime
-                article_date = datetime.fromisoformat(date.replace('Z', '+00:00'))
-                current = datetime.now(article_date.tzinfo)
-                delta = (current - article_date).days
-                if delta == 0:
-                    days_ago = "today"
-                elif delta == 1:
-                    days_ago = "yesterday"
-                else:
-                    days_ago = f"{delta} days ago"
-            except:
-                pass
+        if ts is not None:
+            delta = int((now - ts) // 86400)
+            if delta <= 0:
+                days_ago = "today"
+            elif delta == 1:
+                days_ago = "yesterday"
+            else:
+                days_ago = f"{delta} days ago"
 
         # Use actual content
         if article.get('has_content') and article.get('full_content'):
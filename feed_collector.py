@@ -1,28 +1,46 @@
-import feedparser
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 from typing import List, Dict, Any
 import logging
 import hashlib
 import json
 from pathlib import Path
+import time
+from near_duplicates import collapse_near_duplicates
+from source_health import SourceHealthTracker, get_source_health
+from http_client import get_http_client
+from text_normalizer import strip_html
+from date_normalizer import entry_ts, iso_from_ts
+from async_ingest import get_ingest_engine
 
 logger = logging.getLogger(__name__)
 
 class FeedCollector:
-    def __init__(self, cache_dir: str = "data/cache"):
+    def __init__(self, cache_dir: str = "data/cache", health: SourceHealthTracker = None):
         self.cache_dir = Path(cache_dir)
+        self.health = health or get_source_health("sources.json")
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'SecurityMonitor/1.0 (Geopolitical Security Feed Aggregator)'
-        })
-    
-    def collect_from_source(self, source: Dict[str, Any]) -> List[Dict[str, Any]]:
+        self.http = get_http_client()
+        # Last articles per source, reused while it is not due
+        self._last_articles: Dict[str, List[Dict[str, Any]]] = {}
+
+    def _due(self, source: Dict[str, Any]) -> bool:
+        # The schedule survives restarts but the articles don't, so a source
+        # with nothing collected by this instance is polled regardless
+        return source['url'] not in self._last_articles or self.health.should_poll(source['url'])
+
+    def collect_from_source(self, source: Dict[str, Any], feed=None) -> List[Dict[str, Any]]:
+        """Collect one source; feed is its already-downloaded RSS, if any"""
+        if feed is None and not self._due(source):
+            logger.info(f"Reusing last articles from {source['name']}: backing off or not due")
+            return self._last_articles[source['url']]
+
+        # A failed poll still counts as polled, so backoff applies from now on
+        self._last_articles.setdefault(source['url'], [])
+
+        started = time.time() - (feed.get('elapsed', 0.0) if feed is not None else 0.0)
         try:
             if source['type'] == 'rss':
-                return self._collect_rss(source)
+                articles = self._collect_rss(source, feed)
             elif source['type'] == 'web':
                 return self._collect_web(source)
             else:
@@ -30,26 +48,33 @@ class FeedCollector:
                 return []
         except Exception as e:
             logger.error(f"Error collecting from {source['name']}: {e}")
+            self.health.record_failure(source['url'], time.time() - started, str(e), name=source['name'])
             return []
+
+        self.health.record_success(source['url'], time.time() - started,
+                                   [a['link'] for a in articles], name=source['name'])
+        self._last_articles[source['url']] = articles
+        return articles
     
-    def _collect_rss(self, source: Dict[str, Any]) -> List[Dict[str, Any]]:
-        feed = feedparser.parse(source['url'])
+    def _collect_rss(self, source: Dict[str, Any], feed=None) -> List[Dict[str, Any]]:
+        if feed is None:
+            feed = self.http.fetch_feed(source['url'])
+        if getattr(feed, 'status', 200) >= 400:
+            raise IOError(f"HTTP {feed.status}")
+        if feed.get('bozo') and not feed.entries:
+            raise IOError(f"Unparseable feed: {feed.get('bozo_exception')}")
         articles = []
         
         # Only get articles from last 24 hours
-        cutoff_time = datetime.now() - timedelta(days=1)
+        cutoff_ts = int(time.time()) - 86400
         
         for entry in feed.entries:
-            # Parse publication date
-            pub_date = None
-            if hasattr(entry, 'published_parsed'):
-                pub_date = datetime.fromtimestamp(
-                    feedparser._parse_date(entry.published).timetuple().__hash__()
-                ).replace(microsecond=0)
-            elif hasattr(entry, 'updated_parsed'):
-                pub_date = datetime.fromtimestamp(
-                    feedparser._parse_date(entry.updated).timetuple().__hash__()
-                ).replace(microsecond=0)
+            # UTC epoch seconds from feedparser's parsed struct (or the string)
+            pub_ts = entry_ts(entry, source['name'])
+
+            # Drop stale entries before any cleaning; keep undated ones
+            if pub_ts is not None and pub_ts < cutoff_ts:
+                continue
             
             # Create article ID
             article_id = hashlib.md5(
@@ -64,18 +89,13 @@ class FeedCollector:
                 'title': entry.get('title', 'No title'),
                 'link': entry.get('link', ''),
                 'summary': self._clean_html(entry.get('summary', '')),
-                'published': pub_date.isoformat() if pub_date else datetime.now().isoformat(),
+                'published': iso_from_ts(pub_ts) if pub_ts is not None else datetime.now(timezone.utc).isoformat(),
+                'published_ts': pub_ts,
                 'collected_at': datetime.now().isoformat(),
                 'tags': entry.get('tags', []),
                 'author': entry.get('author', 'Unknown')
             }
-            
-            # Filter by time if we have a valid date
-            if pub_date and pub_date >= cutoff_time:
-                articles.append(article)
-            elif not pub_date:
-                # Include if we can't determine the date
-                articles.append(article)
+            articles.append(article)
         
         logger.info(f"Collected {len(articles)} articles from {source['name']}")
         return articles
@@ -87,16 +107,23 @@ class FeedCollector:
         return []
     
     def _clean_html(self, text: str) -> str:
-        if not text:
-            return ""
-        soup = BeautifulSoup(text, 'html.parser')
-        return soup.get_text(separator=' ', strip=True)
+        return strip_html(text)
     
     def collect_all(self, sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         all_articles = []
+
+        # Download every due RSS feed at once, then parse them in order
+        due = [s['url'] for s in sources if s['type'] == 'rss' and self._due(s)]
+        feeds = get_ingest_engine().fetch_feeds(due)
+
         for source in sources:
-            articles = self.collect_from_source(source)
+            if source['type'] == 'rss' and source['url'] not in feeds:
+                logger.info(f"Reusing last articles from {source['name']}: backing off or not due")
+                all_articles.extend(self._last_articles.get(source['url'], []))
+                continue
+            articles = self.collect_from_source(source, feeds.get(source['url']))
             all_articles.extend(articles)
+        self.health.save()
         
         # Remove duplicates based on article ID
         unique_articles = {}
@@ -104,7 +131,8 @@ class FeedCollector:
             if article['id'] not in unique_articles:
                 unique_articles[article['id']] = article
         
-        return list(unique_articles.values())
+        # Collapse the same story syndicated across several feeds
+        return collapse_near_duplicates(list(unique_articles.values()))
     
     def save_collection(self, articles: List[Dict[str, Any]], 
                        filename: str = None) -> str:
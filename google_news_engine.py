@@ -2,29 +2,34 @@
 Google News Engine - Works like actual Google
 No manual lists, no missing events, just comprehensive search
 """
-import feedparser
-import requests
 from urllib.parse import quote_plus
 from datetime import datetime, timedelta
 import time
-import socket
+from near_duplicates import collapse_near_duplicates
+from http_client import fetch_feed
+from async_ingest import fetch_feeds
+from text_normalizer import strip_html
+from date_normalizer import entry_ts
+from google_news_resolver import get_google_news_resolver
+
+def feed_error(feed):
+    """Why a fetched feed is unusable (HTTP error, throttling, network), or None
+
+    An empty feed that parsed cleanly is just "no news".
+    """
+    status = feed.get('status')
+    if status and status >= 400:
+        return f"HTTP {status}" + (" (throttled)" if status in (429, 503) else "")
+    if feed.get('bozo') and not feed.entries:
+        return str(feed.get('bozo_exception') or 'unparseable feed')
+    return None
 
-# Set timeout for feed fetching
-socket.setdefaulttimeout(5)
 
 class GoogleNewsEngine:
     def __init__(self):
         self.base_url = "https://news.google.com/rss/search"
 
-    def search(self, query, when="7d", max_results=100):
-        """
-        Search Google News exactly like a user would
-
-        Args:
-            query: Exactly what you'd type into Google
-            when: Time range (1h, 1d, 7d, 30d)
-            max_results: Max articles to return
-        """
+    def _search_url(self, query, when):
         # Build the URL exactly like Google News does
         params = {
             'q': query,
@@ -36,26 +41,66 @@ class GoogleNewsEngine:
 
         # Create the query string
         query_string = '&'.join([f"{k}={quote_plus(str(v))}" for k, v in params.items()])
-        url = f"{self.base_url}?{query_string}"
+        return f"{self.base_url}?{query_string}"
+
+    def _articles_from_feed(self, feed, max_results):
+        error = feed_error(feed)
+        if error:
+            raise IOError(error)
+        articles = []
+
+        for entry in feed.entries[:max_results]:
+            articles.append({
+                'title': entry.get('title', ''),
+                'link': entry.get('link', ''),
+                'published': entry.get('published', ''),
+                'published_ts': entry_ts(entry, 'news.google.com'),
+                'source': entry.get('source', {}).get('title', 'Google News'),
+                'summary': strip_html(entry.get('summary', ''))[:200]
+            })
+
+        # Decode publisher URLs where possible offline (no extra requests here;
+        # the extractor resolves the rest before fetching)
+        return get_google_news_resolver().resolve_articles(articles, allow_network=False)
+
+    def search(self, query, when="7d", max_results=100):
+        """
+        Search Google News exactly like a user would
 
+        Args:
+            query: Exactly what you'd type into Google
+            when: Time range (1h, 1d, 7d, 30d)
+            max_results: Max articles to return
+        """
         try:
-            feed = feedparser.parse(url)
-            articles = []
-
-            for entry in feed.entries[:max_results]:
-                articles.append({
-                    'title': entry.get('title', ''),
-                    'link': entry.get('link', ''),
-                    'published': entry.get('published', ''),
-                    'source': entry.get('source', {}).get('title', 'Google News'),
-                    'summary': entry.get('summary', '')[:200]
-                })
-
-            return articles
+            feed = fetch_feed(self._search_url(query, when), timeout=(3.05, 5))
+            return self._articles_from_feed(feed, max_results)
         except Exception as e:
             print(f"Search failed: {e}")
             return []
 
+    def search_many(self, queries, when="7d", max_results=100, errors=None):
+        """
+        Run several searches concurrently
+
+        Returns {query: articles}; a failed search (network error, HTTP
+        error such as 429) maps to an empty list, and to its reason in the
+        `errors` dict if one is given.
+        """
+        urls = {query: self._search_url(query, when) for query in queries}
+        feeds = fetch_feeds(urls.values(), timeout=(3.05, 5))
+
+        results = {}
+        for query, url in urls.items():
+            try:
+                results[query] = self._articles_from_feed(feeds[url], max_results)
+            except Exception as e:
+                print(f"Search failed ({query}): {e}")
+                results[query] = []
+                if errors is not None:
+                    errors[query] = str(e)
+        return results
+
     def get_country_news(self, country, days_back=7):
         """
         Get comprehensive news for any country
@@ -68,18 +113,14 @@ class GoogleNewsEngine:
         }
         when = when_map.get(days_back, "7d")
 
-        all_articles = []
-
         # Basic country search - exactly what a user would do
-        print(f"Searching: {country}")
-        articles = self.search(country, when=when)
-        all_articles.extend(articles)
-
         # If it's a security tool, also search for security terms
         # But in a smart way - as ONE search, not multiple
         security_query = f"{country} (war OR conflict OR military OR security OR crisis OR attack OR violence)"
-        print(f"Security search: {country} + security terms")
-        security_articles = self.search(security_query, when=when)
+        print(f"Searching: {country} (plain and + security terms)")
+        results = self.search_many([country, security_query], when=when)
+        all_articles = results[country]
+        security_articles = results[security_query]
 
         # Merge and deduplicate
         seen_titles = set()
@@ -90,7 +131,8 @@ class GoogleNewsEngine:
                 seen_titles.add(article['title'])
                 final_articles.append(article)
 
-        return final_articles
+        # Collapse syndicated copies of the same wire story
+        return collapse_near_duplicates(final_articles)
 
     def search_incident(self, description, days_back=30):
         """
@@ -0,0 +1,265 @@
+"""
+Resolve Google News redirect links to canonical publisher URLs
+
+Google News RSS links look like news.google.com/rss/articles/<id>. Fetching
+them returns a Google interstitial, not the story. The <id> is a base64
+protobuf:
+- older ids embed the publisher URL directly, so they decode offline
+- newer ids (payload starting 'AU_yqL') need one call to Google's
+  batchexecute endpoint, using the signature and timestamp from the
+  article page
+Resolved mappings are cached in a JSON file, so each link costs at most one
+lookup ever. canonicalize_url() then normalises publisher URLs (tracking
+params, www., trailing slashes), which lets the same story reached via
+different links be deduplicated.
+"""
+import base64
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote
+
+from atomic_file import atomic_write_json
+from fetch_scheduler import get_fetch_scheduler
+from http_client import get_http_client, BROWSER_USER_AGENT
+
+_ARTICLE_ID = re.compile(r"news\.google\.com/(?:rss/)?(?:articles|read)/([A-Za-z0-9_\-]+)")
+_SIGNATURE = re.compile(r'data-n-a-sg="([^"]+)"')
+_TIMESTAMP = re.compile(r'data-n-a-ts="([^"]+)"')
+
+_TRACKING_PARAMS = {'fbclid', 'gclid', 'ocid', 'cmpid', 'ref', 'smid', 'mc_cid', 'mc_eid', 'guccounter'}
+
+BATCH_URL = "https://news.google.com/_/DotsSplashUi/data/batchexecute"
+
+
+def is_google_news_link(url: str) -> bool:
+    return bool(url) and _ARTICLE_ID.search(url) is not None
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalise a publisher URL so the same article compares equal"""
+    if not url:
+        return url
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith('utm_') and k.lower() not in _TRACKING_PARAMS]
+    path = parts.path.rstrip('/') or '/'
+    # AMP copies point at the same story
+    if path.endswith('/amp'):
+        path = path[:-4] or '/'
+    return urlunsplit(('https', host, path, urlencode(sorted(query)), ''))
+
+
+def _read_varint(data: bytes, pos: int):
+    value, shift = 0, 0
+    while pos < len(data):
+        byte = data[pos]
+        value |= (byte & 0x7f) << shift
+        pos += 1
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+    raise ValueError("truncated varint")
+
+
+def decode_article_id(article_id: str) -> Optional[str]:
+    """
+    Decode an article id offline
+
+    Returns the publisher URL, or None when the id is the newer opaque
+    format (or not decodable) and needs an online lookup.
+    """
+    try:
+        data = base64.urlsafe_b64decode(article_id + '=' * (-len(article_id) % 4))
+    except (ValueError, TypeError):
+        return None
+
+    # Field 4 (tag 0x22) holds the URL as a length-delimited string
+    pos = data.find(b'\x22')
+    while pos != -1:
+        try:
+            length, start = _read_varint(data, pos + 1)
+        except ValueError:
+            return None
+        value = data[start:start + length]
+        if value.startswith(b'http'):
+            return value.decode('utf-8', errors='replace')
+        if value.startswith(b'AU_yqL'):
+            return None
+        pos = data.find(b'\x22', pos + 1)
+    return None
+
+
+class GoogleNewsResolver:
+    def __init__(self, cache_file: str = "data/google_news_links.json", max_entries: int = 50000):
+        self.cache_file = Path(cache_file)
+        self.max_entries = max_entries
+        self.cache = self._load()
+        self.failed = set()  # ids that failed this process; retried after restart
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.http = get_http_client()
+
+    def _load(self) -> Dict[str, str]:
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"[Resolver] Could not read {self.cache_file}: {e}")
+        return {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            if len(self.cache) > self.max_entries:
+                # Dicts keep insertion order: drop the oldest mappings
+                for article_id in list(self.cache)[:len(self.cache) - self.max_entries]:
+                    del self.cache[article_id]
+            snapshot = dict(self.cache)
+            self._dirty = False
+        atomic_write_json(self.cache_file, snapshot, indent=None)
+
+    def _remember(self, article_id: str, url: str):
+        with self._lock:
+            self.cache[article_id] = url
+            self._dirty = True
+
+    def _resolve_online(self, article_id: str) -> Optional[str]:
+        headers = {'User-Agent': BROWSER_USER_AGENT}
+        page = self.http.get(f"https://news.google.com/rss/articles/{article_id}",
+                             timeout=(3.05, 5), headers=headers)
+        signature = _SIGNATURE.search(page.text)
+        timestamp = _TIMESTAMP.search(page.text)
+
+        if signature and timestamp:
+            request = [
+                "Fbv4je",
+                f'["garturlreq",[["X","X",["X","X"],null,null,1,1,"US:en",null,1,null,null,null,null,null,0,1],'
+                f'"X","X",1,[1,1,1],1,1,null,0,0,null,0],"{article_id}",{timestamp.group(1)},"{signature.group(1)}"]',
+                None,
+                "generic"
+            ]
+            body = "f.req=" + quote(json.dumps([[request]]))
+            response = self.http.post(BATCH_URL, data=body, timeout=(3.05, 5), headers={
+                'User-Agent': BROWSER_USER_AGENT,
+                'Content-Type': 'application/x-www-form-urlencoded;charset=UTF-8'
+            })
+            payload = json.loads(response.text.split("\n\n", 1)[1])
+            return json.loads(payload[0][2])[1]
+
+        # Some ids still answer with a plain HTTP redirect
+        if 'news.google.com' not in (urlsplit(page.url).hostname or ''):
+            return page.url
+        return None
+
+    def resolve(self, url: str, allow_network: bool = True) -> str:
+        """Publisher URL for a Google News link (other URLs pass through)"""
+        match = _ARTICLE_ID.search(url or '')
+        if not match:
+            return url
+        article_id = match.group(1)
+
+        cached = self.cache.get(article_id)
+        if cached:
+            return cached
+
+        # Offline decoding is cheap enough that it isn't worth caching
+        resolved = decode_article_id(article_id)
+        if resolved:
+            return resolved
+
+        if allow_network and article_id not in self.failed:
+            try:
+                resolved = self._resolve_online(article_id)
+            except Exception as e:
+                print(f"[Resolver] Lookup failed for {article_id[:24]}...: {str(e)[:80]}")
+            if resolved:
+                self._remember(article_id, resolved)
+                return resolved
+            self.failed.add(article_id)
+        return url
+
+    def resolve_articles(self, articles: List[Dict], allow_network: bool = True) -> List[Dict]:
+        """
+        Replace Google News links with publisher URLs, then dedup
+
+        Each article keeps its original link as 'google_link' and gains a
+        'canonical_url'. Articles sharing a canonical URL are merged into
+        the first one. Lookups go through the fetch scheduler, so Google
+        sees a polite request rate.
+        """
+        pending = [a['link'] for a in articles if is_google_news_link(a.get('link', ''))]
+        resolved = {}
+        offline_misses = []
+        for link in dict.fromkeys(pending):
+            target = self.resolve(link, allow_network=False)
+            if target != link:
+                resolved[link] = target
+            else:
+                offline_misses.append(link)
+
+        if allow_network and offline_misses:
+            scheduler = get_fetch_scheduler()
+            for link, target, error in scheduler.map_unordered(self.resolve, offline_misses):
+                if not error and target != link:
+                    resolved[link] = target
+        self.save()
+
+        unique = []
+        by_canonical = {}
+        for article in articles:
+            link = article.get('link', '')
+            if link in resolved:
+                article['google_link'] = link
+                article['link'] = resolved[link]
+            canonical = canonicalize_url(article['link']) if link else ''
+            article['canonical_url'] = canonical
+
+            if canonical and not is_google_news_link(canonical) and canonical in by_canonical:
+                kept = by_canonical[canonical]
+                # Keep the longer summary so nothing useful is lost
+                if len(article.get('summary') or '') > len(kept.get('summary') or ''):
+                    kept['summary'] = article['summary']
+                continue
+            if canonical:
+                by_canonical[canonical] = article
+            unique.append(article)
+
+        if len(unique) < len(articles):
+            print(f"Canonical URL dedup: {len(articles)} articles -> {len(unique)}")
+        return unique
+
+
+# Singleton instance
+_resolver_instance = None
+_resolver_lock = threading.Lock()
+
+
+def get_google_news_resolver() -> GoogleNewsResolver:
+    """Get or create the shared resolver"""
+    global _resolver_instance
+    with _resolver_lock:
+        if _resolver_instance is None:
+            _resolver_instance = GoogleNewsResolver()
+    return _resolver_instance
+
+
+if __name__ == "__main__":
+    from google_news_engine import GoogleNewsEngine
+
+    results = GoogleNewsEngine().search("NATO airspace violation", when="1d", max_results=10)
+    start = time.time()
+    resolved = get_google_news_resolver().resolve_articles(results)
+    print(f"Resolved {len(results)} links in {time.time() - start:.1f}s")
+    for article in resolved:
+        print(f"  {article['link'][:100]}")
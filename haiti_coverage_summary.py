@@ -1,9 +1,6 @@
 """Summary of Haiti coverage improvements"""
 import json
-import feedparser
-import socket
-
-socket.setdefaulttimeout(10)
+from http_client import fetch_feed
 
 def summarize_haiti_coverage():
     with open('sources_config.json', 'r') as f:
@@ -34,7 +31,7 @@ def summarize_haiti_coverage():
             print(f"\n{source['name']}")
             print(f"  Type: {source['type']}")
 
-            feed = feedparser.parse(source['url'])
+            feed = fetch_feed(source['url'])
             if feed.entries:
                 count = len(feed.entries)
                 total_working += 1
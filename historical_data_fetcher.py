@@ -1,15 +1,22 @@
 """Fetch historical and reference data for countries from multiple sources"""
-import requests
 import json
 from bs4 import BeautifulSoup
 import re
 import time
+from persistent_cache import get_persistent_cache, DAY
+from country_intelligence import wikipedia_summary, _cache_key
+
+# Compiled reports carry a timestamp, so they are refreshed daily; a report
+# missing a source (outage, rate limit) is only kept briefly
+HISTORICAL_DATA_TTL = DAY
+HISTORICAL_DATA_PARTIAL_TTL = 600
+
 
 class HistoricalDataFetcher:
-    def __init__(self):
+    def __init__(self, cache=None):
         self.cia_factbook_base = "https://www.cia.gov/the-world-factbook/countries"
         self.wikipedia_api = "https://en.wikipedia.org/api/rest_v1/page/summary"
-        self.country_data_cache = {}
+        self.cache = cache or get_persistent_cache()
 
     def normalize_country_name(self, country_name):
         """Normalize country name for URL construction"""
@@ -97,30 +104,19 @@ class HistoricalDataFetcher:
 
     def fetch_wikipedia_summary(self, country_name):
         """Fetch Wikipedia summary and historical data"""
-        try:
-            # Get Wikipedia summary
-            response = requests.get(f"{self.wikipedia_api}/{country_name}", timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-
-                wiki_data = {
-                    'source': 'Wikipedia',
-                    'title': data.get('title', country_name),
-                    'summary': data.get('extract', ''),
-                    'url': data.get('content_urls', {}).get('desktop', {}).get('page', ''),
-                }
-
-                print(f"[Wikipedia] Retrieved summary for {country_name}")
-                return wiki_data
-            else:
-                print(f"[Wikipedia] No data found for {country_name}")
-                return None
-
-        except Exception as e:
-            print(f"[Wikipedia] Error fetching data for {country_name}: {e}")
+        # Shares the persistent cache entry with CountryIntelligence
+        summary = wikipedia_summary(country_name, self.cache)
+        if not summary:
+            print(f"[Wikipedia] No data found for {country_name}")
             return None
 
+        return {
+            'source': 'Wikipedia',
+            'title': summary['title'],
+            'summary': summary['extract'],
+            'url': summary['page_url'],
+        }
+
     def fetch_historical_timeline(self, country_name):
         """Fetch historical timeline events"""
         # This would connect to a historical events API or database
@@ -180,9 +176,11 @@ class HistoricalDataFetcher:
         print(f"\n=== Fetching Historical Data for {country_name} ===")
 
         # Check cache first
-        if country_name in self.country_data_cache:
+        cache_key = _cache_key(country_name)
+        cached = self.cache.get('historical_data', cache_key)
+        if cached:
             print(f"Returning cached data for {country_name}")
-            return self.country_data_cache[country_name]
+            return cached
 
         historical_data = {
             'country': country_name,
@@ -216,8 +214,10 @@ class HistoricalDataFetcher:
         if political_history:
             historical_data['sources']['political'] = political_history
 
-        # Cache the data
-        self.country_data_cache[country_name] = historical_data
+        # Cache the data; all workers share it, so don't keep a degraded report for a day
+        complete = factbook_data is not None and wiki_data is not None
+        self.cache.set('historical_data', cache_key, historical_data,
+                       HISTORICAL_DATA_TTL if complete else HISTORICAL_DATA_PARTIAL_TTL)
 
         print(f"Historical data compilation complete for {country_name}")
         return historical_data
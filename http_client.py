@@ -0,0 +1,302 @@
+"""
+Shared HTTP client - one pooled session for every outbound request
+
+Replaces the process-wide socket.setdefaulttimeout calls and the ad-hoc
+requests.get/Session usage spread across modules:
+- keep-alive connection pools, sized per host (Google News gets more)
+- explicit (connect, read) timeouts on every call
+- retries on connection errors, 429 and 5xx, with jittered backoff
+- gzip/deflate always, brotli when the brotli package is installed
+- a small TTL cache in front of DNS lookups
+Feeds are downloaded here and the bytes handed to feedparser, so feed
+fetches get the same timeouts, pooling and retries as everything else.
+Article pages are streamed with a byte cap (stream_html) so callers can
+stop reading as soon as they have enough text.
+"""
+import codecs
+import random
+import socket
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import feedparser
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import connection as urllib3_connection
+from urllib3.util.retry import Retry
+
+try:
+    import brotli  # noqa: F401 - urllib3 decodes 'br' when this is importable
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+USER_AGENT = 'SecurityMonitor/1.0 (Geopolitical Security Feed Aggregator)'
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+FEED_TIMEOUT = (3.05, 8)
+
+# Connections kept alive per host; hosts we hit in bursts get larger pools
+DEFAULT_POOL_SIZE = 10
+HOST_POOL_SIZES = {
+    'news.google.com': 32,
+    'en.wikipedia.org': 8,
+    'restcountries.com': 4,
+}
+
+DNS_CACHE_TTL = 300
+
+# Article pages: stop reading after this many (decompressed) bytes
+MAX_HTML_BYTES = 512 * 1024
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class ContentTypeError(IOError):
+    """Raised when a page fetch returns something other than HTML"""
+
+
+class JitterRetry(Retry):
+    """Retry whose exponential backoff is spread randomly (+/-50%)"""
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        return backoff * random.uniform(0.5, 1.5) if backoff else 0
+
+
+def _build_retry() -> Retry:
+    return JitterRetry(
+        total=2,
+        connect=2,
+        read=1,
+        status=2,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+
+
+class _DNSCache:
+    """TTL cache for getaddrinfo results, used only by urllib3 connections"""
+
+    def __init__(self, ttl: float = DNS_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._original_create_connection = None
+
+    def resolve(self, host: str, port: int):
+        key = (host, port)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+        results = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, results)
+        return results
+
+    def evict(self, host: str, port: int):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def create_connection(self, address, *args, **kwargs):
+        host, port = address
+        try:
+            results = self.resolve(host, port)
+        except socket.gaierror:
+            return self._original_create_connection(address, *args, **kwargs)
+
+        last_error = None
+        for family, _, _, _, sockaddr in results:
+            try:
+                # TLS verification and SNI use the hostname from the
+                # connection object, so connecting to the cached IP is safe
+                return self._original_create_connection((sockaddr[0], port), *args, **kwargs)
+            except OSError as e:
+                last_error = e
+        # Every cached address failed: the record may be stale
+        self.evict(host, port)
+        raise last_error
+
+    def install(self):
+        if self._original_create_connection is None:
+            self._original_create_connection = urllib3_connection.create_connection
+            urllib3_connection.create_connection = self.create_connection
+
+
+class HttpClient:
+    """Pooled requests session with per-host adapters and default timeouts"""
+
+    def __init__(self, user_agent: str = USER_AGENT, default_timeout: Timeout = DEFAULT_TIMEOUT,
+                 host_pool_sizes: Dict[str, int] = None):
+        self.default_timeout = default_timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': user_agent,
+            'Accept-Encoding': ACCEPT_ENCODING
+        })
+
+        default_adapter = HTTPAdapter(pool_connections=50, pool_maxsize=DEFAULT_POOL_SIZE,
+                                      max_retries=_build_retry())
+        self.session.mount('http://', default_adapter)
+        self.session.mount('https://', default_adapter)
+
+        # Host-specific adapters take precedence (requests matches the longest prefix)
+        for host, size in (host_pool_sizes or HOST_POOL_SIZES).items():
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=_build_retry())
+            self.session.mount(f'https://{host}/', adapter)
+            self.session.mount(f'http://{host}/', adapter)
+
+    def request(self, method: str, url: str, timeout: Timeout = None, **kwargs) -> requests.Response:
+        return self.session.request(method, url, timeout=timeout or self.default_timeout, **kwargs)
+
+    def get(self, url: str, timeout: Timeout = None, **kwargs) -> requests.Response:
+        return self.request('GET', url, timeout=timeout, **kwargs)
+
+    def post(self, url: str, timeout: Timeout = None, **kwargs) -> requests.Response:
+        return self.request('POST', url, timeout=timeout, **kwargs)
+
+    def fetch_feed(self, url: str, timeout: Timeout = FEED_TIMEOUT,
+                   headers: Optional[Dict[str, str]] = None) -> feedparser.FeedParserDict:
+        """
+        Download a feed and parse it with feedparser
+
+        Like feedparser.parse(url) this never raises: network errors come
+        back as a bozo result with no entries, and the HTTP status is set
+        on the result for callers that check it.
+        """
+        try:
+            response = self.get(url, timeout=timeout, headers=headers)
+        except requests.RequestException as e:
+            return feedparser.FeedParserDict(entries=[], feed=feedparser.FeedParserDict(),
+                                             bozo=1, bozo_exception=e, href=url)
+
+        result = feedparser.parse(
+            response.content,
+            response_headers={k.lower(): v for k, v in response.headers.items()}
+        )
+        result['status'] = response.status_code
+        result['href'] = response.url
+        return result
+
+    def stream_html(self, url: str, max_bytes: int = MAX_HTML_BYTES, timeout: Timeout = None,
+                    headers: Optional[Dict[str, str]] = None, chunk_size: int = 16384) -> Iterator[str]:
+        """
+        Yield a page's HTML as decoded text chunks, stopping at max_bytes
+
+        Raises for HTTP errors and for non-HTML content types (checked from
+        the headers, before any body is read). Closing the generator early
+        closes the response, so callers can stop as soon as they have what
+        they need.
+        """
+        response = self._open_html(url, timeout, headers)
+        try:
+            # requests assumes ISO-8859-1 when text/html has no charset; most pages are UTF-8
+            encoding = self._charset(response) or 'utf-8'
+            try:
+                decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            except LookupError:
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+            for chunk in self._capped_chunks(response, max_bytes, chunk_size):
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+        finally:
+            response.close()
+
+    def fetch_html_bytes(self, url: str, max_bytes: int = MAX_HTML_BYTES, timeout: Timeout = None,
+                         headers: Optional[Dict[str, str]] = None,
+                         chunk_size: int = 16384) -> Tuple[bytes, Optional[str]]:
+        """
+        Download up to max_bytes of a page without decoding it
+
+        Returns (raw bytes, charset from the Content-Type header or None),
+        so the parser can decode once. Same checks as stream_html.
+        """
+        response = self._open_html(url, timeout, headers)
+        try:
+            data = b''.join(self._capped_chunks(response, max_bytes, chunk_size))
+            return data, self._charset(response)
+        finally:
+            response.close()
+
+    def _open_html(self, url: str, timeout: Timeout, headers: Optional[Dict[str, str]]):
+        response = self.get(url, timeout=timeout, headers=headers, stream=True)
+        try:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type and content_type not in HTML_CONTENT_TYPES:
+                raise ContentTypeError(f"Not HTML ({content_type}): {url}")
+        except Exception:
+            response.close()
+            raise
+        return response
+
+    @staticmethod
+    def _charset(response) -> Optional[str]:
+        if 'charset=' in response.headers.get('Content-Type', '').lower() and response.encoding:
+            return response.encoding
+        return None
+
+    @staticmethod
+    def _capped_chunks(response, max_bytes: int, chunk_size: int) -> Iterator[bytes]:
+        received = 0
+        for chunk in response.iter_content(chunk_size):
+            if received + len(chunk) > max_bytes:
+                chunk = chunk[:max_bytes - received]
+            received += len(chunk)
+            yield chunk
+            if received >= max_bytes:
+                break
+
+
+# Singleton instance
+_client_instance = None
+_client_lock = threading.Lock()
+_dns_cache = _DNSCache()
+
+
+def get_http_client() -> HttpClient:
+    """Get or create the shared HTTP client"""
+    global _client_instance
+    with _client_lock:
+        if _client_instance is None:
+            _dns_cache.install()
+            _client_instance = HttpClient()
+    return _client_instance
+
+
+def fetch_feed(url: str, timeout: Timeout = FEED_TIMEOUT) -> feedparser.FeedParserDict:
+    """Fetch and parse a feed through the shared client"""
+    return get_http_client().fetch_feed(url, timeout=timeout)
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).hostname or ''
+
+
+if __name__ == "__main__":
+    client = get_http_client()
+    for feed_url in ["http://feeds.bbci.co.uk/news/world/rss.xml",
+                     "https://news.google.com/rss/search?q=NATO&hl=en-US&gl=US&ceid=US:en"]:
+        start = time.time()
+        feed = client.fetch_feed(feed_url)
+        print(f"{host_of(feed_url)}: status {feed.get('status')}, "
+              f"{len(feed.entries)} entries in {time.time() - start:.2f}s")
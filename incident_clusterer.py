@@ -0,0 +1,314 @@
+"""
+Incremental incident clustering - groups articles into events over time
+
+Each event keeps a centroid term vector (summed TF of its articles). A new
+article joins the most similar recent event when the IDF-weighted cosine
+similarity clears a threshold, otherwise it opens a new event. An inverted
+index from terms to events keeps candidate lookup cheap as events pile up.
+"""
+import itertools
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
+
+from date_normalizer import published_ts
+
+_WORD_PATTERN = re.compile(r"[a-z][a-z0-9\-]+")
+
+_STOPWORDS = {
+    'the', 'and', 'for', 'with', 'from', 'that', 'this', 'are', 'was', 'were',
+    'has', 'have', 'had', 'its', 'his', 'her', 'their', 'they', 'will', 'would',
+    'said', 'says', 'after', 'over', 'into', 'about', 'than', 'more', 'new',
+    'news', 'latest', 'update', 'updates', 'live', 'what', 'who', 'how', 'why',
+    'but', 'not', 'been', 'being', 'also', 'amid', 'as', 'at', 'by', 'in', 'on',
+    'of', 'to', 'is', 'it', 'an', 'a', 'be', 'or', 'he', 'she', 'we', 'you'
+}
+
+
+# Light suffix stripping so "Estonia"/"Estonian" and "violate"/"violation"
+# land on the same term. Checked in order, first match wins.
+_SUFFIXES = ('ions', 'ians', 'ian', 'ing', 'ion', 'ies', 'ed', 'es', 'ia', 's', 'e')
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def extract_terms(article: Dict) -> Counter:
+    """Term frequencies for an article; title terms count double"""
+    title = article.get('title', '')
+    # Drop the ' - Publisher' suffix Google News adds to titles
+    if ' - ' in title:
+        title = title.rsplit(' - ', 1)[0]
+    summary = (article.get('summary') or '')[:500]
+
+    terms = Counter()
+    for word in _WORD_PATTERN.findall(title.lower()):
+        if word not in _STOPWORDS:
+            terms[_stem(word)] += 2
+    for word in _WORD_PATTERN.findall(summary.lower()):
+        if word not in _STOPWORDS:
+            terms[_stem(word)] += 1
+    return terms
+
+
+def article_timestamp(article: Dict) -> float:
+    """Best-effort epoch seconds for an article (now if unknown)"""
+    ts = published_ts(article)
+    return float(ts) if ts is not None else time.time()
+
+
+class IncidentClusterer:
+    """Assigns articles to events incrementally, keeping centroids in memory"""
+
+    def __init__(self, similarity_threshold: float = 0.35, window_hours: float = 72,
+                 retention_hours: float = 24 * 7, max_terms_per_event: int = 60):
+        """
+        Args:
+            similarity_threshold: Minimum cosine similarity to join an event
+            window_hours: An article only joins events active within this window
+            retention_hours: Events idle longer than this are dropped
+            max_terms_per_event: Centroid size cap (keeps the top-weighted terms)
+        """
+        self.similarity_threshold = similarity_threshold
+        self.window_seconds = window_hours * 3600
+        self.retention_seconds = retention_hours * 3600
+        self.max_terms_per_event = max_terms_per_event
+
+        self.events = {}
+        self.term_index = defaultdict(set)   # term -> event ids
+        self.doc_freq = Counter()            # term -> articles containing it
+        self.doc_count = 0
+        self.link_to_event = {}
+        self.latest_seen = 0.0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _idf(self, term: str) -> float:
+        return math.log((self.doc_count + 1) / (self.doc_freq[term] + 1)) + 1
+
+    def _similarity(self, terms: Counter, centroid: Counter, centroid_norm: float) -> float:
+        dot = 0.0
+        norm = 0.0
+        for term, tf in terms.items():
+            idf = self._idf(term)
+            weight = tf * idf
+            norm += weight * weight
+            if term in centroid:
+                dot += weight * centroid[term] * idf
+        if not dot or not norm or not centroid_norm:
+            return 0.0
+        return dot / (math.sqrt(norm) * centroid_norm)
+
+    def _centroid_norm(self, centroid: Counter) -> float:
+        return math.sqrt(sum((tf * self._idf(term)) ** 2 for term, tf in centroid.items()))
+
+    def _index_event(self, event_id: int, old_terms, new_terms):
+        for term in set(old_terms) - set(new_terms):
+            events = self.term_index.get(term)
+            if events is not None:
+                events.discard(event_id)
+                if not events:
+                    del self.term_index[term]
+        for term in new_terms:
+            self.term_index[term].add(event_id)
+
+    def add_article(self, article: Dict) -> int:
+        """Assign an article to an event and return the event id"""
+        with self._lock:
+            link = article.get('link')
+            if link and link in self.link_to_event and self.link_to_event[link] in self.events:
+                return self.link_to_event[link]
+
+            terms = extract_terms(article)
+            timestamp = article_timestamp(article)
+            self.latest_seen = max(self.latest_seen, timestamp)
+
+            self.doc_count += 1
+            for term in terms:
+                self.doc_freq[term] += 1
+
+            # Candidate events share at least one of the article's terms
+            candidates = set()
+            for term in terms:
+                candidates |= self.term_index.get(term, set())
+
+            best_id, best_score = None, 0.0
+            for event_id in candidates:
+                event = self.events[event_id]
+                if abs(timestamp - event['last_seen']) > self.window_seconds and \
+                        not (event['first_seen'] <= timestamp <= event['last_seen']):
+                    continue
+                centroid = event['centroid']
+                score = self._similarity(terms, centroid, self._centroid_norm(centroid))
+                if score > best_score:
+                    best_id, best_score = event_id, score
+
+            if best_id is not None and best_score >= self.similarity_threshold:
+                event_id = best_id
+                event = self.events[event_id]
+                old_terms = list(event['centroid'])
+                event['centroid'].update(terms)
+                if len(event['centroid']) > self.max_terms_per_event:
+                    event['centroid'] = Counter(dict(event['centroid'].most_common(self.max_terms_per_event)))
+                self._index_event(event_id, old_terms, event['centroid'])
+                event['first_seen'] = min(event['first_seen'], timestamp)
+                event['last_seen'] = max(event['last_seen'], timestamp)
+            else:
+                event_id = next(self._ids)
+                event = {
+                    'id': event_id,
+                    'centroid': Counter(dict(terms.most_common(self.max_terms_per_event))),
+                    'first_seen': timestamp,
+                    'last_seen': timestamp,
+                    'articles': [],
+                    'sources': set(),
+                    'doc_terms': Counter()  # this event's share of doc_freq
+                }
+                self.events[event_id] = event
+                self._index_event(event_id, [], event['centroid'])
+
+            event['articles'].append(article)
+            event['sources'].add(article.get('source', 'Unknown'))
+            event['doc_terms'].update(terms.keys())
+            if link:
+                self.link_to_event[link] = event_id
+            return event_id
+
+    def add_articles(self, articles: List[Dict], prune: bool = True) -> List[int]:
+        """Assign articles oldest first so events grow in time order"""
+        ordered = sorted(articles, key=article_timestamp)
+        ids = {id(a): self.add_article(a) for a in ordered}
+        if prune:
+            self.prune()
+        return [ids[id(a)] for a in articles]
+
+    def prune(self, now: Optional[float] = None):
+        """
+        Drop events that have been idle longer than the retention period
+
+        Age is measured against the newest article seen rather than the wall
+        clock, so replaying an old batch does not immediately expire it. The
+        dropped articles are taken out of the IDF statistics too.
+        """
+        now = now or self.latest_seen
+        with self._lock:
+            stale = [eid for eid, e in self.events.items()
+                     if now - e['last_seen'] > self.retention_seconds]
+            for event_id in stale:
+                event = self.events.pop(event_id)
+                self._index_event(event_id, event['centroid'], [])
+                self.doc_count -= len(event['articles'])
+                for term, count in event['doc_terms'].items():
+                    self.doc_freq[term] -= count
+                    if self.doc_freq[term] <= 0:
+                        del self.doc_freq[term]
+                for article in event['articles']:
+                    if self.link_to_event.get(article.get('link')) == event_id:
+                        del self.link_to_event[article.get('link')]
+
+    def summarize_event(self, event_id: int, articles: Optional[List[Dict]] = None) -> Dict:
+        """Plain-dict view of an event, optionally limited to given articles"""
+        with self._lock:
+            return self._summarize_event(event_id, articles)
+
+    def _summarize_event(self, event_id: int, articles: Optional[List[Dict]] = None) -> Dict:
+        event = self.events.get(event_id)
+        if event is None:
+            if not articles:
+                raise KeyError(event_id)
+            # Pruned by another thread since the articles were assigned
+            stamps = [article_timestamp(a) for a in articles]
+            event = {'centroid': sum((extract_terms(a) for a in articles), Counter()),
+                     'first_seen': min(stamps), 'last_seen': max(stamps)}
+        members = list(articles if articles is not None else event['articles'])
+        # Lead article: the one with the most coverage weight, then most text
+        lead = max(members, key=lambda a: (a.get('source_count', 1), len(a.get('summary') or '')))
+        top_terms = [term for term, _ in event['centroid'].most_common(6)]
+        return {
+            'event_id': event_id,
+            'title': lead.get('title', ''),
+            'lead_article': lead,
+            'articles': members,
+            'article_count': len(members),
+            'sources': sorted({a.get('source', 'Unknown') for a in members}),
+            'first_seen': datetime.fromtimestamp(event['first_seen'], timezone.utc).isoformat(),
+            'last_seen': datetime.fromtimestamp(event['last_seen'], timezone.utc).isoformat(),
+            'first_seen_ts': event['first_seen'],
+            'last_seen_ts': event['last_seen'],
+            'key_terms': top_terms
+        }
+
+    def get_events(self, min_articles: int = 1) -> List[Dict]:
+        """All live events, largest and most recent first"""
+        with self._lock:
+            summaries = [self._summarize_event(eid) for eid, e in self.events.items()
+                         if len(e['articles']) >= min_articles]
+        summaries.sort(key=lambda e: (e['article_count'], e['last_seen_ts']), reverse=True)
+        return summaries
+
+
+def group_into_events(articles: List[Dict], clusterer: Optional[IncidentClusterer] = None) -> List[Dict]:
+    """
+    Group a batch of articles into events
+
+    With no clusterer a fresh one is used, so grouping depends only on the
+    batch. Passing the shared clusterer lets the batch join events seen in
+    earlier batches. Returns events (restricted to this batch's articles),
+    largest first.
+    """
+    if not articles:
+        return []
+
+    clusterer = clusterer or IncidentClusterer()
+    event_ids = clusterer.add_articles(articles, prune=False)
+
+    members = defaultdict(list)
+    for article, event_id in zip(articles, event_ids):
+        members[event_id].append(article)
+
+    events = [clusterer.summarize_event(eid, arts) for eid, arts in members.items()]
+    clusterer.prune()
+    events.sort(key=lambda e: (e['article_count'], e['last_seen_ts']), reverse=True)
+    return events
+
+
+# Process-wide clusterer so events persist across requests and polls
+_clusterer_instance = None
+_clusterer_lock = threading.Lock()
+
+
+def get_incident_clusterer() -> IncidentClusterer:
+    """Get or create the shared incident clusterer"""
+    global _clusterer_instance
+    with _clusterer_lock:
+        if _clusterer_instance is None:
+            _clusterer_instance = IncidentClusterer()
+    return _clusterer_instance
+
+
+if __name__ == "__main__":
+    sample = [
+        {'title': 'Russian jets violate Estonian airspace - Reuters', 'summary': 'Three MiG-31 jets entered Estonian airspace.',
+         'published': 'Fri, 19 Sep 2025 10:00:00 GMT', 'source': 'Reuters', 'link': 'a'},
+        {'title': 'Estonia requests NATO Article 4 talks over airspace violation - BBC',
+         'summary': 'Estonia invoked Article 4 after Russian jets violated its airspace.',
+         'published': 'Fri, 19 Sep 2025 16:00:00 GMT', 'source': 'BBC', 'link': 'b'},
+        {'title': 'NATO allies meet after Estonia airspace violation - AP',
+         'summary': 'NATO held Article 4 consultations on the Russian airspace violation over Estonia.',
+         'published': 'Tue, 23 Sep 2025 09:00:00 GMT', 'source': 'AP', 'link': 'c'},
+        {'title': 'Haiti gangs attack police station in Port-au-Prince - AP',
+         'summary': 'Gang members attacked a police station overnight.',
+         'published': 'Sat, 20 Sep 2025 08:00:00 GMT', 'source': 'AP', 'link': 'd'},
+    ]
+
+    for event in group_into_events(sample):
+        print(f"[{event['article_count']} articles, {len(event['sources'])} sources] "
+              f"{event['title']}  ({', '.join(event['key_terms'])})")
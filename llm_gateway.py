@@ -0,0 +1,310 @@
+"""
+LLM gateway - the one way synthesizers call a model
+
+Every LLM call goes through here, whatever the provider:
+- per-provider limits: a concurrency cap and a requests-per-minute token
+  bucket, shared by all callers in the process
+- retries with exponential backoff and jitter for failed calls
+- hedging: once a provider has a latency history, a call still running
+  past its p90 latency (never sooner than HEDGE_MIN_DELAY) gets a second
+  identical request if a slot is free right away; the first answer wins
+- fallback: when a provider's attempts are exhausted the call moves to the
+  next provider in the chain (LLM_FALLBACK, e.g. "gemini,ollama"; by
+  default the preferred provider, then every other configured one); each
+  provider gets an equal share of the remaining time, so fallbacks always run
+- a record of every call: provider, latency, prompt/completion tokens,
+  hedged or not, success
+
+Providers come from the registry (set up once, kept warm); the gateway
+only decides which to call, when, and how often.
+"""
+import concurrent.futures
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Optional
+
+from fetch_scheduler import TokenBucket
+from llm_providers import LLMProvider, ProviderRegistry, ProviderUnavailable, get_provider_registry
+from token_counter import count_tokens
+
+# (max concurrent calls, requests per minute; 0 = unlimited) per provider
+DEFAULT_LIMITS = {
+    'gemini': (4, 15),
+    'openai': (8, 60),
+    'ollama': (1, 0),
+}
+FALLBACK_LIMITS = (4, 30)
+
+RETRIES = 2
+BACKOFF_SECONDS = 1.0
+CALL_TIMEOUT = 90
+HEDGE_PERCENTILE = 0.9
+HEDGE_MIN_DELAY = 2.0
+HEDGE_MIN_SAMPLES = 10
+LATENCY_WINDOW = 200
+CALL_LOG_SIZE = 500
+
+
+class LLMGatewayError(RuntimeError):
+    """Every provider in the chain failed"""
+
+
+class ProviderLimits:
+    """Concurrency slots plus an RPM token bucket for one provider"""
+
+    def __init__(self, concurrency: int, rpm: float):
+        self.concurrency = concurrency
+        self.rpm = rpm
+        # Allow a quarter of a minute's quota as a burst
+        self.burst = max(1.0, rpm / 4.0) if rpm else None
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._bucket = TokenBucket(rpm / 60.0, self.burst) if rpm else None
+
+    def enter(self, deadline: float) -> bool:
+        """Wait for a request token and a slot, until deadline"""
+        if self._bucket and not self._bucket.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            return False
+        return self._slots.acquire(timeout=max(deadline - time.monotonic(), 0))
+
+    def try_enter(self) -> bool:
+        """A slot and token right now, or nothing (used for hedges)"""
+        if not self._slots.acquire(blocking=False):
+            return False
+        if self._bucket and not self._bucket.try_acquire():
+            self._slots.release()
+            return False
+        return True
+
+    def leave(self):
+        self._slots.release()
+
+
+def _limits_from_env(name: str) -> tuple:
+    concurrency, rpm = DEFAULT_LIMITS.get(name, FALLBACK_LIMITS)
+    concurrency = int(os.getenv(f"LLM_{name.upper()}_CONCURRENCY", concurrency))
+    rpm = float(os.getenv(f"LLM_{name.upper()}_RPM", rpm))
+    return concurrency, rpm
+
+
+class _NoHedgeSlot(Exception):
+    pass
+
+
+class LLMGateway:
+    def __init__(self, registry: ProviderRegistry = None, providers: Optional[List[LLMProvider]] = None,
+                 limits: Optional[Dict[str, tuple]] = None, retries: int = RETRIES,
+                 backoff: float = BACKOFF_SECONDS, timeout: float = CALL_TIMEOUT,
+                 hedge_percentile: Optional[float] = HEDGE_PERCENTILE, hedge_min_delay: float = HEDGE_MIN_DELAY,
+                 hedge_min_samples: int = HEDGE_MIN_SAMPLES):
+        self.registry = registry or get_provider_registry()
+        self._fixed_chain = list(providers) if providers else None
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+
+        self._limit_config = dict(limits or {})
+        self._limits: Dict[str, ProviderLimits] = {}
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self.stats = defaultdict(Counter)
+        self.calls = deque(maxlen=CALL_LOG_SIZE)
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=32, thread_name_prefix='llm')
+
+    # -- providers ---------------------------------------------------------
+
+    def chain(self, names: Optional[List[str]] = None) -> List[LLMProvider]:
+        """Providers to try, in order"""
+        if names:
+            candidates = [self.registry.get(n) for n in names]
+        elif self._fixed_chain is not None:
+            candidates = self._fixed_chain
+        else:
+            order = [n.strip() for n in os.getenv('LLM_FALLBACK', '').split(',') if n.strip()]
+            if not order:
+                default = self.registry.default()
+                order = ([default.name] if default else []) + self.registry.names()
+            candidates = [self.registry.get(n) for n in dict.fromkeys(order)]
+        return [p for p in candidates if p is not None and p.usable()]
+
+    def primary(self) -> Optional[LLMProvider]:
+        chain = self.chain()
+        return chain[0] if chain else None
+
+    def available(self) -> bool:
+        return self.primary() is not None
+
+    def limits(self, name: str) -> ProviderLimits:
+        """Concurrency and RPM limits in force for a provider"""
+        return self._provider_limits(name)
+
+    def _provider_limits(self, name: str) -> ProviderLimits:
+        with self._lock:
+            limits = self._limits.get(name)
+            if limits is None:
+                concurrency, rpm = self._limit_config.get(name) or _limits_from_env(name)
+                limits = self._limits[name] = ProviderLimits(concurrency, rpm)
+            return limits
+
+    # -- latency & records ----------------------------------------------
+
+    def latency_percentile(self, name: str, percentile: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies[name])
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(percentile * len(samples)))]
+
+    def _hedge_delay(self, name: str) -> Optional[float]:
+        if not self.hedge_percentile:
+            return None
+        observed = self.latency_percentile(name, self.hedge_percentile, self.hedge_min_samples)
+        return None if observed is None else max(self.hedge_min_delay, observed)
+
+    def _record(self, name: str, started: float, prompt_tokens: int, completion_tokens: int,
+                ok: bool, hedge: bool, error: Optional[str] = None):
+        latency = time.monotonic() - started
+        with self._lock:
+            if ok:
+                self._latencies[name].append(latency)
+            stats = self.stats[name]
+            stats['calls'] += 1
+            stats['failures'] += 0 if ok else 1
+            stats['hedges'] += 1 if hedge else 0
+            stats['prompt_tokens'] += prompt_tokens
+            stats['completion_tokens'] += completion_tokens
+            self.calls.append({
+                'provider': name, 'latency': round(latency, 3), 'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens, 'ok': ok, 'hedge': hedge, 'error': error,
+                'at': time.time(),
+            })
+
+    # -- calls -------------------------------------------------------------
+
+    def _call(self, provider: LLMProvider, messages, temperature, max_tokens, deadline: float,
+              hedge: bool = False) -> str:
+        limits = self._provider_limits(provider.name)
+        if hedge:
+            if not limits.try_enter():
+                raise _NoHedgeSlot()
+        elif not limits.enter(deadline):
+            raise TimeoutError(f"{provider.name}: no capacity before the deadline")
+
+        prompt_tokens = sum(count_tokens(m['content']) for m in messages)
+        started = time.monotonic()
+        try:
+            text = provider.complete(messages, temperature, max_tokens)
+        except Exception as e:
+            self._record(provider.name, started, prompt_tokens, 0, False, hedge, str(e))
+            raise
+        finally:
+            limits.leave()
+        self._record(provider.name, started, prompt_tokens, count_tokens(text or ''), True, hedge)
+        return text
+
+    def _hedged(self, provider: LLMProvider, messages, temperature, max_tokens, deadline: float) -> str:
+        """One attempt on provider, with a hedge request if it runs slow"""
+        futures = [self._executor.submit(self._call, provider, messages, temperature, max_tokens, deadline)]
+        delay = self._hedge_delay(provider.name)
+        if delay is not None:
+            done, _ = concurrent.futures.wait(futures, timeout=min(delay, max(deadline - time.monotonic(), 0)))
+            if not done and time.monotonic() < deadline:
+                futures.append(self._executor.submit(self._call, provider, messages, temperature,
+                                                     max_tokens, deadline, True))
+
+        first_error = None
+        pending = set(futures)
+        while pending:
+            done, pending = concurrent.futures.wait(pending, timeout=max(deadline - time.monotonic(), 0),
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"{provider.name}: no answer within the deadline")
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    if future is not futures[0]:
+                        with self._lock:
+                            self.stats[provider.name]['hedge_wins'] += 1
+                    return future.result()
+                if not isinstance(error, _NoHedgeSlot):
+                    first_error = first_error or error
+        raise first_error
+
+    def _with_retries(self, provider: LLMProvider, messages, temperature, max_tokens, deadline: float) -> str:
+        for attempt in range(self.retries + 1):
+            try:
+                return self._hedged(provider, messages, temperature, max_tokens, deadline)
+            except ProviderUnavailable:
+                raise
+            except Exception as e:
+                wait = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                if attempt == self.retries or time.monotonic() + wait >= deadline:
+                    raise
+                print(f"[LLM Gateway] {provider.name} attempt {attempt + 1} failed ({e}); retrying in {wait:.1f}s")
+                with self._lock:
+                    self.stats[provider.name]['retries'] += 1
+                time.sleep(wait)
+
+    def complete(self, messages: List[Dict[str, str]], temperature: Optional[float] = None,
+                 max_tokens: Optional[int] = None, providers: Optional[List[str]] = None,
+                 timeout: Optional[float] = None) -> str:
+        """
+        Answer a chat-style message list, trying each provider in the chain
+
+        Raises LLMGatewayError if every provider fails (or none is usable).
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        errors = []
+        chain = self.chain(providers)
+        for i, provider in enumerate(chain):
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if errors:
+                print(f"[LLM Gateway] Falling back to {provider.name}")
+                with self._lock:
+                    self.stats[provider.name]['fallbacks'] += 1
+            # Each provider gets an equal share of what is left, so a hung
+            # provider can't use up the time its fallbacks need
+            attempt_deadline = now + (deadline - now) / (len(chain) - i)
+            try:
+                return self._with_retries(provider, messages, temperature, max_tokens, attempt_deadline)
+            except Exception as e:
+                errors.append(f"{provider.name}: {e}")
+        raise LLMGatewayError("All LLM providers failed: " + ('; '.join(errors) or 'none configured'))
+
+    def generate(self, prompt: str, temperature: Optional[float] = None, max_tokens: Optional[int] = None,
+                 providers: Optional[List[str]] = None, timeout: Optional[float] = None) -> str:
+        return self.complete([{'role': 'user', 'content': prompt}], temperature, max_tokens, providers, timeout)
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per-provider counters plus p50/p95 latency"""
+        result = {}
+        with self._lock:
+            names = list(self.stats)
+        for name in names:
+            with self._lock:
+                entry = dict(self.stats[name])
+            entry['p50_latency'] = self.latency_percentile(name, 0.5)
+            entry['p95_latency'] = self.latency_percentile(name, 0.95)
+            result[name] = entry
+        return result
+
+
+# Singleton instance
+_gateway_instance = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Get or create the shared LLM gateway"""
+    global _gateway_instance
+    with _gateway_lock:
+        if _gateway_instance is None:
+            _gateway_instance = LLMGateway()
+    return _gateway_instance
@@ -0,0 +1,330 @@
+"""
+Process-wide LLM provider registry
+
+The synthesizers used to set up their backend in their constructors -
+importing the SDK, configuring the API key, and for Ollama a blocking
+/api/tags check - and they are constructed per request and per scheduled
+run. Here each backend is set up once per process:
+- providers are cheap objects; the SDK is imported and the client built
+  on first use (or ahead of time by warm(), from a background thread)
+- the client is kept, so its HTTP connections stay warm between calls
+- each provider tracks its health: state, last error, call/failure counts
+  and a moving average of latency
+
+Callers ask the registry for the default provider (LLM_PROVIDER, then
+whichever of Gemini/OpenAI has a key) and call complete(messages) or
+generate(prompt); the provider-specific request shapes live here.
+"""
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from http_client import get_http_client
+
+LATENCY_SMOOTHING = 0.2
+# An unavailable provider is offered again after this long (e.g. Ollama started later)
+RECHECK_SECONDS = 300
+
+
+class ProviderUnavailable(RuntimeError):
+    """The provider is not configured, its SDK is missing, or it can't be reached"""
+
+
+class LLMProvider:
+    name = ''
+    default_model = ''
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model or self.default_model
+        self.state = 'cold'  # cold -> ready | unavailable; degraded after a failed call
+        self.last_error: Optional[str] = None
+        self.latency: Optional[float] = None
+        self.unavailable_at = 0.0
+        self.stats = Counter()
+        self._client = None
+        self._lock = threading.Lock()
+
+    def configured(self) -> bool:
+        """Whether the environment asks for this provider (cheap, no imports)"""
+        raise NotImplementedError
+
+    def _connect(self):
+        """Import the SDK and build the client"""
+        raise NotImplementedError
+
+    def _complete(self, client, messages: List[Dict[str, str]], temperature: Optional[float],
+                  max_tokens: Optional[int]) -> str:
+        raise NotImplementedError
+
+    def _mark_unavailable(self, error: Optional[str]):
+        self.state = 'unavailable'
+        self.unavailable_at = time.monotonic()
+        if error:
+            self.last_error = error
+
+    def usable(self) -> bool:
+        """Configured, and not found unusable within the last RECHECK_SECONDS"""
+        if not self.configured():
+            return False
+        return self.state != 'unavailable' or time.monotonic() - self.unavailable_at >= RECHECK_SECONDS
+
+    def client(self):
+        """The provider's client, built once"""
+        if self._client is not None:
+            return self._client
+        with self._lock:
+            if self._client is None:
+                if not self.configured():
+                    self._mark_unavailable(None)
+                    raise ProviderUnavailable(f"{self.name} is not configured")
+                try:
+                    self._client = self._connect()
+                except Exception as e:
+                    self._mark_unavailable(str(e))
+                    raise ProviderUnavailable(f"{self.name}: {e}") from e
+                self.state = 'ready'
+                print(f"[LLM] {self.name} ready ({self.model})")
+            return self._client
+
+    def check(self) -> bool:
+        """Build the client ahead of the first request; False if unusable"""
+        try:
+            self.client()
+            return True
+        except ProviderUnavailable as e:
+            print(f"[LLM] {e}")
+            return False
+
+    def complete(self, messages: List[Dict[str, str]], temperature: Optional[float] = None,
+                 max_tokens: Optional[int] = None) -> str:
+        """Answer a chat-style message list ('system'/'user'/'assistant' roles)"""
+        client = self.client()
+        started = time.monotonic()
+        self.stats['calls'] += 1
+        try:
+            text = self._complete(client, messages, temperature, max_tokens)
+        except Exception as e:
+            self.stats['failures'] += 1
+            self.state = 'degraded'
+            self.last_error = str(e)
+            raise
+        elapsed = time.monotonic() - started
+        self.latency = elapsed if self.latency is None else \
+            (1 - LATENCY_SMOOTHING) * self.latency + LATENCY_SMOOTHING * elapsed
+        self.state = 'ready'
+        return text
+
+    def generate(self, prompt: str, temperature: Optional[float] = None,
+                 max_tokens: Optional[int] = None) -> str:
+        return self.complete([{'role': 'user', 'content': prompt}], temperature, max_tokens)
+
+    def health(self) -> Dict:
+        return {
+            'provider': self.name,
+            'model': self.model,
+            'configured': self.configured(),
+            'state': self.state,
+            'last_error': self.last_error,
+            'calls': self.stats['calls'],
+            'failures': self.stats['failures'],
+            'avg_latency': round(self.latency, 3) if self.latency is not None else None,
+        }
+
+
+class GeminiProvider(LLMProvider):
+    name = 'gemini'
+    default_model = 'gemini-1.5-flash'
+
+    def configured(self) -> bool:
+        return bool(os.getenv('GEMINI_API_KEY'))
+
+    def _connect(self):
+        import google.generativeai as genai
+        endpoint = os.getenv('GEMINI_API_ENDPOINT')
+        if endpoint:
+            # A Gemini-compatible REST server, e.g. mock_llm_server.py for offline benchmarks
+            genai.configure(api_key=os.getenv('GEMINI_API_KEY'), transport='rest',
+                            client_options={'api_endpoint': endpoint})
+        else:
+            genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+        return genai.GenerativeModel(self.model)
+
+    def _complete(self, client, messages, temperature, max_tokens) -> str:
+        # One prompt: system text first, then the conversation
+        prompt = '\n\n'.join(m['content'] for m in messages)
+        config = {}
+        if temperature is not None:
+            config['temperature'] = temperature
+        if max_tokens:
+            config['max_output_tokens'] = max_tokens
+        response = client.generate_content(prompt, generation_config=config or None)
+        return response.text
+
+
+class OpenAIProvider(LLMProvider):
+    name = 'openai'
+    default_model = 'gpt-3.5-turbo'
+
+    def configured(self) -> bool:
+        return bool(os.getenv('OPENAI_API_KEY'))
+
+    def _connect(self):
+        from openai import OpenAI
+        return OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+    def _complete(self, client, messages, temperature, max_tokens) -> str:
+        kwargs = {'model': self.model, 'messages': messages}
+        if temperature is not None:
+            kwargs['temperature'] = temperature
+        if max_tokens:
+            kwargs['max_tokens'] = max_tokens
+        response = client.chat.completions.create(**kwargs)
+        return response.choices[0].message.content
+
+
+class OllamaProvider(LLMProvider):
+    name = 'ollama'
+    default_model = 'mistral'
+    timeout = 120  # Ollama can be slow on first run
+
+    def __init__(self, model: Optional[str] = None, base_url: Optional[str] = None):
+        super().__init__(model or os.getenv('OLLAMA_MODEL'))
+        self.base_url = (base_url or os.getenv('OLLAMA_URL', 'http://localhost:11434')).rstrip('/')
+
+    def configured(self) -> bool:
+        return os.getenv('LLM_PROVIDER', '').lower() == 'ollama' or bool(os.getenv('OLLAMA_URL'))
+
+    def _connect(self):
+        # The shared pooled session keeps the connection to the server open
+        return get_http_client()
+
+    def check(self) -> bool:
+        """Client plus a /api/tags probe for the server and model"""
+        if not super().check():
+            return False
+        try:
+            response = self._client.get(f"{self.base_url}/api/tags", timeout=5)
+            response.raise_for_status()
+            names = [m['name'].split(':')[0] for m in response.json().get('models', [])]
+        except Exception as e:
+            self._mark_unavailable(f"Cannot reach Ollama at {self.base_url}: {e}")
+            print(f"[LLM] {self.last_error}")
+            return False
+        if self.model not in names:
+            self._mark_unavailable(f"Model {self.model} not found (available: {names}); "
+                                   f"run: ollama pull {self.model}")
+            print(f"[LLM] {self.last_error}")
+            return False
+        return True
+
+    def _complete(self, client, messages, temperature, max_tokens) -> str:
+        system = '\n\n'.join(m['content'] for m in messages if m['role'] == 'system')
+        prompt = ''
+        for m in messages:
+            if m['role'] == 'user':
+                prompt += f"User: {m['content']}\n" if len(messages) > 1 else m['content']
+            elif m['role'] == 'assistant':
+                prompt += f"Assistant: {m['content']}\n"
+        if len(messages) > 1:
+            prompt += "Assistant: "
+
+        payload = {'model': self.model, 'prompt': prompt, 'stream': False}
+        if system:
+            payload['system'] = system
+        options = {}
+        if temperature is not None:
+            options['temperature'] = temperature
+        if max_tokens:
+            options['num_predict'] = max_tokens
+        if options:
+            payload['options'] = options
+        response = client.post(f"{self.base_url}/api/generate", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get('response', '')
+
+
+PROVIDERS = {
+    'gemini': GeminiProvider,
+    'openai': OpenAIProvider,
+    'ollama': OllamaProvider,
+}
+
+# Tried after LLM_PROVIDER when picking the default
+FALLBACK_ORDER = ['gemini', 'openai']
+
+
+class ProviderRegistry:
+    def __init__(self, preferred: Optional[str] = None, providers: Optional[Dict[str, LLMProvider]] = None):
+        self.preferred = (preferred or os.getenv('LLM_PROVIDER', 'gemini')).lower()
+        self._providers = dict(providers) if providers else {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[LLMProvider]:
+        """The shared provider instance for name (None if unknown)"""
+        with self._lock:
+            provider = self._providers.get(name)
+            if provider is None and name in PROVIDERS:
+                provider = self._providers[name] = PROVIDERS[name]()
+            return provider
+
+    def names(self) -> List[str]:
+        return list(dict.fromkeys(list(self._providers) + list(PROVIDERS)))
+
+    def default(self) -> Optional[LLMProvider]:
+        """LLM_PROVIDER if usable, else the first configured fallback"""
+        for name in dict.fromkeys([self.preferred] + FALLBACK_ORDER):
+            provider = self.get(name)
+            if provider is not None and provider.usable():
+                return provider
+        return None
+
+    def warm(self, background: bool = True):
+        """Set up every configured provider now, so requests don't pay for it"""
+        providers = [p for p in (self.get(n) for n in self.names()) if p and p.configured()]
+
+        def run():
+            for provider in providers:
+                provider.check()
+
+        if background:
+            threading.Thread(target=run, daemon=True, name="llm-warmup").start()
+        else:
+            run()
+
+    def health(self) -> Dict[str, Dict]:
+        default = self.default()
+        return {
+            'default': default.name if default else None,
+            'providers': {name: self.get(name).health() for name in self.names()},
+        }
+
+
+# Singleton instance
+_registry_instance = None
+_registry_lock = threading.Lock()
+
+
+def get_provider_registry() -> ProviderRegistry:
+    """Get or create the shared provider registry"""
+    global _registry_instance
+    with _registry_lock:
+        if _registry_instance is None:
+            _registry_instance = ProviderRegistry()
+    return _registry_instance
+
+
+def get_llm(name: Optional[str] = None) -> Optional[LLMProvider]:
+    """A named provider, or the default one; None when nothing is configured"""
+    registry = get_provider_registry()
+    return registry.get(name) if name else registry.default()
+
+
+if __name__ == "__main__":
+    registry = get_provider_registry()
+    start = time.time()
+    registry.warm(background=False)
+    print(f"Warm-up took {time.time() - start:.2f}s")
+    for name, health in registry.health()['providers'].items():
+        print(f"{name:8} {health}")
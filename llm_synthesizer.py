@@ -1,43 +1,21 @@
 import os
-import json
 from typing import List, Dict, Any
 from datetime import datetime
 from token_optimizer import TokenOptimizer
+from llm_gateway import LLMGateway, LLMGatewayError, get_llm_gateway
 from security_article_analyzer import SecurityArticleAnalyzer
 
 class LLMSynthesizer:
     """Use LLM to create professional intelligence narratives"""
 
-    def __init__(self):
-        # Check for Gemini first (free option)
-        self.gemini_key = os.getenv('GEMINI_API_KEY')
-        self.openai_key = os.getenv('OPENAI_API_KEY')
-
-        self.use_gemini = bool(self.gemini_key)
-        self.use_openai = bool(self.openai_key)
-        self.use_llm = self.use_gemini or self.use_openai
-
-        if self.use_gemini:
-            try:
-                import google.generativeai as genai
-                genai.configure(api_key=self.gemini_key)
-                self.genai = genai
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-                print("Using Google Gemini for narrative generation")
-            except ImportError:
-                print("Please install google-generativeai: pip install google-generativeai")
-                self.use_gemini = False
-        elif self.use_openai:
-            try:
-                import openai
-                openai.api_key = self.openai_key
-                self.openai = openai
-                self.model = "gpt-3.5-turbo"
-                print("Using OpenAI for narrative generation")
-            except ImportError:
-                print("Please install openai: pip install openai")
-                self.use_openai = False
-    
+    def __init__(self, gateway: LLMGateway = None):
+        # Calls go through the shared gateway (limits, retries, fallback)
+        self.llm = gateway or get_llm_gateway()
+        primary = self.llm.primary()
+        self.use_gemini = bool(primary) and primary.name == 'gemini'
+        self.use_openai = bool(primary) and primary.name == 'openai'
+        self.use_llm = primary is not None
+
     def synthesize_country_report(self, country: str, articles: List[Dict], use_deep_analysis: bool = True) -> str:
         """Generate a professional narrative report for a country using ACTUAL article content"""
 
@@ -68,35 +46,14 @@ class LLMSynthesizer:
                 optimized_articles = optimizer.optimize_for_llm(articles, max_articles=15)
                 article_data = self._prepare_articles(optimized_articles)
 
-            if self.use_gemini:
-                # Use Gemini
-                full_prompt = f"{self._get_system_prompt()}\n\n{self._create_analysis_prompt(country, article_data)}"
-
-                response = self.model.generate_content(
-                    full_prompt,
-                    generation_config={
-                        'temperature': 0.7,
-                        'max_output_tokens': 1500,
-                    }
-                )
-
-                narrative = response.text
-                return narrative
-
-            elif self.use_openai:
-                # Use OpenAI
-                response = self.openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": self._get_system_prompt()},
-                        {"role": "user", "content": self._create_analysis_prompt(country, article_data)}
-                    ],
-                    temperature=0.7,
-                    max_tokens=1500
-                )
-
-                narrative = response.choices[0].message.content
-                return narrative
+            return self.llm.complete(
+                [
+                    {"role": "system", "content": self._get_system_prompt()},
+                    {"role": "user", "content": self._create_analysis_prompt(country, article_data)}
+                ],
+                temperature=0.7,
+                max_tokens=1500
+            )
 
         except Exception as e:
             print(f"LLM synthesis failed: {e}")
@@ -242,38 +199,21 @@ class AlternativeLLM:
     
     def synthesize_with_gemini(self, country: str, articles: List[Dict]) -> str:
         """Use Google Gemini (has free tier)"""
-        import google.generativeai as genai
-        
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
+        try:
+            return get_llm_gateway().generate(self._create_prompt(country, articles), providers=['gemini'])
+        except LLMGatewayError as e:
+            print(f"Gemini synthesis failed: {e}")
             return None
-        
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-pro')
-        
-        prompt = self._create_prompt(country, articles)
-        response = model.generate_content(prompt)
-        
-        return response.text
-    
+
     def synthesize_with_ollama(self, country: str, articles: List[Dict]) -> str:
         """Use Ollama for local LLM (free, runs on your machine)"""
-        import requests
-        
         # Requires Ollama installed locally with a model like llama2 or mistral
-        prompt = self._create_prompt(country, articles)
-        
-        response = requests.post('http://localhost:11434/api/generate', 
-            json={
-                "model": "mistral",  # or "llama2"
-                "prompt": prompt,
-                "stream": False
-            })
-        
-        if response.status_code == 200:
-            return response.json()['response']
-        return None
-    
+        try:
+            return get_llm_gateway().generate(self._create_prompt(country, articles), providers=['ollama'])
+        except LLMGatewayError as e:
+            print(f"Ollama synthesis failed: {e}")
+            return None
+
     def _create_prompt(self, country: str, articles: List[Dict]) -> str:
         article_text = "\n\n".join([
             f"{a.get('title', 'No title')}: {a.get('summary', '')[:300]}"
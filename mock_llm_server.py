@@ -0,0 +1,368 @@
+"""
+Local stand-in LLM server for offline tests and benchmarks
+
+Speaks enough of two protocols for the synthesis path to run end to end
+with no network and no API key:
+- Ollama: GET /api/tags, POST /api/generate and /api/chat (streamed as
+  NDJSON unless "stream": false, as in Ollama)
+- Gemini REST: POST /v1beta/models/<model>:generateContent and
+  :streamGenerateContent (SSE with ?alt=sse, else a JSON array)
+
+Point the app at it with OLLAMA_URL=http://127.0.0.1:11434 or
+GEMINI_API_ENDPOINT=http://127.0.0.1:11434 (any GEMINI_API_KEY).
+
+Answers are deterministic for a given prompt: a three-paragraph brief that
+quotes the prompt's first article title, bullet notes for map-step
+"Summarize" prompts, and one section per "## COUNTRY:" header for batched
+prompts. Timing and failures are configurable:
+- latency before the first token: "0.2", "fixed:0.2", "uniform:0.1,0.5",
+  "normal:0.5,0.1", "lognormal:0.5,0.4" (median, sigma) or "exp:0.5" (mean)
+- tokens_per_second: generation speed after the first token (0 = instant)
+- error_rate / error_status: share of requests answered with an HTTP error
+- hang_rate / hang_seconds: share of requests that stall (client timeouts)
+Random draws come from one seeded generator, so a run is repeatable.
+
+    python mock_llm_server.py --port 11434 --latency lognormal:0.8,0.5 --tps 40 --error-rate 0.05
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+from token_counter import count_tokens, truncate_to_tokens
+
+_TITLE = re.compile(r'^Title: (.+)$', re.M)
+_COUNTRY_HEADER = re.compile(r'^## COUNTRY: (.+)$', re.M)
+_GEMINI_PATH = re.compile(r'^/v1beta/models/([^/:]+):(generateContent|streamGenerateContent)$')
+_ABOUT = re.compile(r'\babout ([A-Z][\w\'-]+(?: [A-Z][\w\'-]+)*)')
+
+_ACTORS = ['armed groups', 'security forces', 'opposition leaders', 'regional officials', 'aid agencies']
+_TRENDS = ['a rise in attacks on transport routes', 'growing pressure on the capital',
+           'competition over revenue from checkpoints', 'a weakening of state presence in rural areas']
+
+
+def parse_latency(spec) -> Callable[[random.Random], float]:
+    """A sampler for a latency spec like "lognormal:0.5,0.4" (seconds)"""
+    if isinstance(spec, (int, float)):
+        return lambda rng: float(spec)
+    kind, _, args = str(spec).partition(':')
+    if not args:
+        kind, args = 'fixed', kind
+    values = [float(v) for v in args.split(',')]
+    if kind == 'fixed':
+        return lambda rng: values[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'normal':
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == 'lognormal':
+        mu = math.log(values[0]) if values[0] > 0 else 0.0
+        return lambda rng: rng.lognormvariate(mu, values[1]) if values[0] > 0 else 0.0
+    if kind == 'exp':
+        return lambda rng: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def mock_completion(prompt: str, max_tokens: Optional[int] = None) -> str:
+    """Deterministic answer shaped like what the synthesis prompts ask for"""
+    seed = int(hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:8], 16)
+    pick = random.Random(seed)
+    titles = _TITLE.findall(prompt)
+    lead = titles[0].strip() if titles else 'the latest reports'
+    about = _ABOUT.search(prompt)
+    subject = about.group(1) if about else 'the country'
+
+    def brief(country: str, lead_title: str) -> str:
+        return (
+            f"The most significant development in {country} is reported as \"{lead_title}\". "
+            f"Reports describe {pick.choice(_ACTORS)} at the centre of events, with {pick.randint(3, 40)} "
+            f"people affected according to local sources.\n\n"
+            f"The pattern points to {pick.choice(_TRENDS)}. The incidents follow earlier tensions and "
+            f"involve {pick.choice(_ACTORS)} and {pick.choice(_ACTORS)}.\n\n"
+            f"The situation in {country} is likely to remain unstable in the coming weeks. "
+            f"Watch for statements from {pick.choice(_ACTORS)} and any spread of violence beyond current areas."
+        )
+
+    countries = _COUNTRY_HEADER.findall(prompt)
+    if countries:
+        sections = []
+        for country in countries:
+            block = prompt.split(f"=== ARTICLES FOR {country} ===", 1)[-1]
+            found = _TITLE.findall(block)
+            sections.append(f"## COUNTRY: {country}\n{brief(country, found[0].strip() if found else lead)}")
+        text = "\n\n".join(sections)
+    elif prompt.lstrip().startswith('Summarize'):
+        text = "\n".join(f"- {t.strip()}: {pick.choice(_ACTORS)} involved, {pick.randint(2, 30)} reported affected."
+                         for t in (titles or [lead])[:5])
+    else:
+        text = brief(subject, lead)
+
+    return truncate_to_tokens(text, max_tokens) if max_tokens else text
+
+
+def _chat_prompt(messages: List[Dict]) -> str:
+    return '\n\n'.join(m.get('content', '') for m in messages)
+
+
+class MockLLMServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency='fixed:0',
+                 tokens_per_second: float = 0, error_rate: float = 0.0, error_status: int = 503,
+                 hang_rate: float = 0.0, hang_seconds: float = 30.0, seed: int = 0,
+                 models: Optional[List[str]] = None):
+        self.latency = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.models = models or ['mistral', 'gemini-1.5-flash']
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockLLMServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True, name="mock-llm")
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted"""
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _draw(self):
+        """(fate, first-token latency) for one request: fate is 'ok', 'error' or 'hang'"""
+        with self._lock:
+            roll = self._rng.random()
+            latency = self.latency(self._rng)
+        if roll < self.error_rate:
+            return 'error', latency
+        if roll < self.error_rate + self.hang_rate:
+            return 'hang', latency
+        return 'ok', latency
+
+    def _pieces(self, text: str) -> List[str]:
+        """The answer cut into roughly token-sized pieces for streaming"""
+        return re.findall(r'\S+\s*|\s+', text) or ['']
+
+    def _token_delay(self, text: str) -> float:
+        return count_tokens(text) / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            # -- plumbing ---------------------------------------------------
+
+            def _body(self) -> Dict:
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+            def _json(self, payload, status: int = 200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _start_stream(self, content_type: str):
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+            def _chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _end_stream(self):
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def _admit(self, kind: str, gemini: bool = False) -> Optional[float]:
+                """Apply the request's fate; its first-token latency if it should be answered"""
+                fate, latency = server._draw()
+                with server._lock:
+                    server.stats[kind] += 1
+                    server.stats[fate] += 1
+                if fate == 'hang':
+                    time.sleep(server.hang_seconds)
+                if fate != 'ok':
+                    message = 'mock server: injected failure'
+                    if gemini:
+                        self._json({'error': {'code': server.error_status, 'message': message,
+                                              'status': 'UNAVAILABLE'}}, server.error_status)
+                    else:
+                        self._json({'error': message}, server.error_status)
+                    return None
+                return latency
+
+            def _stream_pieces(self, text: str, render):
+                """Send text piece by piece at the configured token rate"""
+                delay = server._token_delay(text)
+                pieces = server._pieces(text)
+                for piece in pieces:
+                    if delay:
+                        time.sleep(delay / len(pieces))
+                    self._chunk(render(piece))
+
+            # -- routes -----------------------------------------------------
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path == '/api/tags':
+                    self._json({'models': [{'name': f"{m}:latest", 'model': f"{m}:latest", 'size': 0}
+                                           for m in server.models]})
+                elif path == '/mock/stats':
+                    with server._lock:
+                        self._json(dict(server.stats))
+                else:
+                    self._json({'error': 'not found'}, 404)
+
+            def do_POST(self):
+                parsed = urlparse(self.path)
+                body = self._body()
+                if parsed.path in ('/api/generate', '/api/chat'):
+                    self._ollama(parsed.path == '/api/chat', body)
+                    return
+                match = _GEMINI_PATH.match(parsed.path)
+                if match:
+                    stream = match.group(2) == 'streamGenerateContent'
+                    sse = parse_qs(parsed.query).get('alt', [''])[0] == 'sse'
+                    self._gemini(match.group(1), body, stream, sse)
+                    return
+                self._json({'error': 'not found'}, 404)
+
+            def _ollama(self, chat: bool, body: Dict):
+                if chat:
+                    prompt = _chat_prompt(body.get('messages', []))
+                else:
+                    prompt = '\n\n'.join(p for p in (body.get('system', ''), body.get('prompt', '')) if p)
+                options = body.get('options') or {}
+                latency = self._admit('ollama_chat' if chat else 'ollama_generate')
+                if latency is None:
+                    return
+
+                started = time.monotonic()
+                time.sleep(latency)
+                text = mock_completion(prompt, options.get('num_predict'))
+                model = body.get('model', server.models[0])
+                created = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+                def message(content):
+                    if chat:
+                        return {'message': {'role': 'assistant', 'content': content}}
+                    return {'response': content}
+
+                def final(content):
+                    return dict(message(content), model=model, created_at=created, done=True,
+                                done_reason='stop', total_duration=int((time.monotonic() - started) * 1e9),
+                                prompt_eval_count=count_tokens(prompt), eval_count=count_tokens(text))
+
+                if body.get('stream', True):
+                    self._start_stream('application/x-ndjson')
+                    self._stream_pieces(text, lambda piece: json.dumps(
+                        dict(message(piece), model=model, created_at=created, done=False)).encode() + b"\n")
+                    self._chunk(json.dumps(final('')).encode() + b"\n")
+                    self._end_stream()
+                else:
+                    time.sleep(server._token_delay(text))
+                    self._json(final(text))
+
+            def _gemini(self, model: str, body: Dict, stream: bool, sse: bool):
+                prompt = '\n\n'.join(part.get('text', '') for content in body.get('contents', [])
+                                     for part in content.get('parts', []))
+                config = body.get('generationConfig') or {}
+                latency = self._admit('gemini_stream' if stream else 'gemini_generate', gemini=True)
+                if latency is None:
+                    return
+
+                time.sleep(latency)
+                text = mock_completion(prompt, config.get('maxOutputTokens'))
+                usage = {'promptTokenCount': count_tokens(prompt), 'candidatesTokenCount': count_tokens(text),
+                         'totalTokenCount': count_tokens(prompt) + count_tokens(text)}
+
+                def response(content, finish=None):
+                    candidate = {'content': {'parts': [{'text': content}], 'role': 'model'}, 'index': 0}
+                    if finish:
+                        candidate['finishReason'] = finish
+                    return {'candidates': [candidate], 'usageMetadata': usage}
+
+                if not stream:
+                    time.sleep(server._token_delay(text))
+                    self._json(response(text, 'STOP'))
+                    return
+
+                if sse:
+                    self._start_stream('text/event-stream')
+                    self._stream_pieces(text, lambda piece: b"data: " + json.dumps(response(piece)).encode() + b"\r\n\r\n")
+                    self._chunk(b"data: " + json.dumps(response('', 'STOP')).encode() + b"\r\n\r\n")
+                else:
+                    # Without alt=sse the stream is one JSON array, sent element by element
+                    self._start_stream('application/json')
+                    self._chunk(b"[")
+                    self._stream_pieces(text, lambda piece: json.dumps(response(piece)).encode() + b",\r\n")
+                    self._chunk(json.dumps(response('', 'STOP')).encode() + b"]")
+                self._end_stream()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Ollama/Gemini server for offline benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', default='fixed:0', help='First-token latency, e.g. lognormal:0.5,0.4')
+    parser.add_argument('--tps', type=float, default=0, help='Generated tokens per second (0 = instant)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--hang-rate', type=float, default=0.0)
+    parser.add_argument('--hang-seconds', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--model', action='append', help='Model to list in /api/tags (repeatable)')
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, args.latency, args.tps, args.error_rate, args.error_status,
+                           args.hang_rate, args.hang_seconds, args.seed, args.model)
+    print(f"[Mock LLM] Serving Ollama and Gemini APIs on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
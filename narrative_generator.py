@@ -2,6 +2,7 @@ import re
 from datetime import datetime
 from collections import defaultdict, Counter
 import random
+from incident_clusterer import group_into_events
 
 class NarrativeGenerator:
     """Generates readable narrative intelligence reports from collected articles"""
@@ -28,7 +29,7 @@ class NarrativeGenerator:
         narrative = []
         
         # Opening paragraph - Overview
-        narrative.append(self._generate_opening(country, articles, themes, sentiment))
+        narrative.append(self._generate_opening(country, articles, themes, sentiment, timeline))
         
         # Security situation
         if themes['security']:
@@ -127,11 +128,12 @@ class NarrativeGenerator:
         return Counter(actors).most_common(5)
     
     def _build_timeline(self, articles):
-        """Build chronological timeline of events"""
-        # Sort articles by date if available
-        return sorted(articles, key=lambda x: x.get('published', ''), reverse=True)
+        """Build chronological timeline of events (most recent first)"""
+        # Cluster articles into incidents, then order incidents by activity
+        events = group_into_events(articles)
+        return sorted(events, key=lambda e: e['last_seen_ts'], reverse=True)
     
-    def _generate_opening(self, country, articles, themes, sentiment):
+    def _generate_opening(self, country, articles, themes, sentiment, timeline=None):
         """Generate opening overview paragraph"""
         article_count = len(articles)
         theme_counts = {k: len(v) for k, v in themes.items() if v}
@@ -148,6 +150,10 @@ class NarrativeGenerator:
         
         opening = f"The security and political situation in {country} presents a {sentiment_desc} picture "
         opening += f"based on analysis of {article_count} intelligence reports from the past 24-48 hours. "
+
+        if timeline and len(timeline) < article_count:
+            opening += f"These reports describe {len(timeline)} distinct incidents, "
+            opening += f"the most recent being: {timeline[0]['title']}. "
         
         if dominant_theme == 'security':
             opening += f"Security concerns dominate the current intelligence picture, with {theme_counts['security']} "
@@ -0,0 +1,286 @@
+"""
+Near-duplicate article clustering with locality-sensitive hashing
+
+Wire stories are syndicated across dozens of outlets with small edits to the
+headline and lead. Exact title/link matching misses them, so we hash:
+- titles with SimHash (catches reworded headlines)
+- body text with MinHash, banded for LSH (catches copied wire copy)
+and collapse each cluster to one representative with a source count.
+"""
+import hashlib
+import re
+from typing import List, Dict, Iterable, Set
+
+# MinHash parameters: 64 bins in 16 bands x 4 rows -> pairs above ~0.5 Jaccard collide
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+JACCARD_THRESHOLD = 0.5
+
+# SimHash: 64-bit fingerprints, near if at most 3 bits differ
+SIMHASH_BITS = 64
+SIMHASH_MAX_DISTANCE = 3
+SIMHASH_BLOCKS = SIMHASH_MAX_DISTANCE + 1  # pigeonhole: one block must match exactly
+
+_EMPTY_BIN = (1 << 64) - 1
+
+_STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'to', 'in', 'on', 'at', 'for', 'by',
+    'with', 'from', 'as', 'is', 'are', 'was', 'were', 'be', 'has', 'have', 'it',
+    'its', 'this', 'that', 'after', 'over', 'says', 'said'
+}
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def strip_publisher_suffix(title: str, source: str = '') -> str:
+    """Remove the ' - Publisher' suffix Google News appends to titles"""
+    if ' - ' in title:
+        head, tail = title.rsplit(' - ', 1)
+        if source:
+            if tail.strip().lower() == source.strip().lower():
+                return head
+        elif len(tail) < 30:
+            return head
+    return title
+
+
+def _tokens(text: str) -> List[str]:
+    return [w for w in _WORD_PATTERN.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def title_key(article: Dict) -> str:
+    """Stable key for an article's story: its normalized headline, hashed"""
+    title = strip_publisher_suffix(article.get('title', ''), article.get('source', ''))
+    return format(_hash64(' '.join(_tokens(title))), '016x')
+
+
+def _article_text(article: Dict) -> str:
+    return (article.get('full_content') or article.get('full_text')
+            or article.get('summary') or '')
+
+
+def simhash(tokens: Iterable[str]) -> int:
+    """64-bit SimHash over unigrams and bigrams"""
+    tokens = list(tokens)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not features:
+        return 0
+
+    # Majority vote per bit position; zip over bit strings keeps the
+    # per-bit counting in C instead of a 64-step Python loop per feature
+    bit_strings = [format(_hash64(feature), '064b') for feature in features]
+    half = len(bit_strings) / 2
+
+    fingerprint = 0
+    for position, column in enumerate(zip(*bit_strings)):
+        if column.count('1') > half:
+            fingerprint |= 1 << (SIMHASH_BITS - 1 - position)
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def shingles(tokens: List[str], size: int = 3) -> Set[int]:
+    """Hashed word n-gram shingles (falls back to unigrams for short text)"""
+    if len(tokens) < size:
+        return {_hash64(t) for t in tokens}
+    return {_hash64(' '.join(tokens[i:i + size])) for i in range(len(tokens) - size + 1)}
+
+
+def minhash(shingle_hashes: Set[int]) -> List[int]:
+    """
+    MinHash signature via one-permutation hashing
+
+    Each shingle hash is used once: its low bits pick a bin and the rest is
+    the value, keeping the minimum per bin. This costs O(shingles) instead
+    of O(shingles x permutations) and estimates Jaccard just as well.
+    """
+    signature = [_EMPTY_BIN] * NUM_PERMUTATIONS
+    for h in shingle_hashes:
+        bin_index = h % NUM_PERMUTATIONS
+        value = h // NUM_PERMUTATIONS
+        if value < signature[bin_index]:
+            signature[bin_index] = value
+    return signature
+
+
+def estimate_jaccard(sig_a: List[int], sig_b: List[int]) -> float:
+    """Jaccard estimate ignoring bins that are empty in both signatures"""
+    matches = 0
+    used = 0
+    for x, y in zip(sig_a, sig_b):
+        if x == _EMPTY_BIN and y == _EMPTY_BIN:
+            continue
+        used += 1
+        if x == y:
+            matches += 1
+    return matches / used if used else 0.0
+
+
+def fingerprint_article(article: Dict) -> Dict:
+    """Compute (and memoize on the article) its SimHash and MinHash signature"""
+    cached = article.get('_near_dup_fp')
+    if cached:
+        return cached
+
+    title = strip_publisher_suffix(article.get('title', ''), article.get('source', ''))
+    title_tokens = _tokens(title)
+    # Syndicated copies share the lead, so the first ~120 words are enough
+    body_tokens = _tokens(_article_text(article)[:1000])[:120]
+
+    # Outlets rewrite headlines but copy the wire body, so compare bodies
+    # when there is enough text and fall back to title + body otherwise
+    text_tokens = body_tokens if len(body_tokens) >= 10 else title_tokens + body_tokens
+
+    fp = {
+        'simhash': simhash(title_tokens),
+        'minhash': minhash(shingles(text_tokens)),
+        'title_terms': len(title_tokens)
+    }
+    article['_near_dup_fp'] = fp
+    return fp
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # Keep the earliest article as root so cluster order is stable
+            if rj < ri:
+                ri, rj = rj, ri
+            self.parent[rj] = ri
+
+
+def cluster_near_duplicates(articles: List[Dict]) -> List[List[int]]:
+    """
+    Group article indexes into near-duplicate clusters
+
+    Candidates come from LSH buckets (SimHash blocks and MinHash bands),
+    so the work is roughly linear in the number of articles.
+    """
+    fps = [fingerprint_article(a) for a in articles]
+    uf = _UnionFind(len(articles))
+    buckets = {}
+
+    block_bits = SIMHASH_BITS // SIMHASH_BLOCKS
+    block_mask = (1 << block_bits) - 1
+
+    for idx, fp in enumerate(fps):
+        keys = []
+        # Very short titles ("Live updates") collide by accident; skip SimHash for them
+        if fp['title_terms'] >= 4:
+            keys.extend(
+                ('s', block, (fp['simhash'] >> (block * block_bits)) & block_mask)
+                for block in range(SIMHASH_BLOCKS)
+            )
+        for band in range(BANDS):
+            rows = tuple(fp['minhash'][band * ROWS:(band + 1) * ROWS])
+            # Short texts leave bins empty; an all-empty band says nothing
+            if any(value != _EMPTY_BIN for value in rows):
+                keys.append(('m', band, rows))
+        for key in keys:
+            buckets.setdefault(key, []).append(idx)
+
+    checked = set()
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                if (i, j) in checked or uf.find(i) == uf.find(j):
+                    continue
+                checked.add((i, j))
+                fi, fj = fps[i], fps[j]
+                title_near = (
+                    min(fi['title_terms'], fj['title_terms']) >= 4 and
+                    hamming_distance(fi['simhash'], fj['simhash']) <= SIMHASH_MAX_DISTANCE
+                )
+                if title_near or estimate_jaccard(fi['minhash'], fj['minhash']) >= JACCARD_THRESHOLD:
+                    uf.union(i, j)
+
+    clusters = {}
+    for idx in range(len(articles)):
+        clusters.setdefault(uf.find(idx), []).append(idx)
+    return list(clusters.values())
+
+
+def collapse_near_duplicates(articles: List[Dict]) -> List[Dict]:
+    """
+    Collapse each near-duplicate cluster to one representative article
+
+    The representative is the copy with the most text. It gains:
+        source_count: number of distinct outlets carrying the story
+        sources: those outlet names
+        duplicate_links: links of the collapsed copies
+    Representatives keep the order in which their stories first appeared.
+    """
+    if not articles:
+        return []
+
+    collapsed = []
+    for members in cluster_near_duplicates(articles):
+        copies = [articles[i] for i in members]
+        representative = max(copies, key=lambda a: len(_article_text(a)))
+        rep = {k: v for k, v in representative.items() if k != '_near_dup_fp'}
+
+        # Copies may be representatives from an earlier pass: merge what they
+        # already carry so collapsing twice equals collapsing once
+        sources = []
+        links = []
+        for copy in copies:
+            for source in copy.get('sources') or [copy.get('source', 'Unknown')]:
+                if source not in sources:
+                    sources.append(source)
+            if copy is not representative and copy.get('link'):
+                links.append(copy['link'])
+            links.extend(copy.get('duplicate_links', []))
+
+        rep['source_count'] = len(sources)
+        rep['sources'] = sources
+        rep['duplicate_links'] = [
+            link for link in dict.fromkeys(links) if link != representative.get('link')
+        ]
+        collapsed.append(rep)
+
+    for article in articles:
+        article.pop('_near_dup_fp', None)
+
+    if len(collapsed) < len(articles):
+        print(f"Near-duplicate clustering: {len(articles)} articles -> {len(collapsed)} stories")
+    return collapsed
+
+
+if __name__ == "__main__":
+    sample = [
+        {'title': 'Russian jets violate Estonian airspace, NATO scrambles fighters - Reuters',
+         'summary': 'Three Russian MiG-31 jets entered Estonian airspace for 12 minutes on Friday.',
+         'source': 'Reuters'},
+        {'title': 'Russian jets violate Estonian airspace, NATO scrambles fighters - Yahoo News',
+         'summary': 'Three Russian MiG-31 jets entered Estonian airspace for 12 minutes on Friday.',
+         'source': 'Yahoo News'},
+        {'title': 'NATO scrambles fighters as Russian jets violate Estonia airspace - US News',
+         'summary': 'Three Russian MiG-31 jets entered Estonian airspace for 12 minutes on Friday, officials said.',
+         'source': 'US News'},
+        {'title': 'Haiti gang violence displaces thousands in capital - AP News',
+         'summary': 'Armed gangs attacked neighborhoods in Port-au-Prince overnight.',
+         'source': 'AP News'},
+    ]
+
+    for story in collapse_near_duplicates(sample):
+        print(f"[{story['source_count']} sources] {story['title']}")
@@ -5,6 +5,7 @@ Free, private, and runs entirely on your machine
 import os
 import requests
 import json
+from http_client import get_http_client
 from typing import List, Dict, Any
 
 class OllamaSynthesizer:
@@ -19,15 +20,15 @@ class OllamaSynthesizer:
         self.model = os.getenv('OLLAMA_MODEL', model)
         self.base_url = os.getenv('OLLAMA_URL', base_url)
         self.timeout = 120  # Ollama can be slow on first run
-
-        # Test connection
-        self.test_connection()
+        # No connection test here: it blocked every construction for up to 5s.
+        # The provider registry probes the server once, in the background.
+        self.http = get_http_client()
 
     def test_connection(self):
         """Test if Ollama is running and model is available"""
         try:
             # Check if Ollama is running
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.http.get(f"{self.base_url}/api/tags", timeout=5)
             if response.status_code != 200:
                 print(f"Warning: Ollama may not be running at {self.base_url}")
                 return False
@@ -62,7 +63,7 @@ class OllamaSynthesizer:
             Generated text
         """
         try:
-            response = requests.post(
+            response = self.http.post(
                 f"{self.base_url}/api/generate",
                 json={
                     "model": self.model,
@@ -0,0 +1,186 @@
+"""
+Process-wide persistent TTL cache for slow-changing reference data
+
+Country facts, Wikipedia extracts and section lists change over days, but
+every /api/historical, /api/chat and synthesized /api/fetch_news call used
+to re-query REST Countries and Wikipedia through a fresh instance with an
+empty cache. This cache is shared by the whole process and stored on disk:
+- an in-memory front (dict lookups, microseconds) for warm keys
+- a SQLite table behind it (WAL mode) so entries survive restarts and are
+  shared between worker processes
+- per-entry TTLs; "not found" answers can be kept briefly (negative TTL)
+  while errors are never cached
+- get_or_fetch runs at most one fetch per key at a time
+
+Values must be JSON-serializable. Returned values are shared, so callers
+must treat them as read-only.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DAY = 86400
+COUNTRY_FACTS_TTL = 7 * DAY
+WIKI_TTL = 3 * DAY
+NEGATIVE_TTL = 3600
+MEMORY_ENTRIES = 4096
+
+_MISSING = object()
+
+
+class PersistentCache:
+    def __init__(self, db_path: str = "data/cache.db", memory_entries: int = MEMORY_ENTRIES):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()  # (namespace, key) -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self.stats = {'memory_hit': 0, 'disk_hit': 0, 'miss': 0, 'fetch': 0}
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        try:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.DatabaseError:
+            pass  # e.g. network filesystems; the default journal still works
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        ''')
+        self._conn.commit()
+
+    def _remember(self, slot: Tuple[str, str], expires_at: float, value: Any):
+        self._memory[slot] = (expires_at, value)
+        self._memory.move_to_end(slot)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        """The cached value, or default if absent or expired"""
+        slot = (namespace, key)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(slot)
+            if entry is not None:
+                if entry[0] > now:
+                    self.stats['memory_hit'] += 1
+                    return entry[1]
+                del self._memory[slot]
+
+            row = self._conn.execute(
+                'SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?',
+                (namespace, key, now)
+            ).fetchone()
+            if row is None:
+                self.stats['miss'] += 1
+                return default
+            value = json.loads(row[0])
+            self._remember(slot, row[1], value)
+            self.stats['disk_hit'] += 1
+            return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        """Store a JSON-serializable value for ttl seconds"""
+        expires_at = time.time() + ttl
+        encoded = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)',
+                (namespace, key, encoded, expires_at)
+            )
+            self._conn.commit()
+            self._remember((namespace, key), expires_at, value)
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._memory.pop((namespace, key), None)
+            self._conn.execute('DELETE FROM cache WHERE namespace = ? AND key = ?', (namespace, key))
+            self._conn.commit()
+
+    def _key_lock(self, slot: Tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(slot, threading.Lock())
+
+    def get_or_fetch(self, namespace: str, key: str, fetch: Callable[[], Any], ttl: float,
+                     negative_ttl: Optional[float] = NEGATIVE_TTL) -> Any:
+        """
+        The cached value, or fetch() stored for ttl seconds
+
+        A None result is cached for negative_ttl (skip with None); if fetch
+        raises, nothing is cached and the error propagates. Concurrent
+        callers for the same key wait for a single fetch.
+        """
+        value = self.get(namespace, key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        slot = (namespace, key)
+        with self._key_lock(slot):
+            value = self.get(namespace, key, _MISSING)
+            if value is not _MISSING:
+                return value
+            self.stats['fetch'] += 1
+            value = fetch()
+            if value is not None:
+                self.set(namespace, key, value, ttl)
+            elif negative_ttl:
+                self.set(namespace, key, None, negative_ttl)
+        with self._lock:
+            self._key_locks.pop(slot, None)
+        return value
+
+    def purge_expired(self) -> int:
+        """Delete expired rows; returns how many were removed"""
+        now = time.time()
+        with self._lock:
+            for slot in [s for s, (expires_at, _) in self._memory.items() if expires_at <= now]:
+                del self._memory[slot]
+            removed = self._conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now,)).rowcount
+            self._conn.commit()
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Singleton instance
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_persistent_cache() -> PersistentCache:
+    """Get or create the shared persistent cache"""
+    global _cache_instance
+    with _cache_lock:
+        if _cache_instance is None:
+            _cache_instance = PersistentCache()
+            _cache_instance.purge_expired()
+    return _cache_instance
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PersistentCache(f"{tmp}/cache.db")
+        cache.set('country_basics', 'haiti', {'capital': 'Port-au-Prince', 'population': 11724763}, DAY)
+
+        start = time.perf_counter()
+        for _ in range(100000):
+            cache.get('country_basics', 'haiti')
+        print(f"warm lookup: {(time.perf_counter() - start) * 10:.2f} us")
+
+        reopened = PersistentCache(f"{tmp}/cache.db")
+        start = time.perf_counter()
+        reopened.get('country_basics', 'haiti')
+        print(f"first lookup after restart: {(time.perf_counter() - start) * 1e6:.0f} us")
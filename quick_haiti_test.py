@@ -1,10 +1,6 @@
 """Quick test for Haiti RSS feeds"""
 import json
-import feedparser
-import socket
-
-# Set timeout for fetching feeds
-socket.setdefaulttimeout(5)
+from http_client import fetch_feed
 
 def quick_test():
     # Load sources
@@ -31,7 +27,7 @@ def quick_test():
         print(f"Testing: {source['name']}")
 
         try:
-            feed = feedparser.parse(source['url'])
+            feed = fetch_feed(source['url'], timeout=(3.05, 5))
 
             if feed.entries:
                 count = len(feed.entries)
@@ -5,6 +5,7 @@ from pathlib import Path
 import logging
 from collections import defaultdict
 import re
+from date_normalizer import get_date_normalizer, sort_newest_first, format_ts
 
 logger = logging.getLogger(__name__)
 
@@ -41,12 +42,9 @@ class ReportGenerator:
             category = article.get('category', 'general')
             categorized[category].append(article)
         
-        # Sort articles within each category by publication date
+        # Sort articles within each category by publication date (UTC epoch)
         for category in categorized:
-            categorized[category].sort(
-                key=lambda x: x.get('published', ''),
-                reverse=True
-            )
+            categorized[category] = sort_newest_first(categorized[category])
         
         return dict(categorized)
     
@@ -255,8 +253,6 @@ Total Articles: {sum(len(articles) for articles in categorized.values())}
         return text
     
     def _format_date(self, date_str: str) -> str:
-        try:
-            dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-            return dt.strftime('%B %d, %Y at %I:%M %p')
-        except:
-            return date_str
\ No newline at end of file
+        # Any feed date format; shown in UTC
+        ts = get_date_normalizer().parse(date_str)
+        return format_ts(ts, '%B %d, %Y at %I:%M %p UTC', default=date_str)
\ No newline at end of file
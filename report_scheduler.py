@@ -18,14 +18,23 @@ from dotenv import load_dotenv
 from scheduled_reports import ScheduledReport
 from report_synthesizer import IntelligenceSynthesizer
 from google_news_engine import GoogleNewsEngine
+from date_normalizer import published_ts, format_ts
 from article_extractor import ArticleExtractor
 from fast_llm_synthesizer import FastLLMSynthesizer
+from llm_gateway import get_llm_gateway
+from near_duplicates import collapse_near_duplicates, title_key
 
 load_dotenv()
 
+# Incremental narratives: above this many new articles the brief is rewritten
+# from scratch, as it is after MAX_INCREMENTAL_UPDATES updates in a row
+FULL_REFRESH_NEW_ARTICLES = 40
+MAX_INCREMENTAL_UPDATES = 24
+MAX_FINGERPRINTS = 2000
+
 class ReportScheduler:
-    def __init__(self):
-        self.db = ScheduledReport()
+    def __init__(self, db: ScheduledReport = None):
+        self.db = db or ScheduledReport()
         self.running = False
         self.thread = None
         self.check_interval = 60  # Check every minute
@@ -83,7 +92,8 @@ class ReportScheduler:
             report_data = self._generate_report(
                 report['countries'],
                 report.get('prompt', ''),
-                report['schedule_type']
+                report['schedule_type'],
+                report_id=report['id']
             )
 
             # Format the report
@@ -119,7 +129,8 @@ class ReportScheduler:
         except Exception as e:
             raise Exception(f"Report generation failed: {str(e)}")
 
-    def _generate_report(self, countries: List[str], prompt: str, schedule_type: str) -> Dict:
+    def _generate_report(self, countries: List[str], prompt: str, schedule_type: str,
+                         report_id: int = None) -> Dict:
         """Generate report data for specified countries with time-based filtering"""
         google_engine = GoogleNewsEngine()
         synthesizer = IntelligenceSynthesizer()
@@ -164,6 +175,9 @@ class ReportScheduler:
                 seen_urls.add(article['link'])
                 unique_articles.append(article)
 
+        # Collapse syndicated copies so the LLM sees each story once
+        unique_articles = collapse_near_duplicates(unique_articles)
+
         # Synthesize reports by country
         country_reports = synthesizer.synthesize_by_country(unique_articles, countries)
 
@@ -174,13 +188,8 @@ class ReportScheduler:
 
         # Try to add LLM narratives if available
         try:
-            if os.getenv('GEMINI_API_KEY'):
-                fast_synth = FastLLMSynthesizer()
-                for country, data in country_reports.items():
-                    # Pass prompt to LLM for focused analysis
-                    result = fast_synth.synthesize_country_report(country, data['articles'], custom_prompt=prompt)
-                    data['narrative'] = result['narrative']
-                    data['articles_with_content'] = result['articles_with_content']
+            if get_llm_gateway().available():
+                self._add_narratives(country_reports, prompt, report_id, FastLLMSynthesizer())
         except:
             pass  # Continue without LLM if it fails
 
@@ -191,6 +200,61 @@ class ReportScheduler:
             'generated_at': datetime.now().isoformat()
         }
 
+    def _add_narratives(self, country_reports: Dict, prompt: str, report_id: int, fast_synth):
+        """
+        Narrative per country, reusing the last run's where possible
+
+        With state from an earlier run (same prompt), only articles not seen
+        then are sent, together with the prior narrative; with none new the
+        prior narrative is kept and no LLM call is made. Many new articles,
+        a changed prompt or a long run of updates mean a full rewrite; those
+        countries are written together so small ones can share a prompt.
+        """
+        fingerprints = {}
+        updates = {}
+        results = {}
+        rewrite = {}
+        for country, data in country_reports.items():
+            fingerprints[country] = list(dict.fromkeys(title_key(a) for a in data['articles']))
+            updates[country] = 0
+            state = self.db.get_narrative_state(report_id, country) if report_id is not None else None
+            if state and state['prompt'] != (prompt or ''):
+                state = None
+            if not state:
+                rewrite[country] = data['articles']
+                continue
+
+            known = set(state['fingerprints'])
+            new_articles = [a for a in data['articles'] if title_key(a) not in known]
+            fingerprints[country] = list(dict.fromkeys(fingerprints[country] + state['fingerprints']))
+
+            if not new_articles:
+                print(f"  {country}: no new articles since the last run; keeping narrative")
+                data['narrative'] = state['narrative']
+                updates[country] = state['updates']
+            elif len(new_articles) <= FULL_REFRESH_NEW_ARTICLES and state['updates'] < MAX_INCREMENTAL_UPDATES:
+                print(f"  {country}: updating narrative with {len(new_articles)} new articles")
+                results[country] = fast_synth.update_country_report(country, state['narrative'], new_articles,
+                                                                    custom_prompt=prompt)
+                updates[country] = state['updates'] + 1
+            else:
+                rewrite[country] = data['articles']
+
+        if rewrite:
+            # Pass prompt to LLM for focused analysis
+            results.update(fast_synth.synthesize_country_reports(rewrite, custom_prompt=prompt))
+
+        for country, data in country_reports.items():
+            result = results.get(country, {})
+            if result:
+                data['narrative'] = result['narrative']
+                data['articles_with_content'] = result['articles_with_content']
+
+            # A fallback narrative isn't stored, so the next run tries the LLM again
+            if report_id is not None and data.get('narrative') and not result.get('fallback'):
+                self.db.save_narrative_state(report_id, country, data['narrative'],
+                                             fingerprints[country][:MAX_FINGERPRINTS], prompt, updates[country])
+
     def _format_report(self, report_name: str, countries: List[str],
                       prompt: str, report_data: Dict) -> str:
         """Format report data into readable text"""
@@ -535,13 +599,9 @@ class ReportScheduler:
 
                 # Format date if available
                 date_str = ""
-                if published:
-                    try:
-                        from datetime import datetime as dt
-                        pub_date = dt.fromisoformat(published.replace('Z', '+00:00'))
-                        date_str = f" • {pub_date.strftime('%b %d, %Y')}"
-                    except:
-                        date_str = ""
+                ts = published_ts(article) if published else None
+                if ts is not None:
+                    date_str = f" • {format_ts(ts, '%b %d, %Y')}"
 
                 html += f"""
                     <div class="article">
@@ -1,6 +1,7 @@
 from collections import defaultdict
 from datetime import datetime
 import re
+from incident_clusterer import group_into_events
 
 class IntelligenceSynthesizer:
     """Synthesizes articles into professional intelligence reports by country"""
@@ -96,14 +97,16 @@ class IntelligenceSynthesizer:
         return " ".join(summary_parts)
     
     def extract_key_points(self, articles, max_points=5):
-        """Extract key bullet points from articles"""
+        """Extract key bullet points from articles, one per incident"""
         points = []
         seen_topics = set()
         
-        for article in articles[:max_points]:
+        # Most widely reported incidents first
+        for event in group_into_events(articles):
             # Extract first sentence or key point
-            title = article['title']
-            summary = article['summary']
+            lead = event['lead_article']
+            title = lead['title']
+            summary = lead.get('summary', '')
             
             # Clean and truncate
             point = title if len(title) < 100 else summary[:100]
@@ -113,6 +116,9 @@ class IntelligenceSynthesizer:
             if topic_key not in seen_topics:
                 points.append(point)
                 seen_topics.add(topic_key)
+
+            if len(points) >= max_points:
+                break
         
         return points
     
@@ -8,9 +8,9 @@ from typing import List, Dict, Optional
 import pytz
 
 class ScheduledReport:
-    def __init__(self):
+    def __init__(self, db_path: str = 'security_monitor.db'):
         # Create a new connection for each instance to avoid threading issues
-        self.conn = sqlite3.connect('security_monitor.db', check_same_thread=False)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.create_tables()
 
     def create_tables(self):
@@ -46,6 +46,21 @@ class ScheduledReport:
                 FOREIGN KEY (report_id) REFERENCES scheduled_reports (id)
             )
         ''')
+
+        # Last narrative per report and country, for incremental updates
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS narrative_state (
+                report_id INTEGER,
+                country TEXT,
+                narrative TEXT,
+                fingerprints TEXT,
+                prompt TEXT,
+                updates INTEGER DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (report_id, country),
+                FOREIGN KEY (report_id) REFERENCES scheduled_reports (id)
+            )
+        ''')
         self.conn.commit()
 
     def create_report(self, name: str, countries: List[str], prompt: str,
@@ -181,8 +196,9 @@ class ScheduledReport:
         """Delete a scheduled report"""
         cursor = self.conn.cursor()
 
-        # Delete history first
+        # Delete history and narrative state first
         cursor.execute('DELETE FROM report_history WHERE report_id = ?', (report_id,))
+        cursor.execute('DELETE FROM narrative_state WHERE report_id = ?', (report_id,))
 
         # Delete report
         cursor.execute('DELETE FROM scheduled_reports WHERE id = ?', (report_id,))
@@ -280,6 +296,36 @@ class ScheduledReport:
 
         return history
 
+    def get_narrative_state(self, report_id: int, country: str) -> Optional[Dict]:
+        """Narrative and article fingerprints from the report's last run for country"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT narrative, fingerprints, prompt, updates, updated_at
+            FROM narrative_state
+            WHERE report_id = ? AND country = ?
+        ''', (report_id, country))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return {
+            'narrative': row[0],
+            'fingerprints': json.loads(row[1]) if row[1] else [],
+            'prompt': row[2] or '',
+            'updates': row[3] or 0,
+            'updated_at': row[4]
+        }
+
+    def save_narrative_state(self, report_id: int, country: str, narrative: str,
+                             fingerprints: List[str], prompt: str = '', updates: int = 0):
+        """Store the narrative a run produced and the articles it covered"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO narrative_state
+                (report_id, country, narrative, fingerprints, prompt, updates, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (report_id, country, narrative, json.dumps(fingerprints), prompt or '', updates))
+        self.conn.commit()
+
     def _calculate_next_run(self, schedule_type: str, schedule_time: str,
                            timezone_str: str) -> str:
         """Calculate the next run time based on schedule"""
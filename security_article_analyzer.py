@@ -1,9 +1,7 @@
 """Security-focused article analyzer that reads full content for deep intelligence"""
-import requests
-from bs4 import BeautifulSoup
-import feedparser
 from typing import List, Dict
-import re
+from token_counter import count_tokens, truncate_to_tokens, pack_articles
+from extraction_engine import get_extraction_engine
 
 class SecurityArticleAnalyzer:
     def __init__(self):
@@ -116,46 +114,10 @@ class SecurityArticleAnalyzer:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
 
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-
-            # Try common article content selectors
-            article_text = ""
-
-            # Try different content selectors
-            selectors = [
-                'article',
-                'div.article-content',
-                'div.story-body',
-                'div.content',
-                'main',
-                'div.entry-content',
-                'div.post-content',
-                '[itemprop="articleBody"]'
-            ]
-
-            for selector in selectors:
-                content = soup.select_one(selector)
-                if content:
-                    article_text = content.get_text(separator=' ', strip=True)
-                    break
-
-            # Fallback: get all paragraphs
-            if not article_text:
-                paragraphs = soup.find_all('p')
-                if paragraphs:
-                    article_text = ' '.join([p.get_text(strip=True) for p in paragraphs])
-
-            # Clean up text
-            article_text = re.sub(r'\s+', ' ', article_text)
-            article_text = article_text.strip()
+            # Stream the byte-capped page into the lxml-based engine, keeping
+            # just over 5000 chars of article text
+            article_text = get_extraction_engine().extract_url(
+                url, max_chars=5001, timeout=(3.05, 10), headers=headers)['body']
 
             # Limit to reasonable length (5000 chars) to avoid token overload
             if len(article_text) > 5000:
@@ -288,57 +250,62 @@ class SecurityArticleAnalyzer:
         else:
             return "LOW"
 
-    def prepare_for_llm(self, analysis: Dict, max_chars: int = 4000) -> str:
+    def prepare_for_llm(self, analysis: Dict, max_tokens: int = 1000) -> str:
         """
         Prepare analyzed content for LLM synthesis
-        Includes full text excerpts, not just headlines
+        Includes full text excerpts, not just headlines, packed to max_tokens
         """
-        parts = []
+        header = []
 
         # Add threat assessment
-        parts.append(f"THREAT LEVEL: {analysis['threat_assessment']}\n")
+        header.append(f"THREAT LEVEL: {analysis['threat_assessment']}\n")
 
         # Add top categories
         if analysis['top_categories']:
-            parts.append("PRIMARY CONCERNS:")
+            header.append("PRIMARY CONCERNS:")
             for cat in analysis['top_categories'][:3]:
-                parts.append(f"- {cat['category'].replace('_', ' ').title()}: {cat['count']} incidents")
-            parts.append("")
-
-        # Add articles with full text excerpts
-        parts.append("DETAILED INTELLIGENCE:\n")
-
-        for i, article in enumerate(analysis['articles'][:5], 1):
-            parts.append(f"[{i}] {article['title']}")
-            parts.append(f"    Date: {article.get('published', 'Unknown')}")
-            parts.append(f"    Categories: {', '.join(article.get('security_analysis', {}).get('categories', []))}")
+                header.append(f"- {cat['category'].replace('_', ' ').title()}: {cat['count']} incidents")
+            header.append("")
 
-            # Include meaningful excerpt from full text
-            full_text = article.get('full_text', '')
-            if full_text:
-                # Get first 300 chars of actual content
-                excerpt = full_text[:300].strip()
-                if len(full_text) > 300:
-                    # Try to end at sentence
-                    last_period = excerpt.rfind('. ')
-                    if last_period > 200:
-                        excerpt = excerpt[:last_period + 1]
-                    else:
-                        excerpt += "..."
-                parts.append(f"    Content: {excerpt}")
-            parts.append("")
+        header.append("DETAILED INTELLIGENCE:\n")
 
         # Add key themes
+        footer = []
         if analysis['key_themes']:
-            parts.append("KEY THEMES:")
+            footer.append("KEY THEMES:")
             for theme in analysis['key_themes']:
-                parts.append(f"- {theme}")
+                footer.append(f"- {theme}")
+
+        header_text = '\n'.join(header)
+        footer_text = '\n'.join(footer)
+        article_budget = max_tokens - count_tokens(header_text) - count_tokens(footer_text) - 2
+
+        def render(article, excerpt):
+            lines = [
+                f"[#] {article['title']}",
+                f"    Date: {article.get('published', 'Unknown')}",
+                f"    Categories: {', '.join(article.get('security_analysis', {}).get('categories', []))}"
+            ]
+            if excerpt:
+                lines.append(f"    Content: {excerpt}")
+            return '\n'.join(lines) + '\n'
+
+        # Articles with full text excerpts, most relevant first
+        packed = pack_articles(
+            analysis['articles'], article_budget, render,
+            score=lambda a: a.get('relevance_score', 0),
+            snippet_tokens=(0, 40, 75, 150)
+        )
+        blocks = [
+            block.replace("[#]", f"[{i}]", 1)
+            for i, (_, block) in enumerate(packed, 1)
+        ]
 
-        result = '\n'.join(parts)
+        result = '\n'.join([header_text] + blocks + [footer_text])
 
         # Trim if too long
-        if len(result) > max_chars:
-            result = result[:max_chars] + "\n[Content trimmed]"
+        if count_tokens(result) > max_tokens:
+            result = truncate_to_tokens(result, max_tokens - 5) + "\n[Content trimmed]"
 
         return result
 
@@ -1,6 +1,6 @@
-import feedparser
+from http_client import fetch_feed
 from datetime import datetime
-from bs4 import BeautifulSoup
+from text_normalizer import strip_html
 
 # Security RSS feeds
 feeds = [
@@ -29,7 +29,7 @@ html = f"""<html>
 print(f"\nSECURITY REPORT - {datetime.now().strftime('%B %d, %Y')}\n{'='*50}\n")
 
 for feed_url in feeds:
-    feed = feedparser.parse(feed_url)
+    feed = fetch_feed(feed_url)
     print(f"\n{feed.feed.title}:")
     print("-" * len(feed.feed.title))
 
@@ -37,7 +37,7 @@ for feed_url in feeds:
 
     for entry in feed.entries[:3]:  # Just top 3 stories
         # Clean summary
-        summary = BeautifulSoup(entry.get('summary', ''), 'html.parser').get_text()[:300]
+        summary = strip_html(entry.get('summary', ''))[:300]
 
         print(f"• {entry.title}")
         print(f"  {summary}...")
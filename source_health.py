@@ -0,0 +1,256 @@
+"""
+Source health tracking, adaptive polling and circuit breaking
+
+Every feed fetch is recorded per source URL: latency, error rate, last
+success and how many new items the poll produced. From that we decide
+when a source is next worth polling:
+- failing sources back off exponentially instead of costing a full
+  timeout on every fetch
+- sources that keep producing new items are polled more often, quiet
+  ones less often
+- after repeated failures the circuit opens and the source is skipped
+  until a cooldown passes, then a single trial poll decides whether it
+  closes again
+Stats are saved to source_health.json next to the sources file. Several
+processes poll (gunicorn workers, the scheduler), so a save merges with
+the file under a lock, keeping whichever copy of a record was polled last.
+"""
+import copy
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Iterable, Optional
+
+from atomic_file import atomic_write_json, file_lock
+
+# Polling interval bounds (seconds)
+BASE_INTERVAL = int(os.getenv('SOURCE_BASE_INTERVAL', 900))
+MIN_INTERVAL = 120
+MAX_INTERVAL = 4 * 3600
+
+# Failure backoff and circuit breaker
+BACKOFF_BASE = 60
+BACKOFF_MAX = 2 * 3600
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 3600
+CIRCUIT_COOLDOWN_MAX = 24 * 3600
+
+# Weight of the newest observation in moving averages
+EWMA_ALPHA = 0.3
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def _ewma(previous: Optional[float], value: float) -> float:
+    if previous is None:
+        return value
+    return EWMA_ALPHA * value + (1 - EWMA_ALPHA) * previous
+
+
+def _item_key(link: str) -> str:
+    return hashlib.md5(link.encode('utf-8')).hexdigest()[:12]
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts).isoformat() if ts else None
+
+
+class SourceHealthTracker:
+    """Per-source fetch statistics and polling decisions"""
+
+    def __init__(self, health_file: str = "source_health.json"):
+        self.health_file = Path(health_file)
+        self.records = self._load()
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        if self.health_file.exists():
+            try:
+                with open(self.health_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"[Health] Could not read {self.health_file}: {e}")
+        return {}
+
+    def save(self):
+        """Merge with what other processes saved, then write"""
+        with self._lock, file_lock(self.health_file):
+            for url, record in self._load().items():
+                mine = self.records.get(url)
+                if mine is None or (record.get('last_polled') or 0) > (mine.get('last_polled') or 0):
+                    self.records[url] = record
+            records = copy.deepcopy(self.records)
+            atomic_write_json(self.health_file, records)
+
+    def _record(self, url: str, name: str = None) -> Dict:
+        record = self.records.get(url)
+        if record is None:
+            record = {
+                'name': name or url,
+                'attempts': 0,
+                'successes': 0,
+                'failures': 0,
+                'consecutive_failures': 0,
+                'avg_latency': None,
+                'error_rate': 0.0,
+                'avg_new_items': None,
+                'last_success': None,
+                'last_failure': None,
+                'last_error': None,
+                'last_polled': None,
+                'next_poll': 0,
+                'interval': BASE_INTERVAL,
+                'circuit': CLOSED,
+                'circuit_opened_at': None,
+                'circuit_cooldown': CIRCUIT_COOLDOWN,
+                'last_items': []
+            }
+            self.records[url] = record
+        elif name:
+            record['name'] = name
+        return record
+
+    def should_poll(self, url: str, now: float = None) -> bool:
+        """True when the source is due and its circuit allows a request"""
+        now = now or time.time()
+        with self._lock:
+            record = self.records.get(url)
+            if record is None:
+                return True
+            if record['circuit'] == OPEN:
+                if now - record['circuit_opened_at'] < record['circuit_cooldown']:
+                    return False
+                # Cooldown over: let a single trial request through; the
+                # others wait for its result (or another cooldown if it never reports)
+                record['circuit'] = HALF_OPEN
+                record['next_poll'] = now + record['circuit_cooldown']
+                return True
+            return now >= record['next_poll']
+
+    def record_success(self, url: str, latency: float, links: Iterable[str] = (),
+                       name: str = None, now: float = None) -> int:
+        """Record a successful poll and return how many items were new"""
+        now = now or time.time()
+        with self._lock:
+            record = self._record(url, name)
+            keys = [_item_key(link) for link in links if link]
+            previous = set(record['last_items'])
+            new_items = len([k for k in keys if k not in previous]) if previous else len(keys)
+
+            record['attempts'] += 1
+            record['successes'] += 1
+            record['consecutive_failures'] = 0
+            record['avg_latency'] = _ewma(record['avg_latency'], latency)
+            record['error_rate'] = _ewma(record['error_rate'], 0.0)
+            record['avg_new_items'] = _ewma(record['avg_new_items'], new_items)
+            record['last_success'] = now
+            record['last_polled'] = now
+            record['last_error'] = None
+            record['last_items'] = keys
+            record['circuit'] = CLOSED
+            record['circuit_opened_at'] = None
+            record['circuit_cooldown'] = CIRCUIT_COOLDOWN
+
+            # High-churn feeds get polled sooner, quiet ones later
+            if new_items:
+                record['interval'] = max(MIN_INTERVAL, record['interval'] * 0.7)
+            else:
+                record['interval'] = min(MAX_INTERVAL, record['interval'] * 1.5)
+            record['next_poll'] = now + record['interval']
+            return new_items
+
+    def record_failure(self, url: str, latency: float, error: str,
+                       name: str = None, now: float = None):
+        """Record a failed poll, back off and open the circuit if needed"""
+        now = now or time.time()
+        with self._lock:
+            record = self._record(url, name)
+            record['attempts'] += 1
+            record['failures'] += 1
+            record['consecutive_failures'] += 1
+            record['avg_latency'] = _ewma(record['avg_latency'], latency)
+            record['error_rate'] = _ewma(record['error_rate'], 1.0)
+            record['last_failure'] = now
+            record['last_polled'] = now
+            record['last_error'] = str(error)[:200]
+
+            if record['circuit'] == HALF_OPEN:
+                # Trial request failed: reopen for longer
+                record['circuit'] = OPEN
+                record['circuit_opened_at'] = now
+                record['circuit_cooldown'] = min(CIRCUIT_COOLDOWN_MAX, record['circuit_cooldown'] * 2)
+                print(f"[Health] Circuit re-opened for {record['name']}")
+            elif record['consecutive_failures'] >= CIRCUIT_FAILURE_THRESHOLD:
+                if record['circuit'] != OPEN:
+                    print(f"[Health] Circuit opened for {record['name']} after "
+                          f"{record['consecutive_failures']} failures")
+                record['circuit'] = OPEN
+                record['circuit_opened_at'] = now
+
+            # Exponential backoff with jitter so failing feeds don't retry in lockstep
+            backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (record['consecutive_failures'] - 1))
+            record['next_poll'] = now + backoff * random.uniform(0.8, 1.2)
+
+    def get_health(self, url: str) -> Optional[Dict]:
+        """Public view of a source's stats (None if never polled)"""
+        with self._lock:
+            record = self.records.get(url)
+            if record is None:
+                return None
+            polls = record['attempts']
+            return {
+                'avg_latency_ms': round(record['avg_latency'] * 1000) if record['avg_latency'] is not None else None,
+                'error_rate': round(record['error_rate'], 3),
+                'success_ratio': round(record['successes'] / polls, 3) if polls else None,
+                'avg_new_items': round(record['avg_new_items'], 1) if record['avg_new_items'] is not None else None,
+                'last_success': _iso(record['last_success']),
+                'last_failure': _iso(record['last_failure']),
+                'last_error': record['last_error'],
+                'consecutive_failures': record['consecutive_failures'],
+                'poll_interval_s': round(record['interval']),
+                'next_poll': _iso(record['next_poll']),
+                'circuit': record['circuit']
+            }
+
+    def summary(self, urls: List[str] = None) -> Dict:
+        """Counts of healthy, backing-off and open-circuit sources"""
+        now = time.time()
+        with self._lock:
+            records = [self.records[u] for u in (urls or self.records) if u in self.records]
+        return {
+            'tracked': len(records),
+            'open_circuits': sum(1 for r in records if r['circuit'] == OPEN),
+            'backing_off': sum(1 for r in records if r['consecutive_failures'] and r['circuit'] != OPEN),
+            'due_now': sum(1 for r in records if r['circuit'] != OPEN and now >= r['next_poll'])
+        }
+
+
+# Trackers keyed by health file so each sources file gets its own stats
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def get_source_health(sources_file: str = "sources_config.json") -> SourceHealthTracker:
+    """Get or create the tracker stored alongside the given sources file"""
+    health_file = str(Path(sources_file).with_name('source_health.json'))
+    with _trackers_lock:
+        if health_file not in _trackers:
+            _trackers[health_file] = SourceHealthTracker(health_file)
+    return _trackers[health_file]
+
+
+if __name__ == "__main__":
+    tracker = SourceHealthTracker("source_health_demo.json")
+    url = "https://feeds.reuters.com/Reuters/worldNews"
+    for attempt in range(6):
+        tracker.record_failure(url, 5.0, "timed out", name="Reuters World")
+        print(f"Attempt {attempt + 1}: {tracker.get_health(url)['circuit']}, "
+              f"next poll {tracker.get_health(url)['next_poll']}")
+    print(f"Should poll now: {tracker.should_poll(url)}")
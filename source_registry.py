@@ -0,0 +1,153 @@
+"""
+In-memory source registry backed by a JSON sources file
+
+The file is parsed once and cached; it is only re-read when its mtime
+changes (another process or a manual edit). Writes take an inter-process
+lock, re-read the latest file, apply the change and write through a temp
+file + rename. Active sources, category groups, the blacklist set and id/url
+lookups are precomputed on every load so callers don't rescan the lists.
+
+Cached data is shared: treat what the getters return as read-only and go
+through update() to change anything.
+"""
+import copy
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional
+
+from atomic_file import atomic_write_json, file_lock
+
+# Returned by an update() mutator to skip the write
+UNCHANGED = object()
+
+
+class SourceRegistry:
+    def __init__(self, sources_file: str = "sources_config.json"):
+        self.sources_file = Path(sources_file)
+        self._lock = threading.RLock()
+        self._mtime = None
+        self._set_data({"sources": [], "blacklist": []})
+
+    def _set_data(self, data: Dict[str, Any]):
+        data.setdefault('sources', [])
+        data.setdefault('blacklist', [])
+        blacklist = set(data['blacklist'])
+
+        by_category = {}
+        for source in data['sources']:
+            category = source.get('category') or source.get('type', 'general')
+            by_category.setdefault(category, []).append(source)
+
+        self._data = data
+        self._blacklist = blacklist
+        self._active = [
+            s for s in data['sources']
+            if s.get('active', True) and s['url'] not in blacklist
+        ]
+        self._by_category = by_category
+        self._by_id = {s['id']: s for s in data['sources'] if 'id' in s}
+        self._by_url = {s['url']: s for s in data['sources']}
+
+    def _file_mtime(self) -> Optional[tuple]:
+        # Atomic writes replace the inode, which catches changes even when
+        # two writes land within the filesystem's mtime resolution
+        try:
+            st = os.stat(self.sources_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _refresh(self):
+        """Reload the file if it changed since the last load"""
+        mtime = self._file_mtime()
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            if mtime is None:
+                self._set_data({"sources": [], "blacklist": []})
+            else:
+                with open(self.sources_file, 'r') as f:
+                    self._set_data(json.load(f))
+            self._mtime = mtime
+
+    def exists(self) -> bool:
+        return self._file_mtime() is not None
+
+    def data(self) -> Dict[str, Any]:
+        """The full {'sources', 'blacklist'} document (read-only)"""
+        self._refresh()
+        return self._data
+
+    def all_sources(self) -> List[Dict[str, Any]]:
+        self._refresh()
+        return self._data['sources']
+
+    def active_sources(self) -> List[Dict[str, Any]]:
+        """Active sources that are not blacklisted"""
+        self._refresh()
+        return self._active
+
+    def by_category(self, category: str) -> List[Dict[str, Any]]:
+        self._refresh()
+        return self._by_category.get(category, [])
+
+    def categories(self) -> List[str]:
+        self._refresh()
+        return sorted(self._by_category)
+
+    def is_blacklisted(self, url: str) -> bool:
+        self._refresh()
+        return url in self._blacklist
+
+    def get(self, source_id: int) -> Optional[Dict[str, Any]]:
+        self._refresh()
+        return self._by_id.get(source_id)
+
+    def get_by_url(self, url: str) -> Optional[Dict[str, Any]]:
+        self._refresh()
+        return self._by_url.get(url)
+
+    def update(self, mutator: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        Apply a change and persist it
+
+        mutator receives a private copy of the latest document and edits it
+        in place; its return value is passed back. Return UNCHANGED to skip
+        the write.
+        """
+        with self._lock, file_lock(self.sources_file):
+            # Another process may have written since our last read
+            self._refresh()
+            data = copy.deepcopy(self._data)
+            result = mutator(data)
+            if result is UNCHANGED:
+                return None
+            atomic_write_json(self.sources_file, data)
+            self._set_data(data)
+            self._mtime = self._file_mtime()
+            return result
+
+    def replace(self, data: Dict[str, Any]):
+        """Overwrite the whole document"""
+        def _replace(current):
+            current.clear()
+            current.update(copy.deepcopy(data))
+        self.update(_replace)
+
+
+# Registries keyed by resolved file path
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_source_registry(sources_file: str = "sources_config.json") -> SourceRegistry:
+    """Get or create the shared registry for a sources file"""
+    key = str(Path(sources_file).resolve())
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = SourceRegistry(sources_file)
+    return _registries[key]
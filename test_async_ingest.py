@@ -0,0 +1,124 @@
+"""Test the asyncio ingest engine against a local server (runs offline)"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from async_ingest import AsyncIngestEngine
+from fetch_scheduler import FetchScheduler
+from http_client import ContentTypeError
+
+FEED = """<?xml version="1.0"?><rss version="2.0"><channel><title>Feed {n}</title>
+<item><title>Story {n}</title><link>https://example.com/{n}</link></item></channel></rss>"""
+
+DELAY = 0.5
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith('/feed/'):
+            time.sleep(DELAY)
+            body, content_type = FEED.format(n=self.path.rsplit('/', 1)[1]).encode(), 'application/rss+xml'
+        elif self.path.startswith('/page/'):
+            body, content_type = ("<html><body>" + "é" * 5000 + "</body></html>").encode(), 'text/html; charset=utf-8'
+        elif self.path == '/report.pdf':
+            body, content_type = b'%PDF-1.4', 'application/pdf'
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class BusyServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 drops concurrent connects
+
+
+class Server:
+    def __enter__(self):
+        self.server = BusyServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.engine = AsyncIngestEngine(scheduler=FetchScheduler(
+            domain_policies={'127.0.0.1': (100, 1000.0, 1000)}))
+        return f"http://127.0.0.1:{self.server.server_address[1]}", self.engine
+
+    def __exit__(self, *exc):
+        self.engine.close()
+        self.server.shutdown()
+
+
+def test_feeds_fetched_concurrently_and_never_raise():
+    with Server() as (base, engine):
+        urls = [f"{base}/feed/{i}" for i in range(30)] + [f"{base}/missing", "http://127.0.0.1:9/refused"]
+        start = time.time()
+        feeds = engine.fetch_feeds(urls, timeout=(1, 5))
+        elapsed = time.time() - start
+
+        assert set(feeds) == set(urls)
+        # 30 feeds of 0.5s each: roughly the time of one, not the sum
+        assert elapsed < DELAY * 6, elapsed
+        for i in range(30):
+            feed = feeds[f"{base}/feed/{i}"]
+            assert feed.status == 200 and feed.entries[0].title == f"Story {i}"
+            assert feed['elapsed'] >= DELAY
+        assert feeds[f"{base}/missing"].status == 404
+        refused = feeds["http://127.0.0.1:9/refused"]
+        assert refused.bozo and not refused.entries
+
+
+def test_domain_policy_is_respected():
+    with Server() as (base, engine):
+        engine.scheduler = FetchScheduler(domain_policies={'127.0.0.1': (2, 1000.0, 1000)})
+        start = time.time()
+        engine.fetch_feeds([f"{base}/feed/{i}" for i in range(4)])
+        # Two at a time: two rounds
+        assert time.time() - start >= DELAY * 2
+
+
+def test_iter_html_caps_and_rejects_non_html():
+    with Server() as (base, engine):
+        urls = [f"{base}/page/{i}" for i in range(5)] + [f"{base}/report.pdf"]
+        results = {url: (payload, error) for url, payload, error in
+                   engine.iter_html(urls, max_bytes=4000, limit=2)}
+        assert set(results) == set(urls)
+        for i in range(5):
+            (data, charset), error = results[f"{base}/page/{i}"]
+            assert error is None and len(data) == 4000 and charset == 'utf-8'
+        assert isinstance(results[f"{base}/report.pdf"][1], ContentTypeError)
+
+
+def test_capped_domain_waits_for_a_release_without_polling():
+    scheduler = FetchScheduler(domain_policies={'example.com': (1, 1000.0, 1000)})
+    engine = AsyncIngestEngine(scheduler=scheduler)
+    url = 'https://example.com/a'
+    attempts = []
+    try_reserve = scheduler.try_reserve
+    scheduler.try_reserve = lambda u: attempts.append(u) or try_reserve(u)
+    try:
+        assert try_reserve(url)[0]  # a threaded caller holds the only slot
+        threading.Timer(0.3, scheduler.release, [url]).start()
+        start = time.time()
+        engine.run(engine._reserve(url), timeout=5)
+        assert 0.25 <= time.time() - start < 1.0
+        assert len(attempts) == 2 and not engine._waiters
+        scheduler.release(url)
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    test_feeds_fetched_concurrently_and_never_raise()
+    test_domain_policy_is_respected()
+    test_iter_html_caps_and_rejects_non_html()
+    test_capped_domain_waits_for_a_release_without_polling()
+    print("\nAll async ingest tests passed")
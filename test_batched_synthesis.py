@@ -0,0 +1,84 @@
+"""Test multi-country batched synthesis prompts (runs offline)"""
+from fast_llm_synthesizer import FastLLMSynthesizer
+from llm_gateway import LLMGateway
+from llm_providers import LLMProvider, ProviderRegistry
+
+PARAGRAPHS = ("Gangs attacked the port on September 20, killing 12 people.\n\n"
+              "The attacks follow a month of clashes over fuel routes.\n\n"
+              "Expect further disruption to imports in the coming week.")
+
+
+class BatchProvider(LLMProvider):
+    """Answers batched prompts with `sections`; single-country prompts with a plain brief"""
+    name = 'batch'
+
+    def __init__(self, sections):
+        super().__init__()
+        self.sections = sections
+        self.prompts = []
+
+    def configured(self):
+        return True
+
+    def _connect(self):
+        return object()
+
+    def _complete(self, client, messages, temperature, max_tokens):
+        prompt = messages[-1]['content']
+        self.prompts.append(prompt)
+        if '## COUNTRY:' in prompt:
+            return self.sections
+        return "Single brief. " + PARAGRAPHS
+
+
+def make_articles(country, n=2):
+    return [{'title': f'{country} report {i} on gang attack', 'link': f'https://example.com/{country}/{i}',
+             'published': '2025-09-20T10:00:00', 'full_content': 'Gangs attacked the port. ' * 5,
+             'has_content': True} for i in range(n)]
+
+
+def _synth(provider):
+    registry = ProviderRegistry(preferred='batch', providers={'batch': provider})
+    return FastLLMSynthesizer(LLMGateway(registry, providers=[provider], limits={'batch': (4, 0)}, retries=0))
+
+
+def test_batch_is_one_request_split_per_country():
+    response = "\n\n".join(f"## COUNTRY: {c}\n{c}: {PARAGRAPHS}" for c in ['Haiti', 'Mali', 'Peru'])
+    provider = BatchProvider(response)
+    synth = _synth(provider)
+    batch = {c: make_articles(c) for c in ['Haiti', 'Mali', 'Peru']}
+
+    results = synth._synthesize_batch(batch, custom_prompt='gangs')
+    assert len(provider.prompts) == 1
+    prompt = provider.prompts[0]
+    assert prompt.count('PARAGRAPH 1') == 1  # shared instructions sent once
+    assert '=== ARTICLES FOR Mali ===' in prompt and 'Mali report 1 on gang attack' in prompt
+    assert 'USER FOCUS AREAS: gangs' in prompt
+    for country in batch:
+        assert results[country]['narrative'].startswith(f"{country}: Gangs attacked")
+        assert not results[country]['fallback']
+        assert results[country]['articles_with_content'] == batch[country]
+
+
+def test_malformed_sections_fall_back_to_single_calls():
+    # Mali is missing, Peru's section is a stub, headers vary in case and markup
+    response = f"**## country: haiti**\n{PARAGRAPHS}\n\n## COUNTRY: Peru\nSee above."
+    provider = BatchProvider(response)
+    synth = _synth(provider)
+    batch = {c: make_articles(c) for c in ['Haiti', 'Mali', 'Peru']}
+
+    results = synth._synthesize_batch(batch)
+    assert results['Haiti']['narrative'] == PARAGRAPHS
+    assert results['Mali']['narrative'].startswith('Single brief.')
+    assert results['Peru']['narrative'].startswith('Single brief.')
+    assert len(provider.prompts) == 3
+
+    assert FastLLMSynthesizer._parse_batch("no headers at all", batch) == {}
+    repeated = f"## COUNTRY: Haiti\n{PARAGRAPHS}\n## COUNTRY: Haiti\n{PARAGRAPHS}"
+    assert 'Haiti' not in FastLLMSynthesizer._parse_batch(repeated, batch)
+
+
+if __name__ == "__main__":
+    test_batch_is_one_request_split_per_country()
+    test_malformed_sections_fall_back_to_single_calls()
+    print("\nAll batched synthesis tests passed")
@@ -0,0 +1,173 @@
+"""Test the breaking news watcher with a fake search engine (runs offline)"""
+import tempfile
+from pathlib import Path
+
+import feedparser
+
+import google_news_engine
+from atomic_file import try_file_lock
+from breaking_news_monitor import BreakingNewsMonitor, BreakingNewsWatcher, score_priority
+
+
+class FakeEngine:
+    def __init__(self):
+        self.results = {}
+        self.calls = []
+
+    def search(self, query, when="7d", max_results=100):
+        self.calls.append((query, when))
+        return [dict(a) for a in self.results.get(query, [])]
+
+    def search_many(self, queries, when="7d", max_results=100, errors=None):
+        # Like GoogleNewsEngine.search_many, a failed search maps to []
+        results = {}
+        for query in queries:
+            try:
+                results[query] = self.search(query, when, max_results)
+            except Exception as e:
+                results[query] = []
+                if errors is not None:
+                    errors[query] = str(e)
+        return results
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.sent = []
+
+    def start(self):
+        pass
+
+    def enqueue(self, alerts):
+        self.sent.extend(alerts)
+
+
+def article(title, link, source='Reuters'):
+    return {'title': title, 'link': link, 'source': source, 'summary': title,
+            'published': 'Fri, 19 Sep 2025 10:00:00 GMT'}
+
+
+def make_watcher(seen_file):
+    monitor = BreakingNewsMonitor()
+    monitor.engine = FakeEngine()
+    dispatcher = RecordingDispatcher()
+    watcher = BreakingNewsWatcher(monitor=monitor, alert_threshold=3,
+                                  seen_file=seen_file, dispatcher=dispatcher)
+    return watcher, monitor.engine, dispatcher
+
+
+def test_priority_scoring():
+    assert score_priority({'title': 'NATO invokes Article 5 after missile strike'}) >= 8
+    assert score_priority({'title': 'Weather update for Helsinki'}) == 0
+
+
+def test_only_new_items_are_returned_and_alerted():
+    with tempfile.TemporaryDirectory() as tmp:
+        seen_file = str(Path(tmp) / 'seen.json')
+        watcher, engine, dispatcher = make_watcher(seen_file)
+        engine.results['airspace violation Russia'] = [
+            article('Russian jets violate NATO airspace over Estonia', 'https://x/1'),
+            article('Analysts discuss Baltic defence budgets', 'https://x/2'),
+        ]
+
+        first = watcher.poll_once()
+        assert len(first) == 2
+        # Polls ask for the last hour only
+        assert all(when == '1h' for _, when in engine.calls)
+        # Only the high-priority item is alerted
+        assert [a['link'] for a in dispatcher.sent] == ['https://x/1']
+
+        # Nothing new on the next poll
+        assert watcher.poll_once() == []
+
+        engine.results['missile strike NATO'] = [
+            article('Missile strike near NATO border kills two', 'https://x/3'),
+        ]
+        third = watcher.poll_once()
+        assert [a['link'] for a in third] == ['https://x/3']
+        assert len(watcher.get_recent_alerts()) == 2
+        assert watcher.get_recent_alerts()[0]['link'] == 'https://x/3'
+
+        # The seen-set survives a restart
+        restarted, engine2, _ = make_watcher(seen_file)
+        engine2.results = engine.results
+        assert restarted.poll_once() == []
+
+
+def test_failing_query_does_not_stop_poll():
+    with tempfile.TemporaryDirectory() as tmp:
+        watcher, engine, _ = make_watcher(str(Path(tmp) / 'seen.json'))
+        engine.results['Poland Russia border'] = [article('Poland closes border crossing', 'https://x/9')]
+        original = engine.search
+
+        def flaky(query, when="7d", max_results=100):
+            if query.startswith('NATO'):
+                raise ConnectionError("feed unavailable")
+            return original(query, when, max_results)
+
+        engine.search = flaky
+        assert [a['link'] for a in watcher.poll_once()] == ['https://x/9']
+        assert watcher.search_errors == {'NATO Article 4 Article 5': 'feed unavailable'}
+        assert watcher.failed_searches == 1
+
+
+def test_throttled_feeds_are_failures_not_empty_results():
+    ok = feedparser.parse("<rss version='2.0'><channel><item><title>Story</title>"
+                          "<link>https://x/1</link></item></channel></rss>")
+    ok['status'] = 200
+    empty = feedparser.parse("<rss version='2.0'><channel></channel></rss>")
+    empty['status'] = 200
+    throttled = feedparser.parse(b"<html>Too many requests</html>")
+    throttled['status'] = 429
+    unreachable = feedparser.FeedParserDict(entries=[], feed=feedparser.FeedParserDict(), bozo=1,
+                                            bozo_exception=ConnectionError("connection refused"))
+    assert google_news_engine.feed_error(ok) is None and google_news_engine.feed_error(empty) is None
+    assert google_news_engine.feed_error(throttled) == 'HTTP 429 (throttled)'
+    assert google_news_engine.feed_error(unreachable) == 'connection refused'
+
+    engine = google_news_engine.GoogleNewsEngine()
+    feeds = {'ok': ok, 'quiet': empty, 'busy': throttled, 'down': unreachable}
+    original = google_news_engine.fetch_feeds
+    google_news_engine.fetch_feeds = lambda urls, timeout=None: {
+        url: feeds[url.split('q=')[1].split('&')[0]] for url in urls}
+    try:
+        errors = {}
+        results = engine.search_many(list(feeds), when='1h', errors=errors)
+    finally:
+        google_news_engine.fetch_feeds = original
+    assert [a['title'] for a in results['ok']] == ['Story'] and results['quiet'] == []
+    assert errors == {'busy': 'HTTP 429 (throttled)', 'down': 'connection refused'}
+
+
+def test_only_one_process_polls_and_others_serve_its_alerts():
+    with tempfile.TemporaryDirectory() as tmp:
+        seen_file = str(Path(tmp) / 'seen.json')
+        poller, engine, dispatcher = make_watcher(seen_file)
+        engine.results['airspace violation Russia'] = [
+            article('Russian jets violate NATO airspace over Estonia', 'https://x/1')]
+
+        # Another process (here: another open of the lock file) is polling
+        lock = try_file_lock(seen_file)
+        assert lock is not None and try_file_lock(seen_file) is None
+        follower, follower_engine, follower_dispatcher = make_watcher(seen_file)
+        follower.start()
+        assert follower.following and not follower.running
+
+        poller.poll_once()
+        alerts = follower.get_recent_alerts()
+        assert [a['link'] for a in alerts] == ['https://x/1']
+        assert follower.last_poll == poller.last_poll
+        assert follower_engine.calls == [] and follower_dispatcher.sent == []
+        lock.close()
+        relock = try_file_lock(seen_file)
+        assert relock is not None
+        relock.close()
+
+
+if __name__ == "__main__":
+    test_priority_scoring()
+    test_only_new_items_are_returned_and_alerted()
+    test_failing_query_does_not_stop_poll()
+    test_throttled_feeds_are_failures_not_empty_results()
+    test_only_one_process_polls_and_others_serve_its_alerts()
+    print("\nAll breaking news watcher tests passed")
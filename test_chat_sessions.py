@@ -0,0 +1,103 @@
+"""Test server-side chat sessions and their rolling summary (runs offline)"""
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from chat_sessions import ChatSession, ChatSessionStore, RECENT_TURNS, MAX_SUMMARY_CHARS
+
+
+def new_store(tmp, **kwargs):
+    return ChatSessionStore(str(Path(tmp) / 'chat.db'), **kwargs)
+
+
+def test_sessions_are_per_user_and_country():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = new_store(tmp)
+        store.update_context(1, 'Haiti', 'Article 1:\nGangs attacked...\n---')
+        assert store.get(1, ' haiti ').chat_context.startswith('Article 1')
+        assert store.get(2, 'Haiti') is None
+        assert store.get(1, 'Mali') is None
+
+        # New synthesis replaces the context but keeps the conversation
+        store.add_turn(1, 'Haiti', 'Who controls the capital?', 'Gangs control most of Port-au-Prince.')
+        store.update_context(1, 'Haiti', 'Article 1:\nNewer...\n---')
+        chat = store.get(1, 'Haiti')
+        assert chat.total_turns == 1 and chat.chat_context.startswith('Article 1:\nNewer')
+        store.reset(1, 'Haiti')
+        assert store.get(1, 'Haiti') is None
+
+
+def test_workers_share_sessions_without_losing_turns():
+    with tempfile.TemporaryDirectory() as tmp:
+        worker_a, worker_b = new_store(tmp), new_store(tmp)
+        worker_a.update_context(7, 'Haiti', 'Article 1:\nGangs attacked...\n---')
+        worker_b.update(7, 'Haiti', lambda chat: setattr(chat, 'facts', 'Capital: Port-au-Prince'))
+
+        def ask(store, worker):
+            for i in range(10):
+                store.add_turn(7, 'Haiti', f"{worker} question {i}?", f"{worker} answer {i}.")
+
+        threads = [threading.Thread(target=ask, args=(store, name))
+                   for store, name in ((worker_a, 'A'), (worker_b, 'B'))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        chat = worker_a.get(7, 'haiti')
+        assert chat.total_turns == 20
+        assert chat.facts == 'Capital: Port-au-Prince' and chat.chat_context.startswith('Article 1')
+        assert worker_b.get(7, 'Haiti').to_dict() == chat.to_dict()
+
+
+def test_idle_sessions_expire_and_lru_is_bounded():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = new_store(tmp, ttl=0.05, max_sessions=2)
+        store.get_or_create('u', 'Haiti')
+        time.sleep(0.1)
+        assert store.get('u', 'Haiti') is None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = new_store(tmp, max_sessions=2)
+        for country in ['Haiti', 'Mali', 'Peru']:
+            store.get_or_create('u', country)
+            time.sleep(0.01)
+        assert len(store) == 2
+        assert store.get('u', 'Haiti') is None
+
+
+def test_rolling_summary_keeps_prompt_small():
+    chat = ChatSession('u', 'haiti')
+    for i in range(40):
+        chat.add_turn(f"Question number {i} about the situation?",
+                      f"Answer {i} says the situation is tense. " + "More detail follows here. " * 20)
+
+    assert len(chat.turns) == RECENT_TURNS
+    assert chat.total_turns == 40
+    assert sum(len(line) + 1 for line in chat.summary_lines) <= MAX_SUMMARY_CHARS
+    conversation = chat.conversation()
+    assert 'Answer 39 says' in conversation
+    assert 'A: Answer 35 says the situation is tense.' in conversation
+    assert 'More detail' not in conversation.split('Recent exchange:')[0]
+    assert 'Question number 0 ' not in conversation
+    assert len(conversation) < 6000
+
+
+def test_news_context_is_cut_at_an_article_boundary():
+    articles = ''.join(f"\nArticle {i}:\nTitle: t{i}\nContent: {'x' * 500}\n---" for i in range(20))
+    chat = ChatSession('u', 'haiti')
+    chat.set_context(articles)
+    context = chat.news_context(2000)
+    assert len(context) <= 2000
+    assert context.endswith('\n---')
+    assert context.count('Article ') == 3
+
+
+if __name__ == "__main__":
+    test_sessions_are_per_user_and_country()
+    test_workers_share_sessions_without_losing_turns()
+    test_idle_sessions_expire_and_lru_is_bounded()
+    test_rolling_summary_keeps_prompt_small()
+    test_news_context_is_cut_at_an_article_boundary()
+    print("\nAll chat session tests passed")
@@ -0,0 +1,88 @@
+"""Test the offline country facts snapshot and alias index (runs offline)"""
+import tempfile
+from pathlib import Path
+
+from country_facts import CountryFacts, basics_from_record, normalize_name
+from country_intelligence import CountryIntelligence
+from persistent_cache import PersistentCache
+
+RECORDS = [
+    {'name': {'common': 'Haiti', 'official': 'Republic of Haiti'}, 'cca2': 'HT', 'cca3': 'HTI',
+     'altSpellings': ['HT', 'Ayiti'], 'capital': ['Port-au-Prince'], 'population': 11402533,
+     'idd': {'root': '+5', 'suffixes': ['09']}},
+    {'name': {'common': 'Timor-Leste', 'official': 'Democratic Republic of Timor-Leste'}, 'cca2': 'TL',
+     'cca3': 'TLS', 'altSpellings': ['TL', 'East Timor'], 'capital': ['Dili']},
+    {'name': {'common': 'São Tomé and Príncipe', 'official': 'Democratic Republic of São Tomé and Príncipe'},
+     'cca2': 'ST', 'cca3': 'STP', 'altSpellings': ['ST'], 'capital': ['São Tomé']},
+    {'name': {'common': 'DR Congo', 'official': 'Democratic Republic of the Congo'}, 'cca2': 'CD',
+     'cca3': 'COD', 'altSpellings': ['CD', 'DR Congo', 'Congo-Kinshasa', 'Congo'], 'capital': ['Kinshasa']},
+    {'name': {'common': 'Republic of the Congo', 'official': 'Republic of the Congo'}, 'cca2': 'CG',
+     'cca3': 'COG', 'altSpellings': ['CG', 'Congo', 'Congo-Brazzaville'], 'capital': ['Brazzaville']},
+]
+
+
+class NoHttp:
+    def get(self, *args, **kwargs):
+        raise AssertionError("basic facts must not hit the network once a snapshot exists")
+
+
+def snapshot_facts(tmp, fetch_calls=None):
+    def fetch():
+        if fetch_calls is not None:
+            fetch_calls.append(1)
+        return [basics_from_record(r) for r in RECORDS]
+    return CountryFacts(str(Path(tmp) / 'country_facts.json'), fetch=fetch)
+
+
+def test_lookup_by_name_code_and_alias():
+    with tempfile.TemporaryDirectory() as tmp:
+        facts = snapshot_facts(tmp)
+        assert not facts.loaded
+        assert facts.refresh()
+        assert facts.lookup('haiti')['capital'] == 'Port-au-Prince'
+        assert facts.lookup('HTI')['calling_code'] == '+509'
+        assert facts.lookup('East Timor')['common_name'] == 'Timor-Leste'
+        assert facts.lookup('Sao Tome and Principe')['cca3'] == 'STP'
+        assert facts.lookup('Democratic Republic of the Congo')['cca3'] == 'COD'
+        assert facts.lookup('DRC')['cca3'] == 'COD'
+        # Both Congos list "Congo" as a spelling; the local alias decides
+        assert facts.lookup('Congo')['cca3'] == 'COG'
+        assert facts.lookup('Atlantis') is None
+        assert normalize_name('  São-Tomé ') == 'sao tome'
+
+
+def test_snapshot_survives_restart_and_refresh_failures():
+    with tempfile.TemporaryDirectory() as tmp:
+        calls = []
+        facts = snapshot_facts(tmp, calls)
+        facts.refresh()
+        assert not facts.is_stale()
+
+        reloaded = snapshot_facts(tmp, calls)
+        assert reloaded.loaded and len(reloaded) == len(RECORDS)
+        assert reloaded.lookup('Ayiti')['cca3'] == 'HTI'
+        assert len(calls) == 1
+
+        def broken():
+            raise IOError("API down")
+        reloaded.fetch = broken
+        assert not reloaded.refresh()
+        assert reloaded.lookup('Haiti') is not None
+
+
+def test_country_intelligence_reads_the_snapshot():
+    with tempfile.TemporaryDirectory() as tmp:
+        facts = snapshot_facts(tmp)
+        facts.refresh()
+        intel = CountryIntelligence(PersistentCache(str(Path(tmp) / 'cache.db')), facts)
+        intel.http = NoHttp()
+        assert intel.get_country_basics('East Timor')['capital'] == 'Dili'
+        assert intel.get_country_basics('Atlantis') is None
+        assert intel._get_country_code('Haiti') == 'ht'
+
+
+if __name__ == "__main__":
+    test_lookup_by_name_code_and_alias()
+    test_snapshot_survives_restart_and_refresh_failures()
+    test_country_intelligence_reads_the_snapshot()
+    print("\nAll country facts tests passed")
@@ -0,0 +1,113 @@
+"""Test concurrent historical context lookups and their shared deadline (runs offline)"""
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import country_intelligence
+from country_facts import CountryFacts, basics_from_record
+from country_intelligence import CountryIntelligence
+from persistent_cache import PersistentCache
+
+COUNTRIES = ['Haiti', 'Mali', 'Peru', 'Laos']
+
+
+class SlowResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        pass
+
+
+class SlowWikipedia:
+    """Every request takes `delay` seconds; tracks peak concurrency"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        title = url.rsplit('/', 1)[1]
+        if '/page/sections/' in url:
+            return SlowResponse({'sections': [{'line': 'History', 'toclevel': 1, 'anchor': 'History'}]})
+        return SlowResponse({'title': title, 'extract': f"{title} history.",
+                             'content_urls': {'desktop': {'page': f"https://en.wikipedia.org/wiki/{title}"}}})
+
+
+def make_intel(tmp):
+    facts = CountryFacts(str(Path(tmp) / 'country_facts.json'),
+                         fetch=lambda: [basics_from_record({'name': {'common': name, 'official': f"Republic of {name}"},
+                                                            'cca2': name[:2].upper(), 'cca3': name[:3].upper(),
+                                                            'capital': [f"{name} City"], 'population': 1000})
+                                        for name in COUNTRIES])
+    facts.refresh()
+    return CountryIntelligence(PersistentCache(str(Path(tmp) / 'cache.db')), facts)
+
+
+def with_http(http, fn):
+    original = country_intelligence.get_http_client
+    country_intelligence.get_http_client = lambda: http
+    try:
+        return fn()
+    finally:
+        country_intelligence.get_http_client = original
+
+
+def test_countries_are_looked_up_concurrently():
+    with tempfile.TemporaryDirectory() as tmp:
+        intel = make_intel(tmp)
+        http = SlowWikipedia(0.3)
+        start = time.monotonic()
+        contexts = with_http(http, lambda: intel.get_historical_contexts(COUNTRIES))
+        elapsed = time.monotonic() - start
+
+        # 8 requests of 0.3s each: serially 2.4s
+        assert elapsed < 1.2, elapsed
+        assert http.peak == 2 * len(COUNTRIES)
+        assert set(contexts) == set(COUNTRIES)
+        haiti = contexts['Haiti']
+        assert haiti['missing'] == []
+        assert haiti['basic_info']['capital'] == 'Haiti City'
+        assert haiti['historical_summary'] == 'Haiti history.'
+        assert haiti['wikipedia_data']['history_sections'][0]['title'] == 'History'
+
+
+def test_deadline_returns_partial_results():
+    with tempfile.TemporaryDirectory() as tmp:
+        intel = make_intel(tmp)
+        http = SlowWikipedia(1.0)
+        start = time.monotonic()
+        context = with_http(http, lambda: intel.get_historical_context('Mali', timeout=0.2))
+        assert time.monotonic() - start < 0.6
+
+        # Snapshot facts are there; Wikipedia missed the deadline
+        assert context['basic_info']['capital'] == 'Mali City'
+        assert sorted(context['missing']) == ['wiki_sections', 'wiki_summary']
+        assert context['historical_summary'] == ''
+        assert context['reference_urls']['Wikipedia'] == 'https://en.wikipedia.org/wiki/Mali'
+
+        # The late lookups still land in the cache for the next call
+        time.sleep(1.2)
+        context = with_http(http, lambda: intel.get_historical_context('Mali', timeout=0.2))
+        assert context['missing'] == []
+        assert context['historical_summary'] == 'Mali history.'
+
+
+if __name__ == "__main__":
+    test_countries_are_looked_up_concurrently()
+    test_deadline_returns_partial_results()
+    print("\nAll country intelligence tests passed")
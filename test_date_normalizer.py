@@ -0,0 +1,78 @@
+"""Test date normalization, the collector's 24h cutoff and date sorting (runs offline)"""
+import tempfile
+import time
+from email.utils import formatdate
+from pathlib import Path
+
+import feedparser
+
+from date_normalizer import DateNormalizer, filter_recent, sort_newest_first, format_ts
+from feed_collector import FeedCollector
+from report_generator import ReportGenerator
+from source_health import SourceHealthTracker
+
+TS = 1758276000  # 2025-09-19 10:00:00 UTC
+
+
+def test_formats_parse_to_the_same_timestamp():
+    normalizer = DateNormalizer()
+    for text in ['Fri, 19 Sep 2025 10:00:00 GMT', 'Fri, 19 Sep 2025 12:00:00 +0200',
+                 '2025-09-19T10:00:00Z', '2025-09-19T10:00:00', '2025-09-19T12:00:00.5+02:00',
+                 'September 19, 2025 10:00 AM']:
+        assert normalizer.parse(text) == TS, text
+    assert normalizer.parse('not a date') is None
+    assert normalizer.parse('Mon, 01 Jan 2120 00:00:00 GMT') is None  # far future
+    assert format_ts(TS, '%Y-%m-%d %H:%M') == '2025-09-19 10:00'
+
+
+def test_format_is_cached_per_source():
+    normalizer = DateNormalizer()
+    normalizer.parse('2025-09-19T10:00:00Z', 'Collector')
+    normalizer.parse('Fri, 19 Sep 2025 10:00:00 GMT', 'Reuters')
+    assert normalizer.detected_formats() == {'Collector': 'iso', 'Reuters': 'rfc822'}
+    normalizer.parse('2025-09-20T10:00:00Z', 'Collector')
+    assert normalizer.stats['cache_hit'] == 1
+
+
+def test_collector_drops_stale_entries_using_real_timestamps():
+    now = time.time()
+    items = ''.join(
+        f"<item><title>{title}</title><link>https://example.com/{title}</link>"
+        f"<pubDate>{formatdate(now - age, usegmt=True)}</pubDate></item>"
+        for title, age in [('fresh', 3600), ('stale', 3 * 86400)]
+    ) + "<item><title>undated</title><link>https://example.com/undated</link></item>"
+    feed = feedparser.parse(f"<rss version='2.0'><channel><title>T</title>{items}</channel></rss>")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        collector = FeedCollector(cache_dir=str(Path(tmp) / 'cache'),
+                                  health=SourceHealthTracker(str(Path(tmp) / 'health.json')))
+        source = {'name': 'Example', 'url': 'https://example.com/rss', 'type': 'rss', 'category': 'news'}
+        articles = collector.collect_from_source(source, feed)
+
+    assert [a['title'] for a in articles] == ['fresh', 'undated']
+    assert abs(articles[0]['published_ts'] - (now - 3600)) < 2
+    assert articles[0]['published'].endswith('+00:00')
+    assert articles[1]['published_ts'] is None
+
+
+def test_sorting_and_filtering_mixed_formats():
+    articles = [
+        {'title': 'rfc', 'published': 'Fri, 19 Sep 2025 09:00:00 GMT', 'category': 'news'},
+        {'title': 'iso', 'published': '2025-09-19T11:00:00Z', 'category': 'news'},
+        {'title': 'none', 'published': '', 'category': 'news'},
+        {'title': 'zone', 'published': 'Fri, 19 Sep 2025 12:30:00 +0200', 'category': 'news'},
+    ]
+    # As strings these sort 'iso' < 'Fri...' - by time the ISO one is newest
+    assert [a['title'] for a in sort_newest_first(articles)] == ['iso', 'zone', 'rfc', 'none']
+    assert [a['title'] for a in ReportGenerator(tempfile.mkdtemp())._categorize_articles(articles)['news']] == \
+        ['iso', 'zone', 'rfc', 'none']
+    recent = filter_recent(articles, 3600, now=TS + 1800, keep_undated=False)
+    assert [a['title'] for a in recent] == ['iso', 'zone']
+
+
+if __name__ == "__main__":
+    test_formats_parse_to_the_same_timestamp()
+    test_format_is_cached_per_source()
+    test_collector_drops_stale_entries_using_real_timestamps()
+    test_sorting_and_filtering_mixed_formats()
+    print("\nAll date normalizer tests passed")
@@ -0,0 +1,130 @@
+"""Test the lxml extraction engine and learned selectors (runs offline)"""
+import json
+import tempfile
+from pathlib import Path
+
+from extraction_engine import ExtractionEngine, SelectorRegistry, LXML_AVAILABLE, DROP_AFTER, LEARN_AFTER
+
+STORY = ("<p>Three Russian MiG-31 jets entered Estonian airspace near Vaindloo island, "
+         "officials said, staying for twelve minutes before leaving.</p>")
+
+
+def make_page(body_class="story-text", paragraphs=8, extra_head=""):
+    nav = "".join(f"<li><a href='/s{i}'>Section {i}</a></li>" for i in range(30))
+    return (
+        "<html><head><title>Jets over Estonia | Example News</title>"
+        "<meta property='og:title' content='Russian jets violate Estonian airspace'>"
+        "<meta name='author' content='By Jane Doe'>"
+        "<meta property='article:published_time' content='2025-09-19T10:15:00Z'>"
+        "<link rel='canonical' href='https://example.com/world/estonia-jets'>"
+        "<script>var tracking = '" + "x" * 3000 + "';</script>" + extra_head +
+        "</head><body>"
+        f"<nav><ul>{nav}</ul></nav>"
+        "<div class='newsletter'><p>Sign up for our daily briefing, it's free, fast, and delivered daily.</p></div>"
+        f"<div class='{body_class}'>" + STORY * paragraphs + "</div>"
+        f"<aside class='related'><ul>{nav}</ul></aside>"
+        "</body></html>"
+    )
+
+
+def new_engine(tmp):
+    return ExtractionEngine(SelectorRegistry(str(Path(tmp) / 'selectors.json')))
+
+
+def test_structured_fields_and_body():
+    with tempfile.TemporaryDirectory() as tmp:
+        result = new_engine(tmp).extract_html(make_page(), 'https://www.example.com/world/estonia-jets?utm_source=rss')
+        assert result['body'].startswith("Three Russian MiG-31 jets")
+        assert 'Section' not in result['body'] and 'briefing' not in result['body']
+        if LXML_AVAILABLE:
+            assert result['method'] == 'density'
+            assert result['title'] == 'Russian jets violate Estonian airspace'
+            assert result['byline'] == 'Jane Doe'
+            assert result['published'] == '2025-09-19T10:15:00Z'
+            assert result['canonical_url'] == 'https://example.com/world/estonia-jets'
+
+
+def test_json_ld_metadata():
+    if not LXML_AVAILABLE:
+        return
+    ld = json.dumps({'@context': 'https://schema.org', '@type': 'NewsArticle',
+                     'datePublished': '2025-09-20T08:00:00+00:00',
+                     'author': [{'@type': 'Person', 'name': 'A. Reporter'}, {'name': 'B. Writer'}]})
+    page = make_page().replace("<meta name='author' content='By Jane Doe'>", "") \
+        .replace("<meta property='article:published_time' content='2025-09-19T10:15:00Z'>", "")
+    page = page.replace("</head>", f"<script type='application/ld+json'>{ld}</script></head>")
+    with tempfile.TemporaryDirectory() as tmp:
+        result = new_engine(tmp).extract_html(page, 'https://example.com/a')
+        assert result['byline'] == 'A. Reporter, B. Writer'
+        assert result['published'] == '2025-09-20T08:00:00+00:00'
+
+
+def test_selector_is_learned_persisted_and_dropped():
+    if not LXML_AVAILABLE:
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = new_engine(tmp)
+        first = engine.extract_html(make_page(), 'https://example.com/1')
+        second = engine.extract_html(make_page(), 'https://example.com/2')
+        assert first['method'] == second['method'] == 'density'
+        assert 'story-text' in engine.registry.get('example.com')
+
+        # A fresh engine reads the learned selector and skips scoring
+        engine = new_engine(tmp)
+        assert engine.extract_html(make_page(), 'https://example.com/3')['method'] == 'selector'
+
+        # After a redesign the old selector misses and the new container is learned
+        for i in range(LEARN_AFTER):
+            result = engine.extract_html(make_page(body_class='post-body'), f'https://example.com/r{i}')
+            assert result['body'].startswith("Three Russian")
+        assert 'post-body' in engine.registry.get('example.com')
+
+        # A selector that keeps missing with nothing to replace it is dropped
+        engine.registry.selectors['example.com'] = '//div[@id="gone"]'
+        for i in range(DROP_AFTER):
+            engine.registry.record_miss('example.com')
+        assert engine.registry.get('example.com') is None
+
+
+def test_chunked_input_and_empty_pages():
+    page = make_page()
+    chunks = [page[i:i + 500] for i in range(0, len(page), 500)]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = new_engine(tmp)
+        assert engine.extract_html(chunks, 'https://example.com/c')['body'].startswith("Three Russian")
+        assert engine.extract_html([], 'https://example.com/e')['body'] == ''
+
+
+def test_known_selector_stops_reading_and_quoted_ids_are_skipped():
+    if not LXML_AVAILABLE:
+        return
+    page = make_page() + "<script>" + "var x = 1;" * 20000 + "</script>"
+    chunks = [page[i:i + 500] for i in range(0, len(page), 500)]
+    read = []
+
+    def stream():
+        for chunk in chunks:
+            read.append(chunk)
+            yield chunk
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = new_engine(tmp)
+        engine.registry.selectors['example.com'] = '//div[@class="story-text"]'
+        result = engine.extract_html(stream(), 'https://example.com/s')
+        assert result['method'] == 'selector' and result['title'] == 'Russian jets violate Estonian airspace'
+        assert len(read) < len(chunks) // 10
+
+        quoted = make_page(body_class='x').replace("<div class='x'>", "<div id='main\"body'>")
+        result = engine.extract_html(quoted, 'https://other.example/q')
+        assert result['body'].startswith("Three Russian") and result['selector'] is None
+        engine.registry.selectors['other.example'] = '//div[@id="main"body"]'
+        assert engine.extract_html(quoted, 'https://other.example/q2')['body'].startswith("Three Russian")
+
+
+if __name__ == "__main__":
+    test_structured_fields_and_body()
+    test_json_ld_metadata()
+    test_selector_is_learned_persisted_and_dropped()
+    test_chunked_input_and_empty_pages()
+    test_known_selector_stops_reading_and_quoted_ids_are_skipped()
+    print("\nAll extraction engine tests passed")
@@ -0,0 +1,106 @@
+"""Test the download-thread / parse-process extraction pipeline (runs offline)"""
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import extraction_pipeline
+from extraction_engine import SelectorRegistry, LXML_AVAILABLE
+from extraction_pipeline import ExtractionPipeline
+
+PARAGRAPH = "<p>Gunmen attacked the police station in Mirebalais overnight, officials said, and residents fled.</p>"
+
+
+def make_page(index):
+    return ("<html><head><title>Story</title></head><body><nav><a href='/'>Home</a></nav>"
+            f"<div class='article-body'><p>Report {index}: Kraków</p>" + PARAGRAPH * 6 + "</div></body></html>")
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/missing':
+            self.send_response(404)
+            self.end_headers()
+            return
+        index = int(self.path.rsplit('/', 1)[1])
+        if index % 2:
+            # Declared charset, non-UTF-8 bytes
+            body, content_type = make_page(index).encode('iso-8859-2'), 'text/html; charset=iso-8859-2'
+        else:
+            body, content_type = make_page(index).encode('utf-8'), 'text/html'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def run_pipeline(parse_workers, count=6, queue_size=None):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = SelectorRegistry(str(Path(tmp) / 'selectors.json'))
+        pipeline = ExtractionPipeline(parse_workers=parse_workers, queue_size=queue_size, registry=registry)
+        try:
+            urls = [f"{base}/story/{i}" for i in range(count)] + [f"{base}/missing"]
+            results = {url: (result, error) for url, result, error in pipeline.run(urls, download_workers=4)}
+        finally:
+            pipeline.shutdown()
+            server.shutdown()
+        return base, results, registry
+
+
+def check_results(base, results, registry, count):
+    assert len(results) == count + 1
+    assert results[f"{base}/missing"][0] is None and results[f"{base}/missing"][1] is not None
+    for i in range(count):
+        result, error = results[f"{base}/story/{i}"]
+        assert error is None
+        assert result['body'].startswith(f"Report {i}: Kraków"), result['body'][:40]
+    if LXML_AVAILABLE:
+        # Worker-side selector choices were replayed into the parent registry
+        assert 'article-body' in registry.get('127.0.0.1')
+
+
+def test_process_pool_pipeline():
+    base, results, registry = run_pipeline(parse_workers=2, queue_size=2)
+    check_results(base, results, registry, 6)
+
+
+def test_in_thread_fallback():
+    base, results, registry = run_pipeline(parse_workers=0, count=3)
+    check_results(base, results, registry, 3)
+
+
+class BrokenIngest:
+    """Yields one download error, then the download generator itself fails"""
+
+    def iter_html(self, urls, **kwargs):
+        yield urls[0], None, IOError("connection reset")
+        raise RuntimeError("event loop closed")
+
+
+def test_failing_downloads_report_every_url():
+    original = extraction_pipeline.get_ingest_engine
+    extraction_pipeline.get_ingest_engine = BrokenIngest
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = ExtractionPipeline(parse_workers=0, registry=SelectorRegistry(str(Path(tmp) / 'selectors.json')))
+        try:
+            urls = [f"https://example.com/{i}" for i in range(3)]
+            results = {url: error for url, _, error in pipeline.run(urls)}
+        finally:
+            extraction_pipeline.get_ingest_engine = original
+            pipeline.shutdown()
+    assert isinstance(results[urls[0]], IOError)
+    assert all(isinstance(results[url], RuntimeError) for url in urls[1:])
+
+
+if __name__ == "__main__":
+    test_process_pool_pipeline()
+    test_in_thread_fallback()
+    test_failing_downloads_report_every_url()
+    print("\nAll extraction pipeline tests passed")
@@ -0,0 +1,104 @@
+"""Test per-domain politeness in the fetch scheduler (runs offline)"""
+import threading
+import time
+from collections import Counter
+
+from fetch_scheduler import FetchScheduler, TokenBucket
+
+
+class Recorder:
+    """Fake fetch that tracks how many requests hit each domain at once"""
+
+    def __init__(self, duration=0.05):
+        self.duration = duration
+        self.active = Counter()
+        self.peak = Counter()
+        self.peak_total = 0
+        self.started = []
+        self.lock = threading.Lock()
+
+    def __call__(self, url):
+        domain = url.split('/')[2]
+        with self.lock:
+            self.active[domain] += 1
+            self.peak[domain] = max(self.peak[domain], self.active[domain])
+            self.peak_total = max(self.peak_total, sum(self.active.values()))
+            self.started.append((time.monotonic(), domain))
+        time.sleep(self.duration)
+        with self.lock:
+            self.active[domain] -= 1
+        if 'fail' in url:
+            raise IOError("blocked")
+        return len(url)
+
+
+def urls(domain, count):
+    return [f"https://{domain}/article/{i}" for i in range(count)]
+
+
+def test_per_domain_and_global_caps():
+    scheduler = FetchScheduler(global_limit=5, default_policy=(2, 1000.0, 1000),
+                               domain_policies={'news.google.com': (3, 1000.0, 1000)})
+    fetch = Recorder()
+    items = urls('news.google.com', 12) + urls('reuters.com', 6) + urls('bbc.com', 3)
+    results = list(scheduler.map_unordered(fetch, items))
+
+    assert len(results) == len(items)
+    assert fetch.peak['news.google.com'] <= 3
+    assert fetch.peak['reuters.com'] <= 2
+    assert fetch.peak_total <= 5
+    assert scheduler.stats()['in_flight'] == 0
+
+
+def test_hosts_are_interleaved():
+    scheduler = FetchScheduler(global_limit=3, default_policy=(1, 1000.0, 1000), domain_policies={})
+    fetch = Recorder()
+    items = urls('one.example', 6) + urls('two.example', 2) + urls('three.example', 2)
+    list(scheduler.map_unordered(fetch, items))
+    # The big host does not monopolise the first slots
+    first_wave = {domain for _, domain in fetch.started[:3]}
+    assert first_wave == {'one.example', 'two.example', 'three.example'}
+
+
+def test_rate_limit_spaces_requests():
+    scheduler = FetchScheduler(global_limit=8, default_policy=(8, 20.0, 1), domain_policies={})
+    fetch = Recorder(duration=0)
+    start = time.monotonic()
+    list(scheduler.map_unordered(fetch, urls('slow.example', 5)))
+    # 1 burst token then 20/s: the last of 5 requests can't start before ~0.2s
+    assert time.monotonic() - start >= 0.18
+
+
+def test_errors_are_returned_not_raised():
+    scheduler = FetchScheduler(global_limit=4)
+    fetch = Recorder(duration=0)
+    results = {item: (result, error) for item, result, error in
+               scheduler.map_unordered(fetch, ['https://a.example/ok', 'https://b.example/fail'])}
+    assert results['https://a.example/ok'][1] is None
+    assert isinstance(results['https://b.example/fail'][1], IOError)
+
+
+def test_abandoned_run_releases_slots():
+    scheduler = FetchScheduler(global_limit=4, default_policy=(4, 1000.0, 1000), domain_policies={})
+    fetch = Recorder(duration=0.05)
+    runner = scheduler.map_unordered(fetch, urls('x.example', 8))
+    next(runner)
+    runner.close()
+    time.sleep(0.2)
+    assert scheduler.stats()['in_flight'] == 0
+
+
+def test_token_bucket_acquire_timeout():
+    bucket = TokenBucket(rate=1.0, capacity=1)
+    assert bucket.acquire()
+    assert not bucket.acquire(timeout=0.05)
+
+
+if __name__ == "__main__":
+    test_per_domain_and_global_caps()
+    test_hosts_are_interleaved()
+    test_rate_limit_spaces_requests()
+    test_errors_are_returned_not_raised()
+    test_abandoned_run_releases_slots()
+    test_token_bucket_acquire_timeout()
+    print("\nAll fetch scheduler tests passed")
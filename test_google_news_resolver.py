@@ -0,0 +1,100 @@
+"""Test Google News link resolution and canonical URL dedup (runs offline)"""
+import base64
+import tempfile
+from pathlib import Path
+
+from google_news_resolver import (
+    GoogleNewsResolver, canonicalize_url, decode_article_id, is_google_news_link
+)
+
+
+def _varint(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7f
+        n >>= 7
+        out.append(byte | (0x80 if n else 0))
+        if not n:
+            return bytes(out)
+
+
+def make_id(payload: bytes) -> str:
+    data = b'\x08\x13\x22' + _varint(len(payload)) + payload + b'\xd2\x01\x00'
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+LONG_URL = "https://www.reuters.com/world/europe/" + "estonia-says-russian-jets-violated-airspace-" * 4 + "2025-09-19/"
+LEGACY_LINK = f"https://news.google.com/rss/articles/{make_id(LONG_URL.encode())}?oc=5"
+OPAQUE_LINK = f"https://news.google.com/rss/articles/{make_id(b'AU_yqLOpaqueToken123')}?oc=5"
+
+
+class OfflineResolver(GoogleNewsResolver):
+    """Resolver whose online lookup is answered from a table"""
+
+    def __init__(self, cache_file, answers):
+        super().__init__(cache_file)
+        self.answers = answers
+        self.lookups = 0
+
+    def _resolve_online(self, article_id):
+        self.lookups += 1
+        return self.answers.get(article_id)
+
+
+def test_decode_legacy_ids_offline():
+    article_id = LEGACY_LINK.split('/articles/')[1].split('?')[0]
+    # Long URLs use a two-byte length prefix
+    assert len(LONG_URL) > 127
+    assert decode_article_id(article_id) == LONG_URL
+    opaque_id = OPAQUE_LINK.split('/articles/')[1].split('?')[0]
+    assert decode_article_id(opaque_id) is None
+    assert is_google_news_link(OPAQUE_LINK)
+    assert not is_google_news_link(LONG_URL)
+
+
+def test_canonicalize_url():
+    assert canonicalize_url("http://www.BBC.com/news/world-123/?utm_source=rss&id=7#top") == \
+        "https://bbc.com/news/world-123?id=7"
+    assert canonicalize_url("https://example.com/story/amp") == canonicalize_url("https://example.com/story")
+
+
+def test_resolve_cache_and_dedup():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = str(Path(tmp) / 'links.json')
+        opaque_id = OPAQUE_LINK.split('/articles/')[1].split('?')[0]
+        resolver = OfflineResolver(cache_file, {opaque_id: "https://apnews.com/article/haiti-police-1?utm_medium=rss"})
+
+        articles = [
+            {'title': 'Estonia airspace - Reuters', 'link': LEGACY_LINK, 'summary': 'short'},
+            {'title': 'Estonia airspace (copy)', 'link': LONG_URL + '?utm_source=x', 'summary': 'a much longer summary'},
+            {'title': 'Haiti police station attacked - AP', 'link': OPAQUE_LINK, 'summary': ''},
+        ]
+        unique = resolver.resolve_articles(articles)
+
+        assert len(unique) == 2
+        assert unique[0]['link'] == LONG_URL
+        assert unique[0]['google_link'] == LEGACY_LINK
+        assert unique[0]['summary'] == 'a much longer summary'
+        assert unique[1]['link'].startswith("https://apnews.com/article/haiti-police-1")
+        assert resolver.lookups == 1
+
+        # The online answer persists; a fresh resolver needs no lookup
+        reloaded = OfflineResolver(cache_file, {})
+        assert reloaded.resolve(OPAQUE_LINK).startswith("https://apnews.com/")
+        assert reloaded.lookups == 0
+
+
+def test_offline_only_mode_leaves_opaque_links():
+    with tempfile.TemporaryDirectory() as tmp:
+        resolver = OfflineResolver(str(Path(tmp) / 'links.json'), {})
+        article = {'title': 'x', 'link': OPAQUE_LINK}
+        assert resolver.resolve_articles([article], allow_network=False)[0]['link'] == OPAQUE_LINK
+        assert resolver.lookups == 0
+
+
+if __name__ == "__main__":
+    test_decode_legacy_ids_offline()
+    test_canonicalize_url()
+    test_resolve_cache_and_dedup()
+    test_offline_only_mode_leaves_opaque_links()
+    print("\nAll Google News resolver tests passed")
@@ -0,0 +1,108 @@
+"""Test the shared HTTP client against a local server (runs offline)"""
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from http_client import HttpClient, get_http_client, _dns_cache
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Local Feed</title>
+<item><title>Russian jets violate Estonian airspace</title><link>https://x.example/1</link></item>
+<item><title>Haiti gangs attack police station</title><link>https://x.example/2</link></item>
+</channel></rss>"""
+
+hits = {'flaky': 0}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/feed.xml':
+            body = RSS
+            encoding = None
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body, encoding = gzip.compress(RSS), 'gzip'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/rss+xml')
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == '/flaky':
+            hits['flaky'] += 1
+            status = 503 if hits['flaky'] == 1 else 200
+            self.send_response(status)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'ok')
+        else:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_fetch_feed_parses_gzipped_bytes():
+    server, base = start_server()
+    try:
+        feed = HttpClient().fetch_feed(f"{base}/feed.xml")
+        assert feed.status == 200
+        assert not feed.bozo
+        assert [e.title for e in feed.entries] == [
+            'Russian jets violate Estonian airspace', 'Haiti gangs attack police station'
+        ]
+    finally:
+        server.shutdown()
+
+
+def test_errors_do_not_raise():
+    server, base = start_server()
+    try:
+        missing = HttpClient().fetch_feed(f"{base}/missing.xml")
+        assert missing.status == 404
+        assert missing.entries == []
+    finally:
+        server.shutdown()
+
+    # Nothing listening any more: a bozo result instead of an exception
+    refused = HttpClient().fetch_feed(f"{base}/feed.xml", timeout=(0.5, 0.5))
+    assert refused.bozo and refused.entries == []
+
+
+def test_retries_transient_server_errors():
+    server, base = start_server()
+    try:
+        response = HttpClient().get(f"{base}/flaky", timeout=2)
+        assert response.status_code == 200
+        assert hits['flaky'] == 2
+    finally:
+        server.shutdown()
+
+
+def test_shared_client_and_dns_cache():
+    server, base = start_server()
+    try:
+        client = get_http_client()
+        assert client is get_http_client()
+        port = server.server_address[1]
+        response = client.get(f"http://localhost:{port}/flaky", timeout=2)
+        assert response.ok
+        assert ('localhost', port) in _dns_cache._entries
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_fetch_feed_parses_gzipped_bytes()
+    test_errors_do_not_raise()
+    test_retries_transient_server_errors()
+    test_shared_client_and_dns_cache()
+    print("\nAll HTTP client tests passed")
@@ -0,0 +1,101 @@
+"""Test incremental incident clustering (runs offline)"""
+from incident_clusterer import IncidentClusterer, group_into_events
+from report_synthesizer import IntelligenceSynthesizer
+from narrative_generator import NarrativeGenerator
+
+
+def article(title, summary, published, source, link):
+    return {'title': title, 'summary': summary, 'published': published, 'source': source, 'link': link}
+
+
+ESTONIA = [
+    article('Russian jets violate Estonian airspace - Reuters',
+            'Three Russian MiG-31 jets entered Estonian airspace for 12 minutes.',
+            'Fri, 19 Sep 2025 10:00:00 GMT', 'Reuters', 'https://r.example/1'),
+    article('Estonia requests NATO Article 4 talks over airspace violation - BBC',
+            'Estonia invoked Article 4 after Russian jets violated its airspace.',
+            'Fri, 19 Sep 2025 16:00:00 GMT', 'BBC', 'https://b.example/2'),
+    article('NATO scrambles jets after Russian airspace violation over Estonia - CNN',
+            'Italian F-35s intercepted the Russian jets over Estonia.',
+            'Sat, 20 Sep 2025 09:00:00 GMT', 'CNN', 'https://c.example/3'),
+]
+
+HAITI = [
+    article('Haiti gangs attack police station in Port-au-Prince - AP',
+            'Gang members attacked a police station overnight in Port-au-Prince.',
+            'Sat, 20 Sep 2025 08:00:00 GMT', 'AP', 'https://a.example/4'),
+    article('Police station attacked by gangs in Haiti capital - Al Jazeera',
+            'Armed gangs stormed a police station in Port-au-Prince, Haiti.',
+            'Sat, 20 Sep 2025 12:00:00 GMT', 'Al Jazeera', 'https://aj.example/5'),
+]
+
+
+def test_articles_group_into_incidents():
+    events = group_into_events(ESTONIA + HAITI)
+    for event in events:
+        print(f"[{event['article_count']}] {event['title']} ({', '.join(event['key_terms'])})")
+    assert len(events) == 2
+    assert events[0]['article_count'] == 3
+    assert events[1]['article_count'] == 2
+    assert set(events[1]['sources']) == {'AP', 'Al Jazeera'}
+
+
+def test_incremental_assignment_reuses_events():
+    clusterer = IncidentClusterer()
+    first = clusterer.add_articles(ESTONIA[:2])
+    # A later poll joins the existing event instead of opening a new one
+    later = clusterer.add_article(ESTONIA[2])
+    assert first[0] == first[1] == later
+    # Re-adding a known link is idempotent
+    assert clusterer.add_article(ESTONIA[0]) == later
+    assert len(clusterer.get_events()) == 1
+
+
+def test_time_window_splits_old_and_new_incidents():
+    clusterer = IncidentClusterer(window_hours=24)
+    old = dict(ESTONIA[0], link='old', published='Mon, 01 Sep 2025 10:00:00 GMT')
+    ids = clusterer.add_articles([old, ESTONIA[0]])
+    assert ids[0] != ids[1]
+
+
+def test_key_points_one_per_incident():
+    points = IntelligenceSynthesizer().extract_key_points(ESTONIA + HAITI)
+    assert len(points) == 2
+
+
+def test_timeline_is_event_based():
+    timeline = NarrativeGenerator()._build_timeline(ESTONIA + HAITI)
+    assert len(timeline) == 2
+    assert timeline[0]['last_seen_ts'] >= timeline[1]['last_seen_ts']
+
+
+def test_prune_releases_term_statistics():
+    clusterer = IncidentClusterer(retention_hours=24)
+    estonia_ids = clusterer.add_articles(ESTONIA, prune=False)
+    clusterer.add_articles(HAITI, prune=False)
+    haiti_only = IncidentClusterer()
+    haiti_only.add_articles(HAITI, prune=False)
+
+    # Haiti's event is newer; only Estonia's has been idle past the retention
+    clusterer.prune(now=clusterer.latest_seen + 24 * 3600 - 60)
+    assert len(clusterer.events) == 1
+    assert clusterer.doc_count == haiti_only.doc_count == len(HAITI)
+    assert clusterer.doc_freq == haiti_only.doc_freq
+    assert set(clusterer.term_index) == set(haiti_only.term_index)
+
+    clusterer.prune(now=clusterer.latest_seen + 10 * 24 * 3600)
+    assert clusterer.doc_count == 0 and not clusterer.doc_freq and not clusterer.term_index
+
+    # A pruned event can still be summarized from the articles it was given
+    summary = clusterer.summarize_event(estonia_ids[0], ESTONIA)
+    assert summary['article_count'] == 3 and summary['first_seen_ts'] < summary['last_seen_ts']
+
+
+if __name__ == "__main__":
+    test_articles_group_into_incidents()
+    test_incremental_assignment_reuses_events()
+    test_time_window_splits_old_and_new_incidents()
+    test_key_points_one_per_incident()
+    test_timeline_is_event_based()
+    test_prune_releases_term_statistics()
+    print("\nAll incident clustering tests passed")
@@ -0,0 +1,116 @@
+"""Test incremental narrative updates for scheduled reports (runs offline)"""
+import os
+import tempfile
+
+from fast_llm_synthesizer import FastLLMSynthesizer
+from llm_gateway import LLMGateway
+from llm_providers import LLMProvider, ProviderRegistry
+from near_duplicates import title_key
+from report_scheduler import ReportScheduler, FULL_REFRESH_NEW_ARTICLES
+from scheduled_reports import ScheduledReport
+
+
+class RecordingSynth:
+    """Stands in for FastLLMSynthesizer; records which path each country took"""
+
+    def __init__(self):
+        self.calls = []
+
+    def synthesize_country_report(self, country, articles, custom_prompt=None):
+        self.calls.append(('full', country, len(articles)))
+        return {'narrative': f"Full brief on {country} from {len(articles)} articles",
+                'articles_with_content': articles, 'fallback': False}
+
+    def synthesize_country_reports(self, country_articles, custom_prompt=None):
+        return {country: self.synthesize_country_report(country, articles, custom_prompt)
+                for country, articles in country_articles.items()}
+
+    def update_country_report(self, country, prior_narrative, new_articles, custom_prompt=None):
+        self.calls.append(('update', country, len(new_articles)))
+        return {'narrative': f"{prior_narrative} + {len(new_articles)} new",
+                'articles_with_content': new_articles, 'fallback': False}
+
+
+class EchoProvider(LLMProvider):
+    name = 'echo'
+
+    def configured(self):
+        return True
+
+    def _connect(self):
+        return object()
+
+    def _complete(self, client, messages, temperature, max_tokens):
+        self.last_prompt = messages[-1]['content']
+        return "Updated brief."
+
+
+def make_articles(titles):
+    return [{'title': t, 'link': f"https://example.com/{i}", 'source': 'Wire',
+             'published': '2025-09-20T10:00:00'} for i, t in enumerate(titles)]
+
+
+def _scheduler():
+    path = os.path.join(tempfile.mkdtemp(), 'reports.db')
+    return ReportScheduler(db=ScheduledReport(path))
+
+
+def test_runs_reuse_update_or_rewrite_the_narrative():
+    scheduler = _scheduler()
+    synth = RecordingSynth()
+    first = make_articles(['Gangs attack police station in capital', 'Port closed after clashes'])
+
+    reports = {'Haiti': {'articles': first}}
+    scheduler._add_narratives(reports, 'gangs', 7, synth)
+    assert synth.calls == [('full', 'Haiti', 2)]
+
+    # Same stories again (one with a publisher suffix): no LLM call
+    again = make_articles(['Gangs attack police station in capital - Wire', 'Port closed after clashes'])
+    reports = {'Haiti': {'articles': again}}
+    scheduler._add_narratives(reports, 'gangs', 7, synth)
+    assert len(synth.calls) == 1
+    assert reports['Haiti']['narrative'] == 'Full brief on Haiti from 2 articles'
+
+    # One new story: only it is sent, with the prior brief
+    reports = {'Haiti': {'articles': again + make_articles(['UN extends mission mandate'])}}
+    scheduler._add_narratives(reports, 'gangs', 7, synth)
+    assert synth.calls[-1] == ('update', 'Haiti', 1)
+    state = scheduler.db.get_narrative_state(7, 'Haiti')
+    assert state['narrative'] == 'Full brief on Haiti from 2 articles + 1 new'
+    assert state['updates'] == 1
+    assert title_key({'title': 'UN extends mission mandate'}) in state['fingerprints']
+
+    # A flood of news or a changed prompt means a full rewrite
+    flood = make_articles([f"Story number {i} about fuel shortages" for i in range(FULL_REFRESH_NEW_ARTICLES + 1)])
+    scheduler._add_narratives({'Haiti': {'articles': flood}}, 'gangs', 7, synth)
+    assert synth.calls[-1][0] == 'full'
+    scheduler._add_narratives({'Haiti': {'articles': flood}}, 'elections', 7, synth)
+    assert synth.calls[-1][0] == 'full'
+    assert scheduler.db.get_narrative_state(7, 'Haiti')['updates'] == 0
+
+
+def test_failed_llm_narrative_is_not_stored():
+    scheduler = _scheduler()
+    synth = RecordingSynth()
+    synth.synthesize_country_report = lambda country, articles, custom_prompt=None: {
+        'narrative': 'Basic narrative', 'articles_with_content': articles, 'fallback': True}
+    scheduler._add_narratives({'Haiti': {'articles': make_articles(['Gangs attack'])}}, '', 3, synth)
+    assert scheduler.db.get_narrative_state(3, 'Haiti') is None
+
+
+def test_update_prompt_carries_prior_brief_and_new_articles():
+    provider = EchoProvider()
+    registry = ProviderRegistry(preferred='echo', providers={'echo': provider})
+    synth = FastLLMSynthesizer(LLMGateway(registry, providers=[provider], limits={'echo': (4, 0)}))
+    new = make_articles(['UN extends mission mandate'])
+    assert synth._write_update('Haiti', 'Gangs control the capital.', new, 'gangs') == 'Updated brief.'
+    assert 'PREVIOUS BRIEFING:\nGangs control the capital.' in provider.last_prompt
+    assert 'UN extends mission mandate' in provider.last_prompt
+    assert 'USER FOCUS AREAS: gangs' in provider.last_prompt
+
+
+if __name__ == "__main__":
+    test_runs_reuse_update_or_rewrite_the_narrative()
+    test_failed_llm_narrative_is_not_stored()
+    test_update_prompt_carries_prior_brief_and_new_articles()
+    print("\nAll incremental narrative tests passed")
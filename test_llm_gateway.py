@@ -0,0 +1,136 @@
+"""Test the LLM gateway: limits, retries, hedging, fallback, call records (runs offline)"""
+import threading
+import time
+
+from llm_gateway import LLMGateway, LLMGatewayError, ProviderLimits
+from llm_providers import LLMProvider, ProviderRegistry
+
+
+class ScriptedProvider(LLMProvider):
+    """Answers after `delay` seconds; fails the first `failures` calls"""
+
+    def __init__(self, name, delay=0.0, failures=0, always_fail=False):
+        super().__init__()
+        self.name = name
+        self.delay = delay
+        self.failures = failures
+        self.always_fail = always_fail
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._count_lock = threading.Lock()
+
+    def configured(self):
+        return True
+
+    def _connect(self):
+        return object()
+
+    def _complete(self, client, messages, temperature, max_tokens):
+        with self._count_lock:
+            self.calls += 1
+            call = self.calls
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            delay = self.delay(call) if callable(self.delay) else self.delay
+            time.sleep(delay)
+            if self.always_fail or call <= self.failures:
+                raise IOError(f"{self.name} overloaded")
+            return f"{self.name}: {messages[-1]['content']}"
+        finally:
+            with self._count_lock:
+                self.active -= 1
+
+
+def _gateway(*providers, **kwargs):
+    registry = ProviderRegistry(preferred=providers[0].name, providers={p.name: p for p in providers})
+    kwargs.setdefault('backoff', 0.01)
+    kwargs.setdefault('hedge_percentile', None)
+    kwargs.setdefault('limits', {p.name: (8, 0) for p in providers})
+    return LLMGateway(registry, providers=list(providers), **kwargs)
+
+
+def test_concurrency_cap_is_shared_by_callers():
+    slow = ScriptedProvider('slow', delay=0.05)
+    gateway = _gateway(slow, limits={'slow': (2, 0)})
+    threads = [threading.Thread(target=gateway.generate, args=(f"q{i}",)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert slow.calls == 8
+    assert slow.max_active == 2
+
+
+def test_rpm_bucket_limits_request_rate():
+    limits = ProviderLimits(concurrency=4, rpm=60)  # 1 per second, burst of 15
+    deadline = time.monotonic() + 0.1
+    entered = 0
+    while limits.try_enter():
+        entered += 1
+        limits.leave()
+    assert entered == 15
+    assert not limits.enter(deadline)  # bucket empty, next token is a second away
+
+
+def test_retry_then_fallback_and_records():
+    flaky = ScriptedProvider('flaky', failures=1)
+    gateway = _gateway(flaky)
+    assert gateway.generate('status?') == 'flaky: status?'
+    assert gateway.stats['flaky']['retries'] == 1
+    assert gateway.stats['flaky']['failures'] == 1
+
+    down = ScriptedProvider('down', always_fail=True)
+    local = ScriptedProvider('local')
+    gateway = _gateway(down, local, retries=1)
+    assert gateway.complete([{'role': 'system', 'content': 'Be brief.'},
+                             {'role': 'user', 'content': 'status?'}]) == 'local: status?'
+    assert down.calls == 2
+    assert gateway.stats['local']['fallbacks'] == 1
+
+    record = gateway.calls[-1]
+    assert record['provider'] == 'local' and record['ok']
+    assert record['prompt_tokens'] > 0 and record['completion_tokens'] > 0
+    assert gateway.summary()['local']['p50_latency'] is not None
+
+    gateway = _gateway(ScriptedProvider('a', always_fail=True), ScriptedProvider('b', always_fail=True), retries=0)
+    try:
+        gateway.generate('status?')
+        raise AssertionError("expected LLMGatewayError")
+    except LLMGatewayError as e:
+        assert 'a overloaded' in str(e) and 'b overloaded' in str(e)
+
+
+def test_hung_primary_leaves_time_for_fallback():
+    hung = ScriptedProvider('hung', delay=2.0)
+    local = ScriptedProvider('local')
+    gateway = _gateway(hung, local)
+    started = time.monotonic()
+    assert gateway.generate('status?', timeout=0.6) == 'local: status?'
+    assert time.monotonic() - started < 0.6
+    assert gateway.stats['local']['fallbacks'] == 1
+
+
+def test_slow_call_is_hedged_once_latency_is_known():
+    # Call 11 stalls; its hedge (call 12) answers at the usual speed
+    provider = ScriptedProvider('p', delay=lambda call: 1.0 if call == 11 else 0.01)
+    gateway = _gateway(provider, hedge_percentile=0.9, hedge_min_delay=0.05, hedge_min_samples=10)
+    for i in range(10):
+        gateway.generate(f"warm {i}")
+    assert gateway.stats['p']['hedges'] == 0
+
+    started = time.monotonic()
+    assert gateway.generate('slow one') == 'p: slow one'
+    assert time.monotonic() - started < 0.5
+    assert gateway.stats['p']['hedges'] == 1
+    assert gateway.stats['p']['hedge_wins'] == 1
+
+
+if __name__ == "__main__":
+    test_concurrency_cap_is_shared_by_callers()
+    test_rpm_bucket_limits_request_rate()
+    test_retry_then_fallback_and_records()
+    test_hung_primary_leaves_time_for_fallback()
+    test_slow_call_is_hedged_once_latency_is_known()
+    print("\nAll LLM gateway tests passed")
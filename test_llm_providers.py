@@ -0,0 +1,144 @@
+"""Test the LLM provider registry: lazy setup, defaults, health (runs offline)"""
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fast_llm_synthesizer import FastLLMSynthesizer
+from llm_gateway import LLMGateway
+from llm_providers import LLMProvider, OllamaProvider, ProviderRegistry, ProviderUnavailable
+
+
+class FakeProvider(LLMProvider):
+    name = 'fake'
+    default_model = 'fake-1'
+
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.connects = 0
+
+    def configured(self):
+        return True
+
+    def _connect(self):
+        self.connects += 1
+        return object()
+
+    def _complete(self, client, messages, temperature, max_tokens):
+        if self.fail:
+            raise IOError("quota exceeded")
+        return f"echo: {messages[-1]['content']}"
+
+
+class OllamaHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply({'models': [{'name': 'mistral:latest'}]})
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        OllamaHandler.requests_seen.append(payload)
+        self._reply({'response': f"ollama says: {payload['prompt']}"})
+
+
+def test_client_is_built_once_and_health_is_tracked():
+    provider = FakeProvider()
+    assert provider.state == 'cold'
+    assert provider.generate('hi') == 'echo: hi'
+    assert provider.generate('again') == 'echo: again'
+    assert provider.connects == 1
+    health = provider.health()
+    assert health['state'] == 'ready' and health['calls'] == 2 and health['failures'] == 0
+    assert health['avg_latency'] is not None
+
+    failing = FakeProvider(fail=True)
+    try:
+        failing.generate('hi')
+        raise AssertionError("expected failure")
+    except IOError:
+        pass
+    assert failing.health()['state'] == 'degraded'
+    assert failing.health()['last_error'] == 'quota exceeded'
+
+
+def test_registry_defaults_and_lazy_imports():
+    saved = {k: os.environ.pop(k, None) for k in ('GEMINI_API_KEY', 'OPENAI_API_KEY', 'OLLAMA_URL', 'LLM_PROVIDER')}
+    try:
+        imported_before = 'google.generativeai' in sys.modules
+        registry = ProviderRegistry()
+        assert registry.default() is None
+        assert registry.get('gemini').state == 'cold'
+        assert ('google.generativeai' in sys.modules) == imported_before  # no SDK import yet
+        try:
+            registry.get('gemini').client()
+            raise AssertionError("expected ProviderUnavailable")
+        except ProviderUnavailable:
+            pass
+        assert registry.health()['providers']['gemini']['state'] == 'unavailable'
+
+        os.environ['OPENAI_API_KEY'] = 'sk-test'
+        registry = ProviderRegistry()
+        assert registry.default().name == 'openai'  # gemini preferred but not configured
+        assert registry.get('openai') is registry.get('openai')
+
+        fake = FakeProvider()
+        registry = ProviderRegistry(preferred='fake', providers={'fake': fake})
+        assert registry.default() is fake
+        registry.warm(background=False)
+        assert fake.state == 'ready' and fake.connects == 1
+
+        # Synthesizers share providers through the gateway: construction does no setup
+        synth = FastLLMSynthesizer(LLMGateway(registry, providers=[fake]))
+        assert synth.enabled and synth.provider == 'fake'
+        assert fake.connects == 1
+    finally:
+        for key, value in saved.items():
+            os.environ.pop(key, None)
+            if value is not None:
+                os.environ[key] = value
+
+
+def test_ollama_provider_over_pooled_http():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        provider = OllamaProvider(model='mistral', base_url=f"http://127.0.0.1:{server.server_port}")
+        provider.configured = lambda: True
+        assert provider.check()
+        assert provider.generate('ping', temperature=0.2, max_tokens=50) == 'ollama says: ping'
+        sent = OllamaHandler.requests_seen[-1]
+        assert sent['options'] == {'temperature': 0.2, 'num_predict': 50}
+
+        answer = provider.complete([{'role': 'system', 'content': 'Be brief.'},
+                                    {'role': 'user', 'content': 'Status?'}])
+        assert OllamaHandler.requests_seen[-1]['system'] == 'Be brief.'
+        assert answer == 'ollama says: User: Status?\nAssistant: '
+
+        missing = OllamaProvider(model='llama3', base_url=f"http://127.0.0.1:{server.server_port}")
+        missing.configured = lambda: True
+        assert not missing.check()
+        assert missing.state == 'unavailable' and 'ollama pull llama3' in missing.last_error
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    test_client_is_built_once_and_health_is_tracked()
+    test_registry_defaults_and_lazy_imports()
+    test_ollama_provider_over_pooled_http()
+    print("\nAll LLM provider tests passed")
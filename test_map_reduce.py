@@ -0,0 +1,111 @@
+"""Test map-reduce synthesis over large article sets (runs offline)"""
+import re
+import threading
+import time
+
+import fast_llm_synthesizer
+from fast_llm_synthesizer import FastLLMSynthesizer, MAP_CHUNK_ARTICLES
+from llm_gateway import LLMGateway
+from llm_providers import LLMProvider, ProviderRegistry
+from token_counter import count_tokens
+
+
+class NoteTaker(LLMProvider):
+    """Answers map prompts with a note naming the batch's first article, after `delay`"""
+
+    def __init__(self, delay=0.0, fail_on=None):
+        super().__init__()
+        self.name = 'notes'
+        self.delay = delay
+        self.fail_on = fail_on
+        self.prompts = []
+        self._prompt_lock = threading.Lock()
+
+    def configured(self):
+        return True
+
+    def _connect(self):
+        return object()
+
+    def _complete(self, client, messages, temperature, max_tokens):
+        prompt = messages[-1]['content']
+        with self._prompt_lock:
+            self.prompts.append(prompt)
+        if prompt.startswith('Summarize'):
+            time.sleep(self.delay)
+            first = re.search(r'Title: (Haiti report \d+)', prompt).group(1)
+            if first == self.fail_on:
+                raise IOError("model overloaded")
+            return f"- Note on {first}: gangs attacked the capital."
+        return "Paragraph one.\n\nParagraph two.\n\nParagraph three."
+
+
+def make_articles(n):
+    return [
+        {
+            'title': f'Haiti report {i} on gang attack',
+            'link': f'https://example.com/{i}',
+            'published': '2025-09-20T10:00:00',
+            'full_content': 'Gang violence killed 20 people in Port-au-Prince on Tuesday. ' * 10,
+            'has_content': True,
+        }
+        for i in range(n)
+    ]
+
+
+def _synth(provider, limits=(8, 0)):
+    registry = ProviderRegistry(preferred='notes', providers={'notes': provider})
+    return FastLLMSynthesizer(LLMGateway(registry, providers=[provider], limits={'notes': limits},
+                                         retries=0, hedge_percentile=None))
+
+
+def test_map_notes_cover_every_chunk_in_parallel():
+    provider = NoteTaker(delay=0.1)
+    synth = _synth(provider)
+    articles = make_articles(160)
+
+    started = time.monotonic()
+    notes = synth._map_notes('Haiti', articles)
+    elapsed = time.monotonic() - started
+
+    chunks = len(articles) // MAP_CHUNK_ARTICLES
+    assert len(provider.prompts) == chunks
+    assert notes.count('Batch ') == chunks
+    assert 'Note on Haiti report 150:' in notes
+    # 16 chunks at 0.1s each, 8 at a time: two rounds, not sixteen
+    assert elapsed < 1.0
+    assert count_tokens(notes) <= fast_llm_synthesizer.CONTEXT_TOKEN_BUDGET + chunks * 20
+
+
+def test_failed_chunk_falls_back_to_headlines_and_reduce_writes_brief():
+    provider = NoteTaker(fail_on='Haiti report 10')
+    synth = _synth(provider)
+    narrative = synth._write_narrative('Haiti', make_articles(30), map_reduce=True)
+    assert narrative.startswith('Paragraph one.')
+
+    reduce_prompt = provider.prompts[-1]
+    assert 'notes, each summarizing a batch' in reduce_prompt
+    assert 'Note on Haiti report 0:' in reduce_prompt
+    assert '- 2025-09-20: Haiti report 10 on gang attack' in reduce_prompt
+    assert 'Note on Haiti report 20:' in reduce_prompt
+
+
+def test_chunk_count_fits_provider_limits():
+    # Gemini's defaults: 4 concurrent, 15 RPM (a burst of 3.75 requests)
+    provider = NoteTaker()
+    synth = _synth(provider, limits=(4, 15))
+    started = time.monotonic()
+    notes = synth._map_notes('Haiti', make_articles(150))
+    assert len(provider.prompts) == 3
+    assert 'Batch 3 (articles 101-150):' in notes
+    assert time.monotonic() - started < 1.0  # no queueing on the rate limit
+
+    assert _synth(NoteTaker(), limits=(1, 0))._map_chunk_size(150, None) == 75
+    assert _synth(NoteTaker(), limits=(8, 600))._map_chunk_size(25, None) == MAP_CHUNK_ARTICLES
+
+
+if __name__ == "__main__":
+    test_map_notes_cover_every_chunk_in_parallel()
+    test_failed_chunk_falls_back_to_headlines_and_reduce_writes_brief()
+    test_chunk_count_fits_provider_limits()
+    print("\nAll map-reduce tests passed")
@@ -0,0 +1,81 @@
+"""Test the mock LLM server and an offline benchmark run (runs offline)"""
+import json
+import random
+
+import httpx
+
+from benchmark_synthesis import run_benchmark
+from fast_llm_synthesizer import FastLLMSynthesizer
+from llm_providers import OllamaProvider
+from mock_llm_server import MockLLMServer, mock_completion, parse_latency
+
+
+def test_ollama_protocol_streaming_and_chat():
+    with MockLLMServer(tokens_per_second=2000) as server:
+        provider = OllamaProvider(model='mistral', base_url=server.url)
+        provider.configured = lambda: True
+        assert provider.check()
+        prompt = "Analyze these RECENT articles about Haiti\nTitle: Gangs seize the main port"
+        answer = provider.generate(prompt, max_tokens=400)
+        assert 'Gangs seize the main port' in answer and 'Haiti' in answer
+        assert answer == mock_completion(prompt, 400)  # deterministic
+
+        with httpx.stream('POST', f"{server.url}/api/generate", json={'model': 'mistral', 'prompt': prompt}) as r:
+            lines = [json.loads(line) for line in r.iter_lines() if line]
+        assert len(lines) > 10 and lines[-1]['done'] and lines[-1]['eval_count'] > 0
+        assert ''.join(line['response'] for line in lines) == answer
+
+        reply = httpx.post(f"{server.url}/api/chat", json={
+            'model': 'mistral', 'stream': False, 'messages': [{'role': 'user', 'content': prompt}]}).json()
+        assert reply['message']['role'] == 'assistant' and reply['message']['content'] == answer
+        assert server.stats['ollama_generate'] == 2 and server.stats['ollama_chat'] == 1
+
+
+def test_gemini_shape_and_sse_stream():
+    with MockLLMServer() as server:
+        body = {'contents': [{'parts': [{'text': 'Summarize these articles\nTitle: A\nTitle: B'}], 'role': 'user'}],
+                'generationConfig': {'maxOutputTokens': 200}}
+        reply = httpx.post(f"{server.url}/v1beta/models/gemini-1.5-flash:generateContent", json=body).json()
+        candidate = reply['candidates'][0]
+        assert candidate['finishReason'] == 'STOP'
+        assert candidate['content']['parts'][0]['text'].startswith('- A:')
+        assert reply['usageMetadata']['candidatesTokenCount'] > 0
+
+        url = f"{server.url}/v1beta/models/gemini-1.5-flash:streamGenerateContent?alt=sse"
+        with httpx.stream('POST', url, json=body) as r:
+            events = [json.loads(line[6:]) for line in r.iter_lines() if line.startswith('data: ')]
+        text = ''.join(e['candidates'][0]['content']['parts'][0]['text'] for e in events)
+        assert text == candidate['content']['parts'][0]['text']
+
+
+def test_error_injection_latency_and_batched_answers():
+    with MockLLMServer(error_rate=1.0, error_status=429) as server:
+        r = httpx.post(f"{server.url}/api/generate", json={'prompt': 'hi', 'stream': False})
+        assert r.status_code == 429 and server.stats['error'] == 1
+
+    rng = random.Random(1)
+    assert parse_latency('0.25')(rng) == 0.25
+    assert 0.1 <= parse_latency('uniform:0.1,0.2')(rng) <= 0.2
+    samples = [parse_latency('lognormal:0.5,0.4')(random.Random(i)) for i in range(200)]
+    assert 0.4 < sorted(samples)[100] < 0.6
+
+    prompt = ("=== ARTICLES FOR Haiti ===\nTitle: Port seized\n\n=== ARTICLES FOR Mali ===\nTitle: Convoy hit\n"
+              "FORMAT:\n## COUNTRY: Haiti\n## COUNTRY: Mali")
+    sections = FastLLMSynthesizer._parse_batch(mock_completion(prompt), {'Haiti': [], 'Mali': []})
+    assert 'Port seized' in sections['Haiti'] and 'Convoy hit' in sections['Mali']
+
+
+def test_benchmark_runs_end_to_end_offline():
+    result = run_benchmark('ollama', 'batch', countries=6, articles=5, concurrency=4,
+                           latency='fixed:0.01', tokens_per_second=0, error_rate=0.0)
+    assert result['failures'] == 0
+    assert result['server']['ollama_generate'] == 2  # 6 countries in batches of 4
+    assert result['gateway']['calls'] == 2 and result['gateway']['completion_tokens'] > 0
+
+
+if __name__ == "__main__":
+    test_ollama_protocol_streaming_and_chat()
+    test_gemini_shape_and_sse_stream()
+    test_error_injection_latency_and_batched_answers()
+    test_benchmark_runs_end_to_end_offline()
+    print("\nAll mock LLM server tests passed")
@@ -0,0 +1,81 @@
+"""Test near-duplicate clustering of syndicated wire stories (runs offline)"""
+from near_duplicates import (
+    collapse_near_duplicates, cluster_near_duplicates, strip_publisher_suffix
+)
+
+WIRE_BODY = ("Three Russian MiG-31 fighter jets entered Estonian airspace near Vaindloo "
+             "island on Friday and remained for 12 minutes, the Estonian military said.")
+
+
+def wire_copy(outlet, title=None, extra=''):
+    return {
+        'title': f"{title or 'Russian jets violate Estonian airspace for 12 minutes'} - {outlet}",
+        'summary': WIRE_BODY + extra,
+        'link': f"https://{outlet.lower().replace(' ', '')}.example/story",
+        'source': outlet
+    }
+
+
+def test_syndicated_copies_collapse():
+    articles = [
+        wire_copy('Reuters'),
+        wire_copy('Yahoo News'),
+        wire_copy('US News', extra=' NATO allies were informed.'),
+        wire_copy('Euronews', title='Estonia says Russian jets violated its airspace for 12 minutes'),
+        {
+            'title': 'Haiti gang violence displaces thousands in capital - AP News',
+            'summary': 'Armed gangs attacked several neighborhoods in Port-au-Prince overnight.',
+            'link': 'https://apnews.example/haiti',
+            'source': 'AP News'
+        },
+    ]
+    stories = collapse_near_duplicates(articles)
+    print(f"{len(articles)} articles -> {len(stories)} stories")
+
+    assert len(stories) == 2
+    estonia = stories[0]
+    assert estonia['source_count'] == 4
+    assert set(estonia['sources']) == {'Reuters', 'Yahoo News', 'US News', 'Euronews'}
+    assert len(estonia['duplicate_links']) == 3
+    assert stories[1]['source_count'] == 1
+    # Internal fingerprints never leak into results
+    assert all('_near_dup_fp' not in a for a in articles + stories)
+
+
+def test_collapsing_again_keeps_merged_sources():
+    copies = [wire_copy('Reuters'), wire_copy('Yahoo News'), wire_copy('US News', extra=' NATO allies were informed.')]
+    once = collapse_near_duplicates([dict(a) for a in copies])
+    twice = collapse_near_duplicates(once)
+    assert len(twice) == 1
+    assert twice[0]['source_count'] == once[0]['source_count'] == 3
+    assert twice[0]['sources'] == once[0]['sources']
+    assert twice[0]['duplicate_links'] == once[0]['duplicate_links']
+
+    # An earlier pass's story meeting a fresh copy (engine, then dashboard)
+    later = collapse_near_duplicates(collapse_near_duplicates([dict(a) for a in copies[:2]]) + [dict(copies[2])])
+    assert set(later[0]['sources']) == {'Reuters', 'Yahoo News', 'US News'}
+    assert set(later[0]['duplicate_links'] + [later[0]['link']]) == {a['link'] for a in copies}
+
+
+def test_different_stories_stay_separate():
+    articles = [
+        {'title': f'Story number {i} about a different topic entirely', 'summary': f'Unique body text {i} ' * 3,
+         'source': 'Feed'}
+        for i in range(20)
+    ]
+    clusters = cluster_near_duplicates(articles)
+    assert len(clusters) == 20
+
+
+def test_publisher_suffix_removed():
+    assert strip_publisher_suffix('Coup attempt in Niger - BBC', 'BBC') == 'Coup attempt in Niger'
+    assert strip_publisher_suffix('Kyiv - Moscow talks stall', 'Reuters') == 'Kyiv - Moscow talks stall'
+    assert strip_publisher_suffix('No suffix here') == 'No suffix here'
+
+
+if __name__ == "__main__":
+    test_syndicated_copies_collapse()
+    test_collapsing_again_keeps_merged_sources()
+    test_different_stories_stay_separate()
+    test_publisher_suffix_removed()
+    print("\nAll near-duplicate tests passed")
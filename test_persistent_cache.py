@@ -0,0 +1,188 @@
+"""Test the persistent TTL cache and its use for country facts (runs offline)"""
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import country_intelligence
+from country_intelligence import CountryIntelligence
+from country_facts import CountryFacts
+from historical_data_fetcher import HistoricalDataFetcher, HISTORICAL_DATA_PARTIAL_TTL
+from persistent_cache import PersistentCache
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise IOError(f"HTTP {self.status_code}")
+
+
+class FakeHttp:
+    """Answers REST Countries and Wikipedia URLs, counting requests"""
+
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.urls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.urls.append(url)
+        if self.status_code != 200:
+            return FakeResponse(self.status_code)
+        if '/page/summary/' in url:
+            return FakeResponse(200, {'title': 'Haiti', 'extract': 'Haiti is a country.',
+                                      'content_urls': {'desktop': {'page': 'https://en.wikipedia.org/wiki/Haiti'}}})
+        if '/page/sections/' in url:
+            return FakeResponse(200, {'sections': [{'line': 'History', 'toclevel': 1, 'anchor': 'History'},
+                                                   {'line': 'Cuisine', 'toclevel': 1, 'anchor': 'Cuisine'}]})
+        return FakeResponse(200, [{'name': {'common': 'Haiti', 'official': 'Republic of Haiti'},
+                                   'capital': ['Port-au-Prince'], 'population': 11724763}])
+
+
+def with_fake_http(http, fn):
+    original = country_intelligence.get_http_client
+    country_intelligence.get_http_client = lambda: http
+    try:
+        return fn()
+    finally:
+        country_intelligence.get_http_client = original
+
+
+def test_ttl_expiry_and_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / 'cache.db')
+        cache = PersistentCache(path)
+        cache.set('ns', 'long', {'a': [1, 2]}, ttl=3600)
+        cache.set('ns', 'short', 'gone soon', ttl=0.05)
+        assert cache.get('ns', 'short') == 'gone soon'
+        time.sleep(0.1)
+        assert cache.get('ns', 'short') is None
+        assert cache.get('ns', 'short', 'default') == 'default'
+
+        reopened = PersistentCache(path)
+        assert reopened.get('ns', 'long') == {'a': [1, 2]}
+        assert reopened.stats['disk_hit'] == 1
+        assert reopened.purge_expired() == 1
+        cache.close()
+        reopened.close()
+
+
+def test_warm_lookups_are_memory_hits():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PersistentCache(str(Path(tmp) / 'cache.db'))
+        cache.set('country_basics', 'haiti', {'capital': 'Port-au-Prince'}, ttl=3600)
+        start = time.perf_counter()
+        for _ in range(10000):
+            cache.get('country_basics', 'haiti')
+        per_lookup = (time.perf_counter() - start) / 10000
+        assert per_lookup < 50e-6, per_lookup
+        assert cache.stats['memory_hit'] == 10000
+        cache.close()
+
+
+def test_get_or_fetch_fetches_once_and_skips_errors():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PersistentCache(str(Path(tmp) / 'cache.db'))
+        calls = []
+
+        def slow_fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return {'ok': True}
+
+        threads = [threading.Thread(target=cache.get_or_fetch, args=('ns', 'k', slow_fetch, 3600))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1
+
+        def failing():
+            raise IOError("down")
+        try:
+            cache.get_or_fetch('ns', 'err', failing, 3600)
+        except IOError:
+            pass
+        assert cache.get('ns', 'err', 'absent') == 'absent'
+
+        # "Not found" is remembered (briefly) as None
+        assert cache.get_or_fetch('ns', 'missing', lambda: None, 3600) is None
+        assert cache.get_or_fetch('ns', 'missing', lambda: {'late': 1}, 3600) is None
+        cache.close()
+
+
+def test_country_intelligence_shares_cache_across_instances():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PersistentCache(str(Path(tmp) / 'cache.db'))
+        no_snapshot = CountryFacts(str(Path(tmp) / 'country_facts.json'))
+        http = FakeHttp()
+
+        def lookup():
+            intel = CountryIntelligence(cache, no_snapshot)
+            intel.http = http
+            return intel.get_country_basics('Haiti'), intel.get_wikipedia_extract('Haiti')
+
+        basics, wiki = with_fake_http(http, lookup)
+        assert basics['capital'] == 'Port-au-Prince'
+        assert wiki['extract'] == 'Haiti is a country.'
+        assert [s['title'] for s in wiki['history_sections']] == ['History']
+        assert len(http.urls) == 3
+
+        # A new instance (as each route creates) makes no requests; neither
+        # does the historical fetcher for the same Wikipedia page
+        again = with_fake_http(http, lookup)
+        fetcher = HistoricalDataFetcher(cache)
+        summary = with_fake_http(http, lambda: fetcher.fetch_wikipedia_summary('haiti'))
+        assert again == (basics, wiki)
+        assert summary['summary'] == 'Haiti is a country.'
+        assert len(http.urls) == 3
+
+        # Outages are not cached as "unknown country"
+        failing = FakeHttp(status_code=503)
+        intel = CountryIntelligence(cache, no_snapshot)
+        intel.http = failing
+        assert intel.get_country_basics('Somalia') is None
+        assert intel.get_country_basics('Somalia') is None
+        assert len(failing.urls) == 2
+        cache.close()
+
+
+def test_historical_report_is_kept_briefly_when_a_source_failed():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PersistentCache(str(Path(tmp) / 'cache.db'))
+        fetcher = HistoricalDataFetcher(cache)
+
+        # Wikipedia is down: the report is cached, but not for a day
+        report = with_fake_http(FakeHttp(status_code=429),
+                                lambda: fetcher.get_comprehensive_historical_data('Haiti'))
+        assert 'wikipedia' not in report['sources']
+        expires_at = cache._conn.execute("SELECT expires_at FROM cache WHERE namespace = 'historical_data' "
+                                         "AND key = 'haiti'").fetchone()[0]
+        assert expires_at - time.time() <= HISTORICAL_DATA_PARTIAL_TTL
+
+        # Once it expires, a full report is built; name variants share the entry
+        cache.delete('historical_data', 'haiti')
+        http = FakeHttp()
+        report = with_fake_http(http, lambda: fetcher.get_comprehensive_historical_data('Haiti'))
+        assert report['sources']['wikipedia']['summary'] == 'Haiti is a country.'
+        assert with_fake_http(http, lambda: fetcher.get_comprehensive_historical_data(' haiti ')) == report
+        expires_at = cache._conn.execute("SELECT expires_at FROM cache WHERE namespace = 'historical_data' "
+                                         "AND key = 'haiti'").fetchone()[0]
+        assert expires_at - time.time() > 3600
+        cache.close()
+
+
+if __name__ == "__main__":
+    test_ttl_expiry_and_restart()
+    test_warm_lookups_are_memory_hits()
+    test_get_or_fetch_fetches_once_and_skips_errors()
+    test_country_intelligence_shares_cache_across_instances()
+    test_historical_report_is_kept_briefly_when_a_source_failed()
+    print("\nAll persistent cache tests passed")
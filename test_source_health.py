@@ -0,0 +1,128 @@
+"""Test source health tracking, backoff and circuit breaking (runs offline)"""
+import tempfile
+import time
+from pathlib import Path
+
+import feedparser
+
+from feed_collector import FeedCollector
+
+from source_health import (
+    SourceHealthTracker, get_source_health, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN,
+    MIN_INTERVAL, MAX_INTERVAL
+)
+
+URL = "https://feeds.example/world.xml"
+
+
+def make_tracker(tmp):
+    return SourceHealthTracker(str(Path(tmp) / 'source_health.json'))
+
+
+def test_new_items_and_adaptive_interval():
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = make_tracker(tmp)
+        now = 1_000_000.0
+        assert tracker.record_success(URL, 0.2, ['a', 'b', 'c'], now=now) == 3
+        busy_interval = tracker.records[URL]['interval']
+
+        # Two new links on the next poll shortens the interval further
+        assert tracker.record_success(URL, 0.2, ['c', 'd', 'e'], now=now + 600) == 2
+        assert MIN_INTERVAL <= tracker.records[URL]['interval'] < busy_interval
+
+        # A quiet feed gets polled less often
+        for i in range(10):
+            tracker.record_success(URL, 0.2, ['c', 'd', 'e'], now=now + 1200 + i)
+        assert tracker.records[URL]['interval'] == MAX_INTERVAL
+        assert not tracker.should_poll(URL, now=now + 1300)
+
+
+def test_backoff_and_circuit_breaker():
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = make_tracker(tmp)
+        now = 1_000_000.0
+        delays = []
+        for i in range(CIRCUIT_FAILURE_THRESHOLD):
+            tracker.record_failure(URL, 5.0, "timed out", now=now)
+            delays.append(tracker.records[URL]['next_poll'] - now)
+        # Backoff grows with each consecutive failure
+        assert delays[-1] > delays[0] * 4
+        assert tracker.get_health(URL)['circuit'] == 'open'
+        assert not tracker.should_poll(URL, now=now + 60)
+
+        # After the cooldown a single trial poll is allowed
+        assert tracker.should_poll(URL, now=now + CIRCUIT_COOLDOWN + 1)
+        assert tracker.get_health(URL)['circuit'] == 'half_open'
+        assert not tracker.should_poll(URL, now=now + CIRCUIT_COOLDOWN + 1.5)
+
+        # A failed trial reopens the circuit for longer
+        tracker.record_failure(URL, 5.0, "timed out", now=now + CIRCUIT_COOLDOWN + 2)
+        assert tracker.records[URL]['circuit_cooldown'] == CIRCUIT_COOLDOWN * 2
+
+        # A later success closes it again
+        tracker.record_success(URL, 0.3, ['x'], now=now + 4 * CIRCUIT_COOLDOWN)
+        health = tracker.get_health(URL)
+        assert health['circuit'] == 'closed'
+        assert health['consecutive_failures'] == 0
+        assert 0 < health['error_rate'] < 1
+
+
+def test_stats_persist_next_to_sources_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = get_source_health(str(Path(tmp) / 'sources_config.json'))
+        assert tracker.health_file == Path(tmp) / 'source_health.json'
+        tracker.record_success(URL, 0.25, ['a'], name='World Feed')
+        tracker.save()
+
+        reloaded = SourceHealthTracker(str(tracker.health_file))
+        health = reloaded.get_health(URL)
+        assert health['avg_latency_ms'] == 250
+        assert health['last_success'] is not None
+        assert reloaded.records[URL]['name'] == 'World Feed'
+
+
+def test_saves_from_several_processes_merge():
+    with tempfile.TemporaryDirectory() as tmp:
+        worker_a, worker_b = make_tracker(tmp), make_tracker(tmp)
+        other = "https://feeds.example/africa.xml"
+        now = 1_000_000.0
+        worker_a.record_success(URL, 0.2, ['a'], now=now)
+        worker_b.record_failure(other, 5.0, "timed out", now=now)
+        worker_b.record_success(URL, 0.4, ['a', 'b'], now=now + 60)  # polled later than worker_a
+        worker_b.save()
+        worker_a.save()
+
+        merged = make_tracker(tmp)
+        assert merged.records[other]['failures'] == 1
+        assert merged.records[URL]['last_polled'] == now + 60
+        assert worker_a.records[URL]['last_polled'] == now + 60
+
+
+def test_restarted_collector_polls_sources_it_has_no_articles_for():
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = make_tracker(tmp)
+        # Saved schedule from an earlier process: not due for hours
+        tracker.record_success(URL, 0.2, ['a'], now=time.time())
+        assert not tracker.should_poll(URL)
+
+        source = {'name': 'World Feed', 'url': URL, 'type': 'rss', 'category': 'world'}
+        collector = FeedCollector(cache_dir=tmp, health=tracker)
+        assert collector._due(source)
+
+        feed = feedparser.parse(
+            "<rss><channel><item><title>Port closed after clashes</title>"
+            "<link>https://feeds.example/a</link></item></channel></rss>")
+        articles = collector.collect_from_source(source, feed)
+        assert len(articles) == 1
+        assert not collector._due(source)
+        # Not due: the last articles come back without a request
+        assert collector.collect_from_source(source) == articles
+
+
+if __name__ == "__main__":
+    test_new_items_and_adaptive_interval()
+    test_backoff_and_circuit_breaker()
+    test_stats_persist_next_to_sources_file()
+    test_saves_from_several_processes_merge()
+    test_restarted_collector_polls_sources_it_has_no_articles_for()
+    print("\nAll source health tests passed")
@@ -0,0 +1,90 @@
+"""Test the cached source registry and SourceManager on top of it (runs offline)"""
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from source_registry import SourceRegistry, UNCHANGED
+from source_manager import SourceManager
+
+
+def write_sources(path, sources, blacklist=()):
+    with open(path, 'w') as f:
+        json.dump({'sources': sources, 'blacklist': list(blacklist)}, f)
+
+
+SOURCES = [
+    {'id': 1, 'name': 'BBC World', 'url': 'https://bbc.example/rss', 'type': 'news', 'active': True},
+    {'id': 2, 'name': 'Krebs', 'url': 'https://krebs.example/feed', 'type': 'cyber', 'active': True},
+    {'id': 3, 'name': 'Old Feed', 'url': 'https://old.example/rss', 'type': 'news', 'active': False},
+]
+
+
+def test_views_and_mtime_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'sources_config.json'
+        write_sources(path, SOURCES, blacklist=['https://krebs.example/feed'])
+        registry = SourceRegistry(str(path))
+
+        assert [s['id'] for s in registry.active_sources()] == [1]
+        assert [s['id'] for s in registry.by_category('news')] == [1, 3]
+        assert registry.is_blacklisted('https://krebs.example/feed')
+        assert registry.get(2)['name'] == 'Krebs'
+
+        # Unchanged file: the same cached objects are returned
+        assert registry.data() is registry.data()
+
+        # An external edit is picked up on the next read
+        write_sources(path, SOURCES[:1])
+        os.utime(path, ns=(1, 1))
+        assert len(registry.all_sources()) == 1
+        assert not registry.is_blacklisted('https://krebs.example/feed')
+
+
+def test_update_writes_atomically_and_refreshes_views():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'sources_config.json'
+        write_sources(path, SOURCES)
+        registry = SourceRegistry(str(path))
+        other_process = SourceRegistry(str(path))
+        assert len(other_process.active_sources()) == 2
+
+        def deactivate(data):
+            data['sources'][0]['active'] = False
+            return data['sources'][0]['active']
+
+        # A mutator returning False still writes; only UNCHANGED skips
+        assert registry.update(deactivate) is False
+        assert [s['id'] for s in registry.active_sources()] == [2]
+        assert [s['id'] for s in other_process.active_sources()] == [2]
+
+        before = path.stat().st_ino
+        assert registry.update(lambda data: UNCHANGED) is None
+        assert path.stat().st_ino == before
+
+        # No temp files are left behind
+        assert sorted(p.name for p in Path(tmp).iterdir()) == ['sources_config.json', 'sources_config.json.lock']
+
+
+def test_source_manager_uses_registry():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / 'sources.json')
+        manager = SourceManager(path)
+        assert manager.add_source('CISA', 'https://cisa.example/alerts.xml', category='government')
+        assert not manager.add_source('CISA', 'https://cisa.example/alerts.xml')
+        assert manager.blacklist_source('https://cisa.example/alerts.xml')
+        assert manager.get_active_sources() == []
+        assert manager.unblacklist_source('https://cisa.example/alerts.xml')
+        assert manager.toggle_source('https://cisa.example/alerts.xml')
+        assert manager.get_active_sources() == []
+        assert [s['name'] for s in manager.list_sources('government')] == ['CISA']
+
+        with open(path) as f:
+            assert json.load(f)['sources'][0]['active'] is False
+
+
+if __name__ == "__main__":
+    test_views_and_mtime_cache()
+    test_update_writes_atomically_and_refreshes_views()
+    test_source_manager_uses_registry()
+    print("\nAll source registry tests passed")
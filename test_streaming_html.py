@@ -0,0 +1,98 @@
+"""Test streaming, size-capped article extraction (runs offline)"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from http_client import HttpClient, ContentTypeError
+from streaming_html import ArticleTextParser, extract_text
+
+PARAGRAPH = "<p>Three Russian MiG-31 jets entered Estonian airspace near Vaindloo island for twelve minutes.</p>"
+
+PAGE_HEAD = ("<html><head><script>var junk = '" + "x" * 5000 + "';</script></head><body>"
+             "<nav><p>Home | World | Business</p></nav>"
+             "<p>Subscribe to our newsletter</p>"
+             "<div class='article-body'>")
+PAGE_TAIL = "</div><footer><p>Copyright</p></footer></body></html>"
+
+
+def chunked(html, size=1024):
+    for i in range(0, len(html), size):
+        yield html[i:i + size]
+
+
+def test_stops_once_enough_text_is_collected():
+    page = PAGE_HEAD + PARAGRAPH * 200 + PAGE_TAIL + "<script>" + "y" * 2_000_000 + "</script>"
+    consumed = []
+
+    def counting_chunks():
+        for chunk in chunked(page):
+            consumed.append(len(chunk))
+            yield chunk
+
+    text = extract_text(counting_chunks(), max_chars=2000)
+    assert len(text) == 2000
+    assert text.startswith("Three Russian MiG-31 jets")
+    assert 'Home' not in text and 'Subscribe' not in text
+    # Only a small prefix of the 2 MB page was read
+    assert sum(consumed) < 50_000
+
+
+def test_prefers_article_container_over_page_chrome():
+    parser = ArticleTextParser(max_chars=5000)
+    parser.feed("<p>Cookie notice one</p><p>Cookie notice two</p><p>Cookie three</p><p>Cookie four</p>"
+                "<article><div><p>" + "Body text. " * 30 + "</p></div><p>Second paragraph.</p></article>")
+    text = parser.text()
+    assert text.startswith("Body text.")
+    assert text.endswith("Second paragraph.")
+    assert 'Cookie' not in text
+
+
+def test_plain_paragraph_pages_still_work():
+    html = "<html><body>" + "".join(f"<p>Paragraph number {i} of the story.</p>" for i in range(6)) + "</body></html>"
+    text = extract_text(chunked(html, 16))
+    assert text.startswith("Paragraph number 0") and "number 5" in text
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/report.pdf':
+            body, content_type = b'%PDF-1.4 ...', 'application/pdf'
+        else:
+            body = ("<html><body><p>" + "z" * 100 + "</p>" + "a" * 300_000).encode()
+            content_type = 'text/html; charset=utf-8'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def test_stream_html_caps_bytes_and_rejects_non_html():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    client = HttpClient()
+    try:
+        html = ''.join(client.stream_html(f"{base}/page.html", max_bytes=10_000))
+        assert len(html) == 10_000
+
+        try:
+            list(client.stream_html(f"{base}/report.pdf"))
+            assert False, "expected ContentTypeError"
+        except ContentTypeError:
+            pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_stops_once_enough_text_is_collected()
+    test_prefers_article_container_over_page_chrome()
+    test_plain_paragraph_pages_still_work()
+    test_stream_html_caps_bytes_and_rejects_non_html()
+    print("\nAll streaming HTML tests passed")
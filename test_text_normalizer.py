@@ -0,0 +1,45 @@
+"""Test the fast summary cleaner"""
+from text_normalizer import strip_html, truncate_at_sentence, clean_summary
+
+CASES = [
+    ('<a href="https://news.google.com/rss/articles/CBMi?oc=5" target="_blank">Jets violate airspace</a>'
+     '&nbsp;&nbsp;<font color="#6f6f6f">Reuters</font>',
+     'Jets violate airspace Reuters'),
+    ('<p>First paragraph.</p><p>Second &amp; last, with <b>bold</b> and <i>it</i>alics.</p>',
+     'First paragraph. Second & last, with bold and italics.'),
+    ('<div><script>var x = "<p>not text</p>";</script>Kept <!-- hidden --> text<br/>next line</div>',
+     'Kept text next line'),
+    ('Plain text with &quot;entities&quot; &#8212; and numbers',
+     'Plain text with "entities" \u2014 and numbers'),
+    ('Plain text, nothing to do.', 'Plain text, nothing to do.'),
+]
+
+
+def test_strips_tags_and_entities():
+    for html, expected in CASES:
+        assert strip_html(html) == expected, (html, strip_html(html))
+
+
+def test_plain_text_and_edge_cases():
+    assert strip_html(None) == '' and strip_html('') == ''
+    assert strip_html('  spaced\n\tout\xa0text ') == 'spaced out text'
+    # A bare '<' in prose is not a tag
+    assert strip_html('casualties < 10 and > 5') == 'casualties < 10 and > 5'
+
+
+def test_truncate_at_sentence():
+    text = 'One sentence here. Another one follows. ' * 10
+    assert truncate_at_sentence('short', 100) == 'short'
+    cut = truncate_at_sentence(text, 100)
+    assert cut.endswith('.') and len(cut) <= 100
+    # No sentence end late enough: hard cut with ellipsis
+    assert truncate_at_sentence('A. ' + 'x' * 200, 100, min_fraction=0.7, ellipsis='...') == \
+        'A. ' + 'x' * 97 + '...'
+    assert len(clean_summary('<p>' + text + '</p>', max_chars=120)) <= 120
+
+
+if __name__ == "__main__":
+    test_strips_tags_and_entities()
+    test_plain_text_and_edge_cases()
+    test_truncate_at_sentence()
+    print("\nAll text normalizer tests passed")
@@ -0,0 +1,102 @@
+"""Test token counting and budget packing (runs offline)"""
+from token_counter import count_tokens, truncate_to_tokens, pack_to_budget, pack_articles
+from token_optimizer import TokenOptimizer
+from fast_llm_synthesizer import FastLLMSynthesizer
+from security_article_analyzer import SecurityArticleAnalyzer
+
+SAMPLE = ("Gang violence killed 20 people in Port-au-Prince on Tuesday as armed groups "
+          "clashed with police. The UN Security Council will meet to discuss the crisis. ")
+
+
+def make_articles(n):
+    return [
+        {
+            'title': f'Haiti report {i}: gang attack kills {i} in capital',
+            'summary': SAMPLE,
+            'full_content': SAMPLE * (i % 4 + 1),
+            'published': '2025-09-20T10:00:00',
+            'link': f'https://example.com/{i}',
+            'relevance_score': i % 7
+        }
+        for i in range(n)
+    ]
+
+
+def test_count_tokens_is_text_based():
+    assert count_tokens("") == 0
+    assert count_tokens("war") == 1
+    # Longer text costs more tokens than shorter text
+    assert count_tokens(SAMPLE * 2) > count_tokens(SAMPLE)
+    print(f"Sample: {len(SAMPLE)} chars -> {count_tokens(SAMPLE)} tokens")
+
+
+def test_truncate_respects_budget():
+    text = SAMPLE * 10
+    for limit in (5, 20, 100):
+        cut = truncate_to_tokens(text, limit)
+        assert count_tokens(cut) <= limit, (limit, count_tokens(cut))
+    assert truncate_to_tokens(SAMPLE, 10_000) == SAMPLE
+
+
+def test_knapsack_prefers_value_within_budget():
+    groups = [
+        [(10, 60, 'a')],
+        [(6, 30, 'b')],
+        [(6, 30, 'c')],
+    ]
+    # 'b' + 'c' (value 12, cost 60) beats 'a' alone (value 10)
+    assert pack_to_budget(groups, 60) == ['b', 'c']
+    assert pack_to_budget(groups, 0) == []
+
+
+def test_pack_articles_never_exceeds_budget():
+    articles = make_articles(40)
+    for budget in (100, 500, 2000):
+        packed = pack_articles(
+            articles, budget,
+            render=lambda a, s: f"Title: {a['title']}\nContent: {s}",
+            score=lambda a: a['relevance_score']
+        )
+        used = sum(count_tokens(block) + 4 for _, block in packed)
+        assert used <= budget
+        assert packed, "budget should fit at least one article"
+        print(f"Budget {budget}: packed {len(packed)} articles using {used} tokens")
+
+
+def test_prepare_for_llm_fits_budget():
+    synth = FastLLMSynthesizer.__new__(FastLLMSynthesizer)
+    data = synth._prepare_for_llm(make_articles(50), token_budget=800)
+    assert count_tokens(data) <= 800
+    assert "Article 1 (" in data
+
+    analyzer = SecurityArticleAnalyzer()
+    articles = analyzer.filter_security_relevant(make_articles(20))
+    for a in articles:
+        a['full_text'] = a['full_content']
+    analysis = {
+        'threat_assessment': 'HIGH',
+        'top_categories': analyzer._get_top_categories(articles),
+        'key_themes': ['Organized crime activity'],
+        'articles': articles
+    }
+    text = analyzer.prepare_for_llm(analysis, max_tokens=400)
+    assert count_tokens(text) <= 400
+    assert "[1]" in text
+
+
+def test_optimization_stats_use_text():
+    optimizer = TokenOptimizer()
+    articles = make_articles(30)
+    optimized = optimizer.optimize_for_llm(articles, max_articles=5)
+    stats = optimizer.get_optimization_stats(articles, optimized)
+    assert stats['original_tokens'] > stats['optimized_tokens'] > 0
+
+
+if __name__ == "__main__":
+    test_count_tokens_is_text_based()
+    test_truncate_respects_budget()
+    test_knapsack_prefers_value_within_budget()
+    test_pack_articles_never_exceeds_budget()
+    test_prepare_for_llm_fits_budget()
+    test_optimization_stats_use_text()
+    print("\nAll token counter tests passed")
@@ -0,0 +1,94 @@
+"""
+Fast text normalization for feed summaries
+
+Feed summaries are short snippets, usually plain text or a handful of
+<a>/<p>/<font> tags. Building a BeautifulSoup tree for each one (thousands
+per fetch cycle) just to drop the tags is most of the cleaning cost, so
+this module strips them with a few precompiled regexes instead:
+- plain-text fast path: no '<' means no parsing, just entities/whitespace
+- script/style/comment blocks are dropped with their contents
+- block tags become spaces, inline tags vanish (so "wo<b>rd</b>" stays whole)
+- entities are decoded and whitespace collapsed
+"""
+import html
+import re
+from typing import Optional
+
+_DROPPED_BLOCKS = re.compile(r'<(script|style|noscript|template)\b[^>]*>.*?</\1\s*>|<!--.*?-->',
+                             re.I | re.S)
+_BLOCK_TAGS = re.compile(r'</?(?:br|p|div|li|ul|ol|tr|td|th|h[1-6]|blockquote|section|article|'
+                         r'table|header|footer|hr|img)\b[^>]*>', re.I)
+# Only things that look like tags: "a < b" in plain prose is left alone
+_TAGS = re.compile(r'</?[A-Za-z][^>]*>|<![^>]*>')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def collapse_whitespace(text: str) -> str:
+    """Runs of whitespace (including non-breaking spaces) become one space"""
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def strip_html(text: Optional[str]) -> str:
+    """Plain text of an HTML snippet, entities decoded, whitespace collapsed"""
+    if not text:
+        return ''
+    if '<' in text:
+        text = _DROPPED_BLOCKS.sub(' ', text)
+        text = _BLOCK_TAGS.sub(' ', text)
+        text = _TAGS.sub('', text)
+    if '&' in text:
+        text = html.unescape(text)
+    return collapse_whitespace(text)
+
+
+def truncate_at_sentence(text: str, max_chars: int, min_fraction: float = 0.0,
+                         ellipsis: str = '') -> str:
+    """
+    Cut text to max_chars, ending on a complete sentence when possible
+
+    The cut ends at the last '. ' if that keeps more than min_fraction of
+    max_chars; otherwise the hard cut is kept, with ellipsis appended.
+    """
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    last_period = cut.rfind('. ')
+    if last_period > 0 and last_period > max_chars * min_fraction:
+        return cut[:last_period + 1]
+    return cut.rstrip() + ellipsis if ellipsis else cut
+
+
+def clean_summary(text: Optional[str], max_chars: Optional[int] = None) -> str:
+    """Strip a feed summary to text, optionally truncated at a sentence"""
+    text = strip_html(text)
+    if max_chars:
+        text = truncate_at_sentence(text, max_chars)
+    return text
+
+
+if __name__ == "__main__":
+    import time
+    from bs4 import BeautifulSoup
+
+    google_news = ('<a href="https://news.google.com/rss/articles/CBMiX2h0dHBz?oc=5" target="_blank">'
+                   'Russian jets violate Estonian airspace for 12 minutes</a>&nbsp;&nbsp;'
+                   '<font color="#6f6f6f">Reuters</font>')
+    publisher = ('<p>Three Russian MiG-31 jets entered Estonian airspace near Vaindloo island on Friday, '
+                 'officials said.</p><p>NATO jets were scrambled &amp; the ambassador was summoned.</p>'
+                 '<img src="https://example.com/pic.jpg" /><br/>')
+    plain = 'Gunmen attacked a police station in Mirebalais overnight, residents said. ' * 3
+    summaries = [google_news, publisher, plain] * 1000
+
+    start = time.time()
+    for summary in summaries:
+        BeautifulSoup(summary, 'html.parser').get_text()
+    bs4_time = time.time() - start
+
+    start = time.time()
+    for summary in summaries:
+        strip_html(summary)
+    fast_time = time.time() - start
+
+    print(f"BeautifulSoup get_text: {len(summaries) / bs4_time:9.0f} summaries/s")
+    print(f"strip_html:             {len(summaries) / fast_time:9.0f} summaries/s "
+          f"({bs4_time / fast_time:.0f}x)")
@@ -0,0 +1,264 @@
+"""
+Offline token counting and budget-aware context packing for LLM prompts
+
+Uses tiktoken when it is installed and its vocabulary is available locally.
+Otherwise falls back to a regex tokenizer that splits text the way BPE
+vocabularies do (words, digit groups, punctuation runs, long words broken
+into sub-word pieces). Either way no network call is needed to count.
+"""
+import math
+import os
+import re
+from functools import lru_cache
+from typing import List, Dict, Callable, Optional, Sequence, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Set TOKEN_COUNTER=heuristic to skip tiktoken even when it is installed
+TOKEN_COUNTER = os.getenv('TOKEN_COUNTER', 'auto').lower()
+TIKTOKEN_ENCODING = os.getenv('TIKTOKEN_ENCODING', 'cl100k_base')
+
+# Pieces roughly matching cl100k pre-tokenization: contractions, words with
+# an optional leading space, digit groups of up to 3, punctuation runs, spaces
+_PIECE_PATTERN = re.compile(
+    r"'(?:s|t|re|ve|m|ll|d)\b"
+    r"| ?[^\W\d_]+"
+    r"|\d{1,3}"
+    r"| ?[^\w\s]+"
+    r"|\s+",
+    re.IGNORECASE
+)
+
+# Words up to this length are almost always a single token in English BPE
+_SINGLE_TOKEN_WORD = 7
+# Average characters per sub-word piece once a word is split
+_SUBWORD_CHARS = 4
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the tiktoken encoding once, or None to use the heuristic"""
+    if tiktoken is None or TOKEN_COUNTER == 'heuristic':
+        return None
+    try:
+        return tiktoken.get_encoding(TIKTOKEN_ENCODING)
+    except Exception as e:
+        # Vocabulary not cached locally and no network - stay offline
+        print(f"[TokenCounter] tiktoken unavailable ({e}), using heuristic counts")
+        return None
+
+
+def _piece_tokens(piece: str) -> int:
+    """Estimate BPE tokens for one pre-tokenized piece"""
+    if piece.isspace():
+        # Runs of whitespace collapse into one token (newlines count each)
+        return max(1, piece.count('\n')) if '\n' in piece else 1
+
+    word = piece.lstrip(' ')
+    if not word.isascii():
+        # Non-Latin scripts tokenize at roughly 2 characters per token
+        return max(1, math.ceil(len(word) / 2))
+    if word.isalpha():
+        if len(word) <= _SINGLE_TOKEN_WORD:
+            return 1
+        return 1 + math.ceil((len(word) - _SINGLE_TOKEN_WORD) / _SUBWORD_CHARS)
+    # Punctuation runs: pairs usually merge (e.g. '."', '),')
+    return max(1, math.ceil(len(word) / 2))
+
+
+def _heuristic_spans(text: str):
+    """Yield (end_offset, tokens) for each piece of text"""
+    for match in _PIECE_PATTERN.finditer(text):
+        yield match.end(), _piece_tokens(match.group())
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text for prompt budgeting"""
+    if not text:
+        return 0
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    return sum(tokens for _, tokens in _heuristic_spans(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, ellipsis: str = "...") -> str:
+    """
+    Cut text to at most max_tokens, preferring a sentence boundary
+
+    The ellipsis is counted against the budget so the result always fits.
+    """
+    if not text or max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    room = max_tokens - count_tokens(ellipsis)
+    if room <= 0:
+        return ""
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:room])
+    else:
+        used = 0
+        end = 0
+        for offset, tokens in _heuristic_spans(text):
+            if used + tokens > room:
+                break
+            used += tokens
+            end = offset
+        cut = text[:end]
+
+    # End on a complete sentence if we keep at least 70% of the room
+    last_period = cut.rfind('. ')
+    if last_period > len(cut) * 0.7:
+        return cut[:last_period + 1]
+    return cut.rstrip() + ellipsis
+
+
+def pack_to_budget(groups: Sequence[Sequence[Tuple[float, int, object]]],
+                   token_budget: int) -> List[object]:
+    """
+    Multiple-choice knapsack: pick at most one option per group
+
+    Args:
+        groups: For each item, a list of (value, token_cost, payload) options
+                (e.g. the same article rendered at different snippet lengths)
+        token_budget: Hard ceiling on the summed token cost
+
+    Returns:
+        Chosen payloads in group order, maximizing total value with the
+        summed cost never exceeding token_budget
+    """
+    if token_budget <= 0 or not groups:
+        return []
+
+    # Bucket costs so the DP table stays ~1000 columns wide. Costs are
+    # rounded UP, so a selection that fits in buckets fits in real tokens.
+    unit = max(1, token_budget // 1000)
+    capacity = token_budget // unit
+
+    # best[c] = best value using capacity c; choice[g][c] = option picked
+    best = [0.0] * (capacity + 1)
+    choices = []
+
+    for options in groups:
+        weighted = [
+            (value, math.ceil(cost / unit), idx)
+            for idx, (value, cost, _) in enumerate(options)
+            if cost <= token_budget
+        ]
+        new_best = best[:]
+        picked = [-1] * (capacity + 1)
+
+        for value, weight, idx in weighted:
+            for c in range(capacity, weight - 1, -1):
+                candidate = best[c - weight] + value
+                if candidate > new_best[c]:
+                    new_best[c] = candidate
+                    picked[c] = idx
+
+        choices.append(picked)
+        best = new_best
+
+    # Walk back through the groups to recover the chosen options
+    selected = []
+    c = max(range(capacity + 1), key=lambda i: best[i])
+    for g in range(len(groups) - 1, -1, -1):
+        idx = choices[g][c]
+        if idx >= 0:
+            value, cost, payload = groups[g][idx]
+            selected.append(payload)
+            c -= math.ceil(cost / unit)
+
+    selected.reverse()
+    return selected
+
+
+def pack_articles(articles: List[Dict], token_budget: int,
+                  render: Callable[[Dict, str], str],
+                  score: Optional[Callable[[Dict], float]] = None,
+                  snippet_tokens: Sequence[int] = (0, 80, 250),
+                  per_item_overhead: int = 4) -> List[Tuple[Dict, str]]:
+    """
+    Fill a token budget with the most valuable article snippets
+
+    Each article is offered at several snippet lengths; the knapsack decides
+    which articles get in and how much of each one's content to keep.
+
+    Args:
+        articles: Articles with 'full_content' / 'full_text' / 'summary'
+        token_budget: Hard ceiling for the packed text
+        render: Builds the prompt block for (article, content_snippet)
+        score: Relevance function; higher scores win space first
+        snippet_tokens: Content lengths to offer (0 = title/metadata only)
+        per_item_overhead: Tokens reserved per article for numbering/separators
+
+    Returns:
+        List of (article, rendered_block) in descending relevance order
+    """
+    groups = []
+    ranked = sorted(
+        articles,
+        key=lambda a: score(a) if score else 0,
+        reverse=True
+    )
+
+    for rank, article in enumerate(ranked):
+        relevance = (score(article) if score else 0) + 1
+        # Break ties toward earlier (higher ranked / more recent) articles
+        relevance += 1.0 / (rank + 2)
+
+        content = (article.get('full_content') or article.get('full_text')
+                   or article.get('summary') or '')
+        content_tokens = count_tokens(content)
+
+        options = []
+        seen = set()
+        for limit in snippet_tokens:
+            snippet = truncate_to_tokens(content, limit) if limit else ''
+            if snippet in seen:
+                continue
+            seen.add(snippet)
+
+            block = render(article, snippet)
+            cost = count_tokens(block) + per_item_overhead
+            coverage = (count_tokens(snippet) / content_tokens) if content_tokens else 1.0
+            # Content is worth more than a bare headline, with diminishing returns
+            value = relevance * (0.5 + 0.5 * math.sqrt(coverage))
+            options.append((value, cost, (article, block)))
+
+        groups.append(options)
+
+    return pack_to_budget(groups, token_budget)
+
+
+if __name__ == "__main__":
+    sample = (
+        "Russian military aircraft violated Estonian airspace on Friday, "
+        "prompting NATO allies to scramble fighter jets. Officials in Tallinn "
+        "called the incursion 'unprecedented' and requested Article 4 consultations."
+    )
+
+    backend = 'tiktoken' if _get_encoding() is not None else 'heuristic'
+    print(f"Token counter backend: {backend}")
+    print(f"Characters: {len(sample)}  Tokens: {count_tokens(sample)}  len/4: {len(sample) / 4:.0f}")
+    print(f"Truncated to 20 tokens: {truncate_to_tokens(sample, 20)}")
+
+    articles = [
+        {'title': f'Article {i}', 'summary': sample * (i % 3 + 1), 'score': i % 5}
+        for i in range(30)
+    ]
+    packed = pack_articles(
+        articles, 600,
+        render=lambda a, s: f"Title: {a['title']}\nContent: {s}",
+        score=lambda a: a['score']
+    )
+    total = sum(count_tokens(block) + 4 for _, block in packed)
+    print(f"\nPacked {len(packed)}/{len(articles)} articles into {total}/600 tokens")
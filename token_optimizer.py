@@ -1,4 +1,7 @@
 """Optimize article data to minimize token usage for LLM processing"""
+from token_counter import count_tokens, pack_articles
+from text_normalizer import truncate_at_sentence
+
 
 class TokenOptimizer:
     def __init__(self):
@@ -49,6 +52,9 @@ class TokenOptimizer:
             elif keyword in summary_lower:
                 score += 1
 
+        # Incidents covered by many reports matter more (capped)
+        score += min(10, 2 * (article.get('event_article_count', 1) - 1))
+
         # Recency bonus (if published date available)
         # Could add time-based scoring here
 
@@ -87,16 +93,9 @@ class TokenOptimizer:
         for score, article in top_articles:
             # Truncate title and summary
             title = article.get('title', '')[:max_title_length]
-            summary = article.get('summary', '')[:max_summary_length]
-
-            # Clean up truncated summary
-            if len(article.get('summary', '')) > max_summary_length:
-                # Try to end at last complete sentence
-                last_period = summary.rfind('. ')
-                if last_period > max_summary_length * 0.7:  # If we're at least 70% through
-                    summary = summary[:last_period + 1]
-                else:
-                    summary = summary.rstrip() + '...'
+            # End at the last complete sentence if we're at least 70% through
+            summary = truncate_at_sentence(article.get('summary', ''), max_summary_length,
+                                           min_fraction=0.7, ellipsis='...')
 
             optimized.append({
                 'title': title,
@@ -144,25 +143,42 @@ class TokenOptimizer:
         return '\n'.join(context_parts)
 
     def estimate_tokens(self, text):
-        """Rough estimate of token count (1 token ≈ 4 characters)"""
-        return len(text) / 4
+        """Token count for text (tokenizer-backed, works offline)"""
+        return count_tokens(text)
+
+    def pack_for_llm(self, articles, token_budget, render, snippet_tokens=(0, 80, 250)):
+        """
+        Select and trim articles to fill exactly token_budget
+
+        Args:
+            articles: List of article dictionaries
+            token_budget: Hard ceiling on tokens for the packed articles
+            render: Function (article, content_snippet) -> prompt block
+            snippet_tokens: Content lengths each article may be cut to
+
+        Returns:
+            List of (article, rendered_block) ordered by relevance
+        """
+        return pack_articles(
+            articles, token_budget, render,
+            score=self.score_article,
+            snippet_tokens=snippet_tokens
+        )
 
     def get_optimization_stats(self, original_articles, optimized_articles):
         """Calculate token savings statistics"""
 
-        # Original token estimate
-        original_chars = sum(
-            len(a.get('title', '')) + len(a.get('summary', ''))
+        # Original token count
+        original_tokens = sum(
+            self.estimate_tokens(f"{a.get('title', '')} {a.get('summary', '')}")
             for a in original_articles
         )
-        original_tokens = self.estimate_tokens(str(original_chars))
 
-        # Optimized token estimate
-        optimized_chars = sum(
-            len(a['title']) + len(a['summary'])
+        # Optimized token count
+        optimized_tokens = sum(
+            self.estimate_tokens(f"{a['title']} {a['summary']}")
             for a in optimized_articles
         )
-        optimized_tokens = self.estimate_tokens(str(optimized_chars))
 
         # Calculate savings
         reduction_percent = ((original_tokens - optimized_tokens) / original_tokens * 100) if original_tokens > 0 else 0
@@ -4,10 +4,22 @@ WSGI entry point for production deployment with Gunicorn
 import os
 from dashboard import app
 from report_scheduler import get_scheduler
+from llm_providers import get_provider_registry
+from country_facts import get_country_facts
+
+# Set up LLM clients now (in the background) so no request pays for SDK import
+get_provider_registry().warm()
+
+# Load the offline country facts snapshot and start its weekly refresher
+get_country_facts()
 
 # Start the scheduler in a background thread
 scheduler = get_scheduler()
 scheduler.start()
 
+# Poll critical queries continuously for breaking alerts
+from breaking_news_monitor import get_breaking_watcher
+get_breaking_watcher().start()
+
 if __name__ == "__main__":
     app.run()
\ No newline at end of file